@@ -0,0 +1,95 @@
+"""
+Controle de Admissão - Calmou API
+Recusa com 503 as rotas de menor prioridade enquanto o disjuntor do
+MongoDB está aberto (src/conexion/disjuntor.py), antes que elas ocupem
+uma thread esperando na fila do pool
+
+    @rotas.route('/stats')
+    @prioridade(PRIORIDADE_BAIXA)
+    def obter_estatisticas(): ...
+
+Sem @prioridade, rotas só de leitura (GET) têm prioridade normal e as
+demais (escritas), alta.
+"""
+
+import functools
+import math
+
+from flask import current_app, jsonify
+
+from src.conexion.disjuntor import (
+    NOMES_PRIORIDADES, PRIORIDADE_ALTA, PRIORIDADE_NORMAL, obter_disjuntor
+)
+
+METODOS_LEITURA = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def prioridade(nivel):
+    """
+    Define a prioridade de uma rota; deve ficar logo acima do def, para
+    que os demais decoradores (limiter, jwt) preservem o atributo
+
+    Args:
+        nivel (int): PRIORIDADE_BAIXA, PRIORIDADE_NORMAL ou PRIORIDADE_ALTA
+    """
+    def decorador(view):
+        view.prioridade = nivel
+        return view
+    return decorador
+
+
+def resposta_recusada(disjuntor, nivel):
+    """503 com Retry-After até o disjuntor aceitar sondas"""
+    resposta = jsonify({
+        'mensagem': 'Serviço temporariamente sobrecarregado. Tente novamente.',
+        'error': 'service_overloaded',
+        'prioridade': NOMES_PRIORIDADES[nivel]
+    })
+    resposta.headers['Retry-After'] = str(math.ceil(disjuntor.segundos_ate_sonda()) or 1)
+    return resposta, 503
+
+
+def _com_admissao(view, nivel, disjuntor):
+    @functools.wraps(view)
+    def executar(*args, **kwargs):
+        admitida, sonda = disjuntor.admitir(nivel)
+        if not admitida:
+            return resposta_recusada(disjuntor, nivel)
+        if not sonda:
+            return view(*args, **kwargs)
+
+        # Sonda do disjuntor meio aberto: o resultado decide se ele fecha
+        try:
+            resposta = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            disjuntor.registrar_sonda(False)
+            raise
+        disjuntor.registrar_sonda(resposta.status_code < 500)
+        return resposta
+
+    return executar
+
+
+def aplicar_admissao(app):
+    """
+    Envolve as rotas registradas com o controle de admissão
+
+    Chamar depois de aplicar_prazos(), para que as requisições recusadas
+    não cheguem a iniciar o prazo.
+    """
+    disjuntor = obter_disjuntor()
+    if not disjuntor.ativo:
+        return
+
+    metodos = {}
+    for regra in app.url_map.iter_rules():
+        metodos.setdefault(regra.endpoint, set()).update(regra.methods or ())
+
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint == 'static':
+            continue
+
+        padrao = PRIORIDADE_NORMAL if metodos.get(endpoint, set()) <= METODOS_LEITURA else PRIORIDADE_ALTA
+        nivel = getattr(view, 'prioridade', padrao)
+        if nivel < PRIORIDADE_ALTA:
+            app.view_functions[endpoint] = _com_admissao(view, nivel, disjuntor)
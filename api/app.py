@@ -2,12 +2,12 @@
 API Calmou - Backend Flask com MongoDB
 Aplicação de saúde mental e bem-estar
 """
-import logging
+import math
 import os
-from datetime import timedelta, datetime
-from logging.handlers import RotatingFileHandler
+from datetime import timedelta
 
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, url_for
+from flask.logging import default_handler
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token,
@@ -16,100 +16,128 @@ from flask_jwt_extended import (
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from marshmallow import ValidationError
-import bcrypt
 from bson import ObjectId
+from dotenv import load_dotenv
+
+# Configuração da API (api/.env); o .env da raiz é lido pela conexão com o MongoDB
+load_dotenv()
 
 # Imports do projeto MongoDB
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.conexion.mongo_conexao import conectar_mongo, fechar_mongo
+from src.conexion.disjuntor import ESTADO_ABERTO, PRIORIDADE_ALTA, PRIORIDADE_BAIXA, obter_disjuntor
+from src.conexion.mongo_conexao import fechar_mongo, prontidao_mongo, reconectar_mongo, verificar_mongo
+from src.controller.buffer_push import esvaziar_buffer_push
 from src.controller.controller_usuario import ControllerUsuario
 from src.controller.controller_meditacao import ControllerMeditacao
-from src.model.usuario import Usuario, ClassificacaoHumor, HistoricoMeditacao
+from src.controller.controller_estatisticas import ControllerEstatisticas, incrementos_usuario
+from src.model.usuario import Usuario, ClassificacaoHumor, HistoricoMeditacao, ResultadoAvaliacao
 from src.model.meditacao import Meditacao
+from src.utils.cache_catalogo import obter_cache_catalogo
+from src.utils.log_estruturado import HandlerFila, configurar_log_estruturado
+from src.utils.metricas import limpar_metricas, texto_metricas
+from src.utils.paginacao import ler_limite
+from pool_senhas import PoolSenhasSobrecarregado, criar_pool_senhas
+from armazenamento_limites import uri_padrao as uri_limites_padrao
+from respostas import (
+    CACHE_CONTROL_CATALOGO, CACHE_CONTROL_PERFIL, MAPA_PERFIL, MAPA_RESULTADO_AVALIACAO,
+    MAPA_USUARIO_RESUMO, etag_forte, meditacao_para_json, normalizar_tipo_avaliacao,
+    relatorio_humor_para_json, resumo_conteudo
+)
+from provedor_json import ProvedorJSON
+from prazos import aplicar_prazos, prazo
+from admissao import aplicar_admissao, prioridade
+from metricas_http import instrumentar_app
+from log_requisicoes import FiltroRequisicao, instrumentar_log
 
 # ==================== CONFIGURAÇÃO DO APP ====================
 
-app = Flask(__name__)
+# Paginação do catálogo de meditações
+LIMITE_PAGINA_MEDITACOES = 100
 
-# Configurações
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'calmou-secret-key-dev-2024')
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'calmou-jwt-secret-2024')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
-app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+# Paginação do histórico de avaliações
+LIMITE_PAGINA_AVALIACOES = 50
+MAXIMO_PAGINA_AVALIACOES = 100
 
-# ==================== LOGGING ====================
+# Janelas aceitas pelo relatório de humor (?dias=)
+JANELAS_RELATORIO_HUMOR = (7, 30, 90)
 
-os.makedirs('logs', exist_ok=True)
+# Prazos das rotas, em segundos (as demais usam API_PRAZO_PADRAO_MS, ver prazos.py)
+PRAZO_AUTENTICACAO = 12.0   # inclui a espera pelo pool de senhas (SENHAS_TIMEOUT)
+PRAZO_RELATORIOS = 5.0      # agregações sobre até 90 dias de registros
 
-formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s')
+def configurar_app(app):
+    """Aplica as configurações lidas do ambiente"""
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'calmou-secret-key-dev-2024')
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'calmou-jwt-secret-2024')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+    app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', '1') == '1'
 
-file_handler = RotatingFileHandler(
-    'logs/api.log',
-    maxBytes=10485760,  # 10MB
-    backupCount=10
-)
-file_handler.setFormatter(formatter)
-file_handler.setLevel(logging.INFO)
+# ==================== LOGGING ====================
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-console_handler.setLevel(logging.INFO)
+def configurar_logging(app):
+    """
+    Liga o app.logger ao log estruturado (uma vez por processo)
 
-app.logger.addHandler(file_handler)
-app.logger.addHandler(console_handler)
-app.logger.setLevel(logging.INFO)
+    Os registros vão para uma fila limitada e são gravados em JSON por uma
+    thread à parte (src/utils/log_estruturado.py), com o contexto e a
+    amostragem da requisição (log_requisicoes.py). O handler padrão do Flask
+    é removido: ele escreveria no stderr na thread da requisição, sem passar
+    pela fila nem pela amostragem
+    """
+    if any(isinstance(handler, HandlerFila) for handler in app.logger.handlers):
+        return
+
+    app.logger.removeHandler(default_handler)
+    configurar_log_estruturado(app.logger, 'logs/api.log', filtros=[FiltroRequisicao()])
 
 # ==================== EXTENSÕES ====================
 
-# CORS
-CORS(app, resources={
-    r"/*": {
-        "origins": ["*"],  # Em produção, especificar origens
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
-    }
-})
+# Rotas da API (registradas na aplicação pelo create_app)
+rotas = Blueprint('api', __name__)
 
 # JWT
-jwt = JWTManager(app)
+jwt = JWTManager()
 
-# Rate Limiting
+# Rate Limiting (contadores compartilhados entre os workers, em SQLite)
 limiter = Limiter(
-    app=app,
     key_func=get_remote_address,
     default_limits=["200 per minute"],
-    storage_uri="memory://"
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI') or uri_limites_padrao(),
+    strategy=os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter')
 )
 
-# Controllers
-db = conectar_mongo()
+# Controllers (cada processo abre a própria conexão na primeira consulta)
 controller_usuario = ControllerUsuario()
 controller_meditacao = ControllerMeditacao()
+controller_estatisticas = ControllerEstatisticas()
+cache_catalogo = obter_cache_catalogo()
+pool_senhas = criar_pool_senhas()
 
 # ==================== ERROR HANDLERS ====================
 
-@app.errorhandler(ValidationError)
+@rotas.app_errorhandler(ValidationError)
 def handle_validation_error(error):
-    app.logger.warning(f"Erro de validação: {error.messages}")
+    current_app.logger.warning("Erro de validação: %s", error.messages)
     return jsonify({
         'mensagem': 'Erro de validação',
         'erros': error.messages
     }), 400
 
-@app.errorhandler(404)
+@rotas.app_errorhandler(404)
 def not_found(error):
     return jsonify({'mensagem': 'Recurso não encontrado'}), 404
 
-@app.errorhandler(500)
+@rotas.app_errorhandler(500)
 def internal_error(error):
-    app.logger.error(f"Erro interno: {error}")
+    current_app.logger.error("Erro interno: %s", error)
     return jsonify({'mensagem': 'Erro interno do servidor'}), 500
 
-@app.errorhandler(429)
+@rotas.app_errorhandler(429)
 def ratelimit_handler(error):
-    app.logger.warning(f"Rate limit atingido: {get_remote_address()}")
+    current_app.logger.warning("Rate limit atingido: %s", get_remote_address())
     return jsonify({
         'mensagem': 'Muitas requisições. Tente novamente mais tarde.'
     }), 429
@@ -140,28 +168,60 @@ def missing_token_callback(error):
 # ==================== HELPER FUNCTIONS ====================
 
 def hash_password(password: str) -> str:
-    """Gera hash bcrypt da senha"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Gera hash bcrypt da senha (no pool de processos)"""
+    return pool_senhas.gerar_hash(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
-    """Verifica se a senha corresponde ao hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
-
-def serialize_objectid(obj):
-    """Converte ObjectId para string em objetos"""
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    if isinstance(obj, dict):
-        return {k: serialize_objectid(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [serialize_objectid(item) for item in obj]
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    return obj
+    """Verifica se a senha corresponde ao hash (no pool de processos)"""
+    return pool_senhas.verificar(password, password_hash)
+
+def resposta_sobrecarga(error):
+    """Resposta 503 com Retry-After quando o pool de senhas está cheio"""
+    current_app.logger.warning("Pool de senhas sobrecarregado: %s", error)
+    resposta = jsonify({'mensagem': 'Serviço temporariamente sobrecarregado. Tente novamente.'})
+    resposta.headers['Retry-After'] = str(error.retry_after)
+    return resposta, 503
+
+def resposta_nao_modificada(etag, cache_control):
+    """Retorna 304 se o If-None-Match do cliente já contém o ETag atual, senão None"""
+    if not request.if_none_match.contains(etag):
+        return None
+    resposta = current_app.response_class(status=304)
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = cache_control
+    return resposta
+
+def com_etag(resposta, etag, cache_control):
+    """Adiciona ETag e Cache-Control a uma resposta completa"""
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = cache_control
+    return resposta
+
+def carregar_pagina_meditacoes(limite, apos):
+    """Busca uma página do catálogo no MongoDB já formatada (usada pelo cache; None em caso de erro)"""
+    pagina = controller_meditacao.listar_pagina(limite, apos)
+    if pagina is None:
+        return None
+    docs, proximo_cursor = pagina
+    return [meditacao_para_json(doc) for doc in docs], proximo_cursor
+
+def obter_pagina_meditacoes(limite, apos):
+    """Retorna uma página do catálogo, do cache ou do MongoDB"""
+    return cache_catalogo.obter(
+        f"pagina:{limite}:{apos or ''}",
+        lambda: carregar_pagina_meditacoes(limite, apos)
+    )
+
+def carregar_meditacao(meditacao_id):
+    """Busca uma meditação no MongoDB já formatada (usada pelo cache)"""
+    meditacao = controller_meditacao.buscar_por_id(ObjectId(meditacao_id))
+    if not meditacao:
+        return None
+    return meditacao_para_json(meditacao.to_dict())
 
 # ==================== ROTAS PÚBLICAS ====================
 
-@app.route('/', methods=['GET'])
+@rotas.route('/', methods=['GET'])
 def index():
     """Rota raiz - Informações da API"""
     return jsonify({
@@ -176,31 +236,54 @@ def index():
             'meditations': '/meditacoes, /meditacoes/<id>',
             'meditation_history': '/meditacoes/historico, /meditacoes/estatisticas',
             'assessments': '/avaliacoes, /avaliacoes/historico',
-            'stats': '/stats'
+            'stats': '/stats',
+            'cache': '/cache/estatisticas',
+            'passwords': '/senhas/estatisticas'
         }
     })
 
-@app.route('/health', methods=['GET'])
+@rotas.route('/health', methods=['GET'])
+@prioridade(PRIORIDADE_ALTA)
 def health_check():
-    """Health check para monitoramento"""
-    try:
-        # Testa conexão com MongoDB
-        db.command('ping')
+    """Health check para monitoramento (prontidão da conexão com o MongoDB)"""
+    disjuntor = obter_disjuntor()
+
+    # Com o disjuntor aberto, responde sem esperar na fila do pool
+    if disjuntor.estado_atual() == ESTADO_ABERTO:
+        resposta = jsonify({
+            'status': 'overloaded',
+            'database': 'degraded',
+            'prontidao': prontidao_mongo(),
+            'disjuntor': disjuntor.resumo()
+        })
+        resposta.headers['Retry-After'] = str(math.ceil(disjuntor.segundos_ate_sonda()) or 1)
+        return resposta, 503
+
+    # Durante o backoff de uma falha, responde sem pingar o servidor de novo
+    if verificar_mongo():
         return jsonify({
             'status': 'healthy',
-            'database': 'connected'
+            'database': 'connected',
+            'prontidao': prontidao_mongo(),
+            'disjuntor': disjuntor.resumo()
         }), 200
-    except Exception as e:
-        app.logger.error(f"Health check falhou: {e}")
-        return jsonify({
-            'status': 'unhealthy',
-            'database': 'disconnected'
-        }), 503
+
+    prontidao = prontidao_mongo()
+    current_app.logger.error("Health check falhou: %s", prontidao['ultimo_erro'])
+    resposta = jsonify({
+        'status': 'unhealthy',
+        'database': 'disconnected',
+        'prontidao': prontidao,
+        'disjuntor': disjuntor.resumo()
+    })
+    resposta.headers['Retry-After'] = str(math.ceil(prontidao['proxima_tentativa_em_s']) or 1)
+    return resposta, 503
 
 # ==================== AUTENTICAÇÃO ====================
 
-@app.route('/register', methods=['POST'])
+@rotas.route('/register', methods=['POST'])
 @limiter.limit("3 per minute")
+@prazo(PRAZO_AUTENTICACAO)
 def register():
     """Endpoint de registro de novo usuário"""
     try:
@@ -237,7 +320,7 @@ def register():
         access_token = create_access_token(identity=str(user_id))
         refresh_token = create_refresh_token(identity=str(user_id))
 
-        app.logger.info(f"Novo usuário registrado: {dados['email']}")
+        current_app.logger.info("Novo usuário registrado: %s", dados['email'])
 
         return jsonify({
             "mensagem": "Usuário criado com sucesso!",
@@ -250,12 +333,15 @@ def register():
             }
         }), 201
 
+    except PoolSenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
     except Exception as e:
-        app.logger.error(f"Erro ao criar usuário: {str(e)}")
+        current_app.logger.error("Erro ao criar usuário: %s", e)
         return jsonify({"mensagem": f"Erro ao criar usuário: {str(e)}"}), 500
 
-@app.route('/login', methods=['POST'])
+@rotas.route('/login', methods=['POST'])
 @limiter.limit("5 per minute")
+@prazo(PRAZO_AUTENTICACAO)
 def login():
     """Endpoint de login com JWT"""
     try:
@@ -271,12 +357,12 @@ def login():
         user_found = controller_usuario.buscar_por_email(email)
 
         if not user_found:
-            app.logger.warning(f"Tentativa de login com email inexistente: {email}")
+            current_app.logger.warning("Tentativa de login com email inexistente: %s", email)
             return jsonify({"mensagem": "Credenciais inválidas"}), 401
 
         # Verifica senha
         if not verify_password(password, user_found.get_password_hash()):
-            app.logger.warning(f"Tentativa de login com senha incorreta: {email}")
+            current_app.logger.warning("Tentativa de login com senha incorreta: %s", email)
             return jsonify({"mensagem": "Credenciais inválidas"}), 401
 
         # Cria tokens JWT
@@ -284,7 +370,7 @@ def login():
         access_token = create_access_token(identity=user_id)
         refresh_token = create_refresh_token(identity=user_id)
 
-        app.logger.info(f"Login bem-sucedido: {email}")
+        current_app.logger.info("Login bem-sucedido: %s", email)
 
         return jsonify({
             "mensagem": "Login bem-sucedido!",
@@ -297,11 +383,13 @@ def login():
             }
         }), 200
 
+    except PoolSenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
     except Exception as e:
-        app.logger.error(f"Erro no login: {str(e)}")
+        current_app.logger.error("Erro no login: %s", e)
         return jsonify({"mensagem": "Erro ao realizar login"}), 500
 
-@app.route('/refresh', methods=['POST'])
+@rotas.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
     """Endpoint para renovar access token"""
@@ -314,12 +402,12 @@ def refresh():
         }), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao renovar token: {str(e)}")
+        current_app.logger.error("Erro ao renovar token: %s", e)
         return jsonify({'mensagem': 'Erro ao renovar token'}), 500
 
 # ==================== USUÁRIOS ====================
 
-@app.route('/usuarios/<user_id>', methods=['GET'])
+@rotas.route('/usuarios/<user_id>', methods=['GET'])
 @jwt_required()
 def obter_usuario(user_id):
     """Retorna dados do usuário"""
@@ -331,26 +419,19 @@ def obter_usuario(user_id):
             return jsonify({"mensagem": "Acesso não autorizado"}), 403
 
         # Busca usuário no MongoDB
-        usuario = db.usuarios.find_one({"_id": ObjectId(user_id)})
+        usuario = controller_usuario.buscar_campos(user_id, MAPA_USUARIO_RESUMO.projecao)
 
         if not usuario:
             return jsonify({"mensagem": "Usuário não encontrado"}), 404
 
         # Remove campos sensíveis
-        usuario_data = {
-            'id': str(usuario['_id']),
-            'nome': usuario.get('nome'),
-            'email': usuario.get('email'),
-            'data_cadastro': usuario.get('data_cadastro').isoformat() if usuario.get('data_cadastro') else None
-        }
-
-        return jsonify(usuario_data), 200
+        return jsonify(MAPA_USUARIO_RESUMO.aplicar(usuario)), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao buscar usuário: {str(e)}")
+        current_app.logger.error("Erro ao buscar usuário: %s", e)
         return jsonify({"mensagem": "Erro ao buscar usuário"}), 500
 
-@app.route('/usuarios/<user_id>/excluir-conta', methods=['DELETE'])
+@rotas.route('/usuarios/<user_id>/excluir-conta', methods=['DELETE'])
 @jwt_required()
 def excluir_conta(user_id):
     """Exclui a conta do usuário (todos os dados)"""
@@ -362,100 +443,127 @@ def excluir_conta(user_id):
             return jsonify({"mensagem": "Acesso não autorizado"}), 403
 
         # Exclui o usuário do MongoDB
-        resultado = db.usuarios.delete_one({"_id": ObjectId(user_id)})
+        resultado = controller_usuario.collection.delete_one({"_id": ObjectId(user_id)})
 
         if resultado.deleted_count > 0:
-            app.logger.info(f"Conta excluída: {user_id}")
+            controller_usuario.remover_dependentes(ObjectId(user_id))
+            controller_estatisticas.registrar(incrementos_usuario(-1))
+            current_app.logger.info("Conta excluída")
             return jsonify({"mensagem": "Conta excluída com sucesso"}), 200
         else:
             return jsonify({"mensagem": "Usuário não encontrado"}), 404
 
     except Exception as e:
-        app.logger.error(f"Erro ao excluir conta: {str(e)}")
+        current_app.logger.error("Erro ao excluir conta: %s", e)
         return jsonify({"mensagem": "Erro ao excluir conta"}), 500
 
 # ==================== MEDITAÇÕES ====================
 
-@app.route('/meditacoes', methods=['GET'])
+@rotas.route('/meditacoes', methods=['GET'])
+@prioridade(PRIORIDADE_BAIXA)
 def listar_meditacoes():
-    """Lista todas as meditações (público)"""
+    """
+    Lista as meditações (público), paginadas por cursor
+
+    Query params:
+        limit: itens por página (padrão e máximo: 100)
+        after: cursor devolvido no header X-Next-Cursor da página anterior
+    """
     try:
-        meditacoes = controller_meditacao.listar_todas()
-
-        meditacoes_json = []
-        for med in meditacoes:
-            meditacoes_json.append({
-                'id': str(med.get_id()),
-                'titulo': med.get_titulo(),
-                'descricao': med.get_descricao(),
-                'duracao_minutos': med.get_duracao_minutos(),
-                'url_audio': med.get_url_audio(),
-                'tipo': med.get_tipo(),
-                'categoria': med.get_categoria(),
-                'imagem_capa': med.get_imagem_capa()
-            })
-
-        return jsonify(meditacoes_json), 200
+        try:
+            limite = ler_limite(request.args.get('limit'), LIMITE_PAGINA_MEDITACOES, LIMITE_PAGINA_MEDITACOES)
+            apos = request.args.get('after')
+
+            pagina_json = obter_pagina_meditacoes(limite, apos)
+        except ValueError:
+            return jsonify({"mensagem": "Parâmetros de paginação inválidos"}), 400
+
+        if pagina_json is None:
+            return jsonify({"mensagem": "Erro ao listar meditações"}), 500
+        meditacoes_json, proximo_cursor = pagina_json
+
+        # O ETag vem do conteúdo da página (a versão do cache é local ao host);
+        # com a página no cache do catálogo, o 304 não lê o MongoDB
+        etag = etag_forte('catalogo', resumo_conteudo(pagina_json))
+        nao_modificada = resposta_nao_modificada(etag, CACHE_CONTROL_CATALOGO)
+        if nao_modificada:
+            return nao_modificada
+
+        resposta = jsonify(meditacoes_json)
+
+        if proximo_cursor:
+            resposta.headers['X-Next-Cursor'] = proximo_cursor
+            proxima_url = url_for('.listar_meditacoes', limit=limite, after=proximo_cursor)
+            resposta.headers['Link'] = f'<{proxima_url}>; rel="next"'
+
+        return com_etag(resposta, etag, CACHE_CONTROL_CATALOGO), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao listar meditações: {str(e)}")
+        current_app.logger.error("Erro ao listar meditações: %s", e)
         return jsonify({"mensagem": "Erro ao listar meditações"}), 500
 
-@app.route('/meditacoes/<meditacao_id>', methods=['GET'])
+@rotas.route('/meditacoes/<meditacao_id>', methods=['GET'])
 def buscar_meditacao(meditacao_id):
     """Busca detalhes de uma meditação específica"""
     try:
-        from bson import ObjectId
-        meditacao = controller_meditacao.buscar_por_id(ObjectId(meditacao_id))
+        versao = cache_catalogo.obter(
+            f"versao:{meditacao_id}",
+            lambda: controller_meditacao.obter_versao(meditacao_id)
+        )
 
-        if not meditacao:
+        if versao is None:
             return jsonify({"mensagem": "Meditação não encontrada"}), 404
 
-        return jsonify({
-            'id': str(meditacao.get_id()),
-            'titulo': meditacao.get_titulo(),
-            'descricao': meditacao.get_descricao(),
-            'duracao_minutos': meditacao.get_duracao_minutos(),
-            'url_audio': meditacao.get_url_audio(),
-            'tipo': meditacao.get_tipo(),
-            'categoria': meditacao.get_categoria(),
-            'imagem_capa': meditacao.get_imagem_capa()
-        }), 200
+        etag = etag_forte('meditacao', meditacao_id, versao)
+        nao_modificada = resposta_nao_modificada(etag, CACHE_CONTROL_CATALOGO)
+        if nao_modificada:
+            return nao_modificada
+
+        meditacao_json = cache_catalogo.obter(
+            f"meditacao:{meditacao_id}",
+            lambda: carregar_meditacao(meditacao_id)
+        )
+
+        if not meditacao_json:
+            return jsonify({"mensagem": "Meditação não encontrada"}), 404
+
+        return com_etag(jsonify(meditacao_json), etag, CACHE_CONTROL_CATALOGO), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao buscar meditação: {str(e)}")
+        current_app.logger.error("Erro ao buscar meditação: %s", e)
         return jsonify({"mensagem": "Erro ao buscar meditação"}), 500
 
 # ==================== PERFIL USUÁRIO ====================
 
-@app.route('/perfil', methods=['GET'])
+@rotas.route('/perfil', methods=['GET'])
 @jwt_required()
 def get_perfil():
     """Retorna perfil do usuário autenticado"""
     try:
         current_user_id = get_jwt_identity()
-        usuario = controller_usuario.buscar_por_id(ObjectId(current_user_id))
+
+        # Consulta coberta pelo índice (_id, versao): o 304 não lê o documento
+        versao = controller_usuario.obter_versao(ObjectId(current_user_id))
+        if versao is None:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        etag = etag_forte('perfil', current_user_id, versao)
+        nao_modificada = resposta_nao_modificada(etag, CACHE_CONTROL_PERFIL)
+        if nao_modificada:
+            return nao_modificada
+
+        usuario = controller_usuario.buscar_campos(current_user_id, MAPA_PERFIL.projecao)
 
         if not usuario:
             return jsonify({"mensagem": "Usuário não encontrado"}), 404
 
-        return jsonify({
-            'id': str(usuario.get_id()),
-            'nome': usuario.get_nome(),
-            'email': usuario.get_email(),
-            'cpf': usuario.get_cpf(),
-            'data_nascimento': usuario.get_data_nascimento().isoformat() if usuario.get_data_nascimento() else None,
-            'tipo_sanguineo': usuario.get_tipo_sanguineo(),
-            'alergias': usuario.get_alergias(),
-            'foto_perfil': usuario.get_foto_perfil(),
-            'data_cadastro': usuario.get_data_cadastro().isoformat() if usuario.get_data_cadastro() else None
-        }), 200
+        return com_etag(jsonify(MAPA_PERFIL.aplicar(usuario)), etag, CACHE_CONTROL_PERFIL), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao buscar perfil: {str(e)}")
+        current_app.logger.error("Erro ao buscar perfil: %s", e)
         return jsonify({"mensagem": "Erro ao buscar perfil"}), 500
 
-@app.route('/perfil', methods=['PUT'])
+@rotas.route('/perfil', methods=['PUT'])
 @jwt_required()
 def atualizar_perfil():
     """Atualiza perfil do usuário autenticado"""
@@ -487,18 +595,18 @@ def atualizar_perfil():
         resultado = controller_usuario.atualizar_usuario(ObjectId(current_user_id), campos_atualizados)
 
         if resultado:
-            app.logger.info(f"Perfil do usuário {current_user_id} atualizado")
+            current_app.logger.info("Perfil atualizado")
             return jsonify({"mensagem": "Perfil atualizado com sucesso!"}), 200
         else:
             return jsonify({"mensagem": "Erro ao atualizar perfil"}), 500
 
     except Exception as e:
-        app.logger.error(f"Erro ao atualizar perfil: {str(e)}")
+        current_app.logger.error("Erro ao atualizar perfil: %s", e)
         return jsonify({"mensagem": f"Erro ao atualizar perfil: {str(e)}"}), 500
 
 # ==================== HUMOR ====================
 
-@app.route('/humor', methods=['POST'])
+@rotas.route('/humor', methods=['POST'])
 @jwt_required()
 def registrar_humor():
     """Registra classificação de humor"""
@@ -521,79 +629,46 @@ def registrar_humor():
         )
 
         if resultado:
-            app.logger.info(f"Humor registrado para usuário {current_user_id}")
+            current_app.logger.info("Humor registrado")
             return jsonify({"mensagem": "Registro de humor salvo com sucesso!"}), 201
         else:
             return jsonify({"mensagem": "Erro ao salvar humor"}), 500
 
     except Exception as e:
-        app.logger.error(f"Erro ao salvar humor: {str(e)}")
+        current_app.logger.error("Erro ao salvar humor: %s", e)
         return jsonify({"mensagem": "Erro ao salvar humor"}), 500
 
-@app.route('/humor/relatorio-semanal', methods=['GET'])
+@rotas.route('/humor/relatorio-semanal', methods=['GET'])
 @jwt_required()
+@prazo(PRAZO_RELATORIOS)
+@prioridade(PRIORIDADE_BAIXA)
 def relatorio_humor_semanal():
-    """Retorna relatório semanal de humor do usuário"""
+    """Retorna relatório de humor do usuário (7 dias por padrão, ou ?dias=30/90)"""
     try:
         current_user_id = get_jwt_identity()
 
-        # Busca usuário e suas classificações de humor
-        usuario = controller_usuario.buscar_por_id(ObjectId(current_user_id))
-
-        if not usuario:
-            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+        try:
+            dias = int(request.args.get('dias', 7))
+        except ValueError:
+            dias = None
+        if dias not in JANELAS_RELATORIO_HUMOR:
+            return jsonify({"mensagem": "Período inválido. Use dias=7, 30 ou 90"}), 400
 
-        # Pega classificações dos últimos 7 dias
-        from datetime import datetime, timedelta
-        data_limite = datetime.now() - timedelta(days=7)
+        # Resumo calculado no MongoDB: só o período pedido sai do servidor
+        resumo = controller_usuario.relatorio_humor(current_user_id, dias)
 
-        classificacoes = usuario.get_classificacoes_humor()
-
-        # Filtra últimos 7 dias
-        classificacoes_semana = [
-            c for c in classificacoes
-            if c.get('data_classificacao') and c['data_classificacao'] >= data_limite
-        ]
-
-        # Calcula estatísticas
-        if classificacoes_semana:
-            niveis = [c.get('nivel_humor', 0) for c in classificacoes_semana]
-            media_humor = sum(niveis) / len(niveis) if niveis else 0
-
-            # Conta sentimentos
-            sentimentos = {}
-            for c in classificacoes_semana:
-                sent = c.get('sentimento_principal', 'Não especificado')
-                sentimentos[sent] = sentimentos.get(sent, 0) + 1
-        else:
-            media_humor = 0
-            sentimentos = {}
-
-        relatorio = {
-            'total_registros': len(classificacoes_semana),
-            'media_humor': round(media_humor, 2),
-            'sentimentos_frequentes': sentimentos,
-            'periodo': '7 dias',
-            'registros': [
-                {
-                    'nivel_humor': c.get('nivel_humor'),
-                    'sentimento_principal': c.get('sentimento_principal'),
-                    'notas': c.get('notas'),
-                    'data': c.get('data_classificacao').isoformat() if c.get('data_classificacao') else None
-                }
-                for c in sorted(classificacoes_semana, key=lambda x: x.get('data_classificacao', datetime.min), reverse=True)[:7]
-            ]
-        }
+        if resumo is None:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
 
-        return jsonify(relatorio), 200
+        return jsonify(relatorio_humor_para_json(resumo, dias)), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao gerar relatório de humor: {str(e)}")
+        current_app.logger.error("Erro ao gerar relatório de humor: %s", e)
         return jsonify({"mensagem": "Erro ao gerar relatório"}), 500
 
 # ==================== HISTÓRICO MEDITAÇÕES ====================
 
-@app.route('/meditacoes/historico', methods=['POST'])
+@rotas.route('/meditacoes/historico', methods=['POST'])
 @jwt_required()
 def registrar_meditacao_historico():
     """Registra uma meditação concluída"""
@@ -615,18 +690,18 @@ def registrar_meditacao_historico():
         )
 
         if resultado:
-            app.logger.info(f"Meditação registrada no histórico para usuário {current_user_id}")
+            current_app.logger.info("Meditação registrada no histórico")
             return jsonify({"mensagem": "Meditação registrada com sucesso!"}), 201
         else:
             return jsonify({"mensagem": "Erro ao registrar meditação"}), 500
 
     except Exception as e:
-        app.logger.error(f"Erro ao registrar meditação: {str(e)}")
+        current_app.logger.error("Erro ao registrar meditação: %s", e)
         return jsonify({"mensagem": "Erro ao registrar meditação"}), 500
 
 # ==================== AVALIAÇÕES ====================
 
-@app.route('/avaliacoes', methods=['POST'])
+@rotas.route('/avaliacoes', methods=['POST'])
 @jwt_required()
 def salvar_avaliacao():
     """Salva resultado de avaliação do usuário autenticado"""
@@ -637,129 +712,215 @@ def salvar_avaliacao():
         if not dados or 'tipo' not in dados or 'resultado_score' not in dados:
             return jsonify({"mensagem": "Tipo e resultado_score são obrigatórios"}), 400
 
-        # Mapeia tipos do frontend para valores do schema MongoDB
-        tipo_mapping = {
-            "Avaliação de Ansiedade": "ansiedade",
-            "Avaliação de Depressão": "depressao",
-            "Avaliação de Estresse": "estresse",
-            "Avaliação de Burnout": "burnout",
-            "Questionário de Burnout": "burnout",
-            "Questionário de Ansiedade": "ansiedade",
-            "Questionário de Depressão": "depressao",
-            "Questionário de Estresse": "estresse"
-        }
-
         tipo_original = dados.get('tipo', '')
-        tipo_normalizado = tipo_mapping.get(tipo_original)
-
-        # Se não encontrou no mapeamento, tenta extrair a palavra-chave
-        if not tipo_normalizado:
-            tipo_lower = tipo_original.lower()
-            if 'ansiedade' in tipo_lower:
-                tipo_normalizado = 'ansiedade'
-            elif 'depressao' in tipo_lower or 'depressão' in tipo_lower:
-                tipo_normalizado = 'depressao'
-            elif 'estresse' in tipo_lower:
-                tipo_normalizado = 'estresse'
-            elif 'burnout' in tipo_lower:
-                tipo_normalizado = 'burnout'
-            else:
-                tipo_normalizado = tipo_lower
-
-        app.logger.info(f"Tipo recebido: '{tipo_original}' -> Normalizado: '{tipo_normalizado}'")
-
-        # Adiciona avaliação no documento do usuário
-        avaliacao = {
-            "tipo": tipo_normalizado,
-            "respostas": dados.get('respostas', {}),
-            "resultado_score": dados['resultado_score'],
-            "resultado_texto": dados.get('resultado_texto'),
-            "data_avaliacao": datetime.now()
-        }
+        tipo_normalizado = normalizar_tipo_avaliacao(tipo_original)
+
+        current_app.logger.debug("Tipo recebido: '%s' -> Normalizado: '%s'", tipo_original, tipo_normalizado)
 
-        resultado = db.usuarios.update_one(
-            {"_id": ObjectId(current_user_id)},
-            {"$push": {"resultados_avaliacoes": avaliacao}}
+        # Adiciona avaliação no documento do usuário (em lote com PUSH_MODO=buffer)
+        avaliacao = ResultadoAvaliacao(
+            tipo=tipo_normalizado,
+            respostas=dados.get('respostas', {}),
+            resultado_score=dados['resultado_score'],
+            resultado_texto=dados.get('resultado_texto')
         )
 
-        if resultado.modified_count > 0:
-            app.logger.info(f"Avaliação salva para usuário {current_user_id}")
+        resultado = controller_usuario.adicionar_resultado_avaliacao(ObjectId(current_user_id), avaliacao)
+
+        if resultado:
+            current_app.logger.info("Avaliação salva")
             return jsonify({"mensagem": "Avaliação salva com sucesso!"}), 201
         else:
             return jsonify({"mensagem": "Erro ao salvar avaliação"}), 500
 
     except Exception as e:
-        app.logger.error(f"Erro ao salvar avaliação: {str(e)}")
+        current_app.logger.error("Erro ao salvar avaliação: %s", e)
         return jsonify({"mensagem": f"Erro ao salvar avaliação: {str(e)}"}), 500
 
-@app.route('/avaliacoes/historico', methods=['GET'])
+@rotas.route('/avaliacoes/historico', methods=['GET'])
 @jwt_required()
+@prazo(PRAZO_RELATORIOS)
+@prioridade(PRIORIDADE_BAIXA)
 def historico_avaliacoes():
-    """Retorna histórico de avaliações do usuário autenticado"""
+    """
+    Retorna histórico de avaliações do usuário autenticado (mais recentes primeiro)
+
+    Query params:
+        limit: itens por página (padrão 50, máximo 100)
+        after: cursor devolvido no header X-Next-Cursor da página anterior
+        tipo: filtra por tipo de avaliação (ansiedade, depressao, estresse, burnout)
+    """
     try:
         current_user_id = get_jwt_identity()
 
-        # Busca usuário diretamente do MongoDB
-        usuario = db.usuarios.find_one({"_id": ObjectId(current_user_id)})
+        try:
+            limite = ler_limite(request.args.get('limit'), LIMITE_PAGINA_AVALIACOES, MAXIMO_PAGINA_AVALIACOES)
+            apos = request.args.get('after')
+            tipo = request.args.get('tipo')
+            tipo = normalizar_tipo_avaliacao(tipo) if tipo else None
 
-        if not usuario:
-            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+            # Filtro, ordenação e corte da página feitos no MongoDB
+            resultado = controller_usuario.listar_avaliacoes(current_user_id, limite, apos, tipo)
+        except ValueError:
+            return jsonify({"mensagem": "Parâmetros de paginação inválidos"}), 400
 
-        # Pega avaliações do documento do usuário
-        avaliacoes_raw = usuario.get('resultados_avaliacoes', [])
+        if resultado is None:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
 
-        app.logger.info(f"Usuário {current_user_id} tem {len(avaliacoes_raw)} avaliações no banco")
+        avaliacoes, proximo_cursor, total = resultado
 
-        # Formata avaliações
-        avaliacoes = []
-        for av in avaliacoes_raw:
-            avaliacoes.append({
-                'tipo': av.get('tipo'),
-                'respostas': av.get('respostas', {}),
-                'resultado_score': av.get('resultado_score'),
-                'resultado_texto': av.get('resultado_texto'),
-                'data_avaliacao': av.get('data_avaliacao').isoformat() if av.get('data_avaliacao') else None
-            })
+        resposta = jsonify({
+            'total': total,
+            'avaliacoes': MAPA_RESULTADO_AVALIACAO.aplicar_lista(avaliacoes)
+        })
 
-        # Ordena por data (mais recentes primeiro)
-        avaliacoes.sort(key=lambda x: x.get('data_avaliacao', ''), reverse=True)
+        if proximo_cursor:
+            resposta.headers['X-Next-Cursor'] = proximo_cursor
+            parametros = {'limit': limite, 'after': proximo_cursor}
+            if tipo:
+                parametros['tipo'] = tipo
+            proxima_url = url_for('.historico_avaliacoes', **parametros)
+            resposta.headers['Link'] = f'<{proxima_url}>; rel="next"'
 
-        app.logger.info(f"Retornando {len(avaliacoes)} avaliações formatadas")
-
-        return jsonify({
-            'total': len(avaliacoes),
-            'avaliacoes': avaliacoes
-        }), 200
+        return resposta, 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao buscar histórico de avaliações: {str(e)}")
+        current_app.logger.error("Erro ao buscar histórico de avaliações: %s", e)
         return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
 
 # ==================== ESTATÍSTICAS ====================
 
-@app.route('/stats', methods=['GET'])
+@rotas.route('/stats', methods=['GET'])
+@prioridade(PRIORIDADE_BAIXA)
 def obter_estatisticas():
-    """Retorna estatísticas gerais do sistema"""
+    """
+    Retorna estatísticas gerais do sistema
+
+    Lidas da coleção 'estatisticas', mantida pelas escritas dos controllers,
+    com cache de ESTATISTICAS_TTL_S por worker; nenhuma coleção é contada.
+    """
     try:
-        stats = {
-            'total_usuarios': db.usuarios.count_documents({}),
-            'total_meditacoes': db.meditacoes.count_documents({}),
-            'database': 'MongoDB',
-            'version': '2.0.0'
-        }
+        resumo = controller_estatisticas.resumo()
+        if resumo is None:
+            return jsonify({"mensagem": "Erro ao buscar estatísticas"}), 500
 
+        stats = dict(resumo, database='MongoDB', version='2.0.0')
         return jsonify(stats), 200
 
     except Exception as e:
-        app.logger.error(f"Erro ao buscar estatísticas: {str(e)}")
+        current_app.logger.error("Erro ao buscar estatísticas: %s", e)
         return jsonify({"mensagem": "Erro ao buscar estatísticas"}), 500
 
+@rotas.route('/senhas/estatisticas', methods=['GET'])
+@prioridade(PRIORIDADE_ALTA)
+def estatisticas_senhas():
+    """Retorna as métricas do pool de hash de senhas deste worker"""
+    return jsonify(pool_senhas.estatisticas()), 200
+
+@rotas.route('/cache/estatisticas', methods=['GET'])
+@prioridade(PRIORIDADE_ALTA)
+def estatisticas_cache():
+    """Retorna os contadores do cache do catálogo deste worker"""
+    return jsonify(cache_catalogo.estatisticas()), 200
+
+@rotas.route('/metrics', methods=['GET'])
+@limiter.exempt
+@prioridade(PRIORIDADE_ALTA)
+def metricas():
+    """Métricas de todos os workers no formato de texto do Prometheus"""
+    return Response(texto_metricas(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# ==================== FÁBRICA DA APLICAÇÃO ====================
+
+def create_app():
+    """
+    Cria e configura a aplicação Flask
+
+    Não abre conexão com o MongoDB: com o preload do gunicorn a aplicação é
+    criada no processo mestre, e cada worker cria o próprio cliente depois
+    do fork (ver preparar_worker e gunicorn.conf.py)
+
+    Returns:
+        Flask: Aplicação pronta para ser servida
+    """
+    app = Flask(__name__)
+    app.json = ProvedorJSON(app)
+    configurar_app(app)
+    configurar_logging(app)
+    instrumentar_app(app)
+    instrumentar_log(app)
+
+    # CORS
+    CORS(app, resources={
+        r"/*": {
+            "origins": ["*"],  # Em produção, especificar origens
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "X-Prazo-Ms"],
+            "expose_headers": ["X-Next-Cursor", "Link", "ETag"]
+        }
+    })
+
+    jwt.init_app(app)
+    limiter.init_app(app)
+    app.register_blueprint(rotas)
+    aplicar_prazos(app)
+    aplicar_admissao(app)
+
+    return app
+
+def aquecer_cache_catalogo():
+    """
+    Carrega a primeira página do catálogo no cache (L1 deste processo e L2)
+
+    Chamado no processo mestre do gunicorn antes do fork: os workers herdam
+    o L1 preenchido. A conexão usada é fechada em seguida para que nenhum
+    worker herde o MongoClient do mestre.
+
+    Returns:
+        int: Quantidade de meditações carregadas
+    """
+    try:
+        # Sem o servidor, não grava uma página vazia no cache
+        if not verificar_mongo(respeitar_backoff=False):
+            raise ConnectionError(prontidao_mongo()['ultimo_erro'])
+        pagina_json = obter_pagina_meditacoes(LIMITE_PAGINA_MEDITACOES, None)
+        if pagina_json is None:
+            raise ConnectionError("erro ao carregar a primeira página do catálogo")
+        return len(pagina_json[0])
+    finally:
+        fechar_mongo()
+
+def preparar_worker(conexoes):
+    """
+    Cria o cliente do MongoDB do worker recém-criado e, se o servidor
+    responder (com novas tentativas em backoff), abre conexoes conexões
+    no pool antes da primeira requisição
+
+    Chamado pelo post_fork do gunicorn
+
+    Returns:
+        bool: True se o MongoDB respondeu
+    """
+    return reconectar_mongo(aquecer=conexoes)
+
+def encerrar_worker():
+    """
+    Grava os eventos pendentes do buffer de escrita e fecha o cliente do
+    MongoDB do worker
+
+    Chamado pelo worker_exit do gunicorn
+    """
+    esvaziar_buffer_push()
+    fechar_mongo()
+
 # ==================== INICIALIZAÇÃO ====================
 
 if __name__ == '__main__':
-    app.logger.info(f"🚀 Iniciando Calmou API MongoDB v2.0.0")
-    app.logger.info(f"🗄️ Database: MongoDB")
-    app.logger.info(f"🌍 Ambiente: development")
+    limpar_metricas()
+    app = create_app()
+    app.logger.info("🚀 Iniciando Calmou API MongoDB v2.0.0")
+    app.logger.info("🗄️ Database: MongoDB")
+    app.logger.info("🌍 Ambiente: development")
 
     app.run(
         host='0.0.0.0',
@@ -0,0 +1,844 @@
+"""
+API Calmou - Variante assíncrona (ASGI) com Quart e Motor
+Mesmas rotas e formatos de resposta de app.py, com E/S no MongoDB não bloqueante
+
+Execução:
+    hypercorn --bind 0.0.0.0:8001 --workers 4 app_async:app
+"""
+import asyncio
+import math
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import jwt as pyjwt
+from bson import ObjectId
+from dotenv import load_dotenv
+from limits import parse
+from limits.aio.strategies import STRATEGIES
+from limits.storage import storage_from_string
+from marshmallow import ValidationError
+from quart import Quart, g, jsonify, request, url_for
+
+# Configuração da API (api/.env); o .env da raiz é lido pela conexão com o MongoDB
+load_dotenv()
+
+# Imports do projeto MongoDB
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conexion.mongo_conexao_async import (
+    MongoDBConnectionAsync, conectar_mongo_async, fechar_mongo_async, prontidao_mongo_async,
+    verificar_mongo_async
+)
+from src.controller.controller_usuario_async import ControllerUsuarioAsync
+from src.controller.controller_meditacao_async import ControllerMeditacaoAsync
+from src.controller.controller_estatisticas import incrementos_usuario
+from src.model.usuario import Usuario, ClassificacaoHumor, HistoricoMeditacao, ResultadoAvaliacao
+from src.utils.cache_catalogo import obter_cache_catalogo
+from src.utils.log_estruturado import configurar_log_estruturado
+from src.utils.paginacao import ler_limite
+from pool_senhas import PoolSenhasSobrecarregado, criar_pool_senhas
+from armazenamento_limites import uri_padrao as uri_limites_padrao
+from respostas import (
+    CACHE_CONTROL_CATALOGO, CACHE_CONTROL_PERFIL, MAPA_PERFIL, MAPA_RESULTADO_AVALIACAO,
+    MAPA_USUARIO_RESUMO, etag_forte, meditacao_para_json, normalizar_tipo_avaliacao,
+    relatorio_humor_para_json, resumo_conteudo
+)
+from provedor_json import ProvedorJSON
+
+# ==================== CONFIGURAÇÃO DO APP ====================
+
+app = Quart(__name__)
+app.json = ProvedorJSON(app)
+
+# Configurações (as mesmas de app.py, para os tokens valerem nas duas APIs)
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'calmou-secret-key-dev-2024')
+app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'calmou-jwt-secret-2024')
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', '1') == '1'
+
+# Paginação do catálogo de meditações
+LIMITE_PAGINA_MEDITACOES = 100
+
+# Paginação do histórico de avaliações
+LIMITE_PAGINA_AVALIACOES = 50
+MAXIMO_PAGINA_AVALIACOES = 100
+
+# Janelas aceitas pelo relatório de humor (?dias=)
+JANELAS_RELATORIO_HUMOR = (7, 30, 90)
+
+# ==================== LOGGING ====================
+
+# Fila limitada e escrita em JSON por uma thread à parte: o loop de eventos
+# nunca espera pelo disco (src/utils/log_estruturado.py). Sem os handlers
+# que o Quart põe no app.logger (o padrão escreve no stderr)
+for handler in list(app.logger.handlers):
+    app.logger.removeHandler(handler)
+configurar_log_estruturado(app.logger, 'logs/api_async.log')
+
+# ==================== EXTENSÕES ====================
+
+# Rate Limiting (contadores compartilhados entre os workers, em SQLite)
+LIMITE_PADRAO = parse("200 per minute")
+uri_limites = os.getenv('RATELIMIT_STORAGE_URI') or uri_limites_padrao()
+rate_limiter = STRATEGIES[os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter')](
+    storage_from_string(uri_limites if uri_limites.startswith('async+') else f"async+{uri_limites}")
+)
+
+# Controllers
+controller_usuario = ControllerUsuarioAsync()
+controller_meditacao = ControllerMeditacaoAsync()
+db = MongoDBConnectionAsync().get_database()
+cache_catalogo = obter_cache_catalogo()
+pool_senhas = criar_pool_senhas()
+
+
+@app.before_serving
+async def iniciar():
+    """Espera o MongoDB (com novas tentativas) sem impedir o worker de subir"""
+    await conectar_mongo_async()
+
+
+@app.after_serving
+async def encerrar():
+    """Fecha o cliente Motor e o pool de senhas"""
+    fechar_mongo_async()
+    pool_senhas.fechar()
+
+
+@app.after_request
+async def adicionar_cors(resposta):
+    """Headers de CORS equivalentes aos do flask-cors em app.py"""
+    resposta.headers['Access-Control-Allow-Origin'] = '*'
+    resposta.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor, Link, ETag'
+    if request.method == 'OPTIONS':
+        resposta.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
+        resposta.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, If-None-Match'
+    return resposta
+
+# ==================== RATE LIMITING ====================
+
+def limitar(limite):
+    """Aplica um limite por IP à rota (substitui o limite padrão)"""
+    item = parse(limite)
+
+    def decorador(funcao):
+        funcao.limite_requisicoes = item
+        return funcao
+    return decorador
+
+
+@app.before_request
+async def verificar_limite():
+    """Aplica o limite da rota, ou o padrão, ao IP de origem"""
+    funcao = app.view_functions.get(request.endpoint)
+    if funcao is None or not app.config['RATELIMIT_ENABLED']:
+        return None
+
+    item = getattr(funcao, 'limite_requisicoes', LIMITE_PADRAO)
+    if not await rate_limiter.hit(item, request.endpoint, request.remote_addr or ''):
+        app.logger.warning("Rate limit atingido: %s", request.remote_addr)
+        return jsonify({
+            'mensagem': 'Muitas requisições. Tente novamente mais tarde.'
+        }), 429
+    return None
+
+# ==================== ERROR HANDLERS ====================
+
+@app.errorhandler(ValidationError)
+async def handle_validation_error(error):
+    app.logger.warning("Erro de validação: %s", error.messages)
+    return jsonify({
+        'mensagem': 'Erro de validação',
+        'erros': error.messages
+    }), 400
+
+@app.errorhandler(404)
+async def not_found(error):
+    return jsonify({'mensagem': 'Recurso não encontrado'}), 404
+
+@app.errorhandler(500)
+async def internal_error(error):
+    app.logger.error("Erro interno: %s", error)
+    return jsonify({'mensagem': 'Erro interno do servidor'}), 500
+
+# ==================== JWT ====================
+# Tokens compatíveis com os emitidos pelo Flask-JWT-Extended em app.py
+
+def _criar_token(identity, tipo, validade):
+    agora = datetime.now(timezone.utc)
+    claims = {
+        'fresh': False,
+        'iat': agora,
+        'jti': str(uuid.uuid4()),
+        'type': tipo,
+        'sub': identity,
+        'nbf': agora,
+        'exp': agora + validade
+    }
+    return pyjwt.encode(claims, app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+def create_access_token(identity):
+    return _criar_token(identity, 'access', app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+
+def create_refresh_token(identity):
+    return _criar_token(identity, 'refresh', app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+
+def get_jwt_identity():
+    return g.jwt_identity
+
+def jwt_required(refresh=False):
+    """Equivalente assíncrono do @jwt_required() do Flask-JWT-Extended"""
+    tipo_esperado = 'refresh' if refresh else 'access'
+
+    def decorador(funcao):
+        @wraps(funcao)
+        async def wrapper(*args, **kwargs):
+            cabecalho = request.headers.get('Authorization', '')
+            if not cabecalho.startswith('Bearer '):
+                return jsonify({
+                    'mensagem': 'Token de autenticação não fornecido',
+                    'error': 'authorization_required'
+                }), 401
+
+            try:
+                claims = pyjwt.decode(
+                    cabecalho[len('Bearer '):],
+                    app.config['JWT_SECRET_KEY'],
+                    algorithms=['HS256']
+                )
+            except pyjwt.ExpiredSignatureError:
+                return jsonify({
+                    'mensagem': 'Token expirado',
+                    'error': 'token_expired'
+                }), 401
+            except pyjwt.InvalidTokenError:
+                return jsonify({
+                    'mensagem': 'Token inválido',
+                    'error': 'invalid_token'
+                }), 401
+
+            if claims.get('type') != tipo_esperado or 'sub' not in claims:
+                return jsonify({
+                    'mensagem': 'Token inválido',
+                    'error': 'invalid_token'
+                }), 401
+
+            g.jwt_identity = claims['sub']
+            return await funcao(*args, **kwargs)
+        return wrapper
+    return decorador
+
+# ==================== HELPER FUNCTIONS ====================
+
+async def hash_password(password: str) -> str:
+    """Gera hash bcrypt da senha (no pool de processos)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, pool_senhas.gerar_hash, password)
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Verifica se a senha corresponde ao hash (no pool de processos)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, pool_senhas.verificar, password, password_hash)
+
+def resposta_sobrecarga(error):
+    """Resposta 503 com Retry-After quando o pool de senhas está cheio"""
+    app.logger.warning("Pool de senhas sobrecarregado: %s", error)
+    return (
+        jsonify({'mensagem': 'Serviço temporariamente sobrecarregado. Tente novamente.'}),
+        503,
+        {'Retry-After': str(error.retry_after)}
+    )
+
+def resposta_nao_modificada(etag, cache_control):
+    """Retorna 304 se o If-None-Match do cliente já contém o ETag atual, senão None"""
+    if not request.if_none_match.contains(etag):
+        return None
+    resposta = app.response_class('', status=304)
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = cache_control
+    return resposta
+
+def com_etag(resposta, etag, cache_control):
+    """Adiciona ETag e Cache-Control a uma resposta completa"""
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = cache_control
+    return resposta
+
+async def carregar_pagina_meditacoes(limite, apos):
+    """Busca uma página do catálogo no MongoDB já formatada (usada pelo cache; None em caso de erro)"""
+    pagina = await controller_meditacao.listar_pagina(limite, apos)
+    if pagina is None:
+        return None
+    docs, proximo_cursor = pagina
+    return [meditacao_para_json(doc) for doc in docs], proximo_cursor
+
+async def carregar_meditacao(meditacao_id):
+    """Busca uma meditação no MongoDB já formatada (usada pelo cache)"""
+    meditacao = await controller_meditacao.buscar_por_id(ObjectId(meditacao_id))
+    if not meditacao:
+        return None
+    return meditacao_para_json(meditacao.to_dict())
+
+# ==================== ROTAS PÚBLICAS ====================
+
+@app.route('/', methods=['GET'])
+async def index():
+    """Rota raiz - Informações da API"""
+    return jsonify({
+        'app': 'Calmou API MongoDB',
+        'version': '2.0.0',
+        'status': 'online',
+        'database': 'MongoDB',
+        'endpoints': {
+            'auth': '/login, /register, /refresh',
+            'users': '/usuarios, /perfil',
+            'mood': '/humor, /humor/relatorio-semanal',
+            'meditations': '/meditacoes, /meditacoes/<id>',
+            'meditation_history': '/meditacoes/historico, /meditacoes/estatisticas',
+            'assessments': '/avaliacoes, /avaliacoes/historico',
+            'stats': '/stats',
+            'cache': '/cache/estatisticas',
+            'passwords': '/senhas/estatisticas'
+        }
+    })
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """Health check para monitoramento (prontidão da conexão com o MongoDB)"""
+    # Durante o backoff de uma falha, responde sem pingar o servidor de novo
+    if await verificar_mongo_async():
+        return jsonify({
+            'status': 'healthy',
+            'database': 'connected',
+            'prontidao': prontidao_mongo_async()
+        }), 200
+
+    prontidao = prontidao_mongo_async()
+    app.logger.error("Health check falhou: %s", prontidao['ultimo_erro'])
+    resposta = jsonify({
+        'status': 'unhealthy',
+        'database': 'disconnected',
+        'prontidao': prontidao
+    })
+    resposta.headers['Retry-After'] = str(math.ceil(prontidao['proxima_tentativa_em_s']) or 1)
+    return resposta, 503
+
+# ==================== AUTENTICAÇÃO ====================
+
+@app.route('/register', methods=['POST'])
+@limitar("3 per minute")
+async def register():
+    """Endpoint de registro de novo usuário"""
+    try:
+        dados = await request.get_json()
+
+        if not dados or not dados.get('nome') or not dados.get('email') or not dados.get('password'):
+            return jsonify({"mensagem": "Nome, email e senha são obrigatórios"}), 400
+
+        # Verifica se email já existe
+        existing_user = await controller_usuario.buscar_por_email(dados['email'])
+        if existing_user:
+            return jsonify({"mensagem": "Email já cadastrado"}), 409
+
+        # Cria usuário
+        password_hash = await hash_password(dados['password'])
+
+        new_user = Usuario(
+            nome=dados['nome'],
+            email=dados['email'],
+            password_hash=password_hash,
+            cpf=dados.get('cpf'),
+            data_nascimento=dados.get('data_nascimento'),
+            tipo_sanguineo=dados.get('tipo_sanguineo'),
+            alergias=dados.get('alergias'),
+            foto_perfil=dados.get('foto_perfil')
+        )
+
+        user_id = await controller_usuario.inserir_usuario(new_user)
+
+        if not user_id:
+            return jsonify({"mensagem": "Erro ao criar usuário"}), 500
+
+        # Cria tokens
+        access_token = create_access_token(identity=str(user_id))
+        refresh_token = create_refresh_token(identity=str(user_id))
+
+        app.logger.info("Novo usuário registrado: %s", dados['email'])
+
+        return jsonify({
+            "mensagem": "Usuário criado com sucesso!",
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "usuario": {
+                "id": str(user_id),
+                "nome": dados['nome'],
+                "email": dados['email']
+            }
+        }), 201
+
+    except PoolSenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
+    except Exception as e:
+        app.logger.error("Erro ao criar usuário: %s", e)
+        return jsonify({"mensagem": f"Erro ao criar usuário: {str(e)}"}), 500
+
+@app.route('/login', methods=['POST'])
+@limitar("5 per minute")
+async def login():
+    """Endpoint de login com JWT"""
+    try:
+        dados = await request.get_json()
+
+        if not dados or not dados.get('email') or not dados.get('password'):
+            return jsonify({"mensagem": "Email e senha são obrigatórios"}), 400
+
+        email = dados['email']
+        password = dados['password']
+
+        # Busca usuário
+        user_found = await controller_usuario.buscar_por_email(email)
+
+        if not user_found:
+            app.logger.warning("Tentativa de login com email inexistente: %s", email)
+            return jsonify({"mensagem": "Credenciais inválidas"}), 401
+
+        # Verifica senha
+        if not await verify_password(password, user_found.get_password_hash()):
+            app.logger.warning("Tentativa de login com senha incorreta: %s", email)
+            return jsonify({"mensagem": "Credenciais inválidas"}), 401
+
+        # Cria tokens JWT
+        user_id = str(user_found.get_id())
+        access_token = create_access_token(identity=user_id)
+        refresh_token = create_refresh_token(identity=user_id)
+
+        app.logger.info("Login bem-sucedido: %s", email)
+
+        return jsonify({
+            "mensagem": "Login bem-sucedido!",
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "usuario": {
+                "id": user_id,
+                "nome": user_found.get_nome(),
+                "email": user_found.get_email()
+            }
+        }), 200
+
+    except PoolSenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
+    except Exception as e:
+        app.logger.error("Erro no login: %s", e)
+        return jsonify({"mensagem": "Erro ao realizar login"}), 500
+
+@app.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+async def refresh():
+    """Endpoint para renovar access token"""
+    try:
+        current_user_id = get_jwt_identity()
+        new_access_token = create_access_token(identity=current_user_id)
+
+        return jsonify({
+            'access_token': new_access_token
+        }), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao renovar token: %s", e)
+        return jsonify({'mensagem': 'Erro ao renovar token'}), 500
+
+# ==================== USUÁRIOS ====================
+
+@app.route('/usuarios/<user_id>', methods=['GET'])
+@jwt_required()
+async def obter_usuario(user_id):
+    """Retorna dados do usuário"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Verifica se está acessando o próprio perfil
+        if current_user_id != user_id:
+            return jsonify({"mensagem": "Acesso não autorizado"}), 403
+
+        usuario = await controller_usuario.buscar_campos(user_id, MAPA_USUARIO_RESUMO.projecao)
+
+        if not usuario:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        # Remove campos sensíveis
+        return jsonify(MAPA_USUARIO_RESUMO.aplicar(usuario)), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao buscar usuário: %s", e)
+        return jsonify({"mensagem": "Erro ao buscar usuário"}), 500
+
+@app.route('/usuarios/<user_id>/excluir-conta', methods=['DELETE'])
+@jwt_required()
+async def excluir_conta(user_id):
+    """Exclui a conta do usuário (todos os dados)"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Verifica se está excluindo a própria conta
+        if current_user_id != user_id:
+            return jsonify({"mensagem": "Acesso não autorizado"}), 403
+
+        resultado = await db.usuarios.delete_one({"_id": ObjectId(user_id)})
+
+        if resultado.deleted_count > 0:
+            await controller_usuario.remover_dependentes(ObjectId(user_id))
+            await controller_usuario.estatisticas.registrar(incrementos_usuario(-1))
+            app.logger.info("Conta excluída: %s", user_id)
+            return jsonify({"mensagem": "Conta excluída com sucesso"}), 200
+        else:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+    except Exception as e:
+        app.logger.error("Erro ao excluir conta: %s", e)
+        return jsonify({"mensagem": "Erro ao excluir conta"}), 500
+
+# ==================== MEDITAÇÕES ====================
+
+@app.route('/meditacoes', methods=['GET'])
+async def listar_meditacoes():
+    """Lista as meditações (público), paginadas por cursor"""
+    try:
+        try:
+            limite = ler_limite(request.args.get('limit'), LIMITE_PAGINA_MEDITACOES, LIMITE_PAGINA_MEDITACOES)
+            apos = request.args.get('after')
+
+            pagina_json = await cache_catalogo.obter_async(
+                f"pagina:{limite}:{apos or ''}",
+                lambda: carregar_pagina_meditacoes(limite, apos)
+            )
+        except ValueError:
+            return jsonify({"mensagem": "Parâmetros de paginação inválidos"}), 400
+
+        if pagina_json is None:
+            return jsonify({"mensagem": "Erro ao listar meditações"}), 500
+        meditacoes_json, proximo_cursor = pagina_json
+
+        # O ETag vem do conteúdo da página (a versão do cache é local ao host);
+        # com a página no cache do catálogo, o 304 não lê o MongoDB
+        etag = etag_forte('catalogo', resumo_conteudo(pagina_json))
+        nao_modificada = resposta_nao_modificada(etag, CACHE_CONTROL_CATALOGO)
+        if nao_modificada:
+            return nao_modificada
+
+        resposta = jsonify(meditacoes_json)
+
+        if proximo_cursor:
+            resposta.headers['X-Next-Cursor'] = proximo_cursor
+            proxima_url = url_for('listar_meditacoes', limit=limite, after=proximo_cursor)
+            resposta.headers['Link'] = f'<{proxima_url}>; rel="next"'
+
+        return com_etag(resposta, etag, CACHE_CONTROL_CATALOGO), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao listar meditações: %s", e)
+        return jsonify({"mensagem": "Erro ao listar meditações"}), 500
+
+@app.route('/meditacoes/<meditacao_id>', methods=['GET'])
+async def buscar_meditacao(meditacao_id):
+    """Busca detalhes de uma meditação específica"""
+    try:
+        versao = await cache_catalogo.obter_async(
+            f"versao:{meditacao_id}",
+            lambda: controller_meditacao.obter_versao(meditacao_id)
+        )
+
+        if versao is None:
+            return jsonify({"mensagem": "Meditação não encontrada"}), 404
+
+        etag = etag_forte('meditacao', meditacao_id, versao)
+        nao_modificada = resposta_nao_modificada(etag, CACHE_CONTROL_CATALOGO)
+        if nao_modificada:
+            return nao_modificada
+
+        meditacao_json = await cache_catalogo.obter_async(
+            f"meditacao:{meditacao_id}",
+            lambda: carregar_meditacao(meditacao_id)
+        )
+
+        if not meditacao_json:
+            return jsonify({"mensagem": "Meditação não encontrada"}), 404
+
+        return com_etag(jsonify(meditacao_json), etag, CACHE_CONTROL_CATALOGO), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao buscar meditação: %s", e)
+        return jsonify({"mensagem": "Erro ao buscar meditação"}), 500
+
+# ==================== PERFIL USUÁRIO ====================
+
+@app.route('/perfil', methods=['GET'])
+@jwt_required()
+async def get_perfil():
+    """Retorna perfil do usuário autenticado"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Consulta coberta pelo índice (_id, versao): o 304 não lê o documento
+        versao = await controller_usuario.obter_versao(ObjectId(current_user_id))
+        if versao is None:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        etag = etag_forte('perfil', current_user_id, versao)
+        nao_modificada = resposta_nao_modificada(etag, CACHE_CONTROL_PERFIL)
+        if nao_modificada:
+            return nao_modificada
+
+        usuario = await controller_usuario.buscar_campos(current_user_id, MAPA_PERFIL.projecao)
+
+        if not usuario:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        return com_etag(jsonify(MAPA_PERFIL.aplicar(usuario)), etag, CACHE_CONTROL_PERFIL), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao buscar perfil: %s", e)
+        return jsonify({"mensagem": "Erro ao buscar perfil"}), 500
+
+@app.route('/perfil', methods=['PUT'])
+@jwt_required()
+async def atualizar_perfil():
+    """Atualiza perfil do usuário autenticado"""
+    try:
+        current_user_id = get_jwt_identity()
+        dados = await request.get_json()
+
+        if not dados:
+            return jsonify({"mensagem": "Nenhum dado fornecido"}), 400
+
+        campos_permitidos = ('nome', 'cpf', 'data_nascimento', 'tipo_sanguineo', 'alergias', 'foto_perfil')
+        campos_atualizados = {campo: dados[campo] for campo in campos_permitidos if campo in dados}
+
+        if not campos_atualizados:
+            return jsonify({"mensagem": "Nenhum campo válido para atualizar"}), 400
+
+        resultado = await controller_usuario.atualizar_usuario(ObjectId(current_user_id), campos_atualizados)
+
+        if resultado:
+            app.logger.info("Perfil do usuário %s atualizado", current_user_id)
+            return jsonify({"mensagem": "Perfil atualizado com sucesso!"}), 200
+        else:
+            return jsonify({"mensagem": "Erro ao atualizar perfil"}), 500
+
+    except Exception as e:
+        app.logger.error("Erro ao atualizar perfil: %s", e)
+        return jsonify({"mensagem": f"Erro ao atualizar perfil: {str(e)}"}), 500
+
+# ==================== HUMOR ====================
+
+@app.route('/humor', methods=['POST'])
+@jwt_required()
+async def registrar_humor():
+    """Registra classificação de humor"""
+    try:
+        current_user_id = get_jwt_identity()
+        dados = await request.get_json()
+
+        if not dados or 'nivel_humor' not in dados:
+            return jsonify({"mensagem": "Nível de humor é obrigatório"}), 400
+
+        classificacao = ClassificacaoHumor(
+            nivel_humor=dados['nivel_humor'],
+            sentimento_principal=dados.get('sentimento_principal'),
+            notas=dados.get('notas')
+        )
+
+        resultado = await controller_usuario.adicionar_classificacao_humor(
+            ObjectId(current_user_id),
+            classificacao
+        )
+
+        if resultado:
+            app.logger.info("Humor registrado para usuário %s", current_user_id)
+            return jsonify({"mensagem": "Registro de humor salvo com sucesso!"}), 201
+        else:
+            return jsonify({"mensagem": "Erro ao salvar humor"}), 500
+
+    except Exception as e:
+        app.logger.error("Erro ao salvar humor: %s", e)
+        return jsonify({"mensagem": "Erro ao salvar humor"}), 500
+
+@app.route('/humor/relatorio-semanal', methods=['GET'])
+@jwt_required()
+async def relatorio_humor_semanal():
+    """Retorna relatório de humor do usuário (7 dias por padrão, ou ?dias=30/90)"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        try:
+            dias = int(request.args.get('dias', 7))
+        except ValueError:
+            dias = None
+        if dias not in JANELAS_RELATORIO_HUMOR:
+            return jsonify({"mensagem": "Período inválido. Use dias=7, 30 ou 90"}), 400
+
+        # Resumo calculado no MongoDB: só o período pedido sai do servidor
+        resumo = await controller_usuario.relatorio_humor(current_user_id, dias)
+
+        if resumo is None:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        return jsonify(relatorio_humor_para_json(resumo, dias)), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao gerar relatório de humor: %s", e)
+        return jsonify({"mensagem": "Erro ao gerar relatório"}), 500
+
+# ==================== HISTÓRICO MEDITAÇÕES ====================
+
+@app.route('/meditacoes/historico', methods=['POST'])
+@jwt_required()
+async def registrar_meditacao_historico():
+    """Registra uma meditação concluída"""
+    try:
+        current_user_id = get_jwt_identity()
+        dados = await request.get_json()
+
+        if not dados or 'meditacao_id' not in dados:
+            return jsonify({"mensagem": "ID da meditação é obrigatório"}), 400
+
+        historico = HistoricoMeditacao(
+            meditacao_id=ObjectId(dados['meditacao_id']),
+            duracao_real_minutos=dados.get('duracao_real_minutos')
+        )
+
+        resultado = await controller_usuario.adicionar_historico_meditacao(
+            ObjectId(current_user_id),
+            historico
+        )
+
+        if resultado:
+            app.logger.info("Meditação registrada no histórico para usuário %s", current_user_id)
+            return jsonify({"mensagem": "Meditação registrada com sucesso!"}), 201
+        else:
+            return jsonify({"mensagem": "Erro ao registrar meditação"}), 500
+
+    except Exception as e:
+        app.logger.error("Erro ao registrar meditação: %s", e)
+        return jsonify({"mensagem": "Erro ao registrar meditação"}), 500
+
+# ==================== AVALIAÇÕES ====================
+
+@app.route('/avaliacoes', methods=['POST'])
+@jwt_required()
+async def salvar_avaliacao():
+    """Salva resultado de avaliação do usuário autenticado"""
+    try:
+        current_user_id = get_jwt_identity()
+        dados = await request.get_json()
+
+        if not dados or 'tipo' not in dados or 'resultado_score' not in dados:
+            return jsonify({"mensagem": "Tipo e resultado_score são obrigatórios"}), 400
+
+        tipo_original = dados.get('tipo', '')
+        tipo_normalizado = normalizar_tipo_avaliacao(tipo_original)
+
+        app.logger.info("Tipo recebido: '%s' -> Normalizado: '%s'", tipo_original, tipo_normalizado)
+
+        # Adiciona avaliação no documento do usuário (e na coleção avaliacoes, conforme COLECOES_MODO)
+        avaliacao = ResultadoAvaliacao(
+            tipo=tipo_normalizado,
+            respostas=dados.get('respostas', {}),
+            resultado_score=dados['resultado_score'],
+            resultado_texto=dados.get('resultado_texto')
+        )
+
+        if await controller_usuario.adicionar_resultado_avaliacao(ObjectId(current_user_id), avaliacao):
+            app.logger.info("Avaliação salva para usuário %s", current_user_id)
+            return jsonify({"mensagem": "Avaliação salva com sucesso!"}), 201
+        else:
+            return jsonify({"mensagem": "Erro ao salvar avaliação"}), 500
+
+    except Exception as e:
+        app.logger.error("Erro ao salvar avaliação: %s", e)
+        return jsonify({"mensagem": f"Erro ao salvar avaliação: {str(e)}"}), 500
+
+@app.route('/avaliacoes/historico', methods=['GET'])
+@jwt_required()
+async def historico_avaliacoes():
+    """
+    Retorna histórico de avaliações do usuário autenticado (mais recentes primeiro)
+
+    Query params:
+        limit: itens por página (padrão 50, máximo 100)
+        after: cursor devolvido no header X-Next-Cursor da página anterior
+        tipo: filtra por tipo de avaliação (ansiedade, depressao, estresse, burnout)
+    """
+    try:
+        current_user_id = get_jwt_identity()
+
+        try:
+            limite = ler_limite(request.args.get('limit'), LIMITE_PAGINA_AVALIACOES, MAXIMO_PAGINA_AVALIACOES)
+            apos = request.args.get('after')
+            tipo = request.args.get('tipo')
+            tipo = normalizar_tipo_avaliacao(tipo) if tipo else None
+
+            # Filtro, ordenação e corte da página feitos no MongoDB
+            resultado = await controller_usuario.listar_avaliacoes(current_user_id, limite, apos, tipo)
+        except ValueError:
+            return jsonify({"mensagem": "Parâmetros de paginação inválidos"}), 400
+
+        if resultado is None:
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        avaliacoes, proximo_cursor, total = resultado
+
+        resposta = jsonify({
+            'total': total,
+            'avaliacoes': MAPA_RESULTADO_AVALIACAO.aplicar_lista(avaliacoes)
+        })
+
+        if proximo_cursor:
+            resposta.headers['X-Next-Cursor'] = proximo_cursor
+            parametros = {'limit': limite, 'after': proximo_cursor}
+            if tipo:
+                parametros['tipo'] = tipo
+            proxima_url = url_for('historico_avaliacoes', **parametros)
+            resposta.headers['Link'] = f'<{proxima_url}>; rel="next"'
+
+        return resposta, 200
+
+    except Exception as e:
+        app.logger.error("Erro ao buscar histórico de avaliações: %s", e)
+        return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
+
+# ==================== ESTATÍSTICAS ====================
+
+@app.route('/stats', methods=['GET'])
+async def obter_estatisticas():
+    """Retorna estatísticas gerais do sistema (coleção 'estatisticas', em cache por ESTATISTICAS_TTL_S)"""
+    try:
+        resumo = await controller_usuario.estatisticas.resumo()
+        if resumo is None:
+            return jsonify({"mensagem": "Erro ao buscar estatísticas"}), 500
+
+        stats = dict(resumo, database='MongoDB', version='2.0.0')
+        return jsonify(stats), 200
+
+    except Exception as e:
+        app.logger.error("Erro ao buscar estatísticas: %s", e)
+        return jsonify({"mensagem": "Erro ao buscar estatísticas"}), 500
+
+@app.route('/senhas/estatisticas', methods=['GET'])
+async def estatisticas_senhas():
+    """Retorna as métricas do pool de hash de senhas deste worker"""
+    return jsonify(pool_senhas.estatisticas()), 200
+
+@app.route('/cache/estatisticas', methods=['GET'])
+async def estatisticas_cache():
+    """Retorna os contadores do cache do catálogo deste worker"""
+    return jsonify(cache_catalogo.estatisticas()), 200
+
+# ==================== INICIALIZAÇÃO ====================
+
+if __name__ == '__main__':
+    app.logger.info("🚀 Iniciando Calmou API MongoDB (async) v2.0.0")
+    app.run(host='0.0.0.0', port=5002, debug=True)
@@ -0,0 +1,302 @@
+"""
+Armazenamento de Rate Limiting Compartilhado - Calmou API
+Backend do `limits` (usado pelo Flask-Limiter) em SQLite no modo WAL,
+compartilhado por todos os workers do gunicorn no mesmo host
+
+Importar este módulo registra os esquemas de URI:
+
+    sqlite:///caminho/arquivo.sqlite3        (Flask-Limiter / limits)
+    async+sqlite:///caminho/arquivo.sqlite3  (limits.aio, usado pelo app_async.py)
+
+O arquivo padrão fica no diretório privado do serviço (~/.cache/calmou,
+0700; ver src/utils/diretorios.py): quem consegue trocar ou apagar o banco
+zera os limites de todos os clientes.
+
+Implementa contadores de janela fixa e de janela deslizante (estratégia
+"sliding-window-counter"). Cada chave ocupa uma linha; linhas expiradas
+são apagadas periodicamente e o arquivo nunca passa de max_chaves linhas
+(além das gravadas entre duas podas).
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from limits.aio.storage import SlidingWindowCounterSupport as SlidingWindowCounterSupportAsync
+from limits.aio.storage import Storage as StorageAsync
+from limits.storage import SlidingWindowCounterSupport, Storage
+
+from src.utils.diretorios import diretorio_privado
+
+
+def caminho_padrao():
+    """Arquivo padrão dos contadores, no diretório privado do serviço"""
+    return os.path.join(diretorio_privado(), "limites.sqlite3")
+
+
+def uri_padrao():
+    """URI do arquivo padrão (sqlite:////caminho/absoluto)"""
+    return f"sqlite:///{caminho_padrao()}"
+
+
+def _ler_uri(uri, options):
+    """
+    Extrai o caminho do arquivo e as opções de uma URI
+
+    Segue a convenção do SQLAlchemy: sqlite:///relativo.sqlite3 e
+    sqlite:////caminho/absoluto.sqlite3
+    """
+    partes = urlparse(uri)
+    caminho = partes.path[1:] or caminho_padrao()
+    opcoes = {nome: valores[-1] for nome, valores in parse_qs(partes.query).items()}
+    opcoes.update(options)
+    return caminho, opcoes
+
+
+class ArmazenamentoSQLite(Storage, SlidingWindowCounterSupport):
+    """Storage do limits em SQLite, seguro entre processos e threads"""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        """
+        Args:
+            uri (str): sqlite:///caminho[?max_chaves=N&intervalo_poda=N] (padrão: uri_padrao())
+            wrap_exceptions (bool): Converte erros do SQLite em StorageError
+            max_chaves (int): Máximo de linhas mantidas após cada poda
+            intervalo_poda (int): Gravações deste processo entre duas podas
+        """
+        uri = uri or uri_padrao()
+        caminho, opcoes = _ler_uri(uri, options)
+        self.caminho = caminho
+        self.max_chaves = int(opcoes.get("max_chaves", 100000))
+        self.intervalo_poda = int(opcoes.get("intervalo_poda", 1000))
+        self._local = threading.local()
+        self._gravacoes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conexao(self):
+        """Retorna a conexão da thread atual (recriada após fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS contadores ("
+            " chave TEXT PRIMARY KEY, valor INTEGER NOT NULL, expira_em REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS janelas ("
+            " chave TEXT PRIMARY KEY, janela INTEGER NOT NULL, atual INTEGER NOT NULL,"
+            " anterior INTEGER NOT NULL, expira_em REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_contadores_expira ON contadores (expira_em)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_janelas_expira ON janelas (expira_em)")
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _registrar_gravacao(self):
+        """Poda o arquivo a cada intervalo_poda gravações deste processo"""
+        self._gravacoes += 1
+        if self._gravacoes % self.intervalo_poda == 0:
+            self.podar()
+
+    def podar(self):
+        """
+        Remove chaves ociosas (expiradas) e, se ainda passar de max_chaves,
+        as que expiram primeiro
+
+        Returns:
+            int: Linhas removidas
+        """
+        conn = self._conexao()
+        agora = time.time()
+        removidas = 0
+        for tabela in ("contadores", "janelas"):
+            removidas += conn.execute(f"DELETE FROM {tabela} WHERE expira_em <= ?", (agora,)).rowcount
+            removidas += conn.execute(
+                f"DELETE FROM {tabela} WHERE chave IN ("
+                f" SELECT chave FROM {tabela} ORDER BY expira_em DESC LIMIT -1 OFFSET ?)",
+                (self.max_chaves,)
+            ).rowcount
+        return removidas
+
+    # ==================== JANELA FIXA ====================
+
+    def incr(self, key, expiry, amount=1):
+        conn = self._conexao()
+        agora = time.time()
+        valor = conn.execute(
+            "INSERT INTO contadores (chave, valor, expira_em) VALUES (?, ?, ?)"
+            " ON CONFLICT (chave) DO UPDATE SET"
+            "  valor = CASE WHEN expira_em <= ? THEN excluded.valor ELSE valor + excluded.valor END,"
+            "  expira_em = CASE WHEN expira_em <= ? THEN excluded.expira_em ELSE expira_em END"
+            " RETURNING valor",
+            (key, amount, agora + expiry, agora, agora)
+        ).fetchone()[0]
+        self._registrar_gravacao()
+        return valor
+
+    def decr(self, key, amount=1):
+        conn = self._conexao()
+        linha = conn.execute(
+            "UPDATE contadores SET valor = MAX(valor - ?, 0) WHERE chave = ? RETURNING valor",
+            (amount, key)
+        ).fetchone()
+        return linha[0] if linha else 0
+
+    def get(self, key):
+        linha = self._conexao().execute(
+            "SELECT valor FROM contadores WHERE chave = ? AND expira_em > ?", (key, time.time())
+        ).fetchone()
+        return linha[0] if linha else 0
+
+    def get_expiry(self, key):
+        linha = self._conexao().execute(
+            "SELECT expira_em FROM contadores WHERE chave = ?", (key,)
+        ).fetchone()
+        return linha[0] if linha else time.time()
+
+    def clear(self, key):
+        conn = self._conexao()
+        conn.execute("DELETE FROM contadores WHERE chave = ?", (key,))
+        conn.execute("DELETE FROM janelas WHERE chave = ?", (key,))
+
+    def reset(self):
+        conn = self._conexao()
+        removidas = conn.execute("DELETE FROM contadores").rowcount
+        removidas += conn.execute("DELETE FROM janelas").rowcount
+        return removidas
+
+    def check(self):
+        try:
+            self._conexao().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    # ==================== JANELA DESLIZANTE ====================
+
+    @staticmethod
+    def _janela_atual(linha, expiry, agora):
+        """
+        Converte a linha gravada nos contadores da janela atual e da anterior
+
+        Returns:
+            tuple: (janela, anterior, atual)
+        """
+        janela = int(agora // expiry)
+        if linha is None:
+            return janela, 0, 0
+
+        janela_gravada, atual, anterior = linha
+        if janela_gravada == janela:
+            return janela, anterior, atual
+        if janela_gravada == janela - 1:
+            return janela, atual, 0
+        return janela, 0, 0
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            agora = time.time()
+            linha = conn.execute(
+                "SELECT janela, atual, anterior FROM janelas WHERE chave = ?", (key,)
+            ).fetchone()
+            janela, anterior, atual = self._janela_atual(linha, expiry, agora)
+
+            restante = expiry - (agora % expiry)
+            ponderado = anterior * restante / expiry + atual
+            if math.floor(ponderado) + amount > limit:
+                conn.execute("COMMIT")
+                return False
+
+            # A linha deixa de influenciar a contagem ao fim da próxima janela
+            conn.execute(
+                "INSERT OR REPLACE INTO janelas (chave, janela, atual, anterior, expira_em)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, janela, atual + amount, anterior, (janela + 2) * expiry)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._registrar_gravacao()
+        return True
+
+    def get_sliding_window(self, key, expiry):
+        agora = time.time()
+        linha = self._conexao().execute(
+            "SELECT janela, atual, anterior FROM janelas WHERE chave = ?", (key,)
+        ).fetchone()
+        _, anterior, atual = self._janela_atual(linha, expiry, agora)
+
+        restante = expiry - (agora % expiry)
+        return anterior, (restante if anterior else 0.0), atual, restante + expiry
+
+    def clear_sliding_window(self, key, expiry):
+        self._conexao().execute("DELETE FROM janelas WHERE chave = ?", (key,))
+
+
+class ArmazenamentoSQLiteAsync(StorageAsync, SlidingWindowCounterSupportAsync):
+    """
+    Versão limits.aio do ArmazenamentoSQLite para a API assíncrona
+
+    Cada operação é uma transação local curta (microssegundos), então é
+    executada direto no event loop em vez de passar por um executor.
+    """
+
+    STORAGE_SCHEME = ["async+sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        uri = uri or f"async+{uri_padrao()}"
+        self._sincrono = ArmazenamentoSQLite(uri.replace("async+", "", 1), **options)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    async def incr(self, key, expiry, amount=1):
+        return self._sincrono.incr(key, expiry, amount)
+
+    async def get(self, key):
+        return self._sincrono.get(key)
+
+    async def get_expiry(self, key):
+        return self._sincrono.get_expiry(key)
+
+    async def check(self):
+        return self._sincrono.check()
+
+    async def reset(self):
+        return self._sincrono.reset()
+
+    async def clear(self, key):
+        self._sincrono.clear(key)
+
+    async def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        return self._sincrono.acquire_sliding_window_entry(key, limit, expiry, amount)
+
+    async def get_sliding_window(self, key, expiry):
+        return self._sincrono.get_sliding_window(key, expiry)
+
+    async def clear_sliding_window(self, key, expiry):
+        self._sincrono.clear_sliding_window(key, expiry)
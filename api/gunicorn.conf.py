@@ -0,0 +1,125 @@
+"""
+Configuração do Gunicorn - Calmou API
+Workers gthread com preload da aplicação e um MongoClient por worker
+
+Uso (a partir do diretório api/):
+    gunicorn -c gunicorn.conf.py
+
+Com o preload, a importação do app.py e o aquecimento do cache do catálogo
+acontecem uma vez no processo mestre. O mestre não mantém conexão com o
+MongoDB: cada worker cria o próprio cliente no post_fork e abre uma conexão
+por thread antes de receber requisições.
+
+Variáveis de ambiente:
+    PORT                          porta (padrão 8000)
+    GUNICORN_WORKERS              padrão 2 x CPUs + 1
+    GUNICORN_THREADS              threads por worker (padrão 8)
+    GUNICORN_PRELOAD              1 carrega a aplicação no mestre (padrão)
+    GUNICORN_AQUECER_CATALOGO     1 preenche o cache do catálogo antes do fork (padrão)
+    GUNICORN_LOG_INICIALIZACAO    arquivo JSONL com os tempos de inicialização
+                                  de cada worker (usado por scripts/benchmark_inicializacao.py)
+    METRICAS_DIR                  retratos das métricas de cada worker, somados
+                                  no /metrics (limpos quando o servidor inicia)
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+# Raiz do projeto, para importar src/ sem carregar a aplicação no mestre
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ==================== SERVIDOR ====================
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+wsgi_app = "app:create_app()"
+
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+AQUECER_CATALOGO = os.getenv("GUNICORN_AQUECER_CATALOGO", "1") == "1"
+LOG_INICIALIZACAO = os.getenv("GUNICORN_LOG_INICIALIZACAO")
+
+# Estado de cada worker (o módulo é copiado no fork)
+_primeira_requisicao = threading.Event()
+_requisicao_local = threading.local()
+
+
+def _registrar(evento, **dados):
+    """Acrescenta um evento de inicialização ao arquivo JSONL, se configurado"""
+    if not LOG_INICIALIZACAO:
+        return
+    linha = json.dumps({"evento": evento, "pid": os.getpid(), "t": time.time(), **dados})
+    with open(LOG_INICIALIZACAO, "a", encoding="utf-8") as arquivo:
+        arquivo.write(linha + "\n")
+
+
+# ==================== HOOKS ====================
+
+def on_starting(server):
+    """Descarta as métricas da execução anterior (contadores recomeçam do zero)"""
+    from src.utils.metricas import limpar_metricas
+
+    limpar_metricas()
+
+
+def when_ready(server):
+    """Aquece o cache do catálogo no mestre, antes de criar os workers"""
+    if preload_app and AQUECER_CATALOGO:
+        from app import aquecer_cache_catalogo
+
+        try:
+            total = aquecer_cache_catalogo()
+            server.log.info("Cache do catálogo aquecido: %s meditações", total)
+        except Exception as e:
+            server.log.warning("Cache do catálogo não aquecido: %s", e)
+
+    _registrar("mestre_pronto")
+
+
+def post_fork(server, worker):
+    """Cria o MongoClient do worker e abre uma conexão por thread"""
+    _registrar("fork")
+
+    from app import preparar_worker
+
+    # O worker sobe mesmo sem o MongoDB: o estado aparece no /health e o
+    # driver conecta na primeira operação que der certo
+    if not preparar_worker(worker.cfg.threads):
+        from app import prontidao_mongo
+
+        server.log.warning("Worker %s sem conexão com o MongoDB: %s",
+                           worker.pid, prontidao_mongo()['ultimo_erro'])
+
+    _registrar("conectado")
+
+
+def post_worker_init(worker):
+    _registrar("pronto")
+
+
+def pre_request(worker, req):
+    _requisicao_local.inicio = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    if LOG_INICIALIZACAO and not _primeira_requisicao.is_set():
+        _primeira_requisicao.set()
+        duracao = time.perf_counter() - getattr(_requisicao_local, "inicio", time.perf_counter())
+        _registrar("primeira_requisicao", duracao_ms=round(duracao * 1000, 2))
+
+
+def worker_exit(server, worker):
+    """Grava o buffer de escrita (PUSH_MODO=buffer) e fecha o cliente do worker"""
+    from app import encerrar_worker
+
+    encerrar_worker()
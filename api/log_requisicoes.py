@@ -0,0 +1,152 @@
+"""
+Log das Requisições - Calmou API
+Contexto da requisição nos registros do app.logger e uma linha de acesso
+por requisição, gravados pelo pipeline de src/utils/log_estruturado.py
+
+Cada registro feito durante uma requisição recebe a rota (modelo da URL),
+o método e o hash do usuário autenticado (HMAC com a SECRET_KEY; o id não
+vai para o log). A linha de acesso traz ainda status, latência e o tempo
+gasto no MongoDB (src/conexion/tempo_mongo.py).
+
+A amostragem é decidida uma vez por requisição: as linhas INFO de uma
+requisição fora da amostra são descartadas antes de entrar na fila.
+WARNING e acima, e as linhas de acesso com status 5xx, são sempre gravados.
+
+Variáveis de ambiente:
+    LOG_AMOSTRAGEM_PADRAO   fração das requisições com linhas INFO gravadas (padrão 1)
+    LOG_AMOSTRAGEM          frações por rota, ex.: "salvar_avaliacao=0.1,historico_avaliacoes=0.1"
+    LOG_ACESSO              1 grava a linha de acesso de cada requisição (padrão)
+    LOG_CABECALHO_MONGO     1 devolve o tempo e os comandos do MongoDB em cada
+                            resposta (Server-Timing e X-Mongo-Comandos), para
+                            scripts/benchmark_endpoints.py (padrão 0)
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+
+from src.conexion.tempo_mongo import encerrar_medicao, iniciar_medicao, tempo_mongo
+from src.utils.metricas import obter_registro
+
+ROTA_DESCONHECIDA = "sem_rota"
+
+
+def taxas_amostragem():
+    """
+    Lê LOG_AMOSTRAGEM
+
+    Returns:
+        dict: Nome do endpoint (com ou sem o prefixo do blueprint) -> fração
+    """
+    taxas = {}
+    for item in os.getenv("LOG_AMOSTRAGEM", "").split(","):
+        if "=" in item:
+            endpoint, valor = item.split("=", 1)
+            taxas[endpoint.strip()] = float(valor)
+    return taxas
+
+
+def hash_usuario(identidade, chave):
+    """Identificador estável e não reversível do usuário para o log"""
+    return hmac.new(chave.encode(), str(identidade).encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def _rota():
+    return request.url_rule.rule if request.url_rule is not None else ROTA_DESCONHECIDA
+
+
+def _usuario():
+    """Hash do usuário do JWT já verificado na requisição (None antes da verificação)"""
+    usuario = g.get('log_usuario')
+    if usuario is not None:
+        return usuario
+    try:
+        identidade = get_jwt_identity()
+    except RuntimeError:
+        return None
+    if identidade is None:
+        return None
+    g.log_usuario = hash_usuario(identidade, current_app.config['SECRET_KEY'])
+    return g.log_usuario
+
+
+class FiltroRequisicao(logging.Filter):
+    """Aplica a amostragem e adiciona o contexto da requisição ao registro"""
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+
+        if record.levelno <= logging.INFO and not g.get('log_amostrada', True):
+            obter_registro().incrementar("calmou_log_descartados_total", (("motivo", "amostragem"),))
+            return False
+
+        record.rota = getattr(record, 'rota', None) or _rota()
+        record.metodo = request.method
+        record.usuario = _usuario()
+        taxa = g.get('log_taxa', 1.0)
+        if taxa < 1:
+            record.amostragem = taxa
+        return True
+
+
+def instrumentar_log(app):
+    """
+    Registra os hooks de amostragem, medição e linha de acesso
+
+    Chamar antes de inicializar o limiter, para que as requisições
+    recusadas por ele (429) também sejam registradas.
+    """
+    padrao = float(os.getenv("LOG_AMOSTRAGEM_PADRAO", "1"))
+    taxas = taxas_amostragem()
+    acesso = os.getenv("LOG_ACESSO", "1") == "1"
+    cabecalho_mongo = os.getenv("LOG_CABECALHO_MONGO", "0") == "1"
+
+    @app.before_request
+    def iniciar_log():
+        endpoint = request.endpoint or ""
+        taxa = taxas.get(endpoint, taxas.get(endpoint.rsplit('.', 1)[-1], padrao))
+        g.log_taxa = taxa
+        g.log_amostrada = taxa >= 1 or random.random() < taxa
+        g.log_inicio = time.perf_counter()
+        g.log_medicao_mongo = iniciar_medicao()
+
+    @app.after_request
+    def registrar_acesso(resposta):
+        inicio = g.get('log_inicio')
+        if cabecalho_mongo and inicio is not None:
+            mongo_ms, mongo_comandos = tempo_mongo()
+            resposta.headers['Server-Timing'] = f"mongo;dur={mongo_ms or 0}"
+            resposta.headers['X-Mongo-Comandos'] = str(mongo_comandos)
+        if not acesso or inicio is None:
+            return resposta
+
+        nivel = logging.WARNING if resposta.status_code >= 500 else logging.INFO
+        if not app.logger.isEnabledFor(nivel):
+            return resposta
+
+        mongo_ms, mongo_comandos = tempo_mongo()
+        rota = _rota()
+        app.logger.log(
+            nivel, "%s %s %s", request.method, rota, resposta.status_code,
+            extra={
+                "rota": rota,
+                "status": resposta.status_code,
+                "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3),
+                "mongo_ms": mongo_ms,
+                "mongo_comandos": mongo_comandos
+            }
+        )
+        return resposta
+
+    @app.teardown_request
+    def encerrar_log(erro):
+        token = g.pop('log_medicao_mongo', None)
+        if token is not None:
+            encerrar_medicao(token)
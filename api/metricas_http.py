@@ -0,0 +1,63 @@
+"""
+Instrumentação HTTP - Calmou API
+Duração, status e requisições em andamento por rota, registrados em
+src/utils/metricas.py e expostos no /metrics
+
+A rota é o modelo da URL (ex.: /usuarios/<user_id>), para que o número de
+séries não cresça com os ids; requisições sem rota aparecem como "sem_rota".
+"""
+
+import time
+
+from flask import g, request
+
+from src.utils.metricas import obter_registro
+
+ROTA_DESCONHECIDA = "sem_rota"
+
+
+def instrumentar_app(app):
+    """
+    Registra os hooks de medição
+
+    Chamar antes de inicializar o limiter, para que as requisições
+    recusadas por ele (429) também sejam medidas.
+    """
+    registro = obter_registro()
+    if not registro.ativo:
+        return
+
+    @app.before_request
+    def iniciar_medicao():
+        rota = request.url_rule.rule if request.url_rule is not None else ROTA_DESCONHECIDA
+        g.metricas_rota = rota
+        g.metricas_inicio = time.perf_counter()
+        registro.incrementar("calmou_http_em_andamento", (("rota", rota),))
+
+    @app.after_request
+    def registrar_resposta(resposta):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is not None:
+            _registrar(registro, g.metricas_rota, resposta.status_code, time.perf_counter() - inicio)
+        return resposta
+
+    @app.teardown_request
+    def encerrar_medicao(erro):
+        rota = g.pop('metricas_rota', None)
+        if rota is None:
+            return
+        registro.incrementar("calmou_http_em_andamento", (("rota", rota),), -1)
+
+        # Exceção que não passou pelo after_request
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is not None:
+            _registrar(registro, rota, 500, time.perf_counter() - inicio)
+
+
+def _registrar(registro, rota, status, duracao):
+    metodo = request.method
+    registro.incrementar(
+        "calmou_http_requisicoes_total",
+        (("rota", rota), ("metodo", metodo), ("status", str(status)))
+    )
+    registro.observar("calmou_http_duracao_segundos", (("rota", rota), ("metodo", metodo)), duracao)
@@ -0,0 +1,212 @@
+"""
+Pool de Hash de Senhas - Calmou API
+Executa bcrypt em um pool de processos de tamanho fixo, fora das threads
+que atendem requisições, com limite de fila e métricas
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+
+class PoolSenhasSobrecarregado(Exception):
+    """Fila do pool cheia ou tempo de espera esgotado"""
+
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+# ==================== FUNÇÕES EXECUTADAS NOS PROCESSOS ====================
+
+def _gerar_hash(senha, rounds):
+    """Gera o hash bcrypt e retorna (hash, início, duração)"""
+    inicio = time.time()
+    password_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    return password_hash, inicio, time.time() - inicio
+
+
+def _verificar_senha(senha, password_hash):
+    """Verifica a senha e retorna (resultado, início, duração)"""
+    inicio = time.time()
+    resultado = bcrypt.checkpw(senha.encode('utf-8'), password_hash.encode('utf-8'))
+    return resultado, inicio, time.time() - inicio
+
+
+# ==================== POOL ====================
+
+class PoolSenhas:
+    """
+    Pool de processos para bcrypt com controle de admissão
+
+    No máximo `processos + max_fila` operações ficam pendentes; acima disso
+    a chamada falha na hora com PoolSenhasSobrecarregado, para a API
+    responder 503 com Retry-After em vez de segurar a thread.
+    """
+
+    def __init__(self, processos, max_fila, timeout, retry_after, rounds):
+        """
+        Args:
+            processos (int): Tamanho do pool (0 executa na própria thread)
+            max_fila (int): Operações aguardando além das que estão executando
+            timeout (float): Espera máxima pelo resultado em segundos
+            retry_after (int): Valor sugerido para o header Retry-After
+            rounds (int): Custo do bcrypt para novos hashes
+        """
+        self.processos = processos
+        self.max_fila = max_fila
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.rounds = rounds
+
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pendentes = 0
+
+        self.total = 0
+        self.rejeitadas = 0
+        self.timeouts = 0
+        self.reinicios = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.hash_total = 0.0
+        self.hash_max = 0.0
+
+    def _obter_executor(self):
+        """Cria o pool no processo atual (após o fork do gunicorn)"""
+        if self._executor is None or self._pid != os.getpid():
+            contexto = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto)
+            self._pid = os.getpid()
+        return self._executor
+
+    def _descartar_executor(self, executor):
+        """
+        Descarta um pool quebrado (processo morto pelo OOM killer, falha no
+        spawn); o próximo _obter_executor cria outro
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.reinicios += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _liberar(self, futuro=None):
+        with self._lock:
+            self._pendentes -= 1
+
+    def _executar(self, funcao, *args):
+        """
+        Executa a função no pool respeitando o limite de pendentes
+
+        Uma operação conta como pendente até terminar no pool, mesmo depois
+        do timeout: o bcrypt em execução não pode ser cancelado.
+        """
+        if self.processos <= 0:
+            resultado, _, duracao = funcao(*args)
+            self._registrar(0.0, duracao)
+            return resultado
+
+        with self._lock:
+            if self._pendentes >= self.processos + self.max_fila:
+                self.rejeitadas += 1
+                raise PoolSenhasSobrecarregado("Fila de hash de senhas cheia", self.retry_after)
+            self._pendentes += 1
+            executor = self._obter_executor()
+
+        enviado_em = time.time()
+        try:
+            futuro = executor.submit(funcao, *args)
+        except BrokenProcessPool:
+            self._liberar()
+            self._descartar_executor(executor)
+            raise PoolSenhasSobrecarregado("Pool de hash de senhas reiniciado", self.retry_after)
+        except BaseException:
+            self._liberar()
+            raise
+        futuro.add_done_callback(self._liberar)
+
+        try:
+            resultado, inicio, duracao = futuro.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            futuro.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PoolSenhasSobrecarregado("Tempo de espera do hash de senha esgotado", self.retry_after)
+        except BrokenProcessPool:
+            self._descartar_executor(executor)
+            raise PoolSenhasSobrecarregado("Pool de hash de senhas reiniciado", self.retry_after)
+
+        self._registrar(max(0.0, inicio - enviado_em), duracao)
+        return resultado
+
+    def _registrar(self, espera, duracao):
+        """Acumula as métricas de espera na fila e tempo de hash"""
+        with self._lock:
+            self.total += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            self.hash_total += duracao
+            self.hash_max = max(self.hash_max, duracao)
+
+    def gerar_hash(self, senha):
+        """Gera hash bcrypt da senha"""
+        return self._executar(_gerar_hash, senha, self.rounds)
+
+    def verificar(self, senha, password_hash):
+        """Verifica se a senha corresponde ao hash"""
+        return self._executar(_verificar_senha, senha, password_hash)
+
+    def fechar(self):
+        """Encerra os processos do pool"""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def estatisticas(self):
+        """
+        Métricas do pool
+
+        Returns:
+            dict: Contadores e tempos (em segundos) de espera na fila e de hash
+        """
+        with self._lock:
+            return {
+                'processos': self.processos,
+                'max_fila': self.max_fila,
+                'pendentes': self._pendentes,
+                'total': self.total,
+                'rejeitadas': self.rejeitadas,
+                'timeouts': self.timeouts,
+                'reinicios': self.reinicios,
+                'espera_fila_media': self.espera_total / self.total if self.total else 0.0,
+                'espera_fila_max': self.espera_max,
+                'tempo_hash_medio': self.hash_total / self.total if self.total else 0.0,
+                'tempo_hash_max': self.hash_max
+            }
+
+
+def criar_pool_senhas():
+    """
+    Cria o pool a partir das variáveis de ambiente
+
+    Returns:
+        PoolSenhas: Pool configurado
+    """
+    pool = PoolSenhas(
+        processos=int(os.getenv('SENHAS_PROCESSOS', min(2, os.cpu_count() or 1))),
+        max_fila=int(os.getenv('SENHAS_MAX_FILA', 32)),
+        timeout=float(os.getenv('SENHAS_TIMEOUT', 10)),
+        retry_after=int(os.getenv('SENHAS_RETRY_AFTER', 2)),
+        rounds=int(os.getenv('SENHAS_BCRYPT_ROUNDS', 12))
+    )
+    atexit.register(pool.fechar)
+    return pool
@@ -0,0 +1,172 @@
+"""
+Prazos por Requisição - Calmou API
+Cada rota recebe um orçamento de tempo; as operações do MongoDB feitas
+durante a requisição herdam o tempo restante via pymongo.timeout() (que o
+driver envia ao servidor como maxTimeMS) e, quando ele se esgota, a
+requisição termina com 504 em vez de ocupar a thread do worker
+
+    @rotas.route('/relatorio')
+    @prazo(3.0)
+    def relatorio(): ...
+
+Os controllers tratam os erros e retornam None/[], então o timeout é
+identificado pela anotação feita em src/utils/prazos.py
+
+Variáveis de ambiente:
+    API_PRAZO_PADRAO_MS   prazo das rotas sem @prazo (padrão 2000; "none" desativa)
+    API_PRAZOS_MS         sobrescritas por rota, ex.: "login=8000,relatorio_humor_semanal=5000"
+
+O cliente (ou um proxy) pode pedir um prazo menor pelo cabeçalho X-Prazo-Ms;
+valores acima do prazo da rota são ignorados.
+"""
+
+import functools
+import os
+import time
+
+import pymongo
+from flask import current_app, jsonify, request
+from pymongo.errors import PyMongoError
+
+from src.utils.prazos import (
+    TIMEOUT_INDISPONIVEL, classificar_timeout, encerrar_monitoramento,
+    iniciar_monitoramento, registrar_timeout, timeout_ocorrido
+)
+
+CABECALHO_PRAZO = 'X-Prazo-Ms'
+
+
+def _ler_ms(valor):
+    """Converte milissegundos em segundos ("none" ou 0: sem prazo)"""
+    if valor is None or valor.strip().lower() in ("", "none", "0"):
+        return None
+    return int(valor) / 1000
+
+
+def prazo_padrao():
+    """Prazo, em segundos, das rotas sem @prazo (None: sem prazo)"""
+    return _ler_ms(os.getenv("API_PRAZO_PADRAO_MS", "2000"))
+
+
+def prazos_ambiente():
+    """
+    Lê API_PRAZOS_MS
+
+    Returns:
+        dict: Nome do endpoint (com ou sem o prefixo do blueprint) -> segundos
+    """
+    prazos = {}
+    for item in os.getenv("API_PRAZOS_MS", "").split(","):
+        if "=" in item:
+            endpoint, valor = item.split("=", 1)
+            prazos[endpoint.strip()] = _ler_ms(valor)
+    return prazos
+
+
+def prazo(segundos):
+    """
+    Define o prazo de uma rota; deve ficar logo acima do def, para que os
+    demais decoradores (limiter, jwt) preservem o atributo
+
+    Args:
+        segundos (float): Orçamento da requisição (None: sem prazo)
+    """
+    def decorador(view):
+        view.prazo_s = segundos
+        return view
+    return decorador
+
+
+def _prazo_cliente(segundos):
+    """Reduz o prazo ao pedido no cabeçalho X-Prazo-Ms, se for menor"""
+    try:
+        pedido = _ler_ms(request.headers.get(CABECALHO_PRAZO))
+    except ValueError:
+        return segundos
+    if pedido is None:
+        return segundos
+    return pedido if segundos is None else min(segundos, pedido)
+
+
+def resposta_timeout(tipo, segundos, inicio):
+    """503 se o MongoDB não atendeu a tempo, 504 se o prazo da requisição acabou"""
+    decorrido_ms = round((time.perf_counter() - inicio) * 1000)
+
+    if tipo == TIMEOUT_INDISPONIVEL:
+        current_app.logger.warning(
+            "MongoDB indisponível em %s %s (%s ms)", request.method, request.path, decorrido_ms
+        )
+        resposta = jsonify({
+            'mensagem': 'Banco de dados indisponível no momento. Tente novamente.',
+            'error': 'database_unavailable'
+        })
+        resposta.headers['Retry-After'] = '1'
+        return resposta, 503
+
+    current_app.logger.warning(
+        "Prazo de %s ms esgotado em %s %s (%s ms)",
+        round(segundos * 1000), request.method, request.path, decorrido_ms
+    )
+    return jsonify({
+        'mensagem': 'Tempo limite da requisição esgotado',
+        'error': 'deadline_exceeded',
+        'prazo_ms': round(segundos * 1000)
+    }), 504
+
+
+def _com_prazo(view, segundos):
+    @functools.wraps(view)
+    def executar(*args, **kwargs):
+        # A anotação é zerada e restaurada mesmo sem prazo: a thread é
+        # reaproveitada e um timeout desta requisição não pode vazar para a
+        # próxima (o cache do catálogo consulta timeout_ocorrido())
+        token = iniciar_monitoramento()
+        try:
+            limite = _prazo_cliente(segundos)
+            if limite is None:
+                return view(*args, **kwargs)
+
+            inicio = time.perf_counter()
+            resposta = None
+            try:
+                with pymongo.timeout(limite):
+                    resposta = view(*args, **kwargs)
+            except PyMongoError as e:
+                # Timeout fora de um controller (ex.: consulta direta na rota)
+                if classificar_timeout(e) is None:
+                    raise
+                registrar_timeout(e)
+
+            tipo = timeout_ocorrido()
+            if tipo is not None:
+                return resposta_timeout(tipo, limite, inicio)
+            return resposta
+        finally:
+            encerrar_monitoramento(token)
+
+    return executar
+
+
+def aplicar_prazos(app):
+    """
+    Envolve as rotas registradas com o prazo de cada uma
+
+    Ordem de precedência: API_PRAZOS_MS, @prazo, API_PRAZO_PADRAO_MS.
+    Chamar depois de registrar os blueprints.
+    """
+    padrao = prazo_padrao()
+    sobrescritas = prazos_ambiente()
+
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint == 'static':
+            continue
+
+        nome_curto = endpoint.rsplit('.', 1)[-1]
+        if endpoint in sobrescritas:
+            segundos = sobrescritas[endpoint]
+        elif nome_curto in sobrescritas:
+            segundos = sobrescritas[nome_curto]
+        else:
+            segundos = getattr(view, 'prazo_s', padrao)
+
+        app.view_functions[endpoint] = _com_prazo(view, segundos)
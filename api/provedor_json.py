@@ -0,0 +1,34 @@
+"""
+Provedor JSON - Calmou API
+JSON provider do Flask (também aceito pelo Quart) que codifica ObjectId,
+datetime e Decimal128 diretamente, usando o orjson quando disponível
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+from src.utils.serializacao import json_dumps_bytes, json_loads, padrao_json
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """Substitui o encoder padrão do jsonify pelo de src.utils.serializacao"""
+
+    # Usado pelo json da biblioteca padrão quando há indentação (modo debug)
+    default = staticmethod(padrao_json)
+
+    def dumps(self, obj, **kwargs):
+        """Serializa em str; a indentação do modo debug usa o json padrão"""
+        if kwargs.get("indent") is not None:
+            return super().dumps(obj, **kwargs)
+        return json_dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        """Desserializa o corpo das requisições"""
+        return json_loads(s)
+
+    def response(self, *args, **kwargs):
+        """Monta a resposta a partir dos bytes do encoder, sem passar por str"""
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,126 @@
+"""
+Formatação de Respostas - Calmou API
+Funções puras compartilhadas pela API Flask (app.py) e pela variante
+assíncrona (app_async.py), para que as duas devolvam o mesmo formato
+"""
+
+import hashlib
+import json
+
+from src.utils.serializacao import MapaCampos
+
+# ETags: incrementar quando o formato das respostas mudar
+VERSAO_REPRESENTACAO = 1
+CACHE_CONTROL_CATALOGO = 'public, no-cache'
+CACHE_CONTROL_PERFIL = 'private, no-cache'
+
+# Mapeia tipos do frontend para valores do schema MongoDB
+TIPOS_AVALIACAO = {
+    "Avaliação de Ansiedade": "ansiedade",
+    "Avaliação de Depressão": "depressao",
+    "Avaliação de Estresse": "estresse",
+    "Avaliação de Burnout": "burnout",
+    "Questionário de Burnout": "burnout",
+    "Questionário de Ansiedade": "ansiedade",
+    "Questionário de Depressão": "depressao",
+    "Questionário de Estresse": "estresse"
+}
+
+# ==================== MAPAS DE CAMPOS ====================
+# Datas e ObjectIds ficam nativos; o ProvedorJSON converte na serialização
+
+MAPA_MEDITACAO = MapaCampos(
+    ('_id', 'id', str), 'titulo', 'descricao', 'duracao_minutos',
+    'url_audio', 'tipo', 'categoria', 'imagem_capa'
+)
+
+MAPA_PERFIL = MapaCampos(
+    ('_id', 'id', str), 'nome', 'email', 'cpf', 'data_nascimento',
+    'tipo_sanguineo', 'alergias', 'foto_perfil', 'data_cadastro'
+)
+
+MAPA_USUARIO_RESUMO = MapaCampos(('_id', 'id', str), 'nome', 'email', 'data_cadastro')
+
+MAPA_ENDERECO = MapaCampos('pais', 'estado', 'cidade', 'rua', 'numero', 'complemento', 'cep')
+
+MAPA_CLASSIFICACAO_HUMOR = MapaCampos(
+    'nivel_humor', 'sentimento_principal', 'notas', ('data_classificacao', 'data')
+)
+
+MAPA_HISTORICO_MEDITACAO = MapaCampos(
+    ('meditacao_id', 'meditacao_id', str), 'data_conclusao', 'duracao_real_minutos'
+)
+
+MAPA_RESULTADO_AVALIACAO = MapaCampos(
+    'tipo', ('respostas', 'respostas', None, {}), 'resultado_score', 'resultado_texto', 'data_avaliacao'
+)
+
+MAPA_NOTIFICACAO = MapaCampos('titulo', 'mensagem', 'data_envio', 'lida')
+
+
+def etag_forte(*partes):
+    """Monta o valor de um ETag forte a partir da versão do recurso"""
+    return '-'.join(str(parte) for parte in (VERSAO_REPRESENTACAO,) + partes)
+
+
+def resumo_conteudo(valor):
+    """
+    Hash do conteúdo de uma resposta, para ETags derivados dos próprios dados
+
+    Hosts diferentes (ou o mesmo host depois de perder o cache) chegam ao
+    mesmo valor para o mesmo conteúdo, ao contrário da versão do cache.
+    """
+    dados = json.dumps(valor, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(dados.encode('utf-8')).hexdigest()[:16]
+
+
+def meditacao_para_json(doc):
+    """Formata um documento de meditação (com CAMPOS_CATALOGO) para a resposta"""
+    return MAPA_MEDITACAO.aplicar(doc)
+
+
+def normalizar_tipo_avaliacao(tipo_original):
+    """
+    Converte o tipo de avaliação enviado pelo app para o valor do schema
+
+    Args:
+        tipo_original (str): Tipo recebido (ex.: "Questionário de Ansiedade")
+
+    Returns:
+        str: ansiedade, depressao, estresse, burnout ou o texto em minúsculas
+    """
+    tipo_normalizado = TIPOS_AVALIACAO.get(tipo_original)
+    if tipo_normalizado:
+        return tipo_normalizado
+
+    # Se não encontrou no mapeamento, tenta extrair a palavra-chave
+    tipo_lower = tipo_original.lower()
+    if 'ansiedade' in tipo_lower:
+        return 'ansiedade'
+    if 'depressao' in tipo_lower or 'depressão' in tipo_lower:
+        return 'depressao'
+    if 'estresse' in tipo_lower:
+        return 'estresse'
+    if 'burnout' in tipo_lower:
+        return 'burnout'
+    return tipo_lower
+
+
+def relatorio_humor_para_json(resumo, dias):
+    """
+    Formata o resumo calculado por ControllerUsuario.relatorio_humor
+
+    Args:
+        resumo (dict): Resultado do aggregate do relatório
+        dias (int): Tamanho da janela do relatório
+
+    Returns:
+        dict: Total, média, sentimentos frequentes e os registros mais recentes
+    """
+    return {
+        'total_registros': resumo.get('total_registros', 0),
+        'media_humor': round(resumo.get('media_humor') or 0, 2),
+        'sentimentos_frequentes': resumo.get('sentimentos_frequentes') or {},
+        'periodo': f'{dias} dias',
+        'registros': MAPA_CLASSIFICACAO_HUMOR.aplicar_lista(resumo.get('registros') or [])
+    }
@@ -17,7 +17,7 @@ from src.controller.controller_usuario import ControllerUsuario
 from src.controller.controller_meditacao import ControllerMeditacao
 from src.model.usuario import Usuario, Endereco, ClassificacaoHumor, HistoricoMeditacao
 from src.model.meditacao import Meditacao
-from src.conexion.mongo_conexao import fechar_mongo
+from src.conexion.mongo_conexao import fechar_mongo, usar_perfil_mongo
 from bson import ObjectId
 
 
@@ -640,6 +640,8 @@ class SistemaCalmou:
 # ==================== MAIN ====================
 
 if __name__ == "__main__":
+    usar_perfil_mongo("cli")
+
     try:
         sistema = SistemaCalmou()
         sistema.executar()
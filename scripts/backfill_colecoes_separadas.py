@@ -0,0 +1,220 @@
+"""
+Backfill das Coleções Separadas - Calmou API
+Copia os arrays embedded de usuarios para as coleções separadas
+(src/controller/colecoes_separadas.py) com a API no ar
+
+Uso:
+    python scripts/backfill_colecoes_separadas.py
+    python scripts/backfill_colecoes_separadas.py --campos resultados_avaliacoes --taxa 2000
+    python scripts/backfill_colecoes_separadas.py --verificar
+    python scripts/backfill_colecoes_separadas.py --campos notificacoes --remover-arrays
+
+Ordem da migração de cada array:
+    1. COLECOES_MODO=<array>=dupla na API
+    2. este script (pode ser interrompido: retoma do último usuário gravado)
+    3. --verificar; COLECOES_MODO=<array>=leitura
+    4. COLECOES_MODO=<array>=separada; este script com --remover-arrays
+
+Os documentos são inseridos com insert_many(ordered=False) em lotes de
+--lote documentos, no máximo --taxa documentos por segundo. Elementos já
+copiados (escrita dupla ou execução anterior) dão chave duplicada e são
+contados como já existentes. O progresso fica na coleção 'migracoes'.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conexion.mongo_conexao import fechar_mongo, obter_colecao, usar_perfil_mongo
+from src.controller.buffer_push import CHAVE_DUPLICADA
+from src.controller.colecoes_separadas import COLECOES_SEPARADAS, documento_separado
+
+COLECAO_MIGRACOES = "migracoes"
+
+
+class Backfill:
+    """Cópia em lotes, com ritmo limitado e ponto de retomada, de um array"""
+
+    def __init__(self, campo, lote=500, taxa=1000):
+        """
+        Args:
+            campo (str): Array de usuarios (chave de COLECOES_SEPARADAS)
+            lote (int): Documentos por insert_many
+            taxa (float): Documentos por segundo (0: sem limite)
+        """
+        self.campo = campo
+        self.lote = lote
+        self.taxa = taxa
+        self.usuarios = obter_colecao("usuarios")
+        self.destino = obter_colecao(COLECOES_SEPARADAS[campo][0])
+        self.migracoes = obter_colecao(COLECAO_MIGRACOES)
+        self.id_progresso = f"colecoes_separadas:{campo}"
+        self.contadores = {"copiados": 0, "existentes": 0, "rejeitados": 0}
+
+    # ==================== CÓPIA ====================
+
+    def _inserir(self, documentos):
+        """
+        insert_many não ordenado; chave duplicada conta como já copiado
+
+        Returns:
+            set: Índices dos documentos rejeitados (ex.: validação do schema)
+        """
+        inicio = time.monotonic()
+        rejeitados = []
+        try:
+            self.destino.insert_many(documentos, ordered=False)
+            self.contadores["copiados"] += len(documentos)
+        except BulkWriteError as e:
+            erros = e.details.get("writeErrors", [])
+            duplicados = sum(1 for erro in erros if erro.get("code") == CHAVE_DUPLICADA)
+            rejeitados = [erro for erro in erros if erro.get("code") != CHAVE_DUPLICADA]
+            self.contadores["copiados"] += e.details.get("nInserted", 0)
+            self.contadores["existentes"] += duplicados
+            self.contadores["rejeitados"] += len(rejeitados)
+            for erro in rejeitados[:3]:
+                print(f"  ⚠️  Rejeitado ({erro.get('code')}): {erro.get('errmsg')}")
+
+        # Ritmo: o lote ocupa pelo menos len/taxa segundos
+        if self.taxa:
+            espera = len(documentos) / self.taxa - (time.monotonic() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+        return {erro["index"] for erro in rejeitados}
+
+    def _documentos(self, usuario):
+        return [
+            documento_separado(usuario["_id"], self.campo, elemento)
+            for elemento in usuario.get(self.campo) or []
+        ]
+
+    def _salvar_progresso(self, ultimo_usuario, concluido=False):
+        definir = {"concluido": concluido, "atualizado_em": datetime.now()}
+        if ultimo_usuario is not None:
+            definir["ultimo_usuario"] = ultimo_usuario
+        self.migracoes.update_one(
+            {"_id": self.id_progresso}, {"$set": definir, "$inc": dict(self.contadores)}, upsert=True
+        )
+        self.contadores = dict.fromkeys(self.contadores, 0)
+
+    def copiar(self, reiniciar=False):
+        """
+        Copia os arrays, do usuário seguinte ao último gravado
+
+        Args:
+            reiniciar (bool): Ignora o progresso salvo
+        """
+        if reiniciar:
+            self.migracoes.delete_one({"_id": self.id_progresso})
+        progresso = self.migracoes.find_one({"_id": self.id_progresso})
+        filtro = {f"{self.campo}.0": {"$exists": True}}
+        if progresso and progresso.get("ultimo_usuario") is not None:
+            filtro["_id"] = {"$gt": progresso["ultimo_usuario"]}
+            print(f"  ↪️  Retomando após o usuário {progresso['ultimo_usuario']}")
+
+        pendentes, ultimo = [], None
+        cursor = self.usuarios.find(filtro, {self.campo: 1}).sort("_id", 1).batch_size(max(self.lote // 10, 10))
+        for usuario in cursor:
+            pendentes.extend(self._documentos(usuario))
+            ultimo = usuario["_id"]
+            # Grava em fronteira de usuário: o progresso nunca aponta para um usuário pela metade
+            if len(pendentes) >= self.lote:
+                self._inserir(pendentes)
+                self._salvar_progresso(ultimo)
+                pendentes = []
+
+        if pendentes:
+            self._inserir(pendentes)
+        self._salvar_progresso(ultimo, concluido=True)
+
+        final = self.migracoes.find_one({"_id": self.id_progresso})
+        print(f"  ✅ {self.campo}: {final.get('copiados', 0)} copiados, "
+              f"{final.get('existentes', 0)} já existentes, {final.get('rejeitados', 0)} rejeitados")
+
+    # ==================== VERIFICAÇÃO E LIMPEZA ====================
+
+    def verificar(self):
+        """Compara os elementos nos arrays com os documentos da coleção"""
+        resultado = list(self.usuarios.aggregate([
+            {"$group": {"_id": None, "total": {"$sum": {"$size": {"$ifNull": [f"${self.campo}", []]}}}}}
+        ], allowDiskUse=True))
+        no_array = resultado[0]["total"] if resultado else 0
+        na_colecao = self.destino.estimated_document_count()
+        simbolo = "✅" if na_colecao >= no_array else "⚠️ "
+        print(f"  {simbolo} {self.campo}: {no_array} nos arrays, {na_colecao} em '{self.destino.name}'")
+        return na_colecao >= no_array
+
+    def remover_arrays(self):
+        """
+        Remove o array dos usuários (API já na fase 'separada')
+
+        Cada lote é copiado de novo antes do $unset, e o array de um usuário
+        com elemento rejeitado pela coleção é mantido.
+        """
+        removidos = mantidos = 0
+        ids, pendentes, donos = [], [], []
+
+        def limpar():
+            rejeitados = self._inserir(pendentes) if pendentes else set()
+            manter = {donos[indice] for indice in rejeitados}
+            remover = [usuario_id for usuario_id in ids if usuario_id not in manter]
+            self.usuarios.update_many({"_id": {"$in": remover}}, {"$unset": {self.campo: ""}})
+            return len(remover), len(manter)
+
+        for usuario in self.usuarios.find({self.campo: {"$exists": True}}, {self.campo: 1}).sort("_id", 1):
+            documentos = self._documentos(usuario)
+            ids.append(usuario["_id"])
+            pendentes.extend(documentos)
+            donos.extend([usuario["_id"]] * len(documentos))
+            if len(pendentes) >= self.lote or len(ids) >= self.lote:
+                resultado = limpar()
+                removidos, mantidos = removidos + resultado[0], mantidos + resultado[1]
+                ids, pendentes, donos = [], [], []
+
+        if ids:
+            resultado = limpar()
+            removidos, mantidos = removidos + resultado[0], mantidos + resultado[1]
+        print(f"  ✅ {self.campo}: array removido de {removidos} usuário(s)")
+        if mantidos:
+            print(f"  ⚠️  {mantidos} usuário(s) mantêm o array: elementos rejeitados pela coleção")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copia os arrays embedded para as coleções separadas")
+    parser.add_argument("--campos", default=",".join(COLECOES_SEPARADAS),
+                        help="Arrays separados por vírgula (padrão: todos)")
+    parser.add_argument("--lote", type=int, default=500, help="Documentos por insert_many (padrão 500)")
+    parser.add_argument("--taxa", type=float, default=1000, help="Documentos por segundo; 0 sem limite (padrão 1000)")
+    parser.add_argument("--reiniciar", action="store_true", help="Ignora o progresso salvo")
+    parser.add_argument("--verificar", action="store_true", help="Só compara as contagens")
+    parser.add_argument("--remover-arrays", action="store_true",
+                        help="Remove os arrays dos usuários (só com a API em COLECOES_MODO=<array>=separada)")
+    args = parser.parse_args()
+
+    campos = [campo.strip() for campo in args.campos.split(",") if campo.strip()]
+    desconhecidos = [campo for campo in campos if campo not in COLECOES_SEPARADAS]
+    if desconhecidos:
+        parser.error(f"arrays desconhecidos: {', '.join(desconhecidos)}")
+
+    usar_perfil_mongo("lote")
+    sucesso = True
+    try:
+        for campo in campos:
+            backfill = Backfill(campo, args.lote, args.taxa)
+            if args.verificar:
+                sucesso = backfill.verificar() and sucesso
+            elif args.remover_arrays:
+                backfill.remover_arrays()
+            else:
+                print(f"\n📦 {campo} → {COLECOES_SEPARADAS[campo][0]}")
+                backfill.copiar(args.reiniciar)
+    finally:
+        fechar_mongo()
+    sys.exit(0 if sucesso else 1)
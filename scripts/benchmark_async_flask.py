@@ -0,0 +1,160 @@
+"""
+Benchmark Flask x ASGI - Calmou API
+Compara requisições/s e latência p99 da API Flask (gunicorn, gthread) com a
+variante assíncrona (hypercorn, Quart + Motor) usando o mesmo número de workers
+
+Uso:
+    python scripts/benchmark_async_flask.py --workers 4 --conexoes 64 --duracao 15
+    python scripts/benchmark_async_flask.py --rotas /health /meditacoes --saida resultado.json
+
+Os dois servidores são iniciados a partir de api/ com RATELIMIT_ENABLED=0 e
+precisam de um MongoDB acessível em MONGO_URI com o catálogo já populado.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.carga_http import executar_carga
+
+DIRETORIO_API = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+
+ROTAS_PADRAO = ["/health", "/meditacoes", "/stats"]
+
+
+def comando_servidor(variante, porta, workers, threads):
+    """Linha de comando de cada servidor"""
+    if variante == "flask":
+        return [
+            sys.executable, "-m", "gunicorn",
+            "--bind", f"127.0.0.1:{porta}",
+            "--workers", str(workers),
+            "--worker-class", "gthread",
+            "--threads", str(threads),
+            "--log-level", "warning",
+            "app:create_app()"
+        ]
+    return [
+        sys.executable, "-m", "hypercorn",
+        "--bind", f"127.0.0.1:{porta}",
+        "--workers", str(workers),
+        "--log-level", "warning",
+        "app_async:app"
+    ]
+
+
+def aguardar_servidor(url, timeout=30.0):
+    """Espera o /health responder 200"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as resposta:
+                if resposta.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def medir_variante(variante, args):
+    """Sobe o servidor, aquece e mede cada rota"""
+    porta = args.porta if variante == "flask" else args.porta + 1
+    url = f"http://127.0.0.1:{porta}"
+
+    ambiente = dict(os.environ, RATELIMIT_ENABLED="0", SENHAS_PROCESSOS="0")
+    processo = subprocess.Popen(
+        comando_servidor(variante, porta, args.workers, args.threads),
+        cwd=DIRETORIO_API,
+        env=ambiente,
+        start_new_session=True
+    )
+
+    try:
+        if not aguardar_servidor(url):
+            print(f"❌ Servidor {variante} não respondeu em {url}/health")
+            return []
+
+        resultados = []
+        for rota in args.rotas:
+            # Aquecimento: conexões, caches e pool do MongoDB
+            asyncio.run(executar_carga(url, rota, args.conexoes, args.aquecimento))
+            resultado = asyncio.run(executar_carga(url, rota, args.conexoes, args.duracao))
+            resultado['variante'] = variante
+            resultados.append(resultado)
+            print(
+                f"   {variante:<6} {rota:<20} {resultado['req_por_s']:>10.1f} req/s"
+                f"   p50 {resultado['latencia_p50_ms']:>8.2f} ms"
+                f"   p99 {resultado['latencia_p99_ms']:>8.2f} ms"
+                f"   erros {resultado['erros']}"
+            )
+        return resultados
+
+    finally:
+        os.killpg(processo.pid, signal.SIGTERM)
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(processo.pid, signal.SIGKILL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Flask x ASGI da Calmou API")
+    parser.add_argument("--workers", type=int, default=4, help="Workers nos dois servidores")
+    parser.add_argument("--threads", type=int, default=8, help="Threads por worker do gunicorn (gthread)")
+    parser.add_argument("--conexoes", type=int, default=64, help="Conexões simultâneas do gerador de carga")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de medição por rota")
+    parser.add_argument("--aquecimento", type=float, default=2.0, help="Segundos de aquecimento por rota")
+    parser.add_argument("--porta", type=int, default=8100, help="Porta do Flask (ASGI usa porta + 1)")
+    parser.add_argument("--rotas", nargs="+", default=ROTAS_PADRAO, help="Rotas GET medidas")
+    parser.add_argument("--variantes", nargs="+", choices=["flask", "async"], default=["flask", "async"])
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"BENCHMARK FLASK x ASGI - {args.workers} workers, {args.conexoes} conexões")
+    print("="*70)
+
+    resultados = []
+    for variante in args.variantes:
+        resultados.extend(medir_variante(variante, args))
+
+    # Comparação por rota
+    por_rota = {}
+    for resultado in resultados:
+        por_rota.setdefault(resultado['caminho'], {})[resultado['variante']] = resultado
+
+    print("\n📊 Comparação (async / flask):")
+    for rota, variantes in por_rota.items():
+        if "flask" in variantes and "async" in variantes and variantes["flask"]['req_por_s']:
+            razao_vazao = variantes["async"]['req_por_s'] / variantes["flask"]['req_por_s']
+            razao_p99 = (
+                variantes["async"]['latencia_p99_ms'] / variantes["flask"]['latencia_p99_ms']
+                if variantes["flask"]['latencia_p99_ms'] else 0.0
+            )
+            print(f"   {rota:<20} vazão x{razao_vazao:.2f}   p99 x{razao_p99:.2f}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                'workers': args.workers,
+                'threads_gunicorn': args.threads,
+                'conexoes': args.conexoes,
+                'duracao_s': args.duracao,
+                'resultados': resultados
+            }, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,663 @@
+"""
+Benchmark dos Endpoints - Calmou API
+Mede todas as rotas do api/app.py sobre uma base semeada de tamanho
+configurável (usuários x registros em cada array), pelo cliente de teste do
+Flask (sem rede) e por HTTP contra o gunicorn
+
+Uso:
+    python scripts/benchmark_endpoints.py --usuarios 1000 --registros 50
+    python scripts/benchmark_endpoints.py --modo http --workers 1 --conexoes 32 --duracao 10
+    python scripts/benchmark_endpoints.py --rotas foco --saida depois.json --comparar antes.json
+    python scripts/benchmark_endpoints.py --armazenamento mongo --banco calmou_benchmark
+
+Para cada rota são medidos vazão, latência (p50, p95, p99), comandos e tempo
+do MongoDB por requisição (cabeçalhos X-Mongo-Comandos e Server-Timing,
+ligados com LOG_CABECALHO_MONGO=1) e bytes devolvidos. As rotas de foco são
+o relatório de humor, o histórico de avaliações e o catálogo.
+
+A base é sempre a mesma para a mesma semente: _id, emails e conteúdo dos
+usuários e das meditações não mudam entre execuções; as datas são relativas
+ao momento da carga, para cair dentro dos períodos dos relatórios. Todos os
+usuários têm a senha SENHA_PADRAO. Identificadores e documentos vêm de
+scripts/dados_sinteticos.py, os mesmos do gerador scripts/gerar_dados.py.
+
+Com --armazenamento memoria (padrão) nada além da API é necessário; no modo
+http a carga acontece no processo mestre do gunicorn antes do fork, e cada
+worker fica com a sua cópia (as escritas de um worker não aparecem nos
+outros). Com --armazenamento mongo as coleções do --banco são apagadas e
+recriadas: use um banco só para o benchmark.
+
+O modo cliente mede uma requisição por vez; vazão e latência de concorrência
+vêm do modo http.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.carga_http import executar_carga, ler_tempo_mongo, percentil
+from scripts.dados_sinteticos import (
+    SENHA_PADRAO, SENTIMENTOS, TIPOS_AVALIACAO, documento_meditacao, email_usuario,
+    hash_senha_padrao, id_meditacao, id_usuario, separar_arrays
+)
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_API = os.path.join(DIRETORIO_RAIZ, "api")
+DIRETORIO_SCRIPTS = os.path.join(DIRETORIO_RAIZ, "scripts")
+
+BANCO_PADRAO = "calmou_benchmark"
+
+# Rotas com a maior parte do custo de leitura
+ROTAS_FOCO = [
+    "GET /humor/relatorio-semanal",
+    "GET /humor/relatorio-semanal?dias=90",
+    "GET /avaliacoes/historico",
+    "GET /avaliacoes/historico?tipo=ansiedade&limit=10",
+    "GET /meditacoes",
+    "GET /meditacoes?limit=20"
+]
+
+
+# ==================== BASE SEMEADA ====================
+
+def _data_recente(aleatorio, agora, dias=90):
+    return agora - timedelta(seconds=aleatorio.randrange(dias * 86400))
+
+
+def documentos_usuario(indice, registros, meditacoes, password_hash, aleatorio, agora):
+    """
+    Usuário com registros elementos em cada array e nas classificações de humor
+
+    Returns:
+        tuple: (documento do usuário, buckets de humor, {coleção: documentos separados})
+    """
+    from src.controller.colecoes_separadas import COLECOES_SEPARADAS
+    from src.controller.controller_humor import documentos_bucket
+
+    usuario_id = id_usuario(indice)
+    arrays = {
+        "historico_meditacoes": [{
+            "meditacao_id": id_meditacao(aleatorio.randrange(meditacoes)),
+            "data_conclusao": _data_recente(aleatorio, agora),
+            "duracao_real_minutos": aleatorio.randint(3, 30)
+        } for _ in range(registros)],
+        "resultados_avaliacoes": [{
+            "tipo": aleatorio.choice(TIPOS_AVALIACAO),
+            "respostas": {f"q{questao}": aleatorio.randint(0, 3) for questao in range(1, 8)},
+            "resultado_score": aleatorio.randint(0, 21),
+            "resultado_texto": "Resultado gerado para o benchmark",
+            "data_avaliacao": _data_recente(aleatorio, agora)
+        } for _ in range(registros)],
+        "notificacoes": [{
+            "titulo": "Lembrete",
+            "mensagem": "Que tal uma pausa para respirar?",
+            "data_envio": _data_recente(aleatorio, agora),
+            "lida": aleatorio.random() < 0.7
+        } for _ in range(registros)]
+    }
+    classificacoes = sorted((
+        {
+            "nivel_humor": aleatorio.randint(1, 5),
+            "sentimento_principal": aleatorio.choice(SENTIMENTOS),
+            "notas": None,
+            "data_classificacao": _data_recente(aleatorio, agora)
+        } for _ in range(registros)
+    ), key=lambda classificacao: classificacao["data_classificacao"])
+
+    for campo, elementos in arrays.items():
+        elementos.sort(key=lambda elemento: elemento[COLECOES_SEPARADAS[campo][1]])
+    separados = separar_arrays(usuario_id, arrays)
+
+    data_cadastro = agora - timedelta(days=120)
+    usuario = {
+        "_id": usuario_id,
+        "nome": f"Usuário {indice}",
+        "email": email_usuario(indice),
+        "password_hash": password_hash,
+        "data_nascimento": None,
+        "tipo_sanguineo": aleatorio.choice(["A+", "O+", "B-", None]),
+        "alergias": None,
+        "foto_perfil": None,
+        "config": None,
+        "data_cadastro": data_cadastro,
+        "endereco": None,
+        "classificacoes_humor": [],
+        **arrays,
+        "versao": 1,
+        "ultima_atividade": data_cadastro
+    }
+    return usuario, documentos_bucket(usuario_id, classificacoes), separados
+
+
+def semear_dados(usuarios=1000, registros=50, meditacoes=200, semente=42, lote=1000):
+    """
+    Apaga e recarrega as coleções do banco atual (MONGO_DB_NAME)
+
+    Cria as coleções e os índices com scripts/create_collections_completo.py
+    e recalcula as estatísticas do /stats no final; a versão do cache do
+    catálogo é incrementada.
+
+    Returns:
+        float: Segundos gastos
+    """
+    from scripts.create_collections_completo import criar_colecoes_completas
+    from src.conexion.mongo_conexao import conectar_mongo
+    from src.controller.controller_estatisticas import ControllerEstatisticas
+    from src.controller.controller_humor import COLECAO_HUMOR
+    from src.utils.cache_catalogo import invalidar_catalogo
+
+    inicio = time.perf_counter()
+    db = conectar_mongo()
+    for nome in db.list_collection_names():
+        db.drop_collection(nome)
+    with contextlib.redirect_stdout(io.StringIO()):
+        criar_colecoes_completas()
+    db = conectar_mongo()
+
+    aleatorio = random.Random(semente)
+    agora = datetime.now().replace(microsecond=0)
+    password_hash = hash_senha_padrao()
+
+    db["meditacoes"].insert_many([documento_meditacao(indice, aleatorio) for indice in range(meditacoes)])
+
+    pendentes = {}
+
+    def gravar(forcar=False):
+        for nome, documentos in pendentes.items():
+            if documentos and (forcar or len(documentos) >= lote):
+                db[nome].insert_many(documentos, ordered=False)
+                documentos.clear()
+
+    for indice in range(usuarios):
+        usuario, buckets, separados = documentos_usuario(
+            indice, registros, meditacoes, password_hash, aleatorio, agora
+        )
+        pendentes.setdefault("usuarios", []).append(usuario)
+        pendentes.setdefault(COLECAO_HUMOR, []).extend(buckets)
+        for nome, documentos in separados.items():
+            pendentes.setdefault(nome, []).extend(documentos)
+        gravar()
+    gravar(forcar=True)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ControllerEstatisticas().recalcular()
+    # O catálogo foi gravado sem o ControllerMeditacao: o L2 do cache, que
+    # sobrevive ao processo, ainda teria as páginas da base anterior
+    invalidar_catalogo()
+    return time.perf_counter() - inicio
+
+
+def criar_app_semeado(usuarios=1000, registros=50, meditacoes=200, semente=42):
+    """
+    Fábrica usada pelo gunicorn no modo http
+
+    No motor em memória a carga acontece aqui, no processo mestre, para que
+    os workers herdem os dados; no MongoDB o benchmark já carregou antes.
+    """
+    from src.conexion.configuracao_mongo import armazenamento_ativo
+
+    if armazenamento_ativo() == "memoria":
+        semear_dados(usuarios, registros, meditacoes, semente)
+
+    from app import create_app
+
+    return create_app()
+
+
+# ==================== ROTAS ====================
+
+def _autorizacao(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def montar_rotas(contexto, unicas):
+    """
+    Requisições de cada rota do api/app.py
+
+    Cada rota tem uma lista de variações (caminho, headers, corpo) usadas em
+    rodízio entre os usuários da amostra. Rotas 'unica' não podem repetir
+    uma variação (cadastro e exclusão de conta).
+
+    Args:
+        contexto (dict): usuarios [(indice, id, access, refresh)], reservados, meditacoes
+        unicas (int): Variações geradas para o cadastro
+
+    Returns:
+        list: dicts com nome, metodo, variacoes e unica
+    """
+    amostra = contexto["usuarios"]
+    meditacoes = contexto["meditacoes"]
+
+    def por_usuario(caminho, corpo=None, refresh=False):
+        return [{
+            "caminho": caminho.format(id=usuario_id),
+            "headers": _autorizacao(tokens[1] if refresh else tokens[0]),
+            "corpo": corpo(posicao) if corpo else None
+        } for posicao, (_, usuario_id, *tokens) in enumerate(amostra)]
+
+    def rota(metodo, nome, variacoes, unica=False):
+        return {"nome": f"{metodo} {nome}", "metodo": metodo, "variacoes": variacoes, "unica": unica}
+
+    def caminho_fixo(caminho):
+        return [{"caminho": caminho, "headers": None, "corpo": None}]
+
+    return [
+        # Públicas e leitura
+        rota("GET", "/", caminho_fixo("/")),
+        rota("GET", "/health", caminho_fixo("/health")),
+        rota("GET", "/meditacoes", caminho_fixo("/meditacoes")),
+        rota("GET", "/meditacoes?limit=20", caminho_fixo("/meditacoes?limit=20")),
+        rota("GET", "/meditacoes/<id>", [
+            {"caminho": f"/meditacoes/{meditacao_id}", "headers": None, "corpo": None}
+            for meditacao_id in meditacoes
+        ]),
+        rota("GET", "/usuarios/<id>", por_usuario("/usuarios/{id}")),
+        rota("GET", "/perfil", por_usuario("/perfil")),
+        rota("GET", "/humor/relatorio-semanal", por_usuario("/humor/relatorio-semanal")),
+        rota("GET", "/humor/relatorio-semanal?dias=90", por_usuario("/humor/relatorio-semanal?dias=90")),
+        rota("GET", "/avaliacoes/historico", por_usuario("/avaliacoes/historico")),
+        rota("GET", "/avaliacoes/historico?tipo=ansiedade&limit=10",
+             por_usuario("/avaliacoes/historico?tipo=ansiedade&limit=10")),
+        rota("GET", "/stats", caminho_fixo("/stats")),
+        rota("GET", "/senhas/estatisticas", caminho_fixo("/senhas/estatisticas")),
+        rota("GET", "/cache/estatisticas", caminho_fixo("/cache/estatisticas")),
+        rota("GET", "/metrics", caminho_fixo("/metrics")),
+        # Autenticação (bcrypt domina o custo)
+        rota("POST", "/login", [{
+            "caminho": "/login", "headers": None,
+            "corpo": {"email": email_usuario(indice), "password": SENHA_PADRAO}
+        } for indice, *_ in amostra]),
+        rota("POST", "/refresh", por_usuario("/refresh", refresh=True)),
+        rota("POST", "/register", [{
+            "caminho": "/register", "headers": None,
+            "corpo": {
+                "nome": f"Cadastro {numero}",
+                "email": f"cadastro{numero}.{contexto['execucao']}@benchmark.calmou.com",
+                "password": SENHA_PADRAO
+            }
+        } for numero in range(unicas)], unica=True),
+        # Escrita
+        rota("POST", "/humor", por_usuario("/humor", lambda posicao: {
+            "nivel_humor": posicao % 5 + 1,
+            "sentimento_principal": SENTIMENTOS[posicao % len(SENTIMENTOS)],
+            "notas": "Registro do benchmark"
+        })),
+        rota("POST", "/meditacoes/historico", por_usuario("/meditacoes/historico", lambda posicao: {
+            "meditacao_id": meditacoes[posicao % len(meditacoes)],
+            "duracao_real_minutos": 10
+        })),
+        rota("POST", "/avaliacoes", por_usuario("/avaliacoes", lambda posicao: {
+            "tipo": "Questionário de Ansiedade",
+            "respostas": {"q1": posicao % 4, "q2": 1},
+            "resultado_score": posicao % 21,
+            "resultado_texto": "Ansiedade leve"
+        })),
+        rota("PUT", "/perfil", por_usuario("/perfil", lambda posicao: {
+            "nome": f"Usuário Atualizado {posicao}",
+            "alergias": "Nenhuma"
+        })),
+        rota("DELETE", "/usuarios/<id>/excluir-conta", [{
+            "caminho": f"/usuarios/{usuario_id}/excluir-conta",
+            "headers": _autorizacao(access), "corpo": None
+        } for _, usuario_id, access, _ in contexto["reservados"]], unica=True)
+    ]
+
+
+def filtrar_rotas(rotas, nomes):
+    if not nomes:
+        return rotas
+    desejadas = set()
+    for nome in nomes:
+        desejadas.update(ROTAS_FOCO if nome == "foco" else [nome])
+    return [rota for rota in rotas if rota["nome"] in desejadas]
+
+
+def criar_contexto(app, args):
+    """
+    Tokens JWT da amostra de usuários e dos usuários reservados para exclusão
+
+    Os _id são derivados do índice, então os tokens podem ser criados sem
+    ler a base (no modo http ela está no processo do gunicorn).
+    """
+    from flask_jwt_extended import create_access_token, create_refresh_token
+
+    reservados = min(args.reservados, max(args.usuarios - 1, 0))
+    disponiveis = args.usuarios - reservados
+    passo = max(disponiveis // max(args.amostra, 1), 1)
+    indices = list(range(0, disponiveis, passo))[:args.amostra]
+
+    def tokens(indice):
+        usuario_id = str(id_usuario(indice))
+        # Tokens longos: o benchmark pode durar mais que a validade padrão
+        validade = timedelta(days=1)
+        return (
+            indice, usuario_id,
+            create_access_token(identity=usuario_id, expires_delta=validade),
+            create_refresh_token(identity=usuario_id, expires_delta=validade)
+        )
+
+    with app.app_context():
+        return {
+            "usuarios": [tokens(indice) for indice in indices],
+            "reservados": [tokens(indice) for indice in range(disponiveis, args.usuarios)],
+            "meditacoes": [str(id_meditacao(indice)) for indice in range(args.meditacoes)],
+            "execucao": int(time.time())
+        }
+
+
+# ==================== MEDIÇÃO ====================
+
+def resumir(rota, modo, latencias, tamanhos, mongo_ms, mongo_comandos, status, erros, decorrido):
+    """Mesmo formato do resultado de scripts/carga_http.py"""
+    latencias.sort()
+
+    def media(valores):
+        return round(sum(valores) / len(valores), 3) if valores else None
+
+    return {
+        'rota': rota,
+        'modo': modo,
+        'requisicoes': len(latencias),
+        'duracao_s': round(decorrido, 3),
+        'req_por_s': round(len(latencias) / decorrido, 1) if decorrido else 0.0,
+        'latencia_media_ms': round(sum(latencias) / len(latencias) * 1000, 3) if latencias else 0.0,
+        'latencia_p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'latencia_p90_ms': round(percentil(latencias, 90) * 1000, 3),
+        'latencia_p95_ms': round(percentil(latencias, 95) * 1000, 3),
+        'latencia_p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'latencia_max_ms': round(latencias[-1] * 1000, 3) if latencias else 0.0,
+        'bytes_por_requisicao': media(tamanhos),
+        'mongo_comandos_por_requisicao': media(mongo_comandos),
+        'mongo_ms_por_requisicao': media(mongo_ms),
+        'status': {str(codigo): total for codigo, total in sorted(status.items())},
+        'erros': erros
+    }
+
+
+def medir_cliente(app, rotas, args):
+    """
+    Uma requisição por vez pelo cliente de teste do Flask
+
+    Os logs INFO e os prints dos controllers ficam desligados: escrever cada
+    linha no terminal custaria mais que a própria requisição.
+    """
+    logging.disable(logging.INFO)
+    cliente = app.test_client()
+    resultados = []
+    for rota in rotas:
+        variacoes = rota["variacoes"]
+        if not variacoes:
+            continue
+        total = min(args.requisicoes, len(variacoes)) if rota["unica"] else args.requisicoes
+        aquecimento = 0 if rota["unica"] else args.aquecimento
+
+        def enviar(numero):
+            variacao = variacoes[numero % len(variacoes)]
+            return cliente.open(
+                variacao["caminho"], method=rota["metodo"],
+                headers=variacao["headers"] or {}, json=variacao["corpo"]
+            )
+
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            for numero in range(aquecimento):
+                enviar(numero)
+            latencias, tamanhos, mongo_ms, mongo_comandos, status, erros, decorrido = _medir_sequencial(
+                enviar, aquecimento, total
+            )
+
+        resultado = resumir(rota["nome"], "cliente", latencias, tamanhos, mongo_ms, mongo_comandos,
+                            status, erros, decorrido)
+        resultados.append(resultado)
+        imprimir_resultado(resultado)
+    return resultados
+
+
+def _medir_sequencial(enviar, primeira, total):
+
+    latencias, tamanhos, mongo_ms, mongo_comandos, status = [], [], [], [], {}
+    erros = 0
+    inicio = time.perf_counter()
+    for numero in range(primeira, primeira + total):
+        antes = time.perf_counter()
+        try:
+            resposta = enviar(numero)
+        except Exception:
+            erros += 1
+            continue
+        latencias.append(time.perf_counter() - antes)
+        status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+        tamanhos.append(len(resposta.data))
+        milissegundos, comandos = ler_tempo_mongo(
+            resposta.headers.get("Server-Timing"), resposta.headers.get("X-Mongo-Comandos")
+        )
+        if comandos is not None:
+            mongo_ms.append(milissegundos)
+            mongo_comandos.append(comandos)
+    return latencias, tamanhos, mongo_ms, mongo_comandos, status, erros, time.perf_counter() - inicio
+
+
+def aguardar_servidor(url, timeout=120.0):
+    """Espera o /health responder 200 (a carga em memória acontece antes)"""
+    import urllib.error
+    import urllib.request
+
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as resposta:
+                if resposta.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def comando_servidor(args):
+    """gunicorn com a configuração da API e a fábrica que semeia a base"""
+    fabrica = (
+        f"benchmark_endpoints:criar_app_semeado(usuarios={args.usuarios},registros={args.registros},"
+        f"meditacoes={args.meditacoes},semente={args.semente})"
+    )
+    return [
+        sys.executable, "-m", "gunicorn",
+        "-c", "gunicorn.conf.py",
+        "--pythonpath", DIRETORIO_SCRIPTS,
+        "--bind", f"127.0.0.1:{args.porta}",
+        "--workers", str(args.workers),
+        "--threads", str(args.threads),
+        "--log-level", "warning",
+        fabrica
+    ]
+
+
+def medir_http(rotas, args):
+    """Sobe o gunicorn e mede cada rota com scripts/carga_http.py"""
+    url = f"http://127.0.0.1:{args.porta}"
+    processo = subprocess.Popen(
+        comando_servidor(args),
+        cwd=DIRETORIO_API,
+        env=dict(os.environ, GUNICORN_PRELOAD="1"),
+        # Os prints dos controllers; erros do servidor continuam no stderr
+        stdout=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+    try:
+        if not aguardar_servidor(url):
+            print(f"❌ Servidor não respondeu em {url}/health")
+            return []
+
+        resultados = []
+        for rota in rotas:
+            variacoes = rota["variacoes"]
+            if not variacoes:
+                continue
+            maximo = len(variacoes) if rota["unica"] else None
+            if not rota["unica"] and args.aquecimento_http:
+                asyncio.run(executar_carga(
+                    url, variacoes[0]["caminho"], args.conexoes, args.aquecimento_http,
+                    metodo=rota["metodo"], variacoes=variacoes
+                ))
+            resultado = asyncio.run(executar_carga(
+                url, variacoes[0]["caminho"], args.conexoes, args.duracao,
+                metodo=rota["metodo"], variacoes=variacoes, maximo=maximo
+            ))
+            resultado['rota'] = rota["nome"]
+            resultado['modo'] = "http"
+            resultados.append(resultado)
+            imprimir_resultado(resultado)
+        return resultados
+
+    finally:
+        os.killpg(processo.pid, signal.SIGTERM)
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(processo.pid, signal.SIGKILL)
+
+
+# ==================== RELATÓRIO ====================
+
+def _formatar(valor, formato):
+    return "-" if valor is None else format(valor, formato)
+
+
+def imprimir_resultado(resultado):
+    print(
+        f"   {resultado['modo']:<7} {resultado['rota']:<48}"
+        f" {resultado['req_por_s']:>9.1f} req/s"
+        f"   p50 {resultado['latencia_p50_ms']:>8.2f}"
+        f"   p95 {resultado['latencia_p95_ms']:>8.2f}"
+        f"   p99 {resultado['latencia_p99_ms']:>8.2f} ms"
+        f"   mongo {_formatar(resultado['mongo_comandos_por_requisicao'], '>5.1f')} cmd"
+        f" {_formatar(resultado['mongo_ms_por_requisicao'], '>7.2f')} ms"
+        f"   {_formatar(resultado['bytes_por_requisicao'], '>9.0f')} B"
+        f"   status {resultado['status']}"
+    )
+
+
+def comparar(resultados, arquivo):
+    """Razões em relação a um JSON anterior do mesmo script"""
+    with open(arquivo, encoding="utf-8") as entrada:
+        anteriores = {
+            (resultado['modo'], resultado['rota']): resultado
+            for resultado in json.load(entrada)['resultados']
+        }
+
+    print(f"\n📊 Comparação com {arquivo} (atual / anterior):")
+    for resultado in resultados:
+        anterior = anteriores.get((resultado['modo'], resultado['rota']))
+        if not anterior or not anterior['req_por_s'] or not anterior['latencia_p99_ms']:
+            continue
+        diferenca_mongo = (
+            resultado['mongo_comandos_por_requisicao'] - anterior['mongo_comandos_por_requisicao']
+            if resultado['mongo_comandos_por_requisicao'] is not None
+            and anterior.get('mongo_comandos_por_requisicao') is not None else None
+        )
+        print(
+            f"   {resultado['modo']:<7} {resultado['rota']:<48}"
+            f" vazão x{resultado['req_por_s'] / anterior['req_por_s']:.2f}"
+            f"   p99 x{resultado['latencia_p99_ms'] / anterior['latencia_p99_ms']:.2f}"
+            f"   mongo {_formatar(diferenca_mongo, '+.1f')} cmd"
+        )
+
+
+# ==================== EXECUÇÃO ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints da Calmou API")
+    parser.add_argument("--modo", choices=["cliente", "http", "ambos"], default="cliente")
+    parser.add_argument("--armazenamento", choices=["memoria", "mongo"], default="memoria")
+    parser.add_argument("--banco", default=BANCO_PADRAO, help="MONGO_DB_NAME usado (apagado e recarregado)")
+    parser.add_argument("--usuarios", type=int, default=1000, help="Usuários na base")
+    parser.add_argument("--registros", type=int, default=50, help="Elementos de cada array por usuário")
+    parser.add_argument("--meditacoes", type=int, default=200, help="Meditações no catálogo")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--amostra", type=int, default=100, help="Usuários autenticados usados em rodízio")
+    parser.add_argument("--reservados", type=int, default=100, help="Usuários reservados para a exclusão de conta")
+    parser.add_argument("--requisicoes", type=int, default=200, help="Requisições medidas por rota (modo cliente)")
+    parser.add_argument("--aquecimento", type=int, default=20, help="Requisições de aquecimento por rota (modo cliente)")
+    parser.add_argument("--cadastros", type=int, default=200, help="Cadastros no máximo por execução do POST /register")
+    parser.add_argument("--conexoes", type=int, default=32, help="Conexões simultâneas (modo http)")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de medição por rota (modo http)")
+    parser.add_argument("--aquecimento-http", type=float, default=2.0, help="Segundos de aquecimento por rota (modo http)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do gunicorn (modo http)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads por worker (modo http)")
+    parser.add_argument("--porta", type=int, default=8200)
+    parser.add_argument("--rotas", nargs="+", help='Nomes das rotas (ex.: "GET /perfil") ou "foco"')
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    if args.armazenamento == "mongo" and args.banco == os.getenv("MONGO_DB_NAME", "calmou_db"):
+        print(f"❌ O banco '{args.banco}' é apagado pelo benchmark: use um banco próprio (--banco)")
+        sys.exit(1)
+
+    # Lidas na importação da API, pelo mestre do gunicorn e pelo cliente de teste
+    os.environ.update({
+        "ARMAZENAMENTO": args.armazenamento,
+        "MONGO_DB_NAME": args.banco,
+        "LOG_CABECALHO_MONGO": "1",
+        "RATELIMIT_ENABLED": "0",
+        "SENHAS_PROCESSOS": "0"
+    })
+    sys.path.insert(0, DIRETORIO_API)
+    from app import create_app
+    from src.conexion.mongo_conexao import fechar_mongo
+
+    print("\n" + "="*70)
+    print(f"BENCHMARK DOS ENDPOINTS - {args.usuarios} usuários x {args.registros} registros ({args.armazenamento})")
+    print("="*70)
+
+    # No modo http com memória a base é carregada no gunicorn
+    if args.modo != "http" or args.armazenamento == "mongo":
+        segundos = semear_dados(args.usuarios, args.registros, args.meditacoes, args.semente)
+        print(f"\n✅ Base carregada em {segundos:.1f}s")
+
+    app = create_app()
+    contexto = criar_contexto(app, args)
+    rotas = filtrar_rotas(montar_rotas(contexto, args.cadastros), args.rotas)
+
+    resultados = []
+    if args.modo in ("cliente", "ambos"):
+        print("\n🧪 Cliente de teste do Flask (uma requisição por vez):")
+        resultados.extend(medir_cliente(app, rotas, args))
+    if args.modo in ("http", "ambos"):
+        if args.modo == "ambos" and args.armazenamento == "mongo":
+            # Desfaz as escritas do modo cliente (contas excluídas, cadastros)
+            semear_dados(args.usuarios, args.registros, args.meditacoes, args.semente)
+        fechar_mongo()
+        print(f"\n🌐 HTTP (gunicorn, {args.workers} workers x {args.threads} threads, {args.conexoes} conexões):")
+        resultados.extend(medir_http(rotas, args))
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                'configuracao': {
+                    chave: valor for chave, valor in vars(args).items()
+                    if chave not in ("saida", "comparar")
+                },
+                'resultados': resultados
+            }, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark de Inicialização - Calmou API
+Mede, para cada worker do gunicorn, o tempo desde o início do servidor até a
+primeira requisição atendida, com e sem preload da aplicação
+
+Uso:
+    python scripts/benchmark_inicializacao.py --workers 4 --threads 8
+    python scripts/benchmark_inicializacao.py --variantes preload --rota /meditacoes --saida inicializacao.json
+
+O servidor é iniciado a partir de api/ com o gunicorn.conf.py do projeto;
+os tempos vêm dos hooks da configuração (GUNICORN_LOG_INICIALIZACAO).
+Precisa de um MongoDB acessível em MONGO_URI.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DIRETORIO_API = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api")
+
+
+def ler_eventos(caminho):
+    """Lê o JSONL gravado pelos hooks do gunicorn"""
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def workers_atendidos(eventos):
+    return {e["pid"] for e in eventos if e["evento"] == "primeira_requisicao"}
+
+
+def requisitar(url):
+    """GET numa conexão nova (sem keep-alive), para espalhar entre os workers"""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resposta:
+            resposta.read()
+    except (urllib.error.URLError, ConnectionError, OSError):
+        pass
+
+
+def medir_variante(variante, args):
+    """Sobe o gunicorn e requisita até todos os workers atenderem uma vez"""
+    caminho_log = os.path.join(tempfile.mkdtemp(prefix="calmou_inicializacao_"), "eventos.jsonl")
+    ambiente = dict(
+        os.environ,
+        PORT=str(args.porta),
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_THREADS=str(args.threads),
+        GUNICORN_PRELOAD="1" if variante == "preload" else "0",
+        GUNICORN_LOG_INICIALIZACAO=caminho_log,
+        RATELIMIT_ENABLED="0",
+        SENHAS_PROCESSOS="0"
+    )
+
+    inicio = time.time()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning"],
+        cwd=DIRETORIO_API,
+        env=ambiente,
+        start_new_session=True
+    )
+
+    url = f"http://127.0.0.1:{args.porta}{args.rota}"
+    try:
+        limite = time.monotonic() + args.tempo_limite
+        with ThreadPoolExecutor(max_workers=args.conexoes) as executor:
+            while len(workers_atendidos(ler_eventos(caminho_log))) < args.workers:
+                if time.monotonic() > limite or processo.poll() is not None:
+                    print(f"❌ Nem todos os workers ({variante}) atenderam em {args.tempo_limite:.0f}s")
+                    break
+                list(executor.map(requisitar, [url] * args.conexoes))
+    finally:
+        os.killpg(processo.pid, signal.SIGTERM)
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(processo.pid, signal.SIGKILL)
+
+    return resumir(variante, ler_eventos(caminho_log), inicio)
+
+
+def resumir(variante, eventos, inicio):
+    """Agrupa os eventos por worker, em ms desde o início do servidor"""
+    def ms(t):
+        return round((t - inicio) * 1000, 1)
+
+    mestre = next((ms(e["t"]) for e in eventos if e["evento"] == "mestre_pronto"), None)
+
+    por_worker = {}
+    for evento in eventos:
+        if evento["evento"] == "mestre_pronto":
+            continue
+        worker = por_worker.setdefault(evento["pid"], {"pid": evento["pid"]})
+        # Só o primeiro registro de cada evento conta
+        worker.setdefault(f"{evento['evento']}_ms", ms(evento["t"]))
+        if "duracao_ms" in evento:
+            worker.setdefault("duracao_primeira_requisicao_ms", evento["duracao_ms"])
+
+    workers = sorted(por_worker.values(), key=lambda w: w.get("fork_ms", 0))
+    primeiras = [w["primeira_requisicao_ms"] for w in workers if "primeira_requisicao_ms" in w]
+
+    return {
+        'variante': variante,
+        'mestre_pronto_ms': mestre,
+        'workers': workers,
+        'primeira_requisicao_min_ms': min(primeiras) if primeiras else None,
+        'primeira_requisicao_max_ms': max(primeiras) if primeiras else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização dos workers do gunicorn")
+    parser.add_argument("--workers", type=int, default=4, help="Workers do gunicorn")
+    parser.add_argument("--threads", type=int, default=8, help="Threads por worker (gthread)")
+    parser.add_argument("--porta", type=int, default=8100, help="Porta do servidor")
+    parser.add_argument("--rota", default="/meditacoes", help="Rota usada na primeira requisição")
+    parser.add_argument("--conexoes", type=int, default=16, help="Requisições simultâneas por rodada")
+    parser.add_argument("--tempo-limite", type=float, default=60.0, help="Segundos de espera por variante")
+    parser.add_argument("--variantes", nargs="+", default=["preload", "sem-preload"],
+                        choices=["preload", "sem-preload"])
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"BENCHMARK INICIALIZAÇÃO - {args.workers} workers x {args.threads} threads - GET {args.rota}")
+    print("="*70)
+
+    resultados = []
+    for variante in args.variantes:
+        resultado = medir_variante(variante, args)
+        resultados.append(resultado)
+
+        print(f"\n   {variante} (mestre pronto em {resultado['mestre_pronto_ms']} ms)")
+        print(f"   {'pid':>8} {'fork':>9} {'conectado':>10} {'pronto':>9} {'1ª req.':>9} {'duração':>9}")
+        for w in resultado['workers']:
+            print(
+                f"   {w['pid']:>8} {w.get('fork_ms', '-'):>9} {w.get('conectado_ms', '-'):>10}"
+                f" {w.get('pronto_ms', '-'):>9} {w.get('primeira_requisicao_ms', '-'):>9}"
+                f" {w.get('duracao_primeira_requisicao_ms', '-'):>9}"
+            )
+        print(f"   todos os workers atendendo em {resultado['primeira_requisicao_max_ms']} ms")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark do Rate Limiting Compartilhado - Calmou API
+Mede o custo de cada verificação do limiter (hit) sob concorrência e confere
+que o limite é respeitado somando os acertos de todos os processos
+
+Uso:
+    python scripts/benchmark_limites.py --processos 4 --threads 8 --duracao 5
+    python scripts/benchmark_limites.py --backends sqlite memory --saida limites.json
+
+O backend "memory" é o armazenamento por processo usado antes; serve de
+referência de custo, mas o teste de exatidão mostra que ele deixa passar
+limite x processos requisições.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Adiciona a raiz (src/) e o diretório da API ao path para importar o armazenamento
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ_PROJETO)
+sys.path.append(os.path.join(RAIZ_PROJETO, "api"))
+
+from limits import parse
+from limits.storage import MemoryStorage
+from limits.strategies import STRATEGIES
+
+from armazenamento_limites import ArmazenamentoSQLite
+
+from carga_http import percentil
+
+
+def _criar_limiter(backend, caminho, estrategia):
+    armazenamento = ArmazenamentoSQLite(f"sqlite:///{caminho}") if backend == "sqlite" else MemoryStorage()
+    return STRATEGIES[estrategia](armazenamento)
+
+
+def _processo_carga(backend, caminho, estrategia, threads, duracao, chaves, fila):
+    """Executa hits em chaves aleatórias e devolve as latências em microssegundos"""
+    limiter = _criar_limiter(backend, caminho, estrategia)
+    item = parse("200 per minute")
+    latencias = []
+    lock = threading.Lock()
+
+    def trabalhar():
+        gerador = random.Random()
+        locais = []
+        fim = time.perf_counter() + duracao
+        while time.perf_counter() < fim:
+            chave = f"10.0.{gerador.randrange(chaves) // 256}.{gerador.randrange(256)}"
+            inicio = time.perf_counter_ns()
+            limiter.hit(item, "benchmark", chave)
+            locais.append((time.perf_counter_ns() - inicio) / 1000)
+        with lock:
+            latencias.extend(locais)
+
+    trabalhadores = [threading.Thread(target=trabalhar) for _ in range(threads)]
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    fila.put(latencias)
+
+
+def _processo_exatidao(backend, caminho, estrategia, tentativas, fila):
+    """Tenta tentativas hits numa única chave e devolve quantos foram aceitos"""
+    limiter = _criar_limiter(backend, caminho, estrategia)
+    item = parse("100 per hour")
+    fila.put(sum(1 for _ in range(tentativas) if limiter.hit(item, "exatidao", "127.0.0.1")))
+
+
+def _executar(alvo, argumentos, processos):
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    filhos = [contexto.Process(target=alvo, args=argumentos + (fila,)) for _ in range(processos)]
+    for filho in filhos:
+        filho.start()
+    resultados = [fila.get() for _ in filhos]
+    for filho in filhos:
+        filho.join()
+    return resultados
+
+
+def medir_backend(backend, args):
+    """Mede custo e exatidão de um backend"""
+    caminho = os.path.join(tempfile.mkdtemp(prefix="calmou_limites_"), "limites.sqlite3")
+
+    latencias = []
+    for parcial in _executar(
+        _processo_carga,
+        (backend, caminho, args.estrategia, args.threads, args.duracao, args.chaves),
+        args.processos
+    ):
+        latencias.extend(parcial)
+    latencias.sort()
+
+    caminho_exatidao = caminho + ".exatidao"
+    aceitos = sum(_executar(_processo_exatidao, (backend, caminho_exatidao, args.estrategia, 200), args.processos))
+
+    return {
+        'backend': backend,
+        'estrategia': args.estrategia,
+        'processos': args.processos,
+        'threads_por_processo': args.threads,
+        'verificacoes': len(latencias),
+        'verificacoes_por_s': round(len(latencias) / args.duracao, 1),
+        'custo_p50_us': round(percentil(latencias, 50), 1),
+        'custo_p99_us': round(percentil(latencias, 99), 1),
+        'custo_max_us': round(latencias[-1], 1) if latencias else 0.0,
+        'limite_exatidao': 100,
+        'aceitos_exatidao': aceitos
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do armazenamento de rate limiting")
+    parser.add_argument("--processos", type=int, default=4, help="Processos simulando workers do gunicorn")
+    parser.add_argument("--threads", type=int, default=4, help="Threads por processo")
+    parser.add_argument("--duracao", type=float, default=5.0, help="Segundos de carga por backend")
+    parser.add_argument("--chaves", type=int, default=10000, help="Quantidade de IPs distintos")
+    parser.add_argument("--estrategia", default="sliding-window-counter",
+                        choices=["sliding-window-counter", "fixed-window"])
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "memory"], choices=["sqlite", "memory"])
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"BENCHMARK RATE LIMITING - {args.processos} processos x {args.threads} threads")
+    print("="*70)
+
+    resultados = []
+    for backend in args.backends:
+        resultado = medir_backend(backend, args)
+        resultados.append(resultado)
+        print(
+            f"   {backend:<7} {resultado['verificacoes_por_s']:>10.1f} verif/s"
+            f"   p50 {resultado['custo_p50_us']:>8.1f} µs"
+            f"   p99 {resultado['custo_p99_us']:>8.1f} µs"
+            f"   exatidão {resultado['aceitos_exatidao']}/{resultado['limite_exatidao']}"
+        )
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Gerador de Carga HTTP - Calmou API
+Cliente HTTP/1.1 mínimo (asyncio, conexões keep-alive) usado pelos benchmarks
+
+Mantém N conexões abertas disparando requisições em sequência durante a
+duração pedida e mede a latência de cada resposta. Só usa a biblioteca
+padrão, para não influenciar o servidor medido com dependências extras.
+
+Com a API iniciada com LOG_CABECALHO_MONGO=1, o resultado traz também o
+tempo e os comandos do MongoDB por requisição (api/log_requisicoes.py).
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def percentil(valores_ordenados, p):
+    """Percentil (0-100) por interpolação linear de uma lista já ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    posicao = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    fracao = posicao - inferior
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * fracao
+
+
+def ler_tempo_mongo(server_timing, comandos):
+    """
+    Tempo e comandos do MongoDB dos cabeçalhos da resposta
+
+    Args:
+        server_timing (str): Server-Timing (ex.: "mongo;dur=1.25")
+        comandos (str): X-Mongo-Comandos
+
+    Returns:
+        tuple: (milissegundos, comandos), ou (None, None) sem os cabeçalhos
+    """
+    if comandos is None:
+        return None, None
+    milissegundos = 0.0
+    for metrica in (server_timing or "").split(","):
+        nome, *parametros = [parte.strip() for parte in metrica.split(";")]
+        if nome == "mongo":
+            for parametro in parametros:
+                if parametro.startswith("dur="):
+                    milissegundos = float(parametro[4:])
+    return milissegundos, int(comandos)
+
+
+def _media(valores):
+    return round(sum(valores) / len(valores), 3) if valores else None
+
+
+def _montar_requisicao(metodo, caminho, host, headers=None, corpo=None):
+    """Serializa uma requisição HTTP/1.1 com keep-alive"""
+    linhas = [f"{metodo} {caminho} HTTP/1.1", f"Host: {host}", "Connection: keep-alive"]
+    dados = b""
+    if corpo is not None:
+        dados = json.dumps(corpo).encode("utf-8")
+        linhas.append("Content-Type: application/json")
+    linhas.append(f"Content-Length: {len(dados)}")
+    for nome, valor in (headers or {}).items():
+        linhas.append(f"{nome}: {valor}")
+    return ("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1") + dados
+
+
+async def _ler_resposta(reader):
+    """Lê uma resposta completa; retorna (status, corpo, fechar_conexao, cabeçalhos em minúsculas)"""
+    linha_status = await reader.readline()
+    if not linha_status:
+        raise ConnectionError("Conexão fechada pelo servidor")
+    versao, status = linha_status.split()[:2]
+    status = int(status)
+
+    tamanho = 0
+    chunked = False
+    # Servidores HTTP/1.0 fecham a conexão após cada resposta
+    fechar = versao == b"HTTP/1.0"
+    cabecalhos = {}
+    while True:
+        linha = await reader.readline()
+        if linha in (b"\r\n", b"\n", b""):
+            break
+        nome, _, valor = linha.decode("latin-1").partition(":")
+        nome = nome.strip().lower()
+        valor = valor.strip()
+        cabecalhos[nome] = valor
+        if nome == "content-length":
+            tamanho = int(valor)
+        elif nome == "transfer-encoding" and "chunked" in valor.lower():
+            chunked = True
+        elif nome == "connection":
+            fechar = valor.lower() != "keep-alive" if fechar else valor.lower() == "close"
+
+    if chunked:
+        partes = []
+        while True:
+            tamanho_parte = int((await reader.readline()).split(b";")[0], 16)
+            if tamanho_parte == 0:
+                await reader.readline()
+                break
+            partes.append(await reader.readexactly(tamanho_parte))
+            await reader.readline()
+        corpo = b"".join(partes)
+    else:
+        corpo = await reader.readexactly(tamanho) if tamanho else b""
+
+    return status, corpo, fechar, cabecalhos
+
+
+async def _trabalhador(url, proxima, fim, medidas, status_contagem, erros):
+    """Uma conexão keep-alive enviando requisições até o fim do teste"""
+    partes = urlsplit(url)
+    writer = None
+    latencias, tamanhos, mongo_ms, mongo_comandos = medidas
+    while time.perf_counter() < fim:
+        requisicao = proxima()
+        if requisicao is None:
+            break
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(partes.hostname, partes.port or 80)
+
+            inicio = time.perf_counter()
+            writer.write(requisicao)
+            await writer.drain()
+            status, corpo, fechar, cabecalhos = await _ler_resposta(reader)
+            latencias.append(time.perf_counter() - inicio)
+            status_contagem[status] = status_contagem.get(status, 0) + 1
+            tamanhos.append(len(corpo))
+            milissegundos, comandos = ler_tempo_mongo(cabecalhos.get("server-timing"), cabecalhos.get("x-mongo-comandos"))
+            if comandos is not None:
+                mongo_ms.append(milissegundos)
+                mongo_comandos.append(comandos)
+
+            if fechar:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            erros[0] += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.01)
+
+    if writer is not None:
+        writer.close()
+
+
+async def executar_carga(url, caminho, conexoes=32, duracao=10.0, metodo="GET", headers=None, corpo=None,
+                         variacoes=None, maximo=None):
+    """
+    Executa a carga contra um endpoint
+
+    Args:
+        url (str): URL base do servidor (ex.: http://127.0.0.1:8000)
+        caminho (str): Caminho da rota (ex.: /meditacoes)
+        conexoes (int): Número de conexões simultâneas
+        duracao (float): Duração do teste em segundos
+        metodo (str): Método HTTP
+        headers (dict, optional): Headers adicionais
+        corpo (dict, optional): Corpo JSON
+        variacoes (list, optional): Dicts com caminho, headers e/ou corpo de cada
+            requisição, usados em rodízio (ex.: um token por usuário)
+        maximo (int, optional): Encerra antes da duração após tantas requisições
+
+    Returns:
+        dict: Requisições por segundo, latências (ms), bytes e comandos do
+            MongoDB por requisição, contagem de status e erros
+    """
+    partes = urlsplit(url)
+    requisicoes = [
+        _montar_requisicao(
+            metodo, variacao.get('caminho', caminho), partes.netloc,
+            variacao.get('headers', headers), variacao.get('corpo', corpo)
+        )
+        for variacao in (variacoes or [{}])
+    ]
+    contador = itertools.count()
+
+    def proxima():
+        numero = next(contador)
+        if maximo is not None and numero >= maximo:
+            return None
+        return requisicoes[numero % len(requisicoes)]
+
+    medidas = ([], [], [], [])
+    latencias, tamanhos, mongo_ms, mongo_comandos = medidas
+    status_contagem = {}
+    erros = [0]
+
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    await asyncio.gather(*(
+        _trabalhador(url, proxima, fim, medidas, status_contagem, erros)
+        for _ in range(conexoes)
+    ))
+    decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'caminho': caminho,
+        'conexoes': conexoes,
+        'duracao_s': round(decorrido, 3),
+        'requisicoes': len(latencias),
+        'req_por_s': round(len(latencias) / decorrido, 1) if decorrido else 0.0,
+        'latencia_media_ms': round(sum(latencias) / len(latencias) * 1000, 3) if latencias else 0.0,
+        'latencia_p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'latencia_p90_ms': round(percentil(latencias, 90) * 1000, 3),
+        'latencia_p95_ms': round(percentil(latencias, 95) * 1000, 3),
+        'latencia_p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'latencia_max_ms': round(latencias[-1] * 1000, 3) if latencias else 0.0,
+        'bytes_por_requisicao': _media(tamanhos),
+        'mongo_comandos_por_requisicao': _media(mongo_comandos),
+        'mongo_ms_por_requisicao': _media(mongo_ms),
+        'status': {str(codigo): total for codigo, total in sorted(status_contagem.items())},
+        'erros': erros[0]
+    }
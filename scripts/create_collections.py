@@ -9,7 +9,7 @@ import os
 # Adiciona o diretório raiz ao path para importar módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.conexion.mongo_conexao import MongoDBConnection
+from src.conexion.mongo_conexao import MongoDBConnection, usar_perfil_mongo
 from pymongo import ASCENDING, DESCENDING
 from pymongo.errors import CollectionInvalid
 
@@ -158,6 +158,10 @@ def criar_colecoes():
         usuarios_collection.create_index([("data_cadastro", DESCENDING)], name="idx_data_cadastro")
         print("  ✅ Índice criado em 'data_cadastro'")
 
+        # Índice em ultima_atividade para a contagem de usuários ativos (GET /stats)
+        usuarios_collection.create_index([("ultima_atividade", DESCENDING)], name="idx_ultima_atividade")
+        print("  ✅ Índice criado em 'ultima_atividade'")
+
         # Índice em classificacoes_humor.data_classificacao
         usuarios_collection.create_index(
             [("classificacoes_humor.data_classificacao", DESCENDING)],
@@ -165,6 +169,19 @@ def criar_colecoes():
         )
         print("  ✅ Índice criado em 'classificacoes_humor.data_classificacao'")
 
+        # ==================== COLEÇÃO: HUMOR_MENSAL ====================
+        # Buckets mensais das classificações de humor (src/controller/controller_humor.py)
+        print("\n📦 Criando coleção 'humor_mensal'...")
+        try:
+            db.create_collection("humor_mensal")
+            print("  ✅ Coleção 'humor_mensal' criada")
+        except CollectionInvalid:
+            print("  ⚠️  Coleção 'humor_mensal' já existe")
+
+        # Índice usado pelo upsert no bucket do mês e pelo relatório de humor
+        db["humor_mensal"].create_index([("usuario_id", ASCENDING), ("mes", ASCENDING)], name="idx_usuario_mes")
+        print("  ✅ Índice criado em 'usuario_id+mes'")
+
         # ==================== COLEÇÃO: MEDITACOES ====================
         print("\n📦 Criando coleção 'meditacoes'...")
 
@@ -263,4 +280,5 @@ def criar_colecoes():
         conexao.fechar_conexao()
 
 if __name__ == "__main__":
+    usar_perfil_mongo("lote")
     criar_colecoes()
@@ -9,7 +9,7 @@ import os
 # Adiciona o diretório raiz ao path para importar módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.conexion.mongo_conexao import MongoDBConnection
+from src.conexion.mongo_conexao import MongoDBConnection, usar_perfil_mongo
 from pymongo import ASCENDING, DESCENDING
 from pymongo.errors import CollectionInvalid
 
@@ -46,6 +46,8 @@ def criar_colecoes_completas():
                     "alergias": {"bsonType": ["string", "null"]},
                     "foto_perfil": {"bsonType": ["string", "null"]},
                     "data_cadastro": {"bsonType": "date"},
+                    "versao": {"bsonType": ["int", "long"]},
+                    "ultima_atividade": {"bsonType": ["date", "null"]},
                     "endereco": {"bsonType": ["object", "null"]},
                     "config": {"bsonType": ["object", "null"]}
                 }
@@ -62,7 +64,11 @@ def criar_colecoes_completas():
         usuarios_collection.create_index([("email", ASCENDING)], unique=True, name="idx_email_unique")
         usuarios_collection.create_index([("cpf", ASCENDING)], unique=True, sparse=True, name="idx_cpf_unique")
         usuarios_collection.create_index([("data_cadastro", DESCENDING)], name="idx_data_cadastro")
-        print("  ✅ Índices criados: email (unique), cpf (unique), data_cadastro")
+        # Cobre a consulta de versão usada nos ETags (GET /perfil)
+        usuarios_collection.create_index([("_id", ASCENDING), ("versao", ASCENDING)], name="idx_id_versao")
+        # Contagem de usuários ativos do GET /stats
+        usuarios_collection.create_index([("ultima_atividade", DESCENDING)], name="idx_ultima_atividade")
+        print("  ✅ Índices criados: email (unique), cpf (unique), data_cadastro, _id+versao, ultima_atividade")
 
         # ==================== COLEÇÃO 2: MEDITACOES ====================
         print("\n📦 Criando coleção 'meditacoes'...")
@@ -80,7 +86,8 @@ def criar_colecoes_completas():
                     "categoria": {"bsonType": "string"},
                     "imagem_capa": {"bsonType": ["string", "null"]},
                     "ativa": {"bsonType": "bool"},
-                    "data_criacao": {"bsonType": "date"}
+                    "data_criacao": {"bsonType": "date"},
+                    "versao": {"bsonType": ["int", "long"]}
                 }
             }
         }
@@ -96,7 +103,11 @@ def criar_colecoes_completas():
         meditacoes_collection.create_index([("tipo", ASCENDING)], name="idx_tipo")
         meditacoes_collection.create_index([("categoria", ASCENDING), ("duracao_minutos", ASCENDING)], name="idx_categoria_duracao")
         meditacoes_collection.create_index([("titulo", "text"), ("descricao", "text")], name="idx_text_search")
-        print("  ✅ Índices criados: categoria, tipo, categoria+duracao, text_search")
+        # Suporta a paginação keyset do catálogo (GET /meditacoes)
+        meditacoes_collection.create_index([("titulo", ASCENDING), ("_id", ASCENDING)], name="idx_titulo_id")
+        # Cobre a consulta de versão usada nos ETags (GET /meditacoes/<id>)
+        meditacoes_collection.create_index([("_id", ASCENDING), ("versao", ASCENDING)], name="idx_id_versao")
+        print("  ✅ Índices criados: categoria, tipo, categoria+duracao, text_search, titulo+_id, _id+versao")
 
         # ==================== COLEÇÃO 3: CLASSIFICACOES_HUMOR ====================
         print("\n📦 Criando coleção 'classificacoes_humor'...")
@@ -127,6 +138,15 @@ def criar_colecoes_completas():
         humor_collection.create_index([("usuario_id", ASCENDING), ("data_classificacao", DESCENDING)], name="idx_usuario_data")
         print("  ✅ Índices criados: usuario_id, data_classificacao, usuario_id+data")
 
+        # Buckets mensais usados pela API (src/controller/controller_humor.py)
+        try:
+            db.create_collection("humor_mensal")
+            print("  ✅ Coleção 'humor_mensal' criada")
+        except CollectionInvalid:
+            print("  ⚠️  Coleção 'humor_mensal' já existe")
+        db["humor_mensal"].create_index([("usuario_id", ASCENDING), ("mes", ASCENDING)], name="idx_usuario_mes")
+        print("  ✅ Índice criado: usuario_id+mes")
+
         # ==================== COLEÇÃO 4: HISTORICO_MEDITACOES ====================
         print("\n📦 Criando coleção 'historico_meditacoes'...")
 
@@ -188,8 +208,13 @@ def criar_colecoes_completas():
         avaliacoes_collection.create_index([("usuario_id", ASCENDING)], name="idx_usuario")
         avaliacoes_collection.create_index([("tipo", ASCENDING)], name="idx_tipo")
         avaliacoes_collection.create_index([("data_avaliacao", DESCENDING)], name="idx_data")
-        avaliacoes_collection.create_index([("usuario_id", ASCENDING), ("tipo", ASCENDING)], name="idx_usuario_tipo")
-        print("  ✅ Índices criados: usuario_id, tipo, data_avaliacao, usuario_id+tipo")
+        # Histórico paginado: filtro por usuário (e tipo) já ordenado por data
+        avaliacoes_collection.create_index([("usuario_id", ASCENDING), ("data_avaliacao", DESCENDING)], name="idx_usuario_data")
+        avaliacoes_collection.create_index(
+            [("usuario_id", ASCENDING), ("tipo", ASCENDING), ("data_avaliacao", DESCENDING)],
+            name="idx_usuario_tipo_data"
+        )
+        print("  ✅ Índices criados: usuario_id, tipo, data_avaliacao, usuario_id+data, usuario_id+tipo+data")
 
         # ==================== COLEÇÃO 6: NOTIFICACOES ====================
         print("\n📦 Criando coleção 'notificacoes'...")
@@ -221,7 +246,9 @@ def criar_colecoes_completas():
         notificacoes_collection.create_index([("lida", ASCENDING)], name="idx_lida")
         notificacoes_collection.create_index([("data_envio", DESCENDING)], name="idx_data_envio")
         notificacoes_collection.create_index([("usuario_id", ASCENDING), ("lida", ASCENDING)], name="idx_usuario_lida")
-        print("  ✅ Índices criados: usuario_id, lida, data_envio, usuario_id+lida")
+        # Últimas notificações do usuário depois do corte de leitura (colecoes_separadas.py)
+        notificacoes_collection.create_index([("usuario_id", ASCENDING), ("data_envio", DESCENDING)], name="idx_usuario_data")
+        print("  ✅ Índices criados: usuario_id, lida, data_envio, usuario_id+lida, usuario_id+data")
 
         # ==================== COLEÇÃO 7: QUESTIONARIOS ====================
         print("\n📦 Criando coleção 'questionarios'...")
@@ -293,4 +320,5 @@ def criar_colecoes_completas():
         conexao.fechar_conexao()
 
 if __name__ == "__main__":
+    usar_perfil_mongo("lote")
     criar_colecoes_completas()
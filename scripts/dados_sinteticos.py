@@ -0,0 +1,89 @@
+"""
+Dados Sintéticos - Calmou API
+Identificadores, constantes e documentos comuns à base do benchmark
+(scripts/benchmark_endpoints.py) e ao gerador de dados (scripts/gerar_dados.py)
+
+Os dois scripts geram os mesmos _id e emails para o mesmo índice de usuário
+ou de meditação: o benchmark consulta uma base criada pelo gerador, e
+vice-versa, sem depender de qual dos dois a carregou.
+"""
+
+import os
+import struct
+
+from bson import ObjectId
+
+SENHA_PADRAO = "Benchmark@2024"
+
+# Timestamp fixo dos ObjectId de usuários e meditações (a ordem segue o índice)
+TIMESTAMP_IDS = 1700000000
+
+SENTIMENTOS = ["Feliz", "Calmo", "Ansioso", "Triste", "Cansado", "Grato", "Irritado", "Animado"]
+TIPOS_AVALIACAO = ["ansiedade", "depressao", "estresse", "burnout"]
+CATEGORIAS = ["sono", "ansiedade", "foco", "respiracao", "gratidao"]
+TIPOS_MEDITACAO = ["guiada", "musica", "respiracao"]
+
+
+def id_usuario(indice):
+    """_id do usuário número indice"""
+    return ObjectId(struct.pack(">IQ", TIMESTAMP_IDS, indice))
+
+
+def id_meditacao(indice):
+    """_id da meditação número indice"""
+    return ObjectId(struct.pack(">IQ", TIMESTAMP_IDS + 1, indice))
+
+
+def email_usuario(indice):
+    return f"usuario{indice}@benchmark.calmou.com"
+
+
+def documento_meditacao(indice, aleatorio):
+    return {
+        "_id": id_meditacao(indice),
+        "titulo": f"Meditação {indice:05d}",
+        "descricao": f"Sessão {indice} de {aleatorio.choice(CATEGORIAS)} para o dia a dia",
+        "duracao_minutos": aleatorio.choice([5, 10, 15, 20, 30]),
+        "url_audio": f"https://cdn.calmou.com/audio/{indice}.mp3",
+        "tipo": aleatorio.choice(TIPOS_MEDITACAO),
+        "categoria": aleatorio.choice(CATEGORIAS),
+        "imagem_capa": f"https://cdn.calmou.com/capas/{indice}.jpg",
+        "versao": 1
+    }
+
+
+def hash_senha_padrao(rounds=None):
+    """Hash bcrypt de SENHA_PADRAO, calculado uma vez para todos os usuários"""
+    import bcrypt
+
+    rounds = rounds or int(os.getenv("SENHAS_BCRYPT_ROUNDS", 12))
+    return bcrypt.hashpw(SENHA_PADRAO.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def separar_arrays(usuario_id, arrays):
+    """
+    Aplica COLECOES_MODO (colecoes_separadas.py) aos arrays de um usuário
+
+    Na escrita dupla o elemento do array recebe o _id do documento separado
+    (um _id já presente no elemento é mantido); na fase 'separada' o array
+    fica vazio. Altera arrays no lugar.
+
+    Args:
+        usuario_id (ObjectId): ID do usuário
+        arrays (dict): Array embedded -> elementos, ordenados por data
+
+    Returns:
+        dict: Coleção separada -> documentos
+    """
+    from src.controller.colecoes_separadas import colecao_de, documento_separado, grava_array, grava_colecao
+
+    separados = {}
+    for campo, elementos in arrays.items():
+        if grava_colecao(campo):
+            documentos = [documento_separado(usuario_id, campo, elemento) for elemento in elementos]
+            for elemento, documento in zip(elementos, documentos):
+                elemento["_id"] = documento["_id"]
+            separados[colecao_de(campo)] = documentos
+        if not grava_array(campo):
+            arrays[campo] = []
+    return separados
@@ -0,0 +1,580 @@
+"""
+Gerador de Dados Sintéticos - Calmou API
+Gera milhões de usuários com classificações de humor, histórico de
+meditações, avaliações e notificações em distribuições de cauda longa, para
+reproduzir a carga de produção
+
+Uso:
+    python scripts/gerar_dados.py --usuarios 1000000 --processos 8
+    python scripts/gerar_dados.py --usuarios 1000000 --limpar --indices-depois
+    python scripts/gerar_dados.py --usuarios 100000 --formato jsonl --saida dados/
+    python scripts/gerar_dados.py --usuarios 5000 --distribuicao fixa --humor 50 --avaliacoes 50
+
+Os dados dependem só da semente, do índice de cada usuário e da data --ate:
+a mesma linha de comando gera os mesmos documentos, com qualquer número de
+processos. Os usuários são divididos em faixas de --faixa índices, geradas
+em paralelo por --processos processos, cada um com o próprio MongoClient.
+Os documentos são gravados com insert_many(ordered=False) em lotes de --lote;
+chaves duplicadas (uma faixa gerada de novo) são contadas como existentes.
+
+Distribuições:
+    cauda   cada usuário recebe um engajamento de Pareto (média 1) que
+            multiplica a média de cada array; poucos usuários concentram
+            a maior parte dos registros, limitados a --maximo por array
+    fixa    todos os usuários com exatamente a média de cada array
+
+As meditações referenciadas são as da coleção 'meditacoes', com
+popularidade de Zipf; se a coleção estiver vazia (ou com --formato de
+arquivo), um catálogo de --meditacoes meditações é gerado junto.
+
+O destino de cada array segue COLECOES_MODO (colecoes_separadas.py), e o
+humor vai para os buckets mensais (controller_humor.py). Todos os usuários
+têm o email usuario<índice>@benchmark.calmou.com e a senha SENHA_PADRAO; os
+_id, emails e meditações vêm de scripts/dados_sinteticos.py, os mesmos do
+benchmark (scripts/benchmark_endpoints.py).
+
+Com --formato jsonl ou bson nada é gravado no MongoDB: cada faixa vira um
+arquivo <saida>/<coleção>/<primeiro usuário>.<formato>, carregável com
+mongoimport (Extended JSON relaxado) ou mongorestore.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.dados_sinteticos import (
+    SENTIMENTOS, TIPOS_AVALIACAO, documento_meditacao, email_usuario, hash_senha_padrao,
+    id_usuario, separar_arrays
+)
+from src.controller.buffer_push import CHAVE_DUPLICADA
+from src.controller.colecoes_separadas import COLECOES_SEPARADAS, grava_colecao
+from src.controller.controller_humor import COLECAO_HUMOR, documentos_bucket
+
+EPOCA = datetime(1970, 1, 1)
+
+# Parâmetro da Pareto do engajamento: quanto menor, mais longa a cauda
+ALFA_ENGAJAMENTO = 1.5
+
+CAMPO_HUMOR = "classificacoes_humor"
+
+# Média de registros por usuário em cada array
+MEDIAS_PADRAO = {
+    CAMPO_HUMOR: 30,
+    "historico_meditacoes": 12,
+    "resultados_avaliacoes": 4,
+    "notificacoes": 15
+}
+
+# Número de cada array no _id dos elementos
+NUMERO_CAMPO = {campo: numero for numero, campo in enumerate(MEDIAS_PADRAO)}
+
+COLECOES_GERADAS = ["usuarios", COLECAO_HUMOR] + [colecao for colecao, _ in COLECOES_SEPARADAS.values()]
+
+NOTAS = ["Dia produtivo", "Dormi mal", "Conversa difícil no trabalho", "Treino pela manhã", "Muito cansaço"]
+TEXTOS_AVALIACAO = ["Nível mínimo", "Nível leve", "Nível moderado", "Nível grave"]
+NOTIFICACOES = [
+    ("Lembrete", "Que tal uma pausa para respirar?"),
+    ("Nova meditação", "Uma nova sessão foi adicionada ao catálogo"),
+    ("Sequência", "Você meditou vários dias seguidos, continue assim!"),
+    ("Avaliação", "Faça a sua avaliação semanal")
+]
+TIPOS_SANGUINEOS = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-", None]
+
+
+# ==================== IDENTIFICADORES ====================
+
+def id_elemento(data, indice, campo, posicao):
+    """_id de um elemento de array: data do registro, usuário, array e posição"""
+    segundos = int((data - EPOCA).total_seconds())
+    return ObjectId(struct.pack(">IQ", segundos, (indice << 24) | (NUMERO_CAMPO[campo] << 20) | posicao))
+
+
+# ==================== DOCUMENTOS ====================
+
+def pesos_zipf(quantidade):
+    """Pesos acumulados de popularidade: a meditação k tem peso 1/(k + 1)"""
+    return list(itertools.accumulate(1 / (posicao + 1) for posicao in range(quantidade)))
+
+
+def tamanhos_usuario(aleatorio, medias, distribuicao="cauda", maximo=1000):
+    """
+    Quantos registros o usuário tem em cada array
+
+    Na cauda o engajamento (Pareto com média 1) vale para todos os arrays
+    do usuário, com uma variação de até 50% em cada um.
+    """
+    if distribuicao == "fixa":
+        return {campo: min(int(round(media)), maximo) for campo, media in medias.items()}
+    engajamento = (aleatorio.paretovariate(ALFA_ENGAJAMENTO) - 1) * (ALFA_ENGAJAMENTO - 1)
+    tamanhos = {}
+    for campo, media in medias.items():
+        esperado = media * engajamento * aleatorio.uniform(0.5, 1.5)
+        # Arredondamento aleatório: mantém a média mesmo para médias pequenas
+        tamanhos[campo] = min(int(esperado + aleatorio.random()), maximo)
+    return tamanhos
+
+
+def documentos_usuario(indice, tamanhos, meditacoes, password_hash, aleatorio, agora, dias=365, pesos=None):
+    """
+    Documentos de um usuário
+
+    Args:
+        indice (int): Número do usuário (define _id e email)
+        tamanhos (dict): Registros de cada array (chaves de MEDIAS_PADRAO)
+        meditacoes (list): _id das meditações referenciadas
+        password_hash (str): Hash bcrypt comum a todos os usuários
+        aleatorio (random.Random): Gerador do usuário
+        agora (datetime): Data mais recente dos registros
+        dias (int): Janela dos registros, até agora
+        pesos (list, optional): Pesos acumulados das meditações (pesos_zipf)
+
+    Returns:
+        tuple: (documento do usuário, buckets de humor, {coleção: documentos separados})
+    """
+    usuario_id = id_usuario(indice)
+    janela = dias * 86400
+
+    def datas(campo):
+        return sorted(agora - timedelta(seconds=aleatorio.randrange(janela)) for _ in range(tamanhos[campo]))
+
+    if pesos:
+        escolhidas = aleatorio.choices(meditacoes, cum_weights=pesos, k=tamanhos["historico_meditacoes"])
+    else:
+        escolhidas = [aleatorio.choice(meditacoes) for _ in range(tamanhos["historico_meditacoes"])]
+
+    arrays = {
+        "historico_meditacoes": [{
+            "meditacao_id": meditacao_id,
+            "data_conclusao": data,
+            "duracao_real_minutos": aleatorio.randint(3, 30)
+        } for meditacao_id, data in zip(escolhidas, datas("historico_meditacoes"))],
+        "resultados_avaliacoes": [],
+        "notificacoes": []
+    }
+    for data in datas("resultados_avaliacoes"):
+        score = aleatorio.randint(0, 21)
+        arrays["resultados_avaliacoes"].append({
+            "tipo": aleatorio.choice(TIPOS_AVALIACAO),
+            "respostas": {f"q{questao}": aleatorio.randint(0, 3) for questao in range(1, 8)},
+            "resultado_score": score,
+            "resultado_texto": TEXTOS_AVALIACAO[min(score // 6, 3)],
+            "data_avaliacao": data
+        })
+    for data in datas("notificacoes"):
+        titulo, mensagem = aleatorio.choice(NOTIFICACOES)
+        arrays["notificacoes"].append({
+            "titulo": titulo,
+            "mensagem": mensagem,
+            "data_envio": data,
+            "lida": data < agora - timedelta(days=2) or aleatorio.random() < 0.3
+        })
+    classificacoes = [{
+        "nivel_humor": aleatorio.randint(1, 5),
+        "sentimento_principal": aleatorio.choice(SENTIMENTOS),
+        "notas": aleatorio.choice(NOTAS) if aleatorio.random() < 0.2 else None,
+        "data_classificacao": data
+    } for data in datas(CAMPO_HUMOR)]
+
+    ultimas = [classificacoes[-1]["data_classificacao"]] if classificacoes else []
+    for campo, elementos in arrays.items():
+        data_campo = COLECOES_SEPARADAS[campo][1]
+        if elementos:
+            ultimas.append(elementos[-1][data_campo])
+        if grava_colecao(campo):
+            # _id em ordem de data, em vez do derivado do conteúdo
+            for posicao, elemento in enumerate(elementos):
+                elemento["_id"] = id_elemento(elemento[data_campo], indice, campo, posicao)
+    separados = separar_arrays(usuario_id, arrays)
+
+    data_cadastro = agora - timedelta(days=dias, seconds=aleatorio.randrange(180 * 86400))
+
+    usuario = {
+        "_id": usuario_id,
+        "nome": f"Usuário {indice}",
+        "email": email_usuario(indice),
+        "password_hash": password_hash,
+        "data_nascimento": datetime(1960, 1, 1) + timedelta(days=aleatorio.randrange(45 * 365)),
+        "tipo_sanguineo": aleatorio.choice(TIPOS_SANGUINEOS),
+        "alergias": None,
+        "foto_perfil": None,
+        "config": None,
+        "data_cadastro": data_cadastro,
+        "endereco": None,
+        CAMPO_HUMOR: [],
+        **arrays,
+        "versao": 1,
+        "ultima_atividade": max(ultimas, default=data_cadastro)
+    }
+    return usuario, documentos_bucket(usuario_id, classificacoes), separados
+
+
+# ==================== DESTINOS ====================
+
+class DestinoMongo:
+    """insert_many não ordenado em lotes; chave duplicada conta como existente"""
+
+    def __init__(self, lote):
+        from src.conexion.mongo_conexao import obter_colecao
+
+        self.lote = lote
+        self.obter_colecao = obter_colecao
+        self.pendentes = {}
+        self.contadores = {}
+
+    def _contador(self, colecao):
+        return self.contadores.setdefault(colecao, {"gravados": 0, "existentes": 0, "rejeitados": 0})
+
+    def _inserir(self, colecao, documentos):
+        contador = self._contador(colecao)
+        try:
+            self.obter_colecao(colecao).insert_many(documentos, ordered=False)
+            contador["gravados"] += len(documentos)
+        except BulkWriteError as e:
+            erros = e.details.get("writeErrors", [])
+            duplicados = sum(1 for erro in erros if erro.get("code") == CHAVE_DUPLICADA)
+            contador["gravados"] += e.details.get("nInserted", 0)
+            contador["existentes"] += duplicados
+            contador["rejeitados"] += len(erros) - duplicados
+            for erro in [erro for erro in erros if erro.get("code") != CHAVE_DUPLICADA][:3]:
+                print(f"  ⚠️  Rejeitado em '{colecao}' ({erro.get('code')}): {erro.get('errmsg')}")
+
+    def gravar(self, colecao, documentos):
+        pendentes = self.pendentes.setdefault(colecao, [])
+        pendentes.extend(documentos)
+        if len(pendentes) >= self.lote:
+            self._inserir(colecao, pendentes)
+            self.pendentes[colecao] = []
+
+    def fechar(self):
+        for colecao, documentos in self.pendentes.items():
+            if documentos:
+                self._inserir(colecao, documentos)
+        self.pendentes = {}
+        return self.contadores
+
+
+class DestinoArquivo:
+    """Um arquivo JSONL (Extended JSON relaxado) ou BSON por coleção e faixa"""
+
+    def __init__(self, diretorio, formato, parte):
+        self.diretorio = diretorio
+        self.formato = formato
+        self.parte = parte
+        self.arquivos = {}
+        self.contadores = {}
+
+    def _arquivo(self, colecao):
+        arquivo = self.arquivos.get(colecao)
+        if arquivo is None:
+            pasta = os.path.join(self.diretorio, colecao)
+            os.makedirs(pasta, exist_ok=True)
+            caminho = os.path.join(pasta, f"{self.parte:010d}.{self.formato}")
+            if self.formato == "bson":
+                arquivo = open(caminho, "wb")
+            else:
+                arquivo = open(caminho, "w", encoding="utf-8")
+            self.arquivos[colecao] = arquivo
+            self.contadores[colecao] = {"gravados": 0, "existentes": 0, "rejeitados": 0}
+        return arquivo
+
+    def gravar(self, colecao, documentos):
+        arquivo = self._arquivo(colecao)
+        if self.formato == "bson":
+            arquivo.write(b"".join(bson.encode(documento) for documento in documentos))
+        else:
+            arquivo.writelines(
+                json_util.dumps(documento, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n"
+                for documento in documentos
+            )
+        self.contadores[colecao]["gravados"] += len(documentos)
+
+    def fechar(self):
+        for arquivo in self.arquivos.values():
+            arquivo.close()
+        self.arquivos = {}
+        return self.contadores
+
+
+# ==================== GERAÇÃO ====================
+
+class GeradorDados:
+    """Gera as faixas de usuários; uma instância por processo"""
+
+    def __init__(self, semente, medias, distribuicao, maximo, dias, agora, meditacoes,
+                 password_hash, formato="mongo", saida=None, lote=1000):
+        self.semente = semente
+        self.medias = medias
+        self.distribuicao = distribuicao
+        self.maximo = maximo
+        self.dias = dias
+        self.agora = agora
+        self.meditacoes = meditacoes
+        self.pesos = pesos_zipf(len(meditacoes))
+        self.password_hash = password_hash
+        self.formato = formato
+        self.saida = saida
+        self.lote = lote
+
+    def gerador_usuario(self, indice):
+        """O mesmo usuário sai igual em qualquer faixa e processo"""
+        return random.Random(self.semente * 2 ** 40 + indice)
+
+    def gerar_faixa(self, inicio, fim):
+        """
+        Gera e grava os usuários [inicio, fim)
+
+        Returns:
+            dict: Coleção -> {gravados, existentes, rejeitados}
+        """
+        if self.formato == "mongo":
+            destino = DestinoMongo(self.lote)
+        else:
+            destino = DestinoArquivo(self.saida, self.formato, inicio)
+
+        for indice in range(inicio, fim):
+            aleatorio = self.gerador_usuario(indice)
+            tamanhos = tamanhos_usuario(aleatorio, self.medias, self.distribuicao, self.maximo)
+            usuario, buckets, separados = documentos_usuario(
+                indice, tamanhos, self.meditacoes, self.password_hash,
+                aleatorio, self.agora, self.dias, self.pesos
+            )
+            destino.gravar("usuarios", [usuario])
+            if buckets:
+                destino.gravar(COLECAO_HUMOR, buckets)
+            for colecao, documentos in separados.items():
+                if documentos:
+                    destino.gravar(colecao, documentos)
+        return destino.fechar()
+
+
+_gerador = None
+
+
+def _iniciar_processo(parametros):
+    """Initializer do pool: cada processo cria o próprio gerador e MongoClient"""
+    global _gerador
+    from src.conexion.mongo_conexao import usar_perfil_mongo
+
+    usar_perfil_mongo("lote")
+    _gerador = GeradorDados(**parametros)
+
+
+def _gerar_faixa(inicio, fim):
+    return inicio, fim, _gerador.gerar_faixa(inicio, fim)
+
+
+def _somar(totais, contadores):
+    for colecao, valores in contadores.items():
+        total = totais.setdefault(colecao, dict.fromkeys(valores, 0))
+        for chave, valor in valores.items():
+            total[chave] += valor
+
+
+def preparar_meditacoes(quantidade, semente, formato="mongo", saida=None):
+    """
+    _id das meditações referenciadas pelo histórico
+
+    No MongoDB usa o catálogo existente; se estiver vazio (ou num formato de
+    arquivo) gera quantidade meditações e grava junto com os usuários.
+
+    Returns:
+        list: _id em ordem (a popularidade de Zipf segue essa ordem)
+    """
+    if formato == "mongo":
+        from src.conexion.mongo_conexao import obter_colecao
+
+        colecao = obter_colecao("meditacoes")
+        existentes = [doc["_id"] for doc in colecao.find({}, {"_id": 1}).sort("_id", 1)]
+        if existentes:
+            return existentes
+
+    aleatorio = random.Random(semente)
+    documentos = [documento_meditacao(indice, aleatorio) for indice in range(quantidade)]
+    if formato == "mongo":
+        from src.utils.cache_catalogo import invalidar_catalogo
+
+        colecao.insert_many(documentos, ordered=False)
+        # Gravado sem o ControllerMeditacao: a API descarta as páginas em cache
+        invalidar_catalogo()
+    else:
+        destino = DestinoArquivo(saida, formato, 0)
+        destino.gravar("meditacoes", documentos)
+        destino.fechar()
+    return [documento["_id"] for documento in documentos]
+
+
+def criar_indices():
+    """Coleções, validadores e índices de scripts/create_collections_completo.py, sem a saída"""
+    from scripts.create_collections_completo import criar_colecoes_completas
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        criar_colecoes_completas()
+
+
+def gerar(usuarios, semente=42, medias=None, distribuicao="cauda", maximo=1000, dias=365, ate=None,
+          meditacoes=200, primeiro=0, processos=1, faixa=10000, lote=1000, formato="mongo", saida=None,
+          password_hash=None, progresso=True):
+    """
+    Gera os usuários [primeiro, primeiro + usuarios)
+
+    Com processos=1 tudo roda no processo atual (necessário com o motor em
+    memória, cujos dados não passam de um processo para outro).
+
+    Args:
+        medias (dict, optional): Média de cada array (padrão MEDIAS_PADRAO)
+        ate (datetime, optional): Data mais recente dos registros (padrão: hoje, 00:00)
+        faixa (int): Usuários por tarefa dos processos
+
+    Returns:
+        dict: Coleção -> {gravados, existentes, rejeitados}
+    """
+    agora = ate or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    parametros = {
+        "semente": semente,
+        "medias": dict(MEDIAS_PADRAO, **(medias or {})),
+        "distribuicao": distribuicao,
+        "maximo": maximo,
+        "dias": dias,
+        "agora": agora,
+        "meditacoes": preparar_meditacoes(meditacoes, semente, formato, saida),
+        "password_hash": password_hash or hash_senha_padrao(),
+        "formato": formato,
+        "saida": saida,
+        "lote": lote
+    }
+    faixas = [(inicio, min(inicio + faixa, primeiro + usuarios))
+              for inicio in range(primeiro, primeiro + usuarios, faixa)]
+
+    totais = {}
+    inicio_geracao = time.perf_counter()
+    concluidos = 0
+
+    def registrar(inicio, fim, contadores):
+        nonlocal concluidos
+        _somar(totais, contadores)
+        concluidos += fim - inicio
+        if progresso:
+            decorrido = time.perf_counter() - inicio_geracao
+            print(f"  ⏳ {concluidos}/{usuarios} usuários ({concluidos / decorrido:.0f} usuários/s)")
+
+    if processos <= 1:
+        gerador = GeradorDados(**parametros)
+        for inicio, fim in faixas:
+            registrar(inicio, fim, gerador.gerar_faixa(inicio, fim))
+        return totais
+
+    # O cliente deste processo não é herdado: cada processo conecta sozinho
+    from src.conexion.mongo_conexao import fechar_mongo
+    import multiprocessing
+
+    fechar_mongo()
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto,
+                             initializer=_iniciar_processo, initargs=(parametros,)) as executor:
+        futuros = [executor.submit(_gerar_faixa, inicio, fim) for inicio, fim in faixas]
+        for futuro in as_completed(futuros):
+            registrar(*futuro.result())
+    return totais
+
+
+# ==================== EXECUÇÃO ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de dados sintéticos da Calmou API")
+    parser.add_argument("--usuarios", type=int, default=100000, help="Usuários gerados")
+    parser.add_argument("--primeiro", type=int, default=0, help="Índice do primeiro usuário (para ampliar uma base)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--distribuicao", choices=["cauda", "fixa"], default="cauda")
+    parser.add_argument("--humor", type=float, default=MEDIAS_PADRAO[CAMPO_HUMOR], help="Média de classificações de humor")
+    parser.add_argument("--historico", type=float, default=MEDIAS_PADRAO["historico_meditacoes"], help="Média de meditações concluídas")
+    parser.add_argument("--avaliacoes", type=float, default=MEDIAS_PADRAO["resultados_avaliacoes"], help="Média de avaliações")
+    parser.add_argument("--notificacoes", type=float, default=MEDIAS_PADRAO["notificacoes"], help="Média de notificações")
+    parser.add_argument("--maximo", type=int, default=1000, help="Registros no máximo por array")
+    parser.add_argument("--dias", type=int, default=365, help="Janela dos registros, em dias")
+    parser.add_argument("--ate", type=lambda valor: datetime.strptime(valor, "%Y-%m-%d"),
+                        help="Data mais recente (AAAA-MM-DD; padrão: hoje). Fixe para repetir a base")
+    parser.add_argument("--meditacoes", type=int, default=200, help="Meditações geradas se o catálogo estiver vazio")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--faixa", type=int, default=10000, help="Usuários por tarefa")
+    parser.add_argument("--lote", type=int, default=1000, help="Documentos por insert_many")
+    parser.add_argument("--formato", choices=["mongo", "jsonl", "bson"], default="mongo")
+    parser.add_argument("--saida", default="dados", help="Diretório dos arquivos (jsonl e bson)")
+    parser.add_argument("--limpar", action="store_true", help="Apaga as coleções geradas antes (não o catálogo)")
+    parser.add_argument("--indices-depois", action="store_true",
+                        help="Cria coleções e índices só no final (carga mais rápida, sem validadores)")
+    parser.add_argument("--sem-estatisticas", action="store_true", help="Não recalcula as estatísticas do /stats")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print(f"GERADOR DE DADOS SINTÉTICOS - {args.usuarios} usuários ({args.distribuicao}, semente {args.semente})")
+    print("="*70 + "\n")
+
+    processos = args.processos
+    if args.formato == "mongo":
+        from src.conexion.configuracao_mongo import armazenamento_ativo
+        from src.conexion.mongo_conexao import conectar_mongo, fechar_mongo, usar_perfil_mongo
+
+        if armazenamento_ativo() == "memoria" and processos > 1:
+            print("⚠️  Motor em memória: os dados ficam no processo, gerando com 1 processo")
+            processos = 1
+        usar_perfil_mongo("lote")
+        if args.limpar:
+            db = conectar_mongo()
+            for colecao in COLECOES_GERADAS:
+                db.drop_collection(colecao)
+            print(f"🗑️  Coleções apagadas: {', '.join(COLECOES_GERADAS)}")
+        if not args.indices_depois:
+            criar_indices()
+
+    inicio = time.perf_counter()
+    totais = gerar(
+        args.usuarios, semente=args.semente,
+        medias={
+            CAMPO_HUMOR: args.humor,
+            "historico_meditacoes": args.historico,
+            "resultados_avaliacoes": args.avaliacoes,
+            "notificacoes": args.notificacoes
+        },
+        distribuicao=args.distribuicao, maximo=args.maximo, dias=args.dias, ate=args.ate,
+        meditacoes=args.meditacoes, primeiro=args.primeiro, processos=processos,
+        faixa=args.faixa, lote=args.lote, formato=args.formato, saida=args.saida
+    )
+    decorrido = time.perf_counter() - inicio
+
+    if args.formato == "mongo":
+        if args.indices_depois:
+            print("\n🔧 Criando coleções e índices...")
+            criar_indices()
+        if not args.sem_estatisticas:
+            from src.controller.controller_estatisticas import ControllerEstatisticas
+
+            print("\n📊 Recalculando estatísticas...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                ControllerEstatisticas().recalcular()
+        fechar_mongo()
+
+    print(f"\n✅ {args.usuarios} usuários em {decorrido:.1f}s ({args.usuarios / decorrido:.0f} usuários/s)")
+    for colecao, contadores in sorted(totais.items()):
+        print(f"   {colecao:<22} {contadores['gravados']:>12} gravados"
+              f"   {contadores['existentes']:>8} existentes   {contadores['rejeitados']:>6} rejeitados")
+    if args.formato != "mongo":
+        print(f"\n💾 Arquivos em {args.saida}/<coleção>/")
+
+
+if __name__ == "__main__":
+    main()
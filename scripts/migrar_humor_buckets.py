@@ -0,0 +1,77 @@
+"""
+Migração do Humor para Buckets Mensais - Calmou API
+Move o array usuarios.classificacoes_humor para a coleção 'humor_mensal'
+(src/controller/controller_humor.py) e remove o array dos usuários
+
+Uso:
+    python scripts/migrar_humor_buckets.py
+    python scripts/migrar_humor_buckets.py --lote 200
+
+Cada lote de usuários grava os buckets (legado: true, _id derivado do
+usuário e do mês) e só depois remove os arrays, então o script pode ser
+interrompido e rodado de novo sem duplicar registros. Depois de concluído,
+defina HUMOR_LEITURA_LEGADA=0 na API.
+"""
+
+import argparse
+import os
+import sys
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conexion.mongo_conexao import fechar_mongo, obter_colecao, usar_perfil_mongo
+from src.controller.controller_humor import COLECAO_HUMOR, operacoes_migracao
+
+
+def migrar(tamanho_lote=100):
+    """
+    Migra os arrays em lotes de usuários
+
+    Returns:
+        tuple: (usuários migrados, registros migrados)
+    """
+    usuarios = obter_colecao("usuarios")
+    humor = obter_colecao(COLECAO_HUMOR)
+    total_usuarios = total_registros = 0
+
+    def gravar(ids, operacoes):
+        if operacoes:
+            humor.bulk_write(operacoes, ordered=False)
+        usuarios.update_many({"_id": {"$in": ids}}, {"$unset": {"classificacoes_humor": ""}})
+
+    ids, operacoes = [], []
+    cursor = usuarios.find(
+        {"classificacoes_humor.0": {"$exists": True}}, {"classificacoes_humor": 1}
+    ).batch_size(tamanho_lote)
+    for doc in cursor:
+        classificacoes = [c for c in doc["classificacoes_humor"] if c.get("data_classificacao")]
+        ids.append(doc["_id"])
+        operacoes.extend(operacoes_migracao(doc["_id"], classificacoes))
+        total_registros += len(classificacoes)
+
+        if len(ids) >= tamanho_lote:
+            gravar(ids, operacoes)
+            total_usuarios += len(ids)
+            print(f"  ✅ {total_usuarios} usuários migrados")
+            ids, operacoes = [], []
+
+    if ids:
+        gravar(ids, operacoes)
+        total_usuarios += len(ids)
+
+    return total_usuarios, total_registros
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move classificacoes_humor para buckets mensais")
+    parser.add_argument("--lote", type=int, default=100, help="Usuários por lote (padrão 100)")
+    args = parser.parse_args()
+
+    usar_perfil_mongo("lote")
+    try:
+        usuarios_migrados, registros = migrar(args.lote)
+        print(f"✅ {usuarios_migrados} usuários e {registros} classificações migrados para '{COLECAO_HUMOR}'")
+        print("💡 Defina HUMOR_LEITURA_LEGADA=0 na API")
+    finally:
+        fechar_mongo()
@@ -17,7 +17,9 @@ except ImportError:
     POSTGRES_AVAILABLE = False
     print("⚠️  psycopg2 não está instalado. Instale com: pip install psycopg2-binary")
 
-from src.conexion.mongo_conexao import MongoDBConnection
+from src.conexion.mongo_conexao import MongoDBConnection, usar_perfil_mongo
+from src.controller.controller_estatisticas import ControllerEstatisticas
+from src.controller.controller_humor import COLECAO_HUMOR, operacoes_migracao
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -95,6 +97,7 @@ def migrar_usuarios(pg_conn, mongo_conn, meditacoes_map):
         usuarios_pg = cursor.fetchall()
 
         usuarios_collection = mongo_conn.get_collection("usuarios")
+        humor_collection = mongo_conn.get_collection(COLECAO_HUMOR)
         usuarios_migrados = 0
 
         for user in usuarios_pg:
@@ -141,7 +144,8 @@ def migrar_usuarios(pg_conn, mongo_conn, meditacoes_map):
                 (user_id,)
             )
             humores = cursor_humor.fetchall()
-            user_doc["classificacoes_humor"] = [
+            # Gravadas nos buckets mensais depois do usuário (controller_humor.py)
+            classificacoes_humor = [
                 {
                     "nivel_humor": h[2],
                     "sentimento_principal": h[3],
@@ -209,7 +213,9 @@ def migrar_usuarios(pg_conn, mongo_conn, meditacoes_map):
             cursor_notif.close()
 
             # ==================== INSERIR USUÁRIO NO MONGODB ====================
-            usuarios_collection.insert_one(user_doc)
+            usuario_id = usuarios_collection.insert_one(user_doc).inserted_id
+            if classificacoes_humor:
+                humor_collection.bulk_write(operacoes_migracao(usuario_id, classificacoes_humor), ordered=False)
             usuarios_migrados += 1
 
         print(f"  ✅ {usuarios_migrados} usuários migrados com dados relacionados")
@@ -248,6 +254,9 @@ def migrar_dados():
         # Migrar usuários com todos os dados relacionados
         migrar_usuarios(pg_conn, mongo_conn, meditacoes_map)
 
+        # Os dados migrados não passam pelos controllers: refaz os contadores do /stats
+        ControllerEstatisticas().recalcular()
+
         # ==================== RESUMO ====================
         print("\n" + "="*60)
         print("RESUMO DA MIGRAÇÃO")
@@ -276,6 +285,8 @@ def migrar_dados():
         mongo_conn.fechar_conexao()
 
 if __name__ == "__main__":
+    usar_perfil_mongo("lote")
+
     # Confirmar migração
     print("\n⚠️  ATENÇÃO: Este script irá migrar dados do PostgreSQL para MongoDB")
     print("Certifique-se de que:")
@@ -0,0 +1,169 @@
+"""
+Ranking das Operações Lentas - Calmou API
+Agrupa o log de operações lentas (src/conexion/operacoes_lentas.py) por
+forma de consulta e ordena pelo tempo total gasto
+
+Uso:
+    python scripts/operacoes_lentas.py
+    python scripts/operacoes_lentas.py --top 10 --horas 24 --colecao usuarios
+    python scripts/operacoes_lentas.py --saida ranking.json
+
+Lê os arquivos de todos os processos (<nome>.<pid>.jsonl), inclusive os
+já rotacionados (.1, .2, ...).
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conexion.operacoes_lentas import ARQUIVO_PADRAO
+from src.utils.log_estruturado import arquivos_dos_processos
+
+
+def arquivos_log(caminho):
+    """Arquivos de cada processo, cada um com os rotacionados do mais antigo para o mais novo"""
+    arquivos = []
+    for atual in arquivos_dos_processos(caminho):
+        indice = 1
+        rotacionados = []
+        while os.path.exists(f"{atual}.{indice}"):
+            rotacionados.append(f"{atual}.{indice}")
+            indice += 1
+        arquivos.extend(reversed(rotacionados))
+        arquivos.append(atual)
+    return arquivos
+
+
+def ler_operacoes(caminho, desde=None, colecao=None):
+    """Lê os registros, ignorando linhas inválidas"""
+    for arquivo in arquivos_log(caminho):
+        with open(arquivo, encoding="utf-8") as entrada:
+            for linha in entrada:
+                try:
+                    operacao = json.loads(linha)
+                except ValueError:
+                    continue
+                if colecao and operacao.get("colecao") != colecao:
+                    continue
+                if desde and datetime.fromisoformat(operacao["data"]) < desde:
+                    continue
+                yield operacao
+
+
+def _percentil(valores, p):
+    """Percentil p (0-100) de uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def ranking(operacoes):
+    """
+    Agrupa por forma de consulta
+
+    Returns:
+        list: Uma entrada por forma, da que mais consumiu tempo para a que menos
+    """
+    grupos = {}
+    for operacao in operacoes:
+        grupo = grupos.setdefault(operacao["forma_id"], {
+            "forma_id": operacao["forma_id"],
+            "comando": operacao["comando"],
+            "colecao": operacao["colecao"],
+            "forma": operacao["forma"],
+            "duracoes": [],
+            "erros": 0,
+            "origens": Counter(),
+            "explain": None
+        })
+        grupo["duracoes"].append(operacao["duracao_ms"])
+        grupo["erros"] += operacao.get("erro") is not None
+        if operacao.get("origem"):
+            grupo["origens"][operacao["origem"]] += 1
+        if operacao.get("explain"):
+            grupo["explain"] = operacao["explain"]
+
+    resultado = []
+    for grupo in grupos.values():
+        duracoes = sorted(grupo.pop("duracoes"))
+        grupo.update({
+            "ocorrencias": len(duracoes),
+            "total_ms": round(sum(duracoes), 3),
+            "media_ms": round(sum(duracoes) / len(duracoes), 3),
+            "p95_ms": _percentil(duracoes, 95),
+            "max_ms": duracoes[-1],
+            "origens": dict(grupo["origens"].most_common())
+        })
+        resultado.append(grupo)
+
+    return sorted(resultado, key=lambda g: g["total_ms"], reverse=True)
+
+
+def exibir(grupos):
+    print(f"\n   {'#':>3} {'forma':<12} {'comando':<10} {'coleção':<14} {'qtd':>6}"
+          f" {'total ms':>11} {'média':>9} {'p95':>9} {'máx':>9}  plano")
+    for posicao, grupo in enumerate(grupos, 1):
+        explain = grupo["explain"] or {}
+        if "estagios" in explain:
+            plano = ("⚠️  COLLSCAN " if explain["collscan"] else "") + " > ".join(explain["estagios"])
+        else:
+            plano = explain.get("erro", "-")
+        print(
+            f"   {posicao:>3} {grupo['forma_id']:<12} {grupo['comando']:<10} {grupo['colecao']:<14}"
+            f" {grupo['ocorrencias']:>6} {grupo['total_ms']:>11.1f} {grupo['media_ms']:>9.1f}"
+            f" {grupo['p95_ms']:>9.1f} {grupo['max_ms']:>9.1f}  {plano}"
+        )
+
+    print("\n   Detalhes:")
+    for grupo in grupos:
+        print(f"\n   [{grupo['forma_id']}] {grupo['comando']} {grupo['colecao']}")
+        print(f"      forma:   {json.dumps(grupo['forma'], ensure_ascii=False)}")
+        if grupo["origens"]:
+            print(f"      origem:  {', '.join(f'{o} ({n})' for o, n in grupo['origens'].items())}")
+        explain = grupo["explain"]
+        if explain and "estagios" in explain:
+            print(
+                f"      explain: {explain['documentos_examinados']} documentos e"
+                f" {explain['chaves_examinadas']} chaves examinados para {explain['retornados']} retornados"
+            )
+        if grupo["erros"]:
+            print(f"      erros:   {grupo['erros']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranking das formas de consulta mais lentas")
+    parser.add_argument("--arquivo", default=os.getenv("LENTAS_ARQUIVO", ARQUIVO_PADRAO),
+                        help="Log de operações lentas (JSONL)")
+    parser.add_argument("--top", type=int, default=20, help="Quantidade de formas exibidas")
+    parser.add_argument("--horas", type=float, help="Considera só as últimas N horas")
+    parser.add_argument("--colecao", help="Filtra por coleção")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar o ranking completo")
+    args = parser.parse_args()
+
+    desde = datetime.now(timezone.utc) - timedelta(hours=args.horas) if args.horas else None
+    grupos = ranking(ler_operacoes(args.arquivo, desde, args.colecao))
+
+    print("\n" + "="*70)
+    print(f"OPERAÇÕES LENTAS - {args.arquivo}")
+    print("="*70)
+
+    if not grupos:
+        print("\nℹ️  Nenhuma operação lenta registrada")
+        return
+
+    exibir(grupos[:args.top])
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(grupos, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Ranking gravado em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Recálculo das Estatísticas - Calmou API
+Refaz a coleção 'estatisticas' (usada pelo GET /stats) e o campo
+usuarios.ultima_atividade a partir dos documentos
+
+Uso:
+    python scripts/recalcular_estatisticas.py
+
+Necessário na primeira implantação e depois de cargas feitas fora dos
+controllers; rodar fora do horário de pico.
+"""
+
+import os
+import sys
+
+# Adiciona o diretório raiz ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conexion.mongo_conexao import fechar_mongo, usar_perfil_mongo
+from src.controller.controller_estatisticas import ControllerEstatisticas
+
+
+if __name__ == "__main__":
+    usar_perfil_mongo("lote")
+    try:
+        sucesso = ControllerEstatisticas().recalcular()
+    finally:
+        fechar_mongo()
+    sys.exit(0 if sucesso else 1)
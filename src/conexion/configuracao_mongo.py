@@ -0,0 +1,214 @@
+"""
+Configuração do Cliente MongoDB - Calmou API
+Perfis de pool, timeouts, compressão e read/write concern por tipo de uso
+
+Perfis:
+    api   API Flask/Quart: pool dimensionado para as threads do worker,
+          timeouts curtos e espera limitada por conexão livre
+    cli   principal.py: poucas conexões, timeouts mais folgados
+    lote  scripts de carga/migração: pool maior, sem timeout de espera
+          por conexão e operações longas
+
+O perfil ativo vem de MONGO_PERFIL (padrão "api") ou do código, via
+usar_perfil_mongo(). Cada opção pode ser sobrescrita por variável de
+ambiente, primeiro a do perfil e depois a geral:
+
+    MONGO_API_MAX_POOL_SIZE=64   (só o perfil api)
+    MONGO_MAX_POOL_SIZE=64       (todos os perfis)
+
+O valor "none" remove o limite (ex.: MONGO_WAIT_QUEUE_TIMEOUT_MS=none).
+As opções passadas aqui têm precedência sobre as da MONGO_URI.
+
+ARMAZENAMENTO=memoria troca o MongoDB pelo motor em memória de
+src/conexion/memoria (testes e benchmarks, sem servidor); o padrão é mongo.
+"""
+
+import importlib.util
+import os
+
+from dotenv import load_dotenv
+
+PERFIL_PADRAO = "api"
+
+ARMAZENAMENTOS = ("mongo", "memoria")
+
+PERFIS = {
+    "api": {
+        "maxPoolSize": 32,
+        "minPoolSize": 0,           # o post_fork do gunicorn aquece o pool
+        "maxIdleTimeMS": 300000,
+        "waitQueueTimeoutMS": 1000,
+        "serverSelectionTimeoutMS": 5000,
+        "connectTimeoutMS": 5000,
+        "socketTimeoutMS": 5000,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 1,
+        "readConcernLevel": None,   # None: padrão do servidor
+        "readPreference": "primary",
+        "w": None,
+        "journal": None
+    },
+    "cli": {
+        "maxPoolSize": 4,
+        "minPoolSize": 0,
+        "maxIdleTimeMS": 60000,
+        "waitQueueTimeoutMS": 10000,
+        "serverSelectionTimeoutMS": 5000,
+        "connectTimeoutMS": 5000,
+        "socketTimeoutMS": 30000,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 6,
+        "readConcernLevel": None,
+        "readPreference": "primary",
+        "w": None,
+        "journal": None
+    },
+    "lote": {
+        "maxPoolSize": 16,
+        "minPoolSize": 0,
+        "maxIdleTimeMS": None,
+        "waitQueueTimeoutMS": None,
+        "serverSelectionTimeoutMS": 30000,
+        "connectTimeoutMS": 10000,
+        "socketTimeoutMS": 120000,
+        "compressors": "zstd,snappy,zlib",
+        "zlibCompressionLevel": 6,
+        "readConcernLevel": None,
+        "readPreference": "primary",
+        "w": 1,
+        "journal": None
+    }
+}
+
+# Opção do driver -> (sufixo da variável de ambiente, conversor)
+VARIAVEIS = {
+    "maxPoolSize": ("MAX_POOL_SIZE", int),
+    "minPoolSize": ("MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("WAIT_QUEUE_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("SERVER_SELECTION_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("SOCKET_TIMEOUT_MS", int),
+    "compressors": ("COMPRESSORS", str),
+    "zlibCompressionLevel": ("ZLIB_LEVEL", int),
+    "readConcernLevel": ("READ_CONCERN", str),
+    "readPreference": ("READ_PREFERENCE", str),
+    "w": ("WRITE_CONCERN", lambda valor: int(valor) if valor.isdigit() else valor),
+    "journal": ("JOURNAL", lambda valor: valor.lower() in ("1", "true", "sim"))
+}
+
+# Compressor -> módulo Python que o driver precisa para usá-lo
+MODULOS_COMPRESSORES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+_ambiente_carregado = False
+
+
+def carregar_ambiente():
+    """Lê o .env na primeira vez que a configuração do MongoDB é usada"""
+    global _ambiente_carregado
+    if not _ambiente_carregado:
+        load_dotenv()
+        _ambiente_carregado = True
+
+
+def perfil_ativo():
+    """Perfil definido em MONGO_PERFIL (padrão: api)"""
+    carregar_ambiente()
+    return os.getenv("MONGO_PERFIL", PERFIL_PADRAO)
+
+
+def armazenamento_ativo():
+    """
+    Armazenamento definido em ARMAZENAMENTO (padrão: mongo)
+
+    Raises:
+        ValueError: Se o valor não estiver em ARMAZENAMENTOS
+    """
+    carregar_ambiente()
+    armazenamento = os.getenv("ARMAZENAMENTO", "mongo").strip().lower() or "mongo"
+    if armazenamento not in ARMAZENAMENTOS:
+        raise ValueError(f"Armazenamento desconhecido: {armazenamento} (use {', '.join(ARMAZENAMENTOS)})")
+    return armazenamento
+
+
+def compressores_disponiveis(compressores):
+    """
+    Filtra os compressores cujo módulo está instalado, mantendo a ordem de preferência
+
+    Args:
+        compressores (str): Lista separada por vírgulas (ex.: "zstd,snappy,zlib")
+
+    Returns:
+        list: Compressores utilizáveis neste ambiente
+    """
+    disponiveis = []
+    for nome in (c.strip() for c in compressores.split(",")):
+        modulo = MODULOS_COMPRESSORES.get(nome)
+        if modulo and importlib.util.find_spec(modulo) is not None:
+            disponiveis.append(nome)
+    return disponiveis
+
+
+def _valor_ambiente(perfil, opcao):
+    """Retorna (encontrado, valor) da variável do perfil ou da geral"""
+    sufixo, conversor = VARIAVEIS[opcao]
+    for nome in (f"MONGO_{perfil.upper()}_{sufixo}", f"MONGO_{sufixo}"):
+        valor = os.getenv(nome)
+        if valor is not None and valor != "":
+            return True, None if valor.lower() == "none" else conversor(valor)
+    return False, None
+
+
+def opcoes_perfil(perfil=None):
+    """
+    Monta as opções de um perfil já com as sobrescritas do ambiente
+
+    Args:
+        perfil (str, optional): Nome do perfil (padrão: perfil_ativo())
+
+    Returns:
+        dict: Opções por nome do driver, com None onde não há limite
+
+    Raises:
+        ValueError: Se o perfil não existir
+    """
+    carregar_ambiente()
+    perfil = perfil or perfil_ativo()
+    if perfil not in PERFIS:
+        raise ValueError(f"Perfil de conexão desconhecido: {perfil} (use {', '.join(PERFIS)})")
+
+    opcoes = dict(PERFIS[perfil])
+    for opcao in VARIAVEIS:
+        encontrado, valor = _valor_ambiente(perfil, opcao)
+        if encontrado:
+            opcoes[opcao] = valor
+    return opcoes
+
+
+def opcoes_cliente(perfil=None):
+    """
+    Argumentos nomeados para MongoClient/AsyncIOMotorClient
+
+    Opções sem valor ficam de fora (valem as do driver ou da MONGO_URI),
+    exceto os timeouts de espera e de socket, em que None significa sem limite.
+
+    Args:
+        perfil (str, optional): Nome do perfil (padrão: perfil_ativo())
+
+    Returns:
+        dict: kwargs do cliente
+    """
+    opcoes = opcoes_perfil(perfil)
+
+    compressores = compressores_disponiveis(opcoes.pop("compressors") or "")
+    if compressores:
+        opcoes["compressors"] = compressores
+    if "zlib" not in compressores:
+        opcoes.pop("zlibCompressionLevel")
+
+    sem_limite = ("waitQueueTimeoutMS", "socketTimeoutMS", "maxIdleTimeMS")
+    return {
+        opcao: valor for opcao, valor in opcoes.items()
+        if valor is not None or opcao in sem_limite
+    }
@@ -0,0 +1,366 @@
+"""
+Disjuntor (Circuit Breaker) do MongoDB - Calmou API
+Controle de admissão alimentado pelos eventos do driver: espera por
+conexão no pool, falhas de checkout e heartbeats do servidor
+
+Estados:
+    fechado      tudo é admitido; a janela de eventos é avaliada a cada requisição
+    aberto       rotas de prioridade baixa (e normal, se o servidor está falhando)
+                 são recusadas sem tocar no pool
+    meio_aberto  depois de DISJUNTOR_ABERTO_S, algumas requisições de sonda
+                 passam; DISJUNTOR_SONDAS sucessos fecham o disjuntor, uma
+                 falha o abre de novo (com o dobro do tempo, até DISJUNTOR_ABERTO_MAX_S)
+
+Rotas de prioridade alta (login, escritas) nunca são recusadas aqui: os
+prazos das requisições (api/prazos.py) limitam quanto tempo elas esperam.
+
+Variáveis de ambiente:
+    DISJUNTOR_ATIVO          1 liga o controle de admissão (padrão)
+    DISJUNTOR_JANELA_S       janela de avaliação (padrão 10)
+    DISJUNTOR_MIN_AMOSTRAS   checkouts mínimos na janela para avaliar (padrão 20)
+    DISJUNTOR_ESPERA_MS      espera de checkout considerada lenta (padrão 250)
+    DISJUNTOR_TAXA_LENTAS    fração de checkouts lentos que abre o disjuntor (padrão 0.5)
+    DISJUNTOR_TAXA_FALHAS    fração de checkouts com falha que abre o disjuntor (padrão 0.2)
+    DISJUNTOR_ABERTO_S       tempo aberto antes das sondas (padrão 5)
+    DISJUNTOR_ABERTO_MAX_S   tempo aberto máximo após sondas com falha (padrão 60)
+    DISJUNTOR_SONDAS         sondas com sucesso para fechar (padrão 3)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from pymongo.monitoring import (
+    ConnectionCheckOutFailedReason, ConnectionPoolListener, ServerHeartbeatListener
+)
+
+ESTADO_FECHADO = "fechado"
+ESTADO_ABERTO = "aberto"
+ESTADO_MEIO_ABERTO = "meio_aberto"
+
+# Prioridades das rotas, da primeira a ser recusada para a última
+PRIORIDADE_BAIXA = 0    # estatísticas, relatórios, listagens
+PRIORIDADE_NORMAL = 1   # leituras pontuais
+PRIORIDADE_ALTA = 2     # login, registro e escritas
+
+NOMES_PRIORIDADES = {PRIORIDADE_BAIXA: "baixa", PRIORIDADE_NORMAL: "normal", PRIORIDADE_ALTA: "alta"}
+
+
+def _env_float(nome, padrao):
+    return float(os.getenv(nome, padrao))
+
+
+# ==================== JANELA DE EVENTOS ====================
+
+class JanelaEventos:
+    """Contadores de checkout agrupados por segundo, para os últimos N segundos"""
+
+    def __init__(self, segundos):
+        self.segundos = max(1, int(segundos))
+        self._baldes = deque()   # [segundo, checkouts, lentos, falhas]
+        self._lock = threading.Lock()
+
+    def _balde(self, agora):
+        segundo = int(agora)
+        if not self._baldes or self._baldes[-1][0] != segundo:
+            self._baldes.append([segundo, 0, 0, 0])
+            while self._baldes[0][0] <= segundo - self.segundos:
+                self._baldes.popleft()
+        return self._baldes[-1]
+
+    def registrar(self, lento=False, falha=False):
+        with self._lock:
+            balde = self._balde(time.monotonic())
+            balde[1] += 1
+            balde[2] += lento
+            balde[3] += falha
+
+    def totais(self):
+        """
+        Returns:
+            tuple: (checkouts, lentos, falhas) dentro da janela
+        """
+        limite = int(time.monotonic()) - self.segundos
+        checkouts = lentos = falhas = 0
+        with self._lock:
+            for segundo, c, l, f in self._baldes:
+                if segundo > limite:
+                    checkouts += c
+                    lentos += l
+                    falhas += f
+        return checkouts, lentos, falhas
+
+    def limpar(self):
+        with self._lock:
+            self._baldes.clear()
+
+
+# ==================== DISJUNTOR ====================
+
+class Disjuntor:
+    """Estado do disjuntor de um processo, seguro entre threads"""
+
+    def __init__(self):
+        """Lê a configuração das variáveis de ambiente"""
+        self.ativo = os.getenv("DISJUNTOR_ATIVO", "1") == "1"
+        self.min_amostras = int(os.getenv("DISJUNTOR_MIN_AMOSTRAS", "20"))
+        self.espera_lenta = _env_float("DISJUNTOR_ESPERA_MS", 250) / 1000
+        self.taxa_lentas = _env_float("DISJUNTOR_TAXA_LENTAS", 0.5)
+        self.taxa_falhas = _env_float("DISJUNTOR_TAXA_FALHAS", 0.2)
+        self.tempo_aberto = _env_float("DISJUNTOR_ABERTO_S", 5)
+        self.tempo_aberto_max = _env_float("DISJUNTOR_ABERTO_MAX_S", 60)
+        self.sondas = int(os.getenv("DISJUNTOR_SONDAS", "3"))
+        self.janela = JanelaEventos(_env_float("DISJUNTOR_JANELA_S", 10))
+
+        self._lock = threading.Lock()
+        self.estado = ESTADO_FECHADO
+        self.motivo = None
+        self.corte = None               # prioridades abaixo ou iguais são recusadas
+        self._fechar_em = 0.0           # fim do período aberto (monotonic)
+        self._atraso = self.tempo_aberto
+        self._sondas_em_curso = 0
+        self._sondas_ok = 0
+
+        self.aberturas = 0
+        self.recusadas = 0
+        self.heartbeat_ms = None
+
+    # ---------- Eventos do driver ----------
+
+    def registrar_checkout(self, espera):
+        """Checkout concluído após espera segundos na fila do pool"""
+        self.janela.registrar(lento=espera >= self.espera_lenta)
+
+    def registrar_falha_checkout(self):
+        """Checkout que estourou o tempo de espera ou não conseguiu conectar"""
+        self.janela.registrar(lento=True, falha=True)
+
+    def registrar_heartbeat(self, duracao):
+        self.heartbeat_ms = round(duracao * 1000, 3)
+
+    def registrar_falha_heartbeat(self, erro):
+        """Servidor não respondeu ao monitoramento: recusa também as rotas normais"""
+        self._abrir(f"heartbeat falhou: {erro}", PRIORIDADE_NORMAL)
+
+    # ---------- Transições ----------
+
+    def _abrir(self, motivo, corte):
+        with self._lock:
+            if self.estado == ESTADO_ABERTO and (self.corte or 0) >= corte:
+                return
+            if self.estado == ESTADO_MEIO_ABERTO:
+                self._atraso = min(self._atraso * 2, self.tempo_aberto_max)
+            elif self.estado == ESTADO_FECHADO:
+                self._atraso = self.tempo_aberto
+                self.aberturas += 1
+            self.estado = ESTADO_ABERTO
+            self.motivo = motivo
+            self.corte = corte if self.corte is None else max(self.corte, corte)
+            self._fechar_em = time.monotonic() + self._atraso
+            self._sondas_em_curso = 0
+            self._sondas_ok = 0
+        print(f"⚡ Disjuntor do MongoDB aberto por {self._atraso:g}s ({motivo})")
+
+    def _fechar(self):
+        with self._lock:
+            if self.estado == ESTADO_FECHADO:
+                return
+            self.estado = ESTADO_FECHADO
+            self.motivo = None
+            self.corte = None
+            self._atraso = self.tempo_aberto
+        self.janela.limpar()
+        print("✅ Disjuntor do MongoDB fechado")
+
+    def _avaliar(self):
+        """Abre o disjuntor se a janela passou dos limites"""
+        checkouts, lentos, falhas = self.janela.totais()
+        if checkouts < self.min_amostras:
+            return
+        if falhas / checkouts >= self.taxa_falhas:
+            self._abrir(f"{falhas}/{checkouts} checkouts com falha", PRIORIDADE_NORMAL)
+        elif lentos / checkouts >= self.taxa_lentas:
+            self._abrir(
+                f"{lentos}/{checkouts} checkouts acima de {self.espera_lenta * 1000:.0f} ms",
+                PRIORIDADE_BAIXA
+            )
+
+    def _passar_para_sondas(self):
+        """Aberto -> meio aberto ao fim do período aberto (chamar com o lock)"""
+        if self.estado == ESTADO_ABERTO and time.monotonic() >= self._fechar_em:
+            self.estado = ESTADO_MEIO_ABERTO
+
+    def estado_atual(self):
+        """Estado já considerando o fim do período aberto (usado pelo /health)"""
+        with self._lock:
+            self._passar_para_sondas()
+            return self.estado
+
+    # ---------- Admissão ----------
+
+    def admitir(self, prioridade):
+        """
+        Decide se uma requisição pode seguir
+
+        Args:
+            prioridade (int): PRIORIDADE_BAIXA, PRIORIDADE_NORMAL ou PRIORIDADE_ALTA
+
+        Returns:
+            tuple: (admitida, sonda) - sonda indica que o resultado deve
+            ser informado em registrar_sonda()
+        """
+        if not self.ativo:
+            return True, False
+
+        if self.estado == ESTADO_FECHADO:
+            self._avaliar()
+            if self.estado == ESTADO_FECHADO:
+                return True, False
+
+        with self._lock:
+            if self.corte is None or prioridade > self.corte:
+                return True, False
+
+            self._passar_para_sondas()
+            if self.estado == ESTADO_MEIO_ABERTO and self._sondas_em_curso + self._sondas_ok < self.sondas:
+                self._sondas_em_curso += 1
+                return True, True
+
+            self.recusadas += 1
+            return False, False
+
+    def registrar_sonda(self, sucesso):
+        """Resultado de uma requisição admitida como sonda"""
+        with self._lock:
+            if self.estado != ESTADO_MEIO_ABERTO:
+                return
+            self._sondas_em_curso = max(0, self._sondas_em_curso - 1)
+            if sucesso:
+                self._sondas_ok += 1
+            fechar = sucesso and self._sondas_ok >= self.sondas
+
+        if not sucesso:
+            self._abrir("sonda falhou", self.corte)
+        elif fechar:
+            self._fechar()
+
+    def segundos_ate_sonda(self):
+        """Tempo até o disjuntor aceitar sondas (usado no Retry-After)"""
+        return max(0.0, self._fechar_em - time.monotonic())
+
+    def resumo(self):
+        """Estado em formato JSON (usado pelo /health)"""
+        checkouts, lentos, falhas = self.janela.totais()
+        return {
+            'ativo': self.ativo,
+            'estado': self.estado_atual(),
+            'motivo': self.motivo,
+            'recusando': [
+                NOMES_PRIORIDADES[p] for p in NOMES_PRIORIDADES
+                if self.corte is not None and p <= self.corte
+            ],
+            'sondas_em_s': round(self.segundos_ate_sonda(), 3) if self.estado == ESTADO_ABERTO else 0.0,
+            'janela': {'checkouts': checkouts, 'lentos': lentos, 'falhas': falhas},
+            'heartbeat_ms': self.heartbeat_ms,
+            'aberturas': self.aberturas,
+            'recusadas': self.recusadas
+        }
+
+
+# ==================== LISTENERS DO DRIVER ====================
+
+class MonitorPoolDisjuntor(ConnectionPoolListener):
+    """Envia ao disjuntor a espera de cada checkout e as falhas de checkout"""
+
+    def __init__(self, disjuntor):
+        self.disjuntor = disjuntor
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.inicio = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        inicio = getattr(self._local, 'inicio', None)
+        if inicio is not None:
+            self.disjuntor.registrar_checkout(time.perf_counter() - inicio)
+
+    def connection_check_out_failed(self, event):
+        if event.reason != ConnectionCheckOutFailedReason.POOL_CLOSED:
+            self.disjuntor.registrar_falha_checkout()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+class MonitorHeartbeatDisjuntor(ServerHeartbeatListener):
+    """Envia ao disjuntor os heartbeats do monitoramento do servidor"""
+
+    def __init__(self, disjuntor):
+        self.disjuntor = disjuntor
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        # Heartbeats "awaited" ficam esperando mudanças no servidor: a duração não é latência
+        if not event.awaited:
+            self.disjuntor.registrar_heartbeat(event.duration)
+
+    def failed(self, event):
+        self.disjuntor.registrar_falha_heartbeat(event.reply)
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+_disjuntor = None
+_disjuntor_lock = threading.Lock()
+
+
+def obter_disjuntor():
+    """
+    Retorna o disjuntor deste processo
+
+    Returns:
+        Disjuntor: Compartilhado pelos listeners do cliente e pela API
+    """
+    global _disjuntor
+    if _disjuntor is None:
+        with _disjuntor_lock:
+            if _disjuntor is None:
+                _disjuntor = Disjuntor()
+    return _disjuntor
+
+
+def ouvintes_disjuntor():
+    """
+    Listeners que alimentam o disjuntor, para o event_listeners do MongoClient
+
+    Returns:
+        list: Vazia se DISJUNTOR_ATIVO=0
+    """
+    disjuntor = obter_disjuntor()
+    if not disjuntor.ativo:
+        return []
+    return [MonitorPoolDisjuntor(disjuntor), MonitorHeartbeatDisjuntor(disjuntor)]
@@ -0,0 +1,24 @@
+"""
+Motor em Memória - Calmou API
+Armazenamento alternativo ao MongoDB para testes e benchmarks, escolhido
+por ARMAZENAMENTO=memoria (ver configuracao_mongo.armazenamento_ativo)
+
+Implementa o subconjunto do pymongo síncrono usado pelos controllers,
+relatórios e scripts: find/find_one com projeção, sort, skip, limit e hint;
+insert, update (operadores e pipeline), replace, delete, find_one_and_*,
+bulk_write, count_documents, distinct e aggregate (estágios em agregacao.py).
+Índices compostos, únicos, esparsos e descendentes são mantidos e usados
+pelas consultas; índices de texto e parciais só valem para unicidade.
+
+Não há: validação de esquema ($jsonSchema), TTL, transações, change streams,
+$text, arrayFilters nem o Motor (api/app_async.py continua exigindo MongoDB).
+Os dados vivem no processo: use um só worker do gunicorn.
+
+Variáveis de ambiente:
+    ARMAZENAMENTO   mongo (padrão) ou memoria
+"""
+
+from src.conexion.memoria.cliente import BancoMemoria, ClienteMemoria, obter_cliente_memoria
+from src.conexion.memoria.colecao import ColecaoMemoria
+
+__all__ = ["BancoMemoria", "ClienteMemoria", "ColecaoMemoria", "obter_cliente_memoria"]
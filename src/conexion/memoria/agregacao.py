@@ -0,0 +1,382 @@
+"""
+Agregação do Motor em Memória - Calmou API
+Estágios do aggregate usados pelos controllers e relatórios
+
+    $match $project $addFields/$set $unset $group $sort $limit $skip $count
+    $unwind $lookup $facet $replaceWith/$replaceRoot $unionWith $sortByCount
+
+Os estágios recebem cópias dos documentos (ver ColecaoMemoria.aggregate)
+e devolvem documentos novos; $lookup e $unionWith leem as outras coleções
+do mesmo banco pelo find, usando os índices delas.
+"""
+
+from pymongo.errors import OperationFailure
+
+from src.conexion.memoria.consulta import corresponde, eh_operador, especificacao_ordenacao, ordenar
+from src.conexion.memoria.expressoes import REMOVER, avaliar, extremo, media, somar, verdadeiro
+from src.conexion.memoria.valores import AUSENTE, chave, copiar, definir, eh_numero, obter, remover
+
+
+def _erro_estagio(mensagem, codigo=40323):
+    return OperationFailure(mensagem, codigo)
+
+
+# ==================== PROJEÇÃO ====================
+
+def _eh_flag(valor):
+    return isinstance(valor, bool) or (eh_numero(valor) and valor in (0, 1))
+
+
+def _modo_projecao(especificacao):
+    """True: inclusão (ou campos calculados); False: exclusão"""
+    for campo, valor in especificacao.items():
+        if campo == "_id":
+            continue
+        if isinstance(valor, dict) and not eh_operador(valor):
+            sub = _modo_projecao(valor)
+            if sub is not None:
+                return sub
+            continue
+        if not _eh_flag(valor) or valor:
+            return True
+        return False
+    return None
+
+
+def _incluir(documento, raiz, especificacao, variaveis):
+    resultado = {}
+    for campo, valor in especificacao.items():
+        partes = campo.split(".")
+        if len(partes) > 1:
+            valor = {".".join(partes[1:]): valor}
+            campo = partes[0]
+        atual = documento.get(campo, AUSENTE) if isinstance(documento, dict) else AUSENTE
+
+        if isinstance(valor, dict) and not eh_operador(valor) and _modo_projecao(valor) is not False:
+            # Subdocumento: projeção aninhada ou objeto calculado
+            if all(_eh_flag(v) or (isinstance(v, dict) and not eh_operador(v)) for v in valor.values()):
+                if isinstance(atual, list):
+                    novo = [_incluir(item, raiz, valor, variaveis) for item in atual if isinstance(item, dict)]
+                elif isinstance(atual, dict):
+                    novo = _incluir(atual, raiz, valor, variaveis)
+                else:
+                    continue
+            else:
+                novo = avaliar(valor, raiz, variaveis)
+            existente = resultado.get(campo)
+            if isinstance(existente, dict) and isinstance(novo, dict):
+                existente.update(novo)
+            else:
+                resultado[campo] = novo
+        elif _eh_flag(valor):
+            if valor and atual is not AUSENTE:
+                resultado[campo] = atual
+        else:
+            novo = avaliar(valor, raiz, variaveis)
+            if novo is not AUSENTE and novo is not REMOVER:
+                resultado[campo] = novo
+    return resultado
+
+
+def _projetar(documento, especificacao, variaveis):
+    if not especificacao:
+        raise _erro_estagio("$project requires at least one output field", 40177)
+    modo = _modo_projecao(especificacao)
+    incluir_id = especificacao.get("_id", True)
+
+    if modo is False or (modo is None and not incluir_id):
+        resultado = copiar(documento)
+        for campo, valor in especificacao.items():
+            if isinstance(valor, dict):
+                for sub in valor:
+                    remover(resultado, f"{campo}.{sub}")
+            else:
+                remover(resultado, campo)
+        return resultado
+
+    campos = {campo: valor for campo, valor in especificacao.items() if campo != "_id"}
+    resultado = {}
+    if incluir_id is not False and incluir_id != 0:
+        if _eh_flag(incluir_id):
+            if "_id" in documento:
+                resultado["_id"] = documento["_id"]
+        else:
+            valor = avaliar(incluir_id, documento, variaveis)
+            if valor is not AUSENTE:
+                resultado["_id"] = valor
+    resultado.update(_incluir(documento, documento, campos, variaveis))
+    return resultado
+
+
+def _adicionar_campos(documento, especificacao, variaveis):
+    resultado = copiar(documento)
+    for campo, expressao in especificacao.items():
+        valor = avaliar(expressao, documento, variaveis)
+        if valor is REMOVER or valor is AUSENTE:
+            remover(resultado, campo)
+        else:
+            definir(resultado, campo, valor)
+    return resultado
+
+
+# ==================== AGRUPAMENTO ====================
+
+class _Acumulador:
+    """Estado de um acumulador do $group"""
+
+    def __init__(self, operador, expressao):
+        self.operador = operador
+        self.expressao = expressao
+        self.valores = []
+
+    def adicionar(self, documento, variaveis):
+        if self.operador == "$count":
+            self.valores.append(1)
+            return
+        self.valores.append(avaliar(self.expressao, documento, variaveis))
+
+    def resultado(self):
+        valores = self.valores
+        operador = self.operador
+        if operador in ("$sum", "$count"):
+            return somar(valores)
+        if operador == "$avg":
+            return media(valores)
+        if operador in ("$max", "$min"):
+            return extremo(valores, operador == "$max")
+        if operador == "$first":
+            return _nulo(valores[0]) if valores else None
+        if operador == "$last":
+            return _nulo(valores[-1]) if valores else None
+        if operador == "$push":
+            return [valor for valor in valores if valor is not AUSENTE]
+        if operador == "$addToSet":
+            unicos = {}
+            for valor in valores:
+                if valor is not AUSENTE:
+                    unicos.setdefault(chave(valor), valor)
+            return list(unicos.values())
+        if operador == "$mergeObjects":
+            resultado = {}
+            for valor in valores:
+                if isinstance(valor, dict):
+                    resultado.update(valor)
+            return resultado
+        raise _erro_estagio(f"unknown group operator '{operador}'", 15952)
+
+
+def _nulo(valor):
+    return None if valor is AUSENTE else valor
+
+
+def _agrupar(documentos, especificacao, variaveis):
+    if "_id" not in especificacao:
+        raise _erro_estagio("a group specification must include an _id", 15955)
+    acumuladores = {}
+    for campo, definicao in especificacao.items():
+        if campo == "_id":
+            continue
+        operador, expressao = next(iter(definicao.items()))
+        acumuladores[campo] = (operador, expressao)
+
+    grupos = {}
+    for documento in documentos:
+        variaveis_doc = dict(variaveis, ROOT=documento, CURRENT=documento)
+        identificador = _nulo(avaliar(especificacao["_id"], documento, variaveis_doc))
+        grupo = grupos.get(chave(identificador))
+        if grupo is None:
+            grupo = grupos[chave(identificador)] = (
+                identificador,
+                {campo: _Acumulador(operador, expressao) for campo, (operador, expressao) in acumuladores.items()}
+            )
+        for acumulador in grupo[1].values():
+            acumulador.adicionar(documento, variaveis_doc)
+
+    resultado = []
+    for identificador, estados in grupos.values():
+        documento = {"_id": identificador}
+        documento.update({campo: acumulador.resultado() for campo, acumulador in estados.items()})
+        resultado.append(documento)
+    return resultado
+
+
+# ==================== ARRAYS E JUNÇÕES ====================
+
+def _desdobrar(documentos, especificacao):
+    if isinstance(especificacao, str):
+        especificacao = {"path": especificacao}
+    caminho = especificacao["path"][1:]
+    preservar = especificacao.get("preserveNullAndEmptyArrays", False)
+    campo_indice = especificacao.get("includeArrayIndex")
+
+    for documento in documentos:
+        valor = _valor_direto(documento, caminho)
+        if isinstance(valor, list) and valor:
+            for indice, item in enumerate(valor):
+                novo = copiar(documento)
+                definir(novo, caminho, item)
+                if campo_indice:
+                    novo[campo_indice] = indice
+                yield novo
+        elif isinstance(valor, list) or valor is None or valor is AUSENTE:
+            if preservar:
+                novo = copiar(documento)
+                if isinstance(valor, list):
+                    remover(novo, caminho)
+                if campo_indice:
+                    novo[campo_indice] = None
+                yield novo
+        else:
+            novo = documento
+            if campo_indice:
+                novo = dict(documento, **{campo_indice: None})
+            yield novo
+
+
+def _valor_direto(documento, caminho):
+    """Valor de um caminho com ponto sem expandir arrays intermediários ($unwind)"""
+    valor = documento
+    for parte in caminho.split("."):
+        if not isinstance(valor, dict):
+            return AUSENTE
+        valor = valor.get(parte, AUSENTE)
+    return valor
+
+
+def _valores_juncao(valor):
+    """Valores comparados no localField do $lookup (arrays comparam cada elemento)"""
+    if valor is AUSENTE:
+        return [None]
+    if isinstance(valor, list):
+        return valor or [None]
+    return [valor]
+
+
+def _juntar(documentos, especificacao, banco, variaveis):
+    if banco is None:
+        raise _erro_estagio("$lookup não é suportado aqui", 51047)
+    estrangeira = banco.get_collection(especificacao["from"])
+    nome = especificacao["as"]
+    campo_local = especificacao.get("localField")
+    campo_estrangeiro = especificacao.get("foreignField")
+    sub_pipeline = especificacao.get("pipeline")
+    variaveis_let = especificacao.get("let", {})
+
+    for documento in documentos:
+        filtro = {}
+        if campo_local is not None:
+            valores = _valores_juncao(obter(documento, campo_local))
+            filtro = {campo_estrangeiro: {"$in": valores}}
+
+        if sub_pipeline is None:
+            encontrados = estrangeira.documentos_filtrados(filtro)
+        else:
+            novas = dict(variaveis)
+            for nome_variavel, expressao in variaveis_let.items():
+                novas[nome_variavel] = avaliar(expressao, documento, variaveis)
+            encontrados = executar_estagios(estrangeira.documentos_filtrados(filtro), sub_pipeline, banco, novas)
+
+        novo = dict(documento)
+        definir(novo, nome, encontrados)
+        yield novo
+
+
+def _facetas(documentos, especificacao, banco, variaveis):
+    documentos = list(documentos)
+    resultado = {}
+    for nome, sub_pipeline in especificacao.items():
+        resultado[nome] = executar_estagios([copiar(doc) for doc in documentos], sub_pipeline, banco, variaveis)
+    return [resultado]
+
+
+def _substituir_raiz(documentos, expressao, variaveis):
+    for documento in documentos:
+        novo = avaliar(expressao, documento, dict(variaveis, ROOT=documento, CURRENT=documento))
+        if not isinstance(novo, dict):
+            raise _erro_estagio("'newRoot' expression must evaluate to an object", 40228)
+        yield novo
+
+
+def _uniao(documentos, especificacao, banco, variaveis):
+    yield from documentos
+    if isinstance(especificacao, str):
+        especificacao = {"coll": especificacao}
+    outra = banco.get_collection(especificacao["coll"])
+    yield from executar_estagios(outra.documentos_filtrados({}), especificacao.get("pipeline", []), banco, variaveis)
+
+
+# ==================== EXECUÇÃO ====================
+
+def executar_estagios(documentos, pipeline, banco, variaveis=None):
+    """
+    Executa os estágios sobre os documentos
+
+    Args:
+        documentos (iterable): Documentos de entrada (cópias; podem ser alterados)
+        pipeline (list): Estágios
+        banco (BancoMemoria): Banco das coleções de $lookup e $unionWith
+        variaveis (dict, optional): Variáveis do $lookup com let
+
+    Returns:
+        list: Documentos de saída
+    """
+    variaveis = variaveis or {}
+    fluxo = iter(documentos)
+
+    def com_raiz(documento):
+        return dict(variaveis, ROOT=documento, CURRENT=documento)
+
+    for estagio in pipeline:
+        if len(estagio) != 1:
+            raise _erro_estagio("A pipeline stage specification object must contain exactly one field.", 40323)
+        nome, especificacao = next(iter(estagio.items()))
+
+        if nome == "$match":
+            fluxo = (doc for doc in fluxo if _filtrar(doc, especificacao, com_raiz(doc)))
+        elif nome == "$project":
+            fluxo = (_projetar(doc, especificacao, com_raiz(doc)) for doc in fluxo)
+        elif nome in ("$addFields", "$set"):
+            fluxo = (_adicionar_campos(doc, especificacao, com_raiz(doc)) for doc in fluxo)
+        elif nome == "$unset":
+            campos = [especificacao] if isinstance(especificacao, str) else especificacao
+            fluxo = (_projetar(doc, {campo: 0 for campo in campos}, {}) for doc in fluxo)
+        elif nome == "$group":
+            fluxo = iter(_agrupar(fluxo, especificacao, variaveis))
+        elif nome == "$sort":
+            fluxo = iter(ordenar(fluxo, especificacao_ordenacao(especificacao)))
+        elif nome == "$limit":
+            fluxo = iter(list(fluxo)[:especificacao])
+        elif nome == "$skip":
+            fluxo = iter(list(fluxo)[especificacao:])
+        elif nome == "$count":
+            total = sum(1 for _ in fluxo)
+            fluxo = iter([{especificacao: total}] if total else [])
+        elif nome == "$sortByCount":
+            agrupados = _agrupar(fluxo, {"_id": especificacao, "count": {"$sum": 1}}, variaveis)
+            fluxo = iter(ordenar(agrupados, [("count", -1)]))
+        elif nome == "$unwind":
+            fluxo = _desdobrar(fluxo, especificacao)
+        elif nome == "$lookup":
+            fluxo = _juntar(fluxo, especificacao, banco, variaveis)
+        elif nome == "$facet":
+            fluxo = iter(_facetas(fluxo, especificacao, banco, variaveis))
+        elif nome == "$replaceWith":
+            fluxo = _substituir_raiz(fluxo, especificacao, variaveis)
+        elif nome == "$replaceRoot":
+            fluxo = _substituir_raiz(fluxo, especificacao["newRoot"], variaveis)
+        elif nome == "$unionWith":
+            fluxo = _uniao(fluxo, especificacao, banco, variaveis)
+        else:
+            raise _erro_estagio(f"Unrecognized pipeline stage name: '{nome}'", 40324)
+        # Materializa a cada estágio: os geradores capturam as variáveis do laço
+        fluxo = iter(list(fluxo))
+
+    return list(fluxo)
+
+
+def _filtrar(documento, filtro, variaveis):
+    """$match; o $expr enxerga as variáveis do let de um $lookup"""
+    if "$expr" not in filtro:
+        return corresponde(documento, filtro)
+    restante = {campo: condicao for campo, condicao in filtro.items() if campo != "$expr"}
+    return corresponde(documento, restante) and verdadeiro(avaliar(filtro["$expr"], documento, variaveis))
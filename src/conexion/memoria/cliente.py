@@ -0,0 +1,136 @@
+"""
+Cliente do Motor em Memória - Calmou API
+Substitui o MongoClient quando ARMAZENAMENTO=memoria (ver mongo_conexao.py)
+
+O cliente é único por processo (obter_cliente_memoria): fechar e reabrir a
+conexão, trocar de perfil ou o post_fork do gunicorn mantêm os dados. Cada
+processo tem os seus próprios dados, então a API deve rodar com um só worker.
+"""
+
+import threading
+
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from src.conexion.memoria.colecao import ColecaoMemoria
+
+
+class BancoMemoria:
+    """Banco de dados: coleções criadas na primeira utilização, como no MongoDB"""
+
+    def __init__(self, cliente, nome):
+        self.client = cliente
+        self.name = nome
+        # Uma trava por banco: o $lookup lê outra coleção dentro de uma operação
+        self.trava = threading.RLock()
+        self._colecoes = {}
+
+    def __getitem__(self, nome):
+        return self.get_collection(nome)
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return self.get_collection(nome)
+
+    def __repr__(self):
+        return f"BancoMemoria({self.name!r})"
+
+    def get_collection(self, nome, **_opcoes):
+        with self.trava:
+            colecao = self._colecoes.get(nome)
+            if colecao is None:
+                colecao = self._colecoes[nome] = ColecaoMemoria(self, nome)
+            return colecao
+
+    def create_collection(self, nome, **opcoes):
+        """
+        Cria a coleção explicitamente
+
+        O validator e as demais opções ficam guardados em colecao.opcoes,
+        mas o esquema não é validado nas escritas.
+
+        Raises:
+            CollectionInvalid: A coleção já existe
+        """
+        with self.trava:
+            colecao = self.get_collection(nome)
+            if colecao.existe:
+                raise CollectionInvalid(f"collection {nome} already exists")
+            colecao.opcoes = dict(opcoes)
+            colecao._criada = True
+            return colecao
+
+    def list_collection_names(self, **_opcoes):
+        with self.trava:
+            return [nome for nome, colecao in self._colecoes.items() if colecao.existe]
+
+    def drop_collection(self, nome, **_opcoes):
+        """
+        Apaga documentos, índices e opções da coleção
+
+        O objeto continua o mesmo: como no pymongo, quem guardou a coleção
+        (ex.: MongoDBConnection.get_collection) passa a ver a coleção vazia.
+        """
+        nome = getattr(nome, "name", nome)
+        with self.trava:
+            colecao = self._colecoes.get(nome)
+            if colecao is not None:
+                colecao.apagar()
+
+    def command(self, comando, *_args, **_opcoes):
+        """Só o ping (health checks); outros comandos não existem em memória"""
+        nome = comando if isinstance(comando, str) else next(iter(comando))
+        if nome == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Comando não suportado pelo motor em memória: {nome}", 59)
+
+
+class ClienteMemoria:
+    """Cliente com a interface do MongoClient usada por mongo_conexao.py"""
+
+    def __init__(self):
+        self._bancos = {}
+        self._trava = threading.Lock()
+
+    def __getitem__(self, nome):
+        return self.get_database(nome)
+
+    @property
+    def admin(self):
+        return self.get_database("admin")
+
+    def get_database(self, nome, **_opcoes):
+        with self._trava:
+            banco = self._bancos.get(nome)
+            if banco is None:
+                banco = self._bancos[nome] = BancoMemoria(self, nome)
+            return banco
+
+    def list_database_names(self):
+        with self._trava:
+            return [nome for nome, banco in self._bancos.items() if banco.list_collection_names()]
+
+    def drop_database(self, nome):
+        """Apaga todas as coleções do banco (os objetos continuam válidos)"""
+        nome = getattr(nome, "name", nome)
+        with self._trava:
+            banco = self._bancos.get(nome)
+        if banco is not None:
+            for colecao in banco.list_collection_names():
+                banco.drop_collection(colecao)
+
+    def close(self):
+        """Não descarta os dados: a próxima conexão do processo volta a vê-los"""
+
+
+_cliente = None
+_trava_cliente = threading.Lock()
+
+
+def obter_cliente_memoria():
+    """Cliente em memória do processo (criado na primeira chamada)"""
+    global _cliente
+    with _trava_cliente:
+        if _cliente is None:
+            _cliente = ClienteMemoria()
+        return _cliente
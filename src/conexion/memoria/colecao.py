@@ -0,0 +1,715 @@
+"""
+Coleção do Motor em Memória - Calmou API
+Subconjunto da API de pymongo.collection.Collection usado pelos
+controllers, relatórios e scripts
+
+Os documentos ficam num dict indexado pela chave do _id (na ordem de
+inserção, a "ordem natural"); os índices (indices.py) são mantidos a cada
+escrita e escolhidos pelo planejador nas leituras. As leituras devolvem
+cópias, e as atualizações copiam só os campos de primeiro nível que tocam,
+trocando o documento inteiro no fim (cada escrita é atômica por documento,
+como no MongoDB).
+
+Os erros e resultados são as próprias classes do pymongo (DuplicateKeyError,
+BulkWriteError, UpdateResult...), então os controllers tratam os dois
+armazenamentos do mesmo jeito. Cada operação conta como um comando no
+tempo no MongoDB do log das requisições (tempo_mongo.py).
+"""
+
+import functools
+import time
+from itertools import islice
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, InvalidOperation, OperationFailure, WriteError
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from src.conexion.memoria.agregacao import executar_estagios
+from src.conexion.memoria.consulta import (
+    campos_atualizados, candidatos, corresponde, documento_upsert, eh_operador, eh_substituicao,
+    especificacao_ordenacao, ordenar, projetar, atualizar, verificar_atualizacao
+)
+from src.conexion.memoria.indices import IndiceOrdenado, cobre_ordenacao, faixa_completa, nome_indice, planejar
+from src.conexion.memoria.valores import AUSENTE, chave, copiar, normalizar
+from src.conexion.tempo_mongo import somar_comando
+
+
+def _comando(metodo):
+    """Executa a operação sob a trava do banco e soma a duração em tempo_mongo"""
+    @functools.wraps(metodo)
+    def medido(self, *args, **kwargs):
+        inicio = time.perf_counter_ns()
+        try:
+            with self.database.trava:
+                return metodo(self, *args, **kwargs)
+        finally:
+            somar_comando((time.perf_counter_ns() - inicio) // 1000)
+    return medido
+
+
+def _lista_chaves(chaves, direcao=None):
+    """Normaliza "campo", [(campo, dir)] e {campo: dir} em lista de pares"""
+    if isinstance(chaves, str):
+        return [(chaves, 1 if direcao is None else direcao)]
+    if isinstance(chaves, dict):
+        return list(chaves.items())
+    return [(campo, dir_) for campo, dir_ in chaves]
+
+
+def _erro_id_imutavel():
+    mensagem = "Performing an update on the path '_id' would modify the immutable field '_id'"
+    return WriteError(mensagem, 66, {"code": 66, "errmsg": mensagem})
+
+
+def _com_id_primeiro(documento):
+    """O MongoDB grava o _id como primeiro campo"""
+    if next(iter(documento), None) == "_id":
+        return documento
+    return {"_id": documento["_id"], **{k: v for k, v in documento.items() if k != "_id"}}
+
+
+# ==================== CURSORES ====================
+
+class CursorMemoria:
+    """Cursor do find(): sort, skip, limit e hint valem até a primeira leitura"""
+
+    def __init__(self, colecao, filtro=None, projecao=None, ordenacao=None, pular=0, limite=0, dica=None):
+        self.collection = colecao
+        self._filtro = filtro or {}
+        self._projecao = projecao
+        self._ordenacao = ordenacao
+        self._pular = pular
+        self._limite = limite
+        self._dica = dica
+        self._resultado = None
+
+    def _verificar_nao_iniciado(self):
+        if self._resultado is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def sort(self, chave_ou_lista, direcao=None):
+        self._verificar_nao_iniciado()
+        self._ordenacao = especificacao_ordenacao(chave_ou_lista, direcao)
+        return self
+
+    def skip(self, quantidade):
+        self._verificar_nao_iniciado()
+        self._pular = quantidade
+        return self
+
+    def limit(self, quantidade):
+        self._verificar_nao_iniciado()
+        self._limite = quantidade
+        return self
+
+    def hint(self, indice):
+        self._verificar_nao_iniciado()
+        self._dica = indice
+        return self
+
+    def batch_size(self, _tamanho):
+        return self
+
+    def max_time_ms(self, _milissegundos):
+        return self
+
+    def comment(self, _comentario):
+        return self
+
+    def collation(self, _collation):
+        return self
+
+    def allow_disk_use(self, _permitir):
+        return self
+
+    def clone(self):
+        return CursorMemoria(self.collection, self._filtro, self._projecao, self._ordenacao,
+                             self._pular, self._limite, self._dica)
+
+    def rewind(self):
+        self._resultado = None
+        return self
+
+    def _carregar(self):
+        if self._resultado is None:
+            documentos = self.collection._buscar(
+                self._filtro, self._projecao, self._ordenacao, self._pular, abs(self._limite), self._dica
+            )
+            self._resultado = iter(documentos)
+        return self._resultado
+
+    @property
+    def alive(self):
+        return self._resultado is None or self._resultado.__length_hint__() > 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._carregar())
+
+    next = __next__
+
+    def close(self):
+        self._resultado = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class CursorComandoMemoria:
+    """Cursor do aggregate(): o resultado já vem calculado"""
+
+    def __init__(self, documentos):
+        self._resultado = iter(documentos)
+
+    @property
+    def alive(self):
+        return self._resultado.__length_hint__() > 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._resultado)
+
+    next = __next__
+
+    def batch_size(self, _tamanho):
+        return self
+
+    def close(self):
+        self._resultado = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+# ==================== COLEÇÃO ====================
+
+class ColecaoMemoria:
+    """Coleção com documentos, índices e as operações do pymongo usadas no projeto"""
+
+    def __init__(self, banco, nome):
+        """
+        Args:
+            banco (BancoMemoria): Banco da coleção (dono da trava)
+            nome (str): Nome da coleção
+        """
+        self.database = banco
+        self.name = nome
+        self.full_name = f"{banco.name}.{nome}"
+        self.opcoes = {}
+        self._criada = False
+        self._documentos = {}
+        self._indices = {}
+        self._limpar()
+
+    def _limpar(self):
+        self._documentos = {}
+        self._indices = {"_id_": IndiceOrdenado("_id_", [("_id", 1)], unique=True)}
+
+    def apagar(self):
+        """Volta ao estado de uma coleção que nunca existiu (ver BancoMemoria.drop_collection)"""
+        with self.database.trava:
+            self._limpar()
+            self.opcoes = {}
+            self._criada = False
+
+    @property
+    def existe(self):
+        """Criada por create_collection, create_index ou pela primeira inserção"""
+        return self._criada or bool(self._documentos)
+
+    def with_options(self, **_opcoes):
+        """Read/write concern e preferências não se aplicam em memória"""
+        return self
+
+    def __repr__(self):
+        return f"ColecaoMemoria({self.full_name!r}, documentos={len(self._documentos)})"
+
+    # ==================== ÍNDICES ====================
+
+    @_comando
+    def create_index(self, chaves, unique=False, sparse=False, name=None, partialFilterExpression=None, **_opcoes):
+        """
+        Cria o índice e o preenche com os documentos existentes
+
+        Opções como background e expireAfterSeconds são aceitas e ignoradas
+        (não há expiração por TTL em memória).
+
+        Returns:
+            str: Nome do índice
+        """
+        chaves = _lista_chaves(chaves)
+        nome = name or nome_indice(chaves)
+        novo = IndiceOrdenado(nome, chaves, unique, sparse, partialFilterExpression)
+
+        existente = self._indices.get(nome)
+        if existente is not None:
+            if existente.descricao() == novo.descricao():
+                return nome
+            raise OperationFailure(f"An existing index has the same name as the requested index: {nome}", 86)
+        for indice in self._indices.values():
+            if indice.descricao() == novo.descricao():
+                return indice.nome
+
+        for id_chave, documento in self._documentos.items():
+            entradas = novo.chaves_documento(documento, id_chave)
+            novo.verificar_unicidade(entradas, id_chave, self.full_name)
+            novo.adicionar(id_chave, entradas, lote=True)
+        self._indices[nome] = novo
+        self._criada = True
+        return nome
+
+    def create_indexes(self, modelos, **_opcoes):
+        """
+        Args:
+            modelos (list): pymongo.IndexModel
+
+        Returns:
+            list: Nomes dos índices
+        """
+        nomes = []
+        for modelo in modelos:
+            especificacao = dict(modelo.document)
+            chaves = list(especificacao.pop("key").items())
+            nomes.append(self.create_index(chaves, **especificacao))
+        return nomes
+
+    @_comando
+    def drop_index(self, indice):
+        nome = indice if isinstance(indice, str) else nome_indice(_lista_chaves(indice))
+        if nome == "_id_":
+            raise OperationFailure("cannot drop _id index", 72)
+        if self._indices.pop(nome, None) is None:
+            raise OperationFailure(f"index not found with name [{nome}]", 27)
+
+    @_comando
+    def index_information(self):
+        return {nome: indice.descricao() for nome, indice in self._indices.items()}
+
+    @_comando
+    def list_indexes(self):
+        indices = [dict(indice.descricao(), key=dict(indice.chaves), name=nome) for nome, indice in self._indices.items()]
+        return CursorComandoMemoria(indices)
+
+    def drop(self, **_opcoes):
+        self.database.drop_collection(self.name)
+
+    # ==================== PLANEJAMENTO ====================
+
+    def _indice_da_dica(self, dica):
+        """Índice pedido no hint (None: $natural); erro se não existir, como no MongoDB"""
+        if isinstance(dica, str):
+            nome = dica
+        else:
+            chaves = _lista_chaves(dica)
+            if chaves and chaves[0][0] == "$natural":
+                return None
+            nome = nome_indice(chaves)
+        indice = self._indices.get(nome)
+        if indice is None or not indice.consultavel:
+            raise OperationFailure(
+                "error processing query: planner returned error :: caused by :: "
+                "hint provided does not correspond to an existing index", 2
+            )
+        return indice
+
+    def _planejar(self, filtro, ordenacao, dica):
+        """
+        Returns:
+            tuple ou None: (índice, faixas, ordem) ou None para varrer a coleção;
+                ordem é o resultado de cobre_ordenacao()
+        """
+        if dica is not None:
+            indice = self._indice_da_dica(dica)
+            if indice is None:
+                return None
+            faixas, iguais = planejar(indice, filtro)
+            faixas = faixas if faixas is not None else faixa_completa()
+            return indice, faixas, cobre_ordenacao(indice, ordenacao, iguais, faixas)
+
+        melhor, melhor_nota = None, None
+        for indice in self._indices.values():
+            if not indice.consultavel:
+                continue
+            faixas, iguais = planejar(indice, filtro)
+            ordem = cobre_ordenacao(indice, ordenacao, iguais, faixas if faixas is not None else faixa_completa())
+            if faixas is None and ordem is None:
+                continue
+            nota = (iguais, faixas is not None, ordem is not None, -len(indice.chaves))
+            if melhor_nota is None or nota > melhor_nota:
+                melhor = (indice, faixas if faixas is not None else faixa_completa(), ordem)
+                melhor_nota = nota
+        return melhor
+
+    def _selecionar(self, filtro, ordenacao=None, pular=0, limite=0, dica=None):
+        """
+        Documentos gravados (sem cópia) que atendem ao filtro, na ordem pedida
+
+        Returns:
+            list: Os próprios documentos da coleção; quem devolve ao usuário copia
+        """
+        filtro = filtro or {}
+        ordenacao = [(campo, direcao) for campo, direcao in (ordenacao or []) if not isinstance(direcao, dict)]
+
+        # Igualdade no _id: acesso direto ao dict
+        id_filtro = filtro.get("_id")
+        if dica is None and len(filtro) == 1 and "_id" in filtro and not (
+            isinstance(id_filtro, list) or eh_operador(id_filtro)
+        ):
+            documento = self._documentos.get(chave(id_filtro))
+            return [documento] if documento is not None and not pular else []
+
+        plano = self._planejar(filtro, ordenacao, dica)
+        if plano is None:
+            fonte, ordem = self._documentos.values(), None
+        else:
+            indice, faixas, ordem = plano
+            fonte = (self._documentos[id_chave] for id_chave in indice.percorrer(faixas, bool(ordem)))
+
+        encontrados = (documento for documento in fonte if corresponde(documento, filtro))
+        if ordenacao and ordem is None:
+            encontrados = ordenar(encontrados, ordenacao)
+        return list(islice(encontrados, pular, pular + limite if limite else None))
+
+    # ==================== LEITURA ====================
+
+    @_comando
+    def _buscar(self, filtro, projecao, ordenacao, pular, limite, dica):
+        """Carga do CursorMemoria (um comando find)"""
+        return [projetar(documento, projecao) for documento in self._selecionar(filtro, ordenacao, pular, limite, dica)]
+
+    def find(self, filter=None, projection=None, skip=0, limit=0, sort=None, hint=None, **_opcoes):
+        ordenacao = especificacao_ordenacao(sort) if sort is not None else None
+        return CursorMemoria(self, filter, projection, ordenacao, skip, limit, hint)
+
+    @_comando
+    def find_one(self, filter=None, projection=None, sort=None, skip=0, hint=None, **_opcoes):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        ordenacao = especificacao_ordenacao(sort) if sort is not None else None
+        documentos = self._selecionar(filter, ordenacao, skip, 1, hint)
+        return projetar(documentos[0], projection) if documentos else None
+
+    @_comando
+    def count_documents(self, filter, skip=0, limit=0, hint=None, **_opcoes):
+        if not filter and not skip and not limit and hint is None:
+            return len(self._documentos)
+        return len(self._selecionar(filter, None, skip, limit, hint))
+
+    @_comando
+    def estimated_document_count(self, **_opcoes):
+        return len(self._documentos)
+
+    @_comando
+    def distinct(self, key, filter=None, **_opcoes):
+        valores = {}
+        for documento in self._selecionar(filter):
+            for valor in candidatos(documento, key.split(".")):
+                for item in (valor if isinstance(valor, list) else [valor]):
+                    if item is not AUSENTE:
+                        valores.setdefault(chave(item), item)
+        return [copiar(valores[c]) for c in sorted(valores)]
+
+    def documentos_filtrados(self, filtro):
+        """Cópias dos documentos do filtro ($lookup e $unionWith de outra coleção)"""
+        with self.database.trava:
+            return [copiar(documento) for documento in self._selecionar(filtro)]
+
+    @_comando
+    def aggregate(self, pipeline, **_opcoes):
+        """
+        O $match inicial (e um $sort/$limit logo depois) usa os índices; os
+        demais estágios rodam sobre cópias dos documentos (agregacao.py)
+        """
+        pipeline = list(pipeline)
+        filtro, ordenacao, limite, inicio = {}, None, 0, 0
+        if pipeline and "$match" in pipeline[0]:
+            filtro, inicio = pipeline[0]["$match"], 1
+        if len(pipeline) > inicio and "$sort" in pipeline[inicio]:
+            ordenacao, inicio = especificacao_ordenacao(pipeline[inicio]["$sort"]), inicio + 1
+        if len(pipeline) > inicio and "$limit" in pipeline[inicio]:
+            limite, inicio = pipeline[inicio]["$limit"], inicio + 1
+
+        documentos = [copiar(documento) for documento in self._selecionar(filtro, ordenacao, 0, limite)]
+        return CursorComandoMemoria(executar_estagios(documentos, pipeline[inicio:], self.database))
+
+    # ==================== ESCRITA (INTERNA) ====================
+
+    def _inserir(self, documento, lote=False):
+        """Grava um documento já normalizado e com _id"""
+        id_chave = chave(documento["_id"])
+        entradas = {nome: indice.chaves_documento(documento, id_chave) for nome, indice in self._indices.items()}
+        for nome, indice in self._indices.items():
+            indice.verificar_unicidade(entradas[nome], id_chave, self.full_name)
+        for nome, indice in self._indices.items():
+            indice.adicionar(id_chave, entradas[nome], lote)
+        self._documentos[id_chave] = documento
+        self._criada = True
+
+    def _remover(self, documento):
+        id_chave = chave(documento["_id"])
+        for indice in self._indices.values():
+            indice.remover(id_chave)
+        del self._documentos[id_chave]
+
+    def _indice_afetado(self, indice, campos):
+        if campos is None or indice.parcial is not None:
+            return True
+        return any(campo.split(".")[0] in campos for campo, _ in indice.chaves)
+
+    def _trocar(self, antigo, novo, campos):
+        """Substitui o documento, atualizando só os índices dos campos alterados"""
+        id_chave = chave(antigo["_id"])
+        afetados = [indice for indice in self._indices.values() if self._indice_afetado(indice, campos)]
+        entradas = {indice.nome: indice.chaves_documento(novo, id_chave) for indice in afetados}
+        for indice in afetados:
+            indice.verificar_unicidade(entradas[indice.nome], id_chave, self.full_name)
+        for indice in afetados:
+            if entradas[indice.nome] != indice.entradas_de(id_chave):
+                indice.remover(id_chave)
+                indice.adicionar(id_chave, entradas[indice.nome])
+        self._documentos[id_chave] = novo
+
+    def _aplicar(self, documento, atualizacao):
+        """
+        Aplica a atualização numa cópia dos campos tocados
+
+        Returns:
+            tuple: (documento novo ou None se nada mudou, campos de primeiro nível tocados)
+        """
+        campos = campos_atualizados(atualizacao)
+        if campos is None:
+            novo = copiar(documento)
+        else:
+            novo = dict(documento)
+            for campo in campos & novo.keys():
+                novo[campo] = copiar(novo[campo])
+        if not atualizar(novo, atualizacao):
+            return None, campos
+        if chave(novo.get("_id")) != chave(documento["_id"]):
+            raise _erro_id_imutavel()
+        return novo, campos
+
+    def _upsert(self, filtro, atualizacao, substituicao=False):
+        """Insere o documento de um upsert sem correspondência; retorna o documento"""
+        base = documento_upsert(filtro)
+        if substituicao:
+            if "_id" in atualizacao and "_id" in base and chave(atualizacao["_id"]) != chave(base["_id"]):
+                raise _erro_id_imutavel()
+            novo = dict(normalizar(atualizacao))
+            if "_id" in base:
+                novo.setdefault("_id", base["_id"])
+        else:
+            novo = base
+            atualizar(novo, atualizacao, inserindo=True)
+        if "_id" not in novo:
+            novo["_id"] = ObjectId()
+        novo = _com_id_primeiro(novo)
+        self._inserir(novo)
+        return novo
+
+    def _atualizar(self, filtro, atualizacao, upsert, multi, dica=None, ordenacao=None):
+        """
+        Returns:
+            tuple: (encontrados, modificados, _id do upsert, documento antigo, documento novo)
+        """
+        substituicao = eh_substituicao(atualizacao)
+        alvos = self._selecionar(filtro, ordenacao, 0, 0 if multi else 1, dica)
+        modificados = 0
+        antigo = novo = None
+        for documento in alvos:
+            if substituicao:
+                if "_id" in atualizacao and chave(atualizacao["_id"]) != chave(documento["_id"]):
+                    raise _erro_id_imutavel()
+                novo = _com_id_primeiro(dict(normalizar(atualizacao), _id=documento["_id"]))
+                campos = None
+                if novo == documento:
+                    novo = None
+            else:
+                novo, campos = self._aplicar(documento, atualizacao)
+            antigo = documento
+            if novo is not None:
+                self._trocar(documento, novo, campos)
+                modificados += 1
+            else:
+                novo = documento
+
+        if not alvos and upsert:
+            novo = self._upsert(filtro, atualizacao, substituicao)
+            return 0, 0, novo["_id"], None, novo
+        return len(alvos), modificados, None, antigo, novo
+
+    @staticmethod
+    def _resultado_atualizacao(encontrados, modificados, upserted):
+        bruto = {"n": encontrados + (upserted is not None), "nModified": modificados}
+        if upserted is not None:
+            bruto["upserted"] = upserted
+        return UpdateResult(bruto, True)
+
+    # ==================== ESCRITA ====================
+
+    @_comando
+    def insert_one(self, document, **_opcoes):
+        # Como o pymongo, grava o _id gerado no próprio documento recebido
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        self._inserir(_com_id_primeiro(normalizar(document)))
+        return InsertOneResult(document["_id"], True)
+
+    @_comando
+    def insert_many(self, documents, ordered=True, **_opcoes):
+        documentos = list(documents)
+        if not documentos:
+            raise TypeError("documents must be a non-empty list")
+        for documento in documentos:
+            if "_id" not in documento:
+                documento["_id"] = ObjectId()
+        inseridos, erros = 0, []
+        for posicao, documento in enumerate(documentos):
+            try:
+                self._inserir(_com_id_primeiro(normalizar(documento)), lote=True)
+                inseridos += 1
+            except DuplicateKeyError as e:
+                erros.append(dict(e.details or {}, index=posicao, code=11000, errmsg=str(e), op=documento))
+                if ordered:
+                    break
+        if erros:
+            raise BulkWriteError({
+                "writeErrors": erros, "writeConcernErrors": [], "nInserted": inseridos,
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []
+            })
+        return InsertManyResult([documento["_id"] for documento in documentos], True)
+
+    @_comando
+    def update_one(self, filter, update, upsert=False, hint=None, array_filters=None, **_opcoes):
+        verificar_atualizacao(update)
+        self._sem_array_filters(array_filters)
+        encontrados, modificados, upserted, _, _ = self._atualizar(filter, update, upsert, False, hint)
+        return self._resultado_atualizacao(encontrados, modificados, upserted)
+
+    @_comando
+    def update_many(self, filter, update, upsert=False, hint=None, array_filters=None, **_opcoes):
+        verificar_atualizacao(update)
+        self._sem_array_filters(array_filters)
+        encontrados, modificados, upserted, _, _ = self._atualizar(filter, update, upsert, True, hint)
+        return self._resultado_atualizacao(encontrados, modificados, upserted)
+
+    @_comando
+    def replace_one(self, filter, replacement, upsert=False, hint=None, **_opcoes):
+        if not eh_substituicao(replacement):
+            raise ValueError("replacement can not include $ operators")
+        encontrados, modificados, upserted, _, _ = self._atualizar(filter, replacement, upsert, False, hint)
+        return self._resultado_atualizacao(encontrados, modificados, upserted)
+
+    @_comando
+    def delete_one(self, filter, hint=None, **_opcoes):
+        alvos = self._selecionar(filter, None, 0, 1, hint)
+        for documento in alvos:
+            self._remover(documento)
+        return DeleteResult({"n": len(alvos)}, True)
+
+    @_comando
+    def delete_many(self, filter, hint=None, **_opcoes):
+        alvos = self._selecionar(filter, None, 0, 0, hint)
+        for documento in alvos:
+            self._remover(documento)
+        return DeleteResult({"n": len(alvos)}, True)
+
+    @_comando
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, hint=None, array_filters=None, **_opcoes):
+        verificar_atualizacao(update)
+        self._sem_array_filters(array_filters)
+        ordenacao = especificacao_ordenacao(sort) if sort is not None else None
+        _, _, _, antigo, novo = self._atualizar(filter, update, upsert, False, hint, ordenacao)
+        documento = novo if return_document == ReturnDocument.AFTER else antigo
+        return projetar(documento, projection) if documento is not None else None
+
+    @_comando
+    def find_one_and_replace(self, filter, replacement, projection=None, sort=None, upsert=False,
+                             return_document=ReturnDocument.BEFORE, hint=None, **_opcoes):
+        if not eh_substituicao(replacement):
+            raise ValueError("replacement can not include $ operators")
+        ordenacao = especificacao_ordenacao(sort) if sort is not None else None
+        _, _, _, antigo, novo = self._atualizar(filter, replacement, upsert, False, hint, ordenacao)
+        documento = novo if return_document == ReturnDocument.AFTER else antigo
+        return projetar(documento, projection) if documento is not None else None
+
+    @_comando
+    def find_one_and_delete(self, filter, projection=None, sort=None, hint=None, **_opcoes):
+        ordenacao = especificacao_ordenacao(sort) if sort is not None else None
+        alvos = self._selecionar(filter, ordenacao, 0, 1, hint)
+        if not alvos:
+            return None
+        self._remover(alvos[0])
+        return projetar(alvos[0], projection)
+
+    @_comando
+    def bulk_write(self, requests, ordered=True, **_opcoes):
+        """InsertOne, UpdateOne/Many, ReplaceOne e DeleteOne/Many, com os erros no BulkWriteError"""
+        resultado = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []
+        }
+        operacoes = list(requests)
+        if not operacoes:
+            raise InvalidOperation("No operations to execute")
+        for posicao, operacao in enumerate(operacoes):
+            try:
+                self._executar_operacao(operacao, posicao, resultado)
+            except WriteError as e:
+                resultado["writeErrors"].append(dict(
+                    e.details or {}, index=posicao, code=e.code, errmsg=str(e), op=operacao
+                ))
+                if ordered:
+                    break
+        if resultado["writeErrors"]:
+            raise BulkWriteError(resultado)
+        return BulkWriteResult(resultado, True)
+
+    def _executar_operacao(self, operacao, posicao, resultado):
+        if isinstance(operacao, InsertOne):
+            documento = operacao._doc
+            if "_id" not in documento:
+                documento["_id"] = ObjectId()
+            self._inserir(_com_id_primeiro(normalizar(documento)), lote=True)
+            resultado["nInserted"] += 1
+        elif isinstance(operacao, (UpdateOne, UpdateMany, ReplaceOne)):
+            if isinstance(operacao, ReplaceOne):
+                if not eh_substituicao(operacao._doc):
+                    raise ValueError("replacement can not include $ operators")
+            else:
+                verificar_atualizacao(operacao._doc)
+                self._sem_array_filters(operacao._array_filters)
+            encontrados, modificados, upserted, _, _ = self._atualizar(
+                operacao._filter, operacao._doc, operacao._upsert, isinstance(operacao, UpdateMany), operacao._hint
+            )
+            resultado["nMatched"] += encontrados
+            resultado["nModified"] += modificados
+            if upserted is not None:
+                resultado["nUpserted"] += 1
+                resultado["upserted"].append({"index": posicao, "_id": upserted})
+        elif isinstance(operacao, (DeleteOne, DeleteMany)):
+            limite = 1 if isinstance(operacao, DeleteOne) else 0
+            alvos = self._selecionar(operacao._filter, None, 0, limite, operacao._hint)
+            for documento in alvos:
+                self._remover(documento)
+            resultado["nRemoved"] += len(alvos)
+        else:
+            raise TypeError(f"{operacao!r} is not a valid request")
+
+    @staticmethod
+    def _sem_array_filters(array_filters):
+        if array_filters:
+            raise OperationFailure("arrayFilters não é suportado pelo motor em memória", 2)
@@ -0,0 +1,540 @@
+"""
+Consultas do Motor em Memória - Calmou API
+Filtros (find, $match, $pull), projeções, ordenação e operadores de
+atualização, com a semântica do MongoDB para arrays e campos ausentes
+
+    corresponde(documento, {"historico_meditacoes.meditacao_id": oid})
+    atualizar(documento, {"$push": {"notificacoes": {...}}, "$set": {...}})
+"""
+
+import re
+from datetime import datetime, timezone
+
+from bson import Regex
+from pymongo.errors import OperationFailure, WriteError
+
+from src.conexion.memoria.expressoes import avaliar, ordenar_valores, verdadeiro
+from src.conexion.memoria.valores import (
+    AUSENTE, NOMES_TIPOS, ORDEM_NUMERO, chave, comparar, copiar, definir, eh_numero,
+    normalizar, obter_direto, ordem_tipo, remover, tipo_bson
+)
+
+
+def eh_operador(condicao):
+    """A condição é um documento de operadores ({"$gte": ...})?"""
+    return isinstance(condicao, dict) and bool(condicao) and next(iter(condicao)).startswith("$")
+
+
+# ==================== FILTROS ====================
+
+def corresponde(documento, filtro):
+    """
+    O documento satisfaz o filtro de consulta?
+
+    Args:
+        documento (dict): Documento
+        filtro (dict): Filtro no formato do find / $match
+    """
+    for campo, condicao in filtro.items():
+        if campo.startswith("$"):
+            if campo == "$and":
+                if not all(corresponde(documento, item) for item in condicao):
+                    return False
+            elif campo == "$or":
+                if not any(corresponde(documento, item) for item in condicao):
+                    return False
+            elif campo == "$nor":
+                if any(corresponde(documento, item) for item in condicao):
+                    return False
+            elif campo == "$expr":
+                if not verdadeiro(avaliar(condicao, documento)):
+                    return False
+            elif campo != "$comment":
+                raise OperationFailure(f"unknown top level operator: {campo}", 2)
+        elif not satisfaz(candidatos(documento, campo.split(".")), condicao):
+            return False
+    return True
+
+
+def candidatos(valor, partes):
+    """
+    Valores de um caminho para a consulta
+
+    Percorre arrays no meio do caminho (cada elemento documento é visitado)
+    e aceita índices numéricos; um campo inexistente gera AUSENTE.
+
+    Returns:
+        list: Valores encontrados
+    """
+    if not partes:
+        return [valor]
+    parte, resto = partes[0], partes[1:]
+    if isinstance(valor, dict):
+        return candidatos(valor.get(parte, AUSENTE), resto)
+    if isinstance(valor, list):
+        resultado = []
+        if parte.isdigit():
+            posicao = int(parte)
+            if posicao < len(valor):
+                resultado.extend(candidatos(valor[posicao], resto))
+        for elemento in valor:
+            if isinstance(elemento, dict):
+                resultado.extend(candidatos(elemento.get(parte, AUSENTE), resto))
+        return resultado or [AUSENTE]
+    return [AUSENTE]
+
+
+def _expandir(valores):
+    """Cada valor, mais os elementos dos que são arrays"""
+    for valor in valores:
+        yield valor
+        if isinstance(valor, list):
+            yield from valor
+
+
+def _igual(valores, alvo):
+    chave_alvo = chave(alvo)
+    return any(chave(valor) == chave_alvo for valor in _expandir(valores))
+
+
+def _regex(padrao, opcoes=""):
+    if isinstance(padrao, Regex):
+        padrao, opcoes = padrao.pattern, padrao.flags if isinstance(padrao.flags, str) else opcoes
+    elif isinstance(padrao, re.Pattern):
+        return padrao
+    bandeiras = 0
+    for letra, bandeira in (("i", re.I), ("m", re.M), ("s", re.S), ("x", re.X)):
+        if letra in (opcoes or ""):
+            bandeiras |= bandeira
+    return re.compile(padrao, bandeiras)
+
+
+def _comparavel(valor, alvo):
+    """Só valores do mesmo tipo se comparam com $gt/$lt (números entre si)"""
+    return ordem_tipo(valor) == ordem_tipo(alvo) and valor is not AUSENTE
+
+
+def _compara(valores, alvo, teste):
+    chave_alvo = chave(alvo)
+    for valor in _expandir(valores):
+        if _comparavel(valor, alvo):
+            chave_valor = chave(valor)
+            if teste(chave_valor, chave_alvo):
+                return True
+    return False
+
+
+def _tipo_confere(valor, tipos):
+    if valor is AUSENTE:
+        return False
+    for tipo in tipos if isinstance(tipos, list) else [tipos]:
+        if tipo == "number" and ordem_tipo(valor) == ORDEM_NUMERO:
+            return True
+        if tipo_bson(valor) == NOMES_TIPOS.get(tipo, tipo):
+            return True
+    return False
+
+
+def _elemento_corresponde(elemento, condicao):
+    if eh_operador(condicao) and not any(c in condicao for c in ("$and", "$or", "$nor", "$expr")):
+        return satisfaz([elemento], condicao, expandir=False)
+    return isinstance(elemento, dict) and corresponde(elemento, condicao)
+
+
+def satisfaz(valores, condicao, expandir=True):
+    """
+    Os valores de um caminho satisfazem a condição?
+
+    Args:
+        valores (list): Saída de candidatos()
+        condicao: Valor (igualdade) ou documento de operadores
+        expandir (bool): Compara também os elementos dos arrays
+    """
+    if isinstance(condicao, (Regex, re.Pattern)):
+        condicao = {"$regex": condicao}
+    if not eh_operador(condicao):
+        return _igual(valores, condicao) if expandir else any(chave(v) == chave(condicao) for v in valores)
+
+    for operador, argumento in condicao.items():
+        if operador == "$eq":
+            resultado = _igual(valores, argumento)
+        elif operador == "$ne":
+            resultado = not _igual(valores, argumento)
+        elif operador in ("$gt", "$gte", "$lt", "$lte"):
+            if argumento is None:
+                # null só se compara por igualdade (inclusive com campo ausente)
+                resultado = operador in ("$gte", "$lte") and _igual(valores, None)
+            else:
+                teste = {
+                    "$gt": lambda a, b: a > b, "$gte": lambda a, b: a >= b,
+                    "$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b
+                }[operador]
+                resultado = _compara(valores, argumento, teste)
+        elif operador == "$in":
+            resultado = any(
+                satisfaz(valores, {"$regex": item}) if isinstance(item, (Regex, re.Pattern)) else _igual(valores, item)
+                for item in argumento
+            )
+        elif operador == "$nin":
+            resultado = not satisfaz(valores, {"$in": argumento})
+        elif operador == "$exists":
+            resultado = any(valor is not AUSENTE for valor in valores) == bool(argumento)
+        elif operador == "$not":
+            resultado = not satisfaz(valores, argumento)
+        elif operador == "$size":
+            resultado = any(isinstance(valor, list) and len(valor) == argumento for valor in valores)
+        elif operador == "$all":
+            resultado = bool(argumento) and all(
+                satisfaz(valores, {"$elemMatch": item["$elemMatch"]}) if eh_operador(item) else _igual(valores, item)
+                for item in argumento
+            )
+        elif operador == "$elemMatch":
+            resultado = any(
+                isinstance(valor, list) and any(_elemento_corresponde(elemento, argumento) for elemento in valor)
+                for valor in valores
+            )
+        elif operador == "$regex":
+            padrao = _regex(argumento, condicao.get("$options", ""))
+            resultado = any(isinstance(valor, str) and padrao.search(valor) for valor in _expandir(valores))
+        elif operador == "$options":
+            continue
+        elif operador == "$type":
+            resultado = any(_tipo_confere(valor, argumento) for valor in _expandir(valores))
+        elif operador == "$mod":
+            divisor, resto = argumento
+            resultado = any(eh_numero(valor) and int(valor) % divisor == resto for valor in _expandir(valores))
+        else:
+            raise OperationFailure(f"unknown operator: {operador}", 2)
+
+        if not resultado:
+            return False
+    return True
+
+
+# ==================== PROJEÇÃO ====================
+
+def _arvore(campos):
+    """{"a.b": 1, "c": 1} -> {"a": {"b": 1}, "c": 1}"""
+    arvore = {}
+    for caminho, valor in campos.items():
+        partes = caminho.split(".")
+        no = arvore
+        for parte in partes[:-1]:
+            no = no.setdefault(parte, {})
+            if not isinstance(no, dict):
+                break
+        else:
+            no[partes[-1]] = valor
+    return arvore
+
+
+def _incluir(valor, arvore):
+    if isinstance(valor, list):
+        return [_incluir(item, arvore) for item in valor if isinstance(item, (dict, list))]
+    if not isinstance(valor, dict):
+        return AUSENTE
+    resultado = {}
+    for campo, sub in arvore.items():
+        if campo not in valor:
+            continue
+        if isinstance(sub, dict) and not eh_operador(sub):
+            parcial = _incluir(valor[campo], sub)
+            if parcial is not AUSENTE:
+                resultado[campo] = parcial
+        else:
+            resultado[campo] = _aplicar_operador_projecao(valor[campo], sub)
+    return resultado
+
+
+def _excluir(valor, arvore):
+    if isinstance(valor, list):
+        return [_excluir(item, arvore) for item in valor]
+    if not isinstance(valor, dict):
+        return valor
+    resultado = {}
+    for campo, item in valor.items():
+        sub = arvore.get(campo)
+        if sub is None:
+            resultado[campo] = copiar(item)
+        elif isinstance(sub, dict) and not eh_operador(sub):
+            resultado[campo] = _excluir(item, sub)
+        elif eh_operador(sub):
+            resultado[campo] = _aplicar_operador_projecao(item, sub)
+    return resultado
+
+
+def _aplicar_operador_projecao(valor, especificacao):
+    if not eh_operador(especificacao):
+        return copiar(valor)
+    if "$slice" in especificacao and isinstance(valor, list):
+        corte = especificacao["$slice"]
+        if isinstance(corte, list):
+            inicio, quantidade = corte
+            if inicio < 0:
+                inicio = max(len(valor) + inicio, 0)
+            return copiar(valor[inicio:inicio + quantidade])
+        return copiar(valor[:corte] if corte >= 0 else valor[corte:])
+    if "$elemMatch" in especificacao and isinstance(valor, list):
+        for elemento in valor:
+            if _elemento_corresponde(elemento, especificacao["$elemMatch"]):
+                return [copiar(elemento)]
+        return AUSENTE
+    return copiar(valor)
+
+
+def projetar(documento, projecao):
+    """
+    Cópia do documento com a projeção do find aplicada
+
+    Args:
+        documento (dict): Documento gravado
+        projecao (dict ou list, optional): {campo: 0/1} ou lista de campos
+
+    Returns:
+        dict: Cópia projetada
+    """
+    if not projecao:
+        return copiar(documento)
+    if isinstance(projecao, (list, tuple)):
+        projecao = {campo: 1 for campo in projecao}
+
+    campos = {campo: valor for campo, valor in projecao.items() if campo != "_id"}
+    inclusao = any(not eh_operador(valor) and valor for valor in campos.values())
+    incluir_id = projecao.get("_id", 1)
+
+    if inclusao:
+        if any(not eh_operador(valor) and not valor for valor in campos.values()):
+            raise OperationFailure("Cannot do exclusion on field in inclusion projection", 31254)
+        arvore = _arvore(campos)
+        resultado = {}
+        if incluir_id and "_id" in documento:
+            resultado["_id"] = documento["_id"]
+        resultado.update(_incluir(documento, arvore))
+        return resultado
+
+    excluidos = dict(campos)
+    if not incluir_id:
+        excluidos["_id"] = 0
+    return _excluir(documento, _arvore(excluidos))
+
+
+# ==================== ORDENAÇÃO ====================
+
+def especificacao_ordenacao(chave_ou_lista, direcao=None):
+    """Normaliza sort("campo", -1), sort([(campo, dir)]) e {campo: dir} em lista de pares"""
+    if isinstance(chave_ou_lista, str):
+        return [(chave_ou_lista, 1 if direcao is None else direcao)]
+    if isinstance(chave_ou_lista, dict):
+        return list(chave_ou_lista.items())
+    return [(campo, dir_) for campo, dir_ in chave_ou_lista]
+
+
+def chave_ordenacao(documento, campo, direcao):
+    """Chave de um campo na ordenação: arrays usam o menor (ou maior) elemento"""
+    valores = candidatos(documento, campo.split("."))
+    chaves = []
+    for valor in valores:
+        if isinstance(valor, list):
+            chaves.extend(chave(item) for item in valor) if valor else chaves.append(chave(valor))
+        else:
+            chaves.append(chave(valor))
+    return (max if direcao < 0 else min)(chaves)
+
+
+def ordenar(documentos, ordenacao):
+    """Ordenação estável pelos campos de especificacao_ordenacao()"""
+    resultado = list(documentos)
+    for campo, direcao in reversed(ordenacao):
+        if isinstance(direcao, dict):
+            continue  # {$meta: ...}
+        resultado.sort(key=lambda doc: chave_ordenacao(doc, campo, direcao), reverse=direcao < 0)
+    return resultado
+
+
+# ==================== ATUALIZAÇÃO ====================
+
+def eh_substituicao(atualizacao):
+    return isinstance(atualizacao, dict) and not any(campo.startswith("$") for campo in atualizacao)
+
+
+def campos_atualizados(atualizacao):
+    """Campos de primeiro nível tocados pela atualização (None: qualquer um)"""
+    if not isinstance(atualizacao, dict) or eh_substituicao(atualizacao):
+        return None
+    campos = set()
+    for operador, argumentos in atualizacao.items():
+        for caminho in argumentos:
+            campos.add(caminho.split(".")[0])
+            if operador == "$rename":
+                campos.add(str(argumentos[caminho]).split(".")[0])
+    return campos
+
+
+def documento_upsert(filtro):
+    """Documento inicial de um upsert: os campos de igualdade do filtro"""
+    documento = {}
+
+    def coletar(filtro_):
+        for campo, condicao in filtro_.items():
+            if campo == "$and":
+                for item in condicao:
+                    coletar(item)
+            elif campo.startswith("$"):
+                continue
+            elif eh_operador(condicao):
+                if "$eq" in condicao:
+                    definir(documento, campo, normalizar(condicao["$eq"]))
+            else:
+                definir(documento, campo, normalizar(condicao))
+
+    coletar(filtro)
+    return documento
+
+
+def _erro_atualizacao(mensagem, codigo=9):
+    return WriteError(mensagem, codigo, {"code": codigo, "errmsg": mensagem})
+
+
+def _numero_obrigatorio(valor, operador, caminho):
+    if not eh_numero(valor):
+        raise _erro_atualizacao(f"Cannot apply {operador} to a value of non-numeric type. "
+                                f"{{_id: ...}} has the field '{caminho}' of non-numeric type", 14)
+
+
+def _push(documento, caminho, argumento, operador):
+    atual = obter_direto(documento, caminho)
+    if atual is AUSENTE:
+        atual = []
+        definir(documento, caminho, atual)
+    elif not isinstance(atual, list):
+        raise _erro_atualizacao(f"The field '{caminho}' must be an array but is of type {type(atual).__name__}", 2)
+
+    modificadores = isinstance(argumento, dict) and "$each" in argumento
+    itens = [normalizar(item) for item in (argumento["$each"] if modificadores else [argumento])]
+
+    if operador == "$addToSet":
+        existentes = {chave(item) for item in atual}
+        novos = []
+        for item in itens:
+            if chave(item) not in existentes:
+                existentes.add(chave(item))
+                novos.append(item)
+        atual.extend(novos)
+        return bool(novos)
+
+    posicao = argumento.get("$position") if modificadores else None
+    if posicao is None:
+        atual.extend(itens)
+    else:
+        atual[posicao:posicao] = itens
+    if modificadores and "$sort" in argumento:
+        atual[:] = ordenar_valores(atual, argumento["$sort"])
+    if modificadores and "$slice" in argumento:
+        corte = argumento["$slice"]
+        atual[:] = atual[:corte] if corte >= 0 else atual[corte:]
+    return bool(itens) or (modificadores and ("$slice" in argumento or "$sort" in argumento))
+
+
+def _pull(documento, caminho, condicao):
+    atual = obter_direto(documento, caminho)
+    if not isinstance(atual, list):
+        return False
+    if eh_operador(condicao):
+        retirar = lambda item: satisfaz([item], condicao)  # noqa: E731
+    elif isinstance(condicao, dict):
+        retirar = lambda item: isinstance(item, dict) and corresponde(item, condicao)  # noqa: E731
+    else:
+        chave_condicao = chave(condicao)
+        retirar = lambda item: chave(item) == chave_condicao  # noqa: E731
+    restantes = [item for item in atual if not retirar(item)]
+    if len(restantes) == len(atual):
+        return False
+    atual[:] = restantes
+    return True
+
+
+def atualizar(documento, atualizacao, inserindo=False):
+    """
+    Aplica os operadores de atualização no documento (no próprio objeto)
+
+    Args:
+        documento (dict): Documento gravado
+        atualizacao (dict ou list): Operadores ($set, $push...) ou pipeline
+        inserindo (bool): Documento novo de um upsert ($setOnInsert vale)
+
+    Returns:
+        bool: True se algum campo mudou
+    """
+    if isinstance(atualizacao, list):
+        from src.conexion.memoria.agregacao import executar_estagios
+        novo = executar_estagios([documento], atualizacao, None)[0]
+        novo["_id"] = documento["_id"]
+        novo = normalizar(novo)
+        mudou = novo != documento
+        documento.clear()
+        documento.update(novo)
+        return mudou
+
+    mudou = False
+    for operador, argumentos in atualizacao.items():
+        if operador == "$setOnInsert" and not inserindo:
+            continue
+        for caminho, argumento in argumentos.items():
+            if operador in ("$set", "$setOnInsert"):
+                novo = normalizar(argumento)
+                if obter_direto(documento, caminho) != novo or obter_direto(documento, caminho) is AUSENTE:
+                    definir(documento, caminho, novo)
+                    mudou = True
+            elif operador == "$unset":
+                mudou = remover(documento, caminho) or mudou
+            elif operador in ("$inc", "$mul"):
+                atual = obter_direto(documento, caminho)
+                _numero_obrigatorio(argumento, operador, caminho)
+                if atual is AUSENTE:
+                    definir(documento, caminho, argumento if operador == "$inc" else 0 * argumento)
+                    mudou = True
+                else:
+                    _numero_obrigatorio(atual, operador, caminho)
+                    novo = atual + argumento if operador == "$inc" else atual * argumento
+                    if novo != atual or type(novo) is not type(atual):
+                        definir(documento, caminho, novo)
+                        mudou = True
+            elif operador in ("$min", "$max"):
+                atual = obter_direto(documento, caminho)
+                novo = normalizar(argumento)
+                if atual is AUSENTE or (comparar(novo, atual) < 0 if operador == "$min" else comparar(novo, atual) > 0):
+                    definir(documento, caminho, novo)
+                    mudou = True
+            elif operador in ("$push", "$addToSet"):
+                mudou = _push(documento, caminho, argumento, operador) or mudou
+            elif operador == "$pull":
+                mudou = _pull(documento, caminho, argumento) or mudou
+            elif operador == "$pullAll":
+                mudou = _pull(documento, caminho, {"$in": argumento}) or mudou
+            elif operador == "$pop":
+                atual = obter_direto(documento, caminho)
+                if isinstance(atual, list) and atual:
+                    atual.pop(0 if argumento == -1 else -1)
+                    mudou = True
+            elif operador == "$currentDate":
+                definir(documento, caminho, normalizar(datetime.now(timezone.utc)))
+                mudou = True
+            elif operador == "$rename":
+                atual = obter_direto(documento, caminho)
+                if atual is not AUSENTE:
+                    remover(documento, caminho)
+                    definir(documento, argumento, atual)
+                    mudou = True
+            else:
+                raise _erro_atualizacao(f"Unknown modifier: {operador}", 9)
+    return mudou
+
+
+def verificar_atualizacao(atualizacao):
+    """Recusa atualizações vazias ou que misturam operadores e campos"""
+    if isinstance(atualizacao, list):
+        return
+    if not atualizacao:
+        raise ValueError("update cannot be empty")
+    if eh_substituicao(atualizacao):
+        raise ValueError("update only works with $ operators")
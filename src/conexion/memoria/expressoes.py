@@ -0,0 +1,630 @@
+"""
+Expressões de Agregação do Motor em Memória - Calmou API
+Avalia as expressões dos estágios ($project, $group, $addFields, $expr...)
+
+    avaliar({"$size": {"$ifNull": ["$historico", []]}}, documento)
+
+"$campo" lê o documento atual, "$$variavel" as variáveis ($$ROOT,
+$$CURRENT, $$REMOVE, $$NOW e as de $let, $filter, $map e $lookup).
+"""
+
+import math
+import re
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from src.conexion.memoria.valores import (
+    AUSENTE, chave, comparar, eh_numero, nome_tipo, obter
+)
+
+
+class _Remover:
+    """$$REMOVE: o campo calculado não entra no resultado"""
+
+    def __repr__(self):
+        return "REMOVE"
+
+
+REMOVER = _Remover()
+
+
+def erro_expressao(mensagem):
+    return OperationFailure(mensagem, 168)
+
+
+def avaliar(expressao, documento, variaveis=None):
+    """
+    Avalia uma expressão de agregação sobre um documento
+
+    Args:
+        expressao: Expressão ("$campo", {"$op": ...}, literal, lista ou objeto)
+        documento (dict): Documento atual ($$CURRENT)
+        variaveis (dict, optional): Variáveis definidas (sem o "$$")
+
+    Returns:
+        O valor (AUSENTE para um campo inexistente, REMOVER para $$REMOVE)
+    """
+    if variaveis is None:
+        variaveis = {"ROOT": documento, "CURRENT": documento}
+    return _avaliar(expressao, documento, variaveis)
+
+
+def _avaliar(expressao, documento, variaveis):
+    if isinstance(expressao, str):
+        if expressao.startswith("$$"):
+            return _variavel(expressao[2:], variaveis)
+        if expressao.startswith("$"):
+            return obter(documento, expressao[1:])
+        return expressao
+
+    if isinstance(expressao, dict):
+        if len(expressao) == 1:
+            operador, argumentos = next(iter(expressao.items()))
+            if operador.startswith("$"):
+                funcao = OPERADORES.get(operador)
+                if funcao is None:
+                    raise erro_expressao(f"Unrecognized expression '{operador}'")
+                return funcao(argumentos, documento, variaveis)
+        resultado = {}
+        for campo, valor in expressao.items():
+            valor = _avaliar(valor, documento, variaveis)
+            if valor is not AUSENTE and valor is not REMOVER:
+                resultado[campo] = valor
+        return resultado
+
+    if isinstance(expressao, list):
+        return [_nulo(_avaliar(item, documento, variaveis)) for item in expressao]
+
+    return expressao
+
+
+def _variavel(nome, variaveis):
+    base, _, resto = nome.partition(".")
+    if base == "REMOVE":
+        return REMOVER
+    if base == "NOW":
+        valor = datetime.now()
+    elif base in variaveis:
+        valor = variaveis[base]
+    else:
+        raise erro_expressao(f"Use of undefined variable: {base}")
+    return obter(valor, resto) if resto else valor
+
+
+def _nulo(valor):
+    """Campo inexistente vira null dentro de arrays e argumentos"""
+    return None if valor is AUSENTE or valor is REMOVER else valor
+
+
+def _argumentos(argumentos, documento, variaveis):
+    """Lista dos argumentos avaliados (um argumento que não é lista vira lista de um)"""
+    if not isinstance(argumentos, list):
+        argumentos = [argumentos]
+    return [_avaliar(argumento, documento, variaveis) for argumento in argumentos]
+
+
+def _com_variavel(variaveis, nome, valor):
+    novas = dict(variaveis)
+    novas[nome] = valor
+    return novas
+
+
+# ==================== ARITMÉTICA ====================
+
+def _soma(argumentos, documento, variaveis):
+    total = 0
+    data = None
+    for valor in _argumentos(argumentos, documento, variaveis):
+        if valor is None or valor is AUSENTE:
+            return None
+        if isinstance(valor, datetime):
+            if data is not None:
+                raise erro_expressao("only one date allowed in an $add expression")
+            data = valor
+        elif eh_numero(valor):
+            total += valor
+        else:
+            raise erro_expressao(f"$add only supports numeric or date types, not {nome_tipo(valor)}")
+    if data is not None:
+        return data + timedelta(milliseconds=total)
+    return total
+
+
+def _subtracao(argumentos, documento, variaveis):
+    a, b = _argumentos(argumentos, documento, variaveis)
+    if a is None or b is None or a is AUSENTE or b is AUSENTE:
+        return None
+    if isinstance(a, datetime) and isinstance(b, datetime):
+        return int((a - b) / timedelta(milliseconds=1))
+    if isinstance(a, datetime):
+        return a - timedelta(milliseconds=b)
+    return a - b
+
+
+def _aritmetica(operacao):
+    def funcao(argumentos, documento, variaveis):
+        valores = _argumentos(argumentos, documento, variaveis)
+        if any(valor is None or valor is AUSENTE for valor in valores):
+            return None
+        return operacao(*valores)
+    return funcao
+
+
+def _multiplicacao(*valores):
+    resultado = 1
+    for valor in valores:
+        resultado *= valor
+    return resultado
+
+
+def _divisao(a, b):
+    if b == 0:
+        raise erro_expressao("can't $divide by zero")
+    return a / b
+
+
+def _arredondar(valor, casas=0):
+    fator = 10 ** casas
+    resultado = math.floor(valor * fator + 0.5) / fator if valor >= 0 else -math.floor(-valor * fator + 0.5) / fator
+    return int(resultado) if isinstance(valor, int) and casas <= 0 else resultado
+
+
+# ==================== COMPARAÇÃO E LÓGICA ====================
+
+def _comparacao(teste):
+    def funcao(argumentos, documento, variaveis):
+        a, b = (_nulo(valor) for valor in _argumentos(argumentos, documento, variaveis))
+        return teste(comparar(a, b))
+    return funcao
+
+
+def verdadeiro(valor):
+    """Valor booleano de uma expressão (null, ausente, false e 0 são falsos)"""
+    if valor is None or valor is AUSENTE or valor is REMOVER or valor is False:
+        return False
+    if eh_numero(valor):
+        return valor != 0
+    return True
+
+
+def _e(argumentos, documento, variaveis):
+    return all(verdadeiro(_avaliar(argumento, documento, variaveis)) for argumento in argumentos)
+
+
+def _ou(argumentos, documento, variaveis):
+    return any(verdadeiro(_avaliar(argumento, documento, variaveis)) for argumento in argumentos)
+
+
+def _nao(argumentos, documento, variaveis):
+    return not verdadeiro(_argumentos(argumentos, documento, variaveis)[0])
+
+
+def _condicional(argumentos, documento, variaveis):
+    if isinstance(argumentos, dict):
+        condicao, entao, senao = argumentos["if"], argumentos["then"], argumentos["else"]
+    else:
+        condicao, entao, senao = argumentos
+    escolhido = entao if verdadeiro(_avaliar(condicao, documento, variaveis)) else senao
+    return _avaliar(escolhido, documento, variaveis)
+
+
+def _se_nulo(argumentos, documento, variaveis):
+    *valores, padrao = argumentos
+    for valor in valores:
+        valor = _avaliar(valor, documento, variaveis)
+        if valor is not None and valor is not AUSENTE:
+            return valor
+    return _avaliar(padrao, documento, variaveis)
+
+
+def _escolha(argumentos, documento, variaveis):
+    for ramo in argumentos["branches"]:
+        if verdadeiro(_avaliar(ramo["case"], documento, variaveis)):
+            return _avaliar(ramo["then"], documento, variaveis)
+    if "default" not in argumentos:
+        raise erro_expressao("$switch could not find a matching branch for an input, and no default was specified.")
+    return _avaliar(argumentos["default"], documento, variaveis)
+
+
+# ==================== ARRAYS ====================
+
+def _array(valor, operador):
+    if not isinstance(valor, list):
+        raise erro_expressao(f"The argument to {operador} must be an array, but was of type: {nome_tipo(valor)}")
+    return valor
+
+
+def _tamanho(argumentos, documento, variaveis):
+    return len(_array(_argumentos(argumentos, documento, variaveis)[0], "$size"))
+
+
+def _filtrar(argumentos, documento, variaveis):
+    entrada = _avaliar(argumentos["input"], documento, variaveis)
+    if entrada is None or entrada is AUSENTE:
+        return None
+    nome = argumentos.get("as", "this")
+    limite = _avaliar(argumentos["limit"], documento, variaveis) if "limit" in argumentos else None
+    resultado = []
+    for item in _array(entrada, "$filter"):
+        if verdadeiro(_avaliar(argumentos["cond"], documento, _com_variavel(variaveis, nome, item))):
+            resultado.append(item)
+            if limite is not None and len(resultado) >= limite:
+                break
+    return resultado
+
+
+def _mapear(argumentos, documento, variaveis):
+    entrada = _avaliar(argumentos["input"], documento, variaveis)
+    if entrada is None or entrada is AUSENTE:
+        return None
+    nome = argumentos.get("as", "this")
+    return [
+        _nulo(_avaliar(argumentos["in"], documento, _com_variavel(variaveis, nome, item)))
+        for item in _array(entrada, "$map")
+    ]
+
+
+def _reduzir(argumentos, documento, variaveis):
+    entrada = _avaliar(argumentos["input"], documento, variaveis)
+    if entrada is None or entrada is AUSENTE:
+        return None
+    acumulado = _avaliar(argumentos["initialValue"], documento, variaveis)
+    for item in _array(entrada, "$reduce"):
+        novas = dict(variaveis, this=item, value=acumulado)
+        acumulado = _avaliar(argumentos["in"], documento, novas)
+    return acumulado
+
+
+def _fatiar(argumentos, documento, variaveis):
+    valores = _argumentos(argumentos, documento, variaveis)
+    entrada = valores[0]
+    if entrada is None or entrada is AUSENTE:
+        return None
+    entrada = _array(entrada, "$slice")
+    if len(valores) == 2:
+        n = valores[1]
+        return entrada[:n] if n >= 0 else entrada[n:]
+    posicao, n = valores[1], valores[2]
+    if posicao < 0:
+        posicao = max(len(entrada) + posicao, 0)
+    return entrada[posicao:posicao + n]
+
+
+def _intervalo(argumentos, documento, variaveis):
+    valores = _argumentos(argumentos, documento, variaveis)
+    inicio, fim = valores[0], valores[1]
+    passo = valores[2] if len(valores) > 2 else 1
+    return list(range(inicio, fim, passo))
+
+
+def ordenar_valores(itens, criterio):
+    """Ordena uma lista como o $sortArray (criterio 1/-1 ou {campo: 1/-1})"""
+    if isinstance(criterio, dict):
+        resultado = list(itens)
+        for campo, direcao in reversed(list(criterio.items())):
+            resultado.sort(key=lambda item: chave(obter(item, campo) if isinstance(item, dict) else AUSENTE),
+                           reverse=direcao < 0)
+        return resultado
+    return sorted(itens, key=chave, reverse=criterio < 0)
+
+
+def _ordenar_array(argumentos, documento, variaveis):
+    entrada = _avaliar(argumentos["input"], documento, variaveis)
+    if entrada is None or entrada is AUSENTE:
+        return None
+    return ordenar_valores(_array(entrada, "$sortArray"), argumentos["sortBy"])
+
+
+def _elemento(argumentos, documento, variaveis):
+    entrada, posicao = _argumentos(argumentos, documento, variaveis)
+    if entrada is None or entrada is AUSENTE:
+        return None
+    entrada = _array(entrada, "$arrayElemAt")
+    if -len(entrada) <= posicao < len(entrada):
+        return entrada[posicao]
+    return AUSENTE
+
+
+def _extremidade(posicao):
+    def funcao(argumentos, documento, variaveis):
+        entrada = _argumentos(argumentos, documento, variaveis)[0]
+        if entrada is None or entrada is AUSENTE:
+            return None
+        entrada = _array(entrada, "$first" if posicao == 0 else "$last")
+        return entrada[posicao] if entrada else AUSENTE
+    return funcao
+
+
+def _contido(argumentos, documento, variaveis):
+    valor, entrada = _argumentos(argumentos, documento, variaveis)
+    chave_valor = chave(_nulo(valor))
+    return any(chave(item) == chave_valor for item in _array(entrada, "$in"))
+
+
+def _concatenar_arrays(argumentos, documento, variaveis):
+    resultado = []
+    for valor in _argumentos(argumentos, documento, variaveis):
+        if valor is None or valor is AUSENTE:
+            return None
+        resultado.extend(_array(valor, "$concatArrays"))
+    return resultado
+
+
+def _uniao(argumentos, documento, variaveis):
+    vistos = {}
+    for valor in _argumentos(argumentos, documento, variaveis):
+        if valor is None or valor is AUSENTE:
+            return None
+        for item in _array(valor, "$setUnion"):
+            vistos.setdefault(chave(item), item)
+    return list(vistos.values())
+
+
+def _inverter(argumentos, documento, variaveis):
+    entrada = _argumentos(argumentos, documento, variaveis)[0]
+    if entrada is None or entrada is AUSENTE:
+        return None
+    return list(reversed(_array(entrada, "$reverseArray")))
+
+
+def _indice_array(argumentos, documento, variaveis):
+    entrada, valor, *faixa = _argumentos(argumentos, documento, variaveis)
+    if entrada is None or entrada is AUSENTE:
+        return None
+    inicio = faixa[0] if faixa else 0
+    fim = faixa[1] if len(faixa) > 1 else len(entrada)
+    for posicao in range(inicio, min(fim, len(entrada))):
+        if chave(entrada[posicao]) == chave(_nulo(valor)):
+            return posicao
+    return -1
+
+
+# ==================== OBJETOS ====================
+
+def _array_para_objeto(argumentos, documento, variaveis):
+    entrada = _argumentos(argumentos, documento, variaveis)[0]
+    if entrada is None or entrada is AUSENTE:
+        return None
+    resultado = {}
+    for item in _array(entrada, "$arrayToObject"):
+        if isinstance(item, dict):
+            resultado[item["k"]] = item["v"]
+        else:
+            resultado[item[0]] = item[1]
+    return resultado
+
+
+def _objeto_para_array(argumentos, documento, variaveis):
+    entrada = _argumentos(argumentos, documento, variaveis)[0]
+    if entrada is None or entrada is AUSENTE:
+        return None
+    return [{"k": campo, "v": valor} for campo, valor in entrada.items()]
+
+
+def _juntar_objetos(argumentos, documento, variaveis):
+    resultado = {}
+    for valor in _argumentos(argumentos, documento, variaveis):
+        if isinstance(valor, dict):
+            resultado.update(valor)
+        elif valor is not None and valor is not AUSENTE:
+            raise erro_expressao(f"$mergeObjects requires object inputs, but input is of type {nome_tipo(valor)}")
+    return resultado
+
+
+# ==================== ACUMULADORES COMO EXPRESSÃO ====================
+
+def _valores_acumulador(argumentos, documento, variaveis):
+    """Um argumento array soma os elementos; vários argumentos, os próprios argumentos"""
+    valores = _argumentos(argumentos, documento, variaveis)
+    if len(valores) == 1 and isinstance(valores[0], list):
+        return valores[0]
+    return valores
+
+
+def somar(valores):
+    total = 0
+    for valor in valores:
+        if eh_numero(valor):
+            total += valor
+    return total
+
+
+def media(valores):
+    numeros = [valor for valor in valores if eh_numero(valor)]
+    return sum(numeros) / len(numeros) if numeros else None
+
+
+def extremo(valores, maior):
+    presentes = [valor for valor in valores if valor is not None and valor is not AUSENTE]
+    if not presentes:
+        return None
+    return (max if maior else min)(presentes, key=chave)
+
+
+# ==================== TEXTO, TIPOS E DATAS ====================
+
+def texto_de(valor):
+    """Conversão do $toString"""
+    if valor is None or valor is AUSENTE:
+        return None
+    if isinstance(valor, str):
+        return valor
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%dT%H:%M:%S.") + f"{valor.microsecond // 1000:03d}Z"
+    if isinstance(valor, (int, float, ObjectId)):
+        return str(valor)
+    raise erro_expressao(f"Unsupported conversion from {nome_tipo(valor)} to string")
+
+
+def _texto(argumentos, documento, variaveis):
+    return texto_de(_argumentos(argumentos, documento, variaveis)[0])
+
+
+def _inteiro(argumentos, documento, variaveis):
+    valor = _argumentos(argumentos, documento, variaveis)[0]
+    if valor is None or valor is AUSENTE:
+        return None
+    return int(float(valor)) if isinstance(valor, str) else int(valor)
+
+
+def _real(argumentos, documento, variaveis):
+    valor = _argumentos(argumentos, documento, variaveis)[0]
+    if valor is None or valor is AUSENTE:
+        return None
+    return float(valor)
+
+
+def _object_id(argumentos, documento, variaveis):
+    valor = _argumentos(argumentos, documento, variaveis)[0]
+    if valor is None or valor is AUSENTE:
+        return None
+    return valor if isinstance(valor, ObjectId) else ObjectId(valor)
+
+
+def _tipo(argumentos, documento, variaveis):
+    valor = _avaliar(argumentos[0] if isinstance(argumentos, list) else argumentos, documento, variaveis)
+    return nome_tipo(valor)
+
+
+def _concatenar(argumentos, documento, variaveis):
+    valores = _argumentos(argumentos, documento, variaveis)
+    if any(valor is None or valor is AUSENTE for valor in valores):
+        return None
+    return "".join(valores)
+
+
+def _caixa(funcao):
+    def operador(argumentos, documento, variaveis):
+        valor = _argumentos(argumentos, documento, variaveis)[0]
+        return "" if valor is None or valor is AUSENTE else funcao(texto_de(valor))
+    return operador
+
+
+FORMATOS_DATA = {
+    "%Y": lambda d: f"{d.year:04d}", "%m": lambda d: f"{d.month:02d}", "%d": lambda d: f"{d.day:02d}",
+    "%H": lambda d: f"{d.hour:02d}", "%M": lambda d: f"{d.minute:02d}", "%S": lambda d: f"{d.second:02d}",
+    "%L": lambda d: f"{d.microsecond // 1000:03d}", "%j": lambda d: f"{d.timetuple().tm_yday:03d}",
+    "%u": lambda d: str(d.isoweekday()), "%V": lambda d: f"{d.isocalendar()[1]:02d}",
+    "%G": lambda d: f"{d.isocalendar()[0]:04d}", "%%": lambda d: "%"
+}
+
+
+def _data_para_texto(argumentos, documento, variaveis):
+    data = _avaliar(argumentos["date"], documento, variaveis)
+    if data is None or data is AUSENTE:
+        return _avaliar(argumentos["onNull"], documento, variaveis) if "onNull" in argumentos else None
+    formato = argumentos.get("format", "%Y-%m-%dT%H:%M:%S.%LZ")
+    return re.sub(r"%.", lambda m: FORMATOS_DATA[m.group(0)](data), formato)
+
+
+def _parte_data(atributo):
+    def funcao(argumentos, documento, variaveis):
+        data = _argumentos(argumentos, documento, variaveis)[0]
+        if isinstance(data, dict):
+            data = _avaliar(data.get("date"), documento, variaveis)
+        if data is None or data is AUSENTE:
+            return None
+        return atributo(data)
+    return funcao
+
+
+# ==================== VARIÁVEIS ====================
+
+def _let(argumentos, documento, variaveis):
+    novas = dict(variaveis)
+    for nome, valor in argumentos["vars"].items():
+        novas[nome] = _avaliar(valor, documento, variaveis)
+    return _avaliar(argumentos["in"], documento, novas)
+
+
+def _literal(argumentos, documento, variaveis):
+    return argumentos
+
+
+def _expressao_unaria(funcao):
+    def operador(argumentos, documento, variaveis):
+        valor = _argumentos(argumentos, documento, variaveis)[0]
+        if valor is None or valor is AUSENTE:
+            return None
+        return funcao(valor)
+    return operador
+
+
+OPERADORES = {
+    # Aritmética
+    "$add": _soma,
+    "$subtract": _subtracao,
+    "$multiply": _aritmetica(_multiplicacao),
+    "$divide": _aritmetica(_divisao),
+    "$mod": _aritmetica(lambda a, b: math.fmod(a, b) if isinstance(a, float) or isinstance(b, float) else a % b),
+    "$floor": _expressao_unaria(math.floor),
+    "$ceil": _expressao_unaria(math.ceil),
+    "$abs": _expressao_unaria(abs),
+    "$round": _aritmetica(_arredondar),
+    "$trunc": _expressao_unaria(math.trunc),
+    # Comparação e lógica
+    "$eq": _comparacao(lambda c: c == 0),
+    "$ne": _comparacao(lambda c: c != 0),
+    "$gt": _comparacao(lambda c: c > 0),
+    "$gte": _comparacao(lambda c: c >= 0),
+    "$lt": _comparacao(lambda c: c < 0),
+    "$lte": _comparacao(lambda c: c <= 0),
+    "$cmp": _comparacao(lambda c: c),
+    "$and": _e,
+    "$or": _ou,
+    "$not": _nao,
+    "$cond": _condicional,
+    "$ifNull": _se_nulo,
+    "$switch": _escolha,
+    # Arrays
+    "$size": _tamanho,
+    "$filter": _filtrar,
+    "$map": _mapear,
+    "$reduce": _reduzir,
+    "$slice": _fatiar,
+    "$range": _intervalo,
+    "$sortArray": _ordenar_array,
+    "$arrayElemAt": _elemento,
+    "$first": _extremidade(0),
+    "$last": _extremidade(-1),
+    "$in": _contido,
+    "$concatArrays": _concatenar_arrays,
+    "$setUnion": _uniao,
+    "$reverseArray": _inverter,
+    "$indexOfArray": _indice_array,
+    "$isArray": lambda a, d, v: isinstance(_argumentos(a, d, v)[0], list),
+    # Objetos
+    "$arrayToObject": _array_para_objeto,
+    "$objectToArray": _objeto_para_array,
+    "$mergeObjects": _juntar_objetos,
+    # Acumuladores
+    "$sum": lambda a, d, v: somar(_valores_acumulador(a, d, v)),
+    "$avg": lambda a, d, v: media(_valores_acumulador(a, d, v)),
+    "$max": lambda a, d, v: extremo(_valores_acumulador(a, d, v), True),
+    "$min": lambda a, d, v: extremo(_valores_acumulador(a, d, v), False),
+    # Texto e tipos
+    "$toString": _texto,
+    "$toInt": _inteiro,
+    "$toLong": _inteiro,
+    "$toDouble": _real,
+    "$toObjectId": _object_id,
+    "$type": _tipo,
+    "$concat": _concatenar,
+    "$toLower": _caixa(str.lower),
+    "$toUpper": _caixa(str.upper),
+    # Datas
+    "$dateToString": _data_para_texto,
+    "$year": _parte_data(lambda d: d.year),
+    "$month": _parte_data(lambda d: d.month),
+    "$dayOfMonth": _parte_data(lambda d: d.day),
+    "$hour": _parte_data(lambda d: d.hour),
+    # Variáveis
+    "$let": _let,
+    "$literal": _literal
+}
@@ -0,0 +1,323 @@
+"""
+Índices Ordenados do Motor em Memória - Calmou API
+Cada índice é uma lista ordenada de tuplas (chave do campo 1, ..., chave do
+_id), mantida com bisect; campos descendentes usam Decrescente. Inserções
+em lote são acumuladas e ordenadas de uma vez na leitura seguinte, e os
+índices únicos guardam também um dict chave -> documento. O planejador
+escolhe o índice pelo prefixo de igualdades do filtro e, quando possível,
+entrega os documentos já na ordem do sort.
+"""
+
+from bisect import bisect_left, insort
+from itertools import product
+
+from pymongo.errors import DuplicateKeyError
+
+from src.conexion.memoria.consulta import candidatos, corresponde, eh_operador
+from src.conexion.memoria.valores import (
+    AUSENTE, MAXIMO, MINIMO, ORDEM_ARRAY, ORDEM_NULL, ORDEM_OBJETO, Decrescente, chave, ordem_tipo
+)
+
+# Acima disso as entradas de um documento são ordenadas com a lista inteira
+LIMITE_INSORT = 16
+
+
+def nome_indice(chaves):
+    """Nome padrão do MongoDB: campo_1_outro_-1"""
+    return "_".join(f"{campo}_{direcao}" for campo, direcao in chaves)
+
+
+class IndiceOrdenado:
+    """Índice de um ou mais campos sobre os documentos de uma coleção"""
+
+    def __init__(self, nome, chaves, unique=False, sparse=False, parcial=None):
+        """
+        Args:
+            nome (str): Nome do índice
+            chaves (list): [(campo, 1 ou -1 ou "text"), ...]
+            unique (bool): Recusa chaves repetidas
+            sparse (bool): Ignora documentos sem nenhum dos campos
+            parcial (dict, optional): partialFilterExpression
+        """
+        self.nome = nome
+        self.chaves = list(chaves)
+        self.unique = unique
+        self.sparse = sparse
+        self.parcial = parcial
+        self.texto = any(not isinstance(direcao, int) for _, direcao in self.chaves)
+        self.multikey = False
+        self._entradas = []
+        self._pendentes = []
+        self._por_documento = {}
+        self._donos = {}
+
+    @property
+    def consultavel(self):
+        """Pode ser usado pelo planejador (índices de texto e parciais só valem para unicidade)"""
+        return not self.texto and self.parcial is None
+
+    def descricao(self):
+        """Entrada do index_information()"""
+        info = {"v": 2, "key": list(self.chaves)}
+        if self.unique:
+            info["unique"] = True
+        if self.sparse:
+            info["sparse"] = True
+        if self.parcial is not None:
+            info["partialFilterExpression"] = self.parcial
+        return info
+
+    # ==================== CHAVES ====================
+
+    def chaves_documento(self, documento, id_chave):
+        """Tuplas indexadas de um documento (várias se algum campo for array)"""
+        if self.texto:
+            return []
+        if self.parcial is not None and not corresponde(documento, self.parcial):
+            return []
+
+        por_campo = []
+        presentes = False
+        for campo, direcao in self.chaves:
+            valores = [v for v in candidatos(documento, campo.split(".")) if v is not AUSENTE]
+            presentes = presentes or bool(valores)
+            expandidos = []
+            for valor in valores or [None]:
+                if isinstance(valor, list):
+                    self.multikey = True
+                    expandidos.extend(valor or [None])
+                else:
+                    expandidos.append(valor)
+            unicos = {chave(valor) for valor in expandidos}
+            por_campo.append([Decrescente(c) if direcao == -1 else c for c in unicos])
+
+        if self.sparse and not presentes:
+            return []
+        return [combinacao + (id_chave,) for combinacao in product(*por_campo)]
+
+    # ==================== MANUTENÇÃO ====================
+
+    def _organizar(self):
+        if self._pendentes:
+            self._entradas.extend(self._pendentes)
+            self._pendentes = []
+            self._entradas.sort()
+
+    def verificar_unicidade(self, entradas, id_chave, colecao):
+        """Levanta DuplicateKeyError se outro documento já tiver a mesma chave"""
+        if not self.unique:
+            return
+        for entrada in entradas:
+            dono = self._donos.get(entrada[:-1], id_chave)
+            if dono != id_chave:
+                campos = ", ".join(campo for campo, _ in self.chaves)
+                mensagem = f"E11000 duplicate key error collection: {colecao} index: {self.nome} dup key: {{ {campos} }}"
+                raise DuplicateKeyError(mensagem, 11000, {
+                    "code": 11000, "errmsg": mensagem, "keyPattern": dict(self.chaves)
+                })
+
+    def adicionar(self, id_chave, entradas, lote=False):
+        """
+        Args:
+            lote (bool): Acumula para ordenar de uma vez (insert_many, bulk_write)
+        """
+        self._por_documento[id_chave] = entradas
+        if self.unique:
+            for entrada in entradas:
+                self._donos[entrada[:-1]] = id_chave
+        if lote or self._pendentes or len(entradas) > LIMITE_INSORT:
+            self._pendentes.extend(entradas)
+        else:
+            for entrada in entradas:
+                insort(self._entradas, entrada)
+
+    def remover(self, id_chave):
+        entradas = self._por_documento.pop(id_chave, [])
+        if not entradas:
+            return
+        if self.unique:
+            for entrada in entradas:
+                if self._donos.get(entrada[:-1]) == id_chave:
+                    del self._donos[entrada[:-1]]
+        self._organizar()
+        for entrada in entradas:
+            posicao = bisect_left(self._entradas, entrada)
+            if posicao < len(self._entradas) and self._entradas[posicao] == entrada:
+                del self._entradas[posicao]
+
+    def entradas_de(self, id_chave):
+        return self._por_documento.get(id_chave, [])
+
+    def limpar(self):
+        self._entradas = []
+        self._pendentes = []
+        self._por_documento = {}
+        self._donos = {}
+        self.multikey = False
+
+    # ==================== LEITURA ====================
+
+    def percorrer(self, faixas, reverso=False):
+        """
+        _id (chaves) das entradas dentro das faixas, na ordem do índice
+
+        Args:
+            faixas (list): [(limite inferior, limite superior)] em tuplas de chaves
+            reverso (bool): Ordem inversa
+        """
+        self._organizar()
+        entradas = self._entradas
+        vistos = set()
+        ordem = reversed(faixas) if reverso else faixas
+        for inferior, superior in ordem:
+            inicio = bisect_left(entradas, inferior)
+            fim = bisect_left(entradas, superior)
+            posicoes = range(fim - 1, inicio - 1, -1) if reverso else range(inicio, fim)
+            for posicao in posicoes:
+                id_chave = entradas[posicao][-1]
+                if id_chave not in vistos:
+                    vistos.add(id_chave)
+                    yield id_chave
+
+
+# ==================== PLANEJADOR ====================
+
+def _limites_campo(condicao):
+    """
+    Faixa de um campo do filtro em chaves: lista de (inferior, inclusivo, superior, inclusivo)
+
+    Returns:
+        list ou None: None quando o índice não pode ser usado para a condição
+    """
+    if isinstance(condicao, (list, dict)) and not eh_operador(condicao):
+        return None
+    if not eh_operador(condicao):
+        return [(chave(condicao), True, chave(condicao), True)]
+
+    inferior, inclusivo_inf, superior, inclusivo_sup = None, True, None, True
+    valores_in = None
+    for operador, argumento in condicao.items():
+        if operador == "$eq":
+            if isinstance(argumento, (list, dict)):
+                return None
+            valores_in = [argumento]
+        elif operador == "$in":
+            if any(isinstance(item, (list, dict)) or not _simples(item) for item in argumento):
+                return None
+            valores_in = list(argumento)
+        elif operador in ("$gt", "$gte"):
+            if argumento is None or not _simples(argumento):
+                return None
+            inferior, inclusivo_inf = chave(argumento), operador == "$gte"
+        elif operador in ("$lt", "$lte"):
+            if argumento is None or not _simples(argumento):
+                return None
+            superior, inclusivo_sup = chave(argumento), operador == "$lte"
+        elif operador in ("$comment",):
+            continue
+        else:
+            # $ne, $exists, $regex, $elemMatch...: filtro completo sem índice neste campo
+            return None
+
+    if valores_in is not None:
+        if inferior is not None or superior is not None:
+            return None
+        return [(chave(valor), True, chave(valor), True) for valor in sorted(valores_in, key=chave)]
+
+    if inferior is None and superior is None:
+        return None
+    # Comparações só encontram valores do mesmo tipo
+    ordem = (inferior or superior)[0]
+    if inferior is None:
+        inferior, inclusivo_inf = (ordem, MINIMO), True
+    if superior is None:
+        superior, inclusivo_sup = (ordem, MAXIMO), True
+    return [(inferior, inclusivo_inf, superior, inclusivo_sup)]
+
+
+def _simples(valor):
+    return ordem_tipo(valor) not in (ORDEM_OBJETO, ORDEM_ARRAY)
+
+
+def _igualdade(faixa):
+    inferior, _, superior, _ = faixa
+    return inferior == superior
+
+
+def planejar(indice, filtro):
+    """
+    Faixas do índice que contêm todos os documentos do filtro
+
+    Usa as igualdades (ou $in) dos primeiros campos do índice e uma faixa
+    no campo seguinte. Condições com null não usam índices esparsos.
+
+    Returns:
+        tuple: (faixas, campos com igualdade) ou (None, 0) se o índice não serve
+    """
+    prefixos = [()]
+    iguais = 0
+    usados = 0
+    for campo, direcao in indice.chaves:
+        if campo not in filtro:
+            break
+        limites = _limites_campo(filtro[campo])
+        if limites is None:
+            break
+        if indice.sparse and any(inf[0] == ORDEM_NULL for inf, _, _, _ in limites):
+            break
+        # Num array, $gt e $lt podem ser atendidos por elementos diferentes
+        if indice.multikey and any(inf[1] is not MINIMO and sup[1] is not MAXIMO and inf != sup
+                                   for inf, _, sup, _ in limites):
+            break
+        usados += 1
+
+        if all(_igualdade(faixa) for faixa in limites):
+            valores = [faixa[0] for faixa in limites]
+            if direcao == -1:
+                valores = [Decrescente(valor) for valor in valores]
+            prefixos = [prefixo + (valor,) for prefixo in prefixos for valor in valores]
+            iguais += 1
+            continue
+
+        faixas = []
+        for prefixo in prefixos:
+            for inferior, inclusivo_inf, superior, inclusivo_sup in limites:
+                if direcao == -1:
+                    inferior, inclusivo_inf, superior, inclusivo_sup = (
+                        Decrescente(superior), inclusivo_sup, Decrescente(inferior), inclusivo_inf
+                    )
+                baixo = prefixo + ((inferior,) if inclusivo_inf else (inferior, MAXIMO))
+                alto = prefixo + ((superior, MAXIMO) if inclusivo_sup else (superior,))
+                faixas.append((baixo, alto))
+        return faixas, iguais
+
+    if not usados:
+        return None, 0
+    return [(prefixo, prefixo + (MAXIMO,)) for prefixo in prefixos], iguais
+
+
+def cobre_ordenacao(indice, ordenacao, iguais, faixas):
+    """
+    O índice entrega os documentos já ordenados?
+
+    Returns:
+        bool ou None: False (mesma direção), True (ordem inversa) ou None
+    """
+    if not ordenacao or indice.multikey or not indice.consultavel:
+        return None
+    # Com várias faixas de igualdade ($in) a ordem só vale dentro de cada uma
+    if faixas is not None and len(faixas) > 1:
+        return None
+    campos = indice.chaves[iguais:iguais + len(ordenacao)]
+    if len(campos) < len(ordenacao):
+        return None
+    if all(campo == c and direcao == d for (campo, direcao), (c, d) in zip(campos, ordenacao)):
+        return False
+    if all(campo == c and direcao == -d for (campo, direcao), (c, d) in zip(campos, ordenacao)):
+        return True
+    return None
+
+
+def faixa_completa():
+    """Faixa do índice inteiro"""
+    return [((MINIMO,), (MAXIMO,))]
@@ -0,0 +1,319 @@
+"""
+Valores do Motor em Memória - Calmou API
+Ordem de comparação do BSON, cópia dos documentos gravados e acesso a
+campos por caminho com ponto ("endereco.cidade", "registros.0")
+"""
+
+import re
+from datetime import datetime, timezone
+
+from bson import Decimal128, ObjectId, Regex
+from bson.binary import Binary
+from bson.max_key import MaxKey
+from bson.min_key import MinKey
+from bson.timestamp import Timestamp
+
+
+class _Ausente:
+    """Campo inexistente (diferente de um campo com valor null)"""
+
+    def __repr__(self):
+        return "AUSENTE"
+
+    def __bool__(self):
+        return False
+
+
+AUSENTE = _Ausente()
+
+# Ordem dos tipos nas comparações e ordenações do MongoDB
+ORDEM_MINKEY, ORDEM_NULL, ORDEM_NUMERO, ORDEM_TEXTO, ORDEM_OBJETO, ORDEM_ARRAY = 1, 2, 3, 4, 5, 6
+ORDEM_BINARIO, ORDEM_OBJECTID, ORDEM_BOOLEANO, ORDEM_DATA, ORDEM_TIMESTAMP, ORDEM_REGEX, ORDEM_MAXKEY = (
+    7, 8, 9, 10, 11, 12, 13
+)
+
+# Nomes do $type (consulta e expressão)
+NOMES_TIPOS = {
+    "double": 1, "string": 2, "object": 3, "array": 4, "binData": 5, "objectId": 7,
+    "bool": 8, "date": 9, "null": 10, "regex": 11, "int": 16, "timestamp": 17,
+    "long": 18, "decimal": 19, "minKey": -1, "maxKey": 127
+}
+
+
+class Extremo:
+    """Limite menor (ou maior) que qualquer chave, usado nas faixas dos índices"""
+
+    __slots__ = ("maximo",)
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+
+    def __lt__(self, outro):
+        return not self.maximo and outro is not self
+
+    def __gt__(self, outro):
+        return self.maximo and outro is not self
+
+    def __le__(self, outro):
+        return not self.maximo or outro is self
+
+    def __ge__(self, outro):
+        return self.maximo or outro is self
+
+    def __eq__(self, outro):
+        return outro is self
+
+    def __hash__(self):
+        return id(self)
+
+
+MINIMO = Extremo(False)
+MAXIMO = Extremo(True)
+
+
+class Decrescente:
+    """Chave de um campo descendente do índice: inverte a comparação"""
+
+    __slots__ = ("chave",)
+
+    def __init__(self, chave):
+        self.chave = chave
+
+    def __lt__(self, outro):
+        if isinstance(outro, Extremo):
+            return outro.maximo
+        return outro.chave < self.chave
+
+    def __gt__(self, outro):
+        if isinstance(outro, Extremo):
+            return not outro.maximo
+        return self.chave < outro.chave
+
+    def __eq__(self, outro):
+        return isinstance(outro, Decrescente) and self.chave == outro.chave
+
+    def __hash__(self):
+        return hash(self.chave)
+
+
+def eh_numero(valor):
+    return isinstance(valor, (int, float, Decimal128)) and not isinstance(valor, bool)
+
+
+def ordem_tipo(valor):
+    """Posição do tipo do valor na ordem de comparação do BSON"""
+    if valor is None or valor is AUSENTE:
+        return ORDEM_NULL
+    if isinstance(valor, bool):
+        return ORDEM_BOOLEANO
+    if eh_numero(valor):
+        return ORDEM_NUMERO
+    if isinstance(valor, str):
+        return ORDEM_TEXTO
+    if isinstance(valor, dict):
+        return ORDEM_OBJETO
+    if isinstance(valor, (list, tuple)):
+        return ORDEM_ARRAY
+    if isinstance(valor, ObjectId):
+        return ORDEM_OBJECTID
+    if isinstance(valor, datetime):
+        return ORDEM_DATA
+    if isinstance(valor, (bytes, Binary)):
+        return ORDEM_BINARIO
+    if isinstance(valor, Timestamp):
+        return ORDEM_TIMESTAMP
+    if isinstance(valor, (Regex, re.Pattern)):
+        return ORDEM_REGEX
+    if isinstance(valor, MinKey):
+        return ORDEM_MINKEY
+    if isinstance(valor, MaxKey):
+        return ORDEM_MAXKEY
+    raise TypeError(f"Tipo não suportado pelo motor em memória: {type(valor).__name__}")
+
+
+def tipo_bson(valor):
+    """Número do tipo BSON (o do $type)"""
+    if isinstance(valor, bool):
+        return 8
+    if isinstance(valor, int):
+        return 16 if -2**31 <= valor < 2**31 else 18
+    if isinstance(valor, float):
+        return 1
+    if isinstance(valor, Decimal128):
+        return 19
+    return {
+        ORDEM_NULL: 10, ORDEM_TEXTO: 2, ORDEM_OBJETO: 3, ORDEM_ARRAY: 4, ORDEM_BINARIO: 5,
+        ORDEM_OBJECTID: 7, ORDEM_DATA: 9, ORDEM_TIMESTAMP: 17, ORDEM_REGEX: 11,
+        ORDEM_MINKEY: -1, ORDEM_MAXKEY: 127
+    }[ordem_tipo(valor)]
+
+
+def nome_tipo(valor):
+    """Nome do tipo devolvido pela expressão $type ('missing' para campo inexistente)"""
+    if valor is AUSENTE:
+        return "missing"
+    numero = tipo_bson(valor)
+    return next(nome for nome, n in NOMES_TIPOS.items() if n == numero)
+
+
+def _data_utc(data):
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def chave(valor):
+    """
+    Chave comparável e hashable de um valor, na ordem do BSON
+
+    Números de tipos diferentes com o mesmo valor têm a mesma chave (1 == 1.0),
+    e um campo inexistente tem a chave do null.
+    """
+    ordem = ordem_tipo(valor)
+    if ordem == ORDEM_NUMERO:
+        return (ordem, float(valor.to_decimal()) if isinstance(valor, Decimal128) else valor)
+    if ordem in (ORDEM_NULL, ORDEM_MINKEY, ORDEM_MAXKEY):
+        return (ordem, 0)
+    if ordem in (ORDEM_TEXTO, ORDEM_BOOLEANO):
+        return (ordem, valor)
+    if ordem == ORDEM_OBJETO:
+        return (ordem, tuple((k, chave(v)) for k, v in valor.items()))
+    if ordem == ORDEM_ARRAY:
+        return (ordem, tuple(chave(v) for v in valor))
+    if ordem == ORDEM_OBJECTID:
+        return (ordem, valor.binary)
+    if ordem == ORDEM_DATA:
+        return (ordem, _data_utc(valor))
+    if ordem == ORDEM_BINARIO:
+        return (ordem, len(valor), bytes(valor))
+    if ordem == ORDEM_TIMESTAMP:
+        return (ordem, valor.time, valor.inc)
+    return (ordem, valor.pattern)
+
+
+def comparar(a, b):
+    """-1, 0 ou 1 na ordem do BSON"""
+    chave_a, chave_b = chave(a), chave(b)
+    return (chave_a > chave_b) - (chave_a < chave_b)
+
+
+def iguais(a, b):
+    return chave(a) == chave(b)
+
+
+# ==================== CÓPIA ====================
+
+def copiar(valor):
+    """Cópia dos dicts e listas de um valor (os escalares do BSON são imutáveis)"""
+    if isinstance(valor, dict):
+        return {k: copiar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [copiar(v) for v in valor]
+    return valor
+
+
+def normalizar(valor):
+    """
+    Valor como o MongoDB o devolveria depois de gravado
+
+    Cópia dos dicts e listas (tuplas viram listas), datas em UTC sem fuso e
+    com precisão de milissegundos.
+    """
+    if isinstance(valor, dict):
+        return {str(k): normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [normalizar(v) for v in valor]
+    if isinstance(valor, datetime):
+        valor = _data_utc(valor)
+        return valor.replace(microsecond=valor.microsecond // 1000 * 1000)
+    if isinstance(valor, re.Pattern):
+        return Regex(valor.pattern)
+    return valor
+
+
+# ==================== CAMINHOS ====================
+
+def obter(valor, caminho):
+    """
+    Valor de um caminho como nas expressões de agregação ("$a.b")
+
+    Um array no meio do caminho devolve a lista dos valores do restante do
+    caminho em cada elemento (os elementos sem o campo são omitidos).
+
+    Returns:
+        O valor, ou AUSENTE
+    """
+    partes = caminho.split(".") if isinstance(caminho, str) else caminho
+    for indice, parte in enumerate(partes):
+        if isinstance(valor, dict):
+            valor = valor.get(parte, AUSENTE)
+        elif isinstance(valor, list):
+            resto = partes[indice:]
+            itens = (obter(elemento, resto) for elemento in valor if isinstance(elemento, (dict, list)))
+            return [item for item in itens if item is not AUSENTE]
+        else:
+            return AUSENTE
+    return valor
+
+
+def obter_direto(valor, caminho):
+    """Valor de um caminho sem expandir arrays (índices numéricos acessam elementos)"""
+    for parte in caminho.split("."):
+        if isinstance(valor, dict):
+            valor = valor.get(parte, AUSENTE)
+        elif isinstance(valor, list) and parte.isdigit():
+            posicao = int(parte)
+            valor = valor[posicao] if posicao < len(valor) else AUSENTE
+        else:
+            return AUSENTE
+    return valor
+
+
+def definir(documento, caminho, valor):
+    """Grava valor no caminho, criando os documentos intermediários"""
+    partes = caminho.split(".")
+    atual = documento
+    for parte in partes[:-1]:
+        if isinstance(atual, list) and parte.isdigit():
+            posicao = int(parte)
+            atual.extend([None] * (posicao + 1 - len(atual)))
+            if not isinstance(atual[posicao], (dict, list)):
+                atual[posicao] = {}
+            atual = atual[posicao]
+        elif isinstance(atual, dict):
+            proximo = atual.get(parte)
+            if not isinstance(proximo, (dict, list)):
+                proximo = atual[parte] = {}
+            atual = proximo
+        else:
+            raise ValueError(f"Não é possível criar o campo '{caminho}'")
+
+    ultima = partes[-1]
+    if isinstance(atual, list) and ultima.isdigit():
+        posicao = int(ultima)
+        atual.extend([None] * (posicao + 1 - len(atual)))
+        atual[posicao] = valor
+    elif isinstance(atual, dict):
+        atual[ultima] = valor
+    else:
+        raise ValueError(f"Não é possível criar o campo '{caminho}'")
+
+
+def remover(documento, caminho):
+    """
+    Remove o campo do caminho ($unset)
+
+    Returns:
+        bool: True se o campo existia
+    """
+    partes = caminho.split(".")
+    pai = obter_direto(documento, ".".join(partes[:-1])) if len(partes) > 1 else documento
+    ultima = partes[-1]
+    if isinstance(pai, dict) and ultima in pai:
+        del pai[ultima]
+        return True
+    if isinstance(pai, list) and ultima.isdigit() and int(ultima) < len(pai):
+        # $unset de um elemento de array grava null, como no MongoDB
+        pai[int(ultima)] = None
+        return True
+    return False
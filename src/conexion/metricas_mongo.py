@@ -0,0 +1,81 @@
+"""
+Métricas dos Comandos do MongoDB - Calmou API
+CommandListener que registra a duração, o tamanho da resposta e as falhas
+de cada comando, por nome do comando e coleção (src/utils/metricas.py)
+
+Variáveis de ambiente:
+    METRICAS_TAMANHO_RESPOSTAS   fração das respostas com o tamanho medido
+                                 (padrão 0, desligado; ex.: 0.01). A medição
+                                 recodifica a resposta em BSON na thread da
+                                 requisição, então só uma amostra é medida
+"""
+
+import os
+import random
+
+import bson
+from pymongo.monitoring import CommandListener
+
+from src.utils.metricas import obter_registro
+
+# Comandos de monitoramento e autenticação não entram nas métricas
+COMANDOS_IGNORADOS = {"hello", "ismaster", "isMaster", "saslStart", "saslContinue", "endSessions"}
+
+
+def colecao_do_comando(nome, comando):
+    """Coleção alvo de um comando ('' para comandos do banco, como ping)"""
+    if nome == "getMore":
+        return comando.get("collection", "")
+    alvo = comando.get(nome)
+    return alvo if isinstance(alvo, str) else ""
+
+
+class MonitorComandos(CommandListener):
+    """Registra duração, tamanho da resposta e falhas por comando e coleção"""
+
+    def __init__(self, registro):
+        self.registro = registro
+        self.amostra_tamanho = float(os.getenv("METRICAS_TAMANHO_RESPOSTAS", "0"))
+        # (conexão, request_id) -> coleção, entre o início e o fim do comando
+        self._em_curso = {}
+
+    def started(self, event):
+        if event.command_name not in COMANDOS_IGNORADOS:
+            self._em_curso[(event.connection_id, event.request_id)] = colecao_do_comando(
+                event.command_name, event.command
+            )
+
+    def _rotulos(self, event):
+        colecao = self._em_curso.pop((event.connection_id, event.request_id), None)
+        if colecao is None:
+            return None
+        return (("comando", event.command_name), ("colecao", colecao))
+
+    def succeeded(self, event):
+        rotulos = self._rotulos(event)
+        if rotulos is None:
+            return
+        self.registro.observar("calmou_mongo_comando_duracao_segundos", rotulos, event.duration_micros / 1e6)
+        # A amostra mantém a distribuição dos tamanhos; a contagem do histograma é a da amostra
+        if self.amostra_tamanho > 0 and random.random() < self.amostra_tamanho:
+            self.registro.observar("calmou_mongo_resposta_bytes", rotulos, len(bson.encode(event.reply)))
+
+    def failed(self, event):
+        rotulos = self._rotulos(event)
+        if rotulos is None:
+            return
+        self.registro.observar("calmou_mongo_comando_duracao_segundos", rotulos, event.duration_micros / 1e6)
+        self.registro.incrementar("calmou_mongo_comandos_falhas_total", rotulos)
+
+
+def ouvintes_metricas():
+    """
+    Listeners de métricas para o event_listeners do MongoClient
+
+    Returns:
+        list: Vazia se METRICAS_ATIVAS=0
+    """
+    registro = obter_registro()
+    if not registro.ativo:
+        return []
+    return [MonitorComandos(registro)]
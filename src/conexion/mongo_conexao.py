@@ -1,15 +1,35 @@
 """
 Módulo de Conexão com MongoDB
 Gerencia a conexão singleton com o banco de dados MongoDB
+
+O cliente é criado na primeira utilização, sem acessar o servidor: a
+conexão é aberta pelo driver na primeira operação. Ele é recriado quando
+o processo muda (fork do gunicorn), e cada worker usa o próprio MongoClient.
+A disponibilidade do servidor fica em prontidao_mongo() / verificar_mongo().
+
+Com ARMAZENAMENTO=memoria o cliente é o do motor em memória
+(src/conexion/memoria), com a mesma interface para os controllers.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import pymongo
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.monitoring import ConnectionCheckOutFailedReason, ConnectionPoolListener
 import os
-from dotenv import load_dotenv
-
-# Carregar variáveis de ambiente
-load_dotenv()
+import threading
+import time
+
+from src.conexion.configuracao_mongo import (
+    PERFIS, armazenamento_ativo, carregar_ambiente, opcoes_cliente, perfil_ativo
+)
+from src.conexion.disjuntor import ouvintes_disjuntor
+from src.conexion.metricas_mongo import ouvintes_metricas
+from src.conexion.operacoes_lentas import ouvintes_operacoes_lentas
+from src.conexion.tempo_mongo import ouvintes_tempo_mongo
+from src.conexion.prontidao import (
+    ESTADO_INDISPONIVEL, ESTADO_PRONTO, EstadoProntidao, tentar_com_backoff,
+    tentativas_inicializacao, timeout_ping
+)
 
 class MongoDBConnection:
     """
@@ -18,6 +38,10 @@ class MongoDBConnection:
     _instance = None
     _client = None
     _db = None
+    _pid = None
+    _colecoes = {}
+    _perfil = None
+    _prontidao = None
 
     def __new__(cls):
         """Implementa o padrão Singleton"""
@@ -26,42 +50,139 @@ class MongoDBConnection:
         return cls._instance
 
     def __init__(self):
-        """Inicializa a conexão apenas uma vez"""
-        if self._client is None:
+        """Cria o cliente uma vez por processo"""
+        if self._client is None or self._pid != os.getpid():
             self._conectar()
 
     def _conectar(self):
-        """Estabelece conexão com o MongoDB"""
+        """Cria o cliente do processo atual (sem esperar pelo servidor)"""
         try:
+            # Um cliente herdado do processo pai não pode ser usado nem fechado
+            # no filho: a referência é apenas descartada
+            self._descartar()
+            carregar_ambiente()
+
             mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
             db_name = os.getenv("MONGO_DB_NAME", "calmou_db")
 
-            # Configurações de timeout
-            self._client = MongoClient(
-                mongo_uri,
-                serverSelectionTimeoutMS=5000,  # 5 segundos
-                connectTimeoutMS=5000,
-                socketTimeoutMS=5000
+            if armazenamento_ativo() == "memoria":
+                # Sem servidor, pool nem eventos de comando: o motor soma o
+                # próprio tempo em tempo_mongo.py
+                from src.conexion.memoria import obter_cliente_memoria
+                self._client = obter_cliente_memoria()
+                self._db = self._client[db_name]
+                self._pid = os.getpid()
+                self._prontidao = EstadoProntidao()
+                return
+
+            # Pool, timeouts, compressão e concerns do perfil (configuracao_mongo.py);
+            # na API, o pool e os heartbeats alimentam o disjuntor (disjuntor.py)
+            # e os comandos, as métricas do /metrics (metricas_mongo.py) e o
+            # tempo no MongoDB do log das requisições (tempo_mongo.py).
+            # Em todos os perfis, os comandos lentos vão para operacoes_lentas.py
+            ouvintes = (
+                ouvintes_disjuntor() + ouvintes_metricas() + ouvintes_tempo_mongo()
+                if self.perfil == "api" else []
             )
-
-            # Testa a conexão
-            self._client.admin.command('ping')
+            ouvintes += ouvintes_operacoes_lentas(lambda nome: self._client[nome])
+            self._client = MongoClient(mongo_uri, event_listeners=ouvintes, **opcoes_cliente(self.perfil))
 
             # Seleciona o banco de dados
             self._db = self._client[db_name]
+            self._pid = os.getpid()
+            self._prontidao = EstadoProntidao()
 
-            print(f"✅ Conectado ao MongoDB: {db_name}")
-
-        except ConnectionFailure as e:
-            print(f"❌ Erro ao conectar ao MongoDB: {e}")
-            raise
-        except ServerSelectionTimeoutError as e:
-            print(f"❌ Timeout ao conectar ao MongoDB. Verifique se o MongoDB está rodando.")
-            raise
         except Exception as e:
-            print(f"❌ Erro inesperado ao conectar: {e}")
+            # Só erros de configuração (URI ou opções inválidas) chegam aqui
+            print(f"❌ Erro ao configurar a conexão com o MongoDB: {e}")
             raise
 
+    @property
+    def perfil(self):
+        """Perfil de conexão em uso (api, cli ou lote)"""
+        return self._perfil or perfil_ativo()
+
+    def _descartar(self):
+        """Esquece o cliente atual sem fechá-lo"""
+        self._client = None
+        self._db = None
+        self._colecoes = {}
+
+    def _ping(self):
+        """Ping limitado a MONGO_PING_TIMEOUT_MS (inclui a seleção do servidor)"""
+        with pymongo.timeout(timeout_ping()):
+            self._client.admin.command('ping')
+
+    def verificar_conexao(self, tentativas=1, respeitar_backoff=False):
+        """
+        Testa a conexão com novas tentativas em backoff exponencial com jitter
+
+        Args:
+            tentativas (int): Máximo de pings
+            respeitar_backoff (bool): Não tenta de novo antes de terminar o
+                backoff da última falha (health checks frequentes)
+
+        Returns:
+            bool: True se o servidor respondeu
+        """
+        if respeitar_backoff and not self._prontidao.pode_tentar():
+            return False
+
+        estado_anterior = self._prontidao.estado
+        pronto = tentar_com_backoff(self._ping, self._prontidao, tentativas)
+        if pronto and estado_anterior != ESTADO_PRONTO:
+            print(f"✅ Conectado ao MongoDB: {self._db.name} (perfil {self.perfil})")
+        elif not pronto and estado_anterior != ESTADO_INDISPONIVEL:
+            print(f"❌ MongoDB indisponível: {self._prontidao.ultimo_erro}")
+        return pronto
+
+    def prontidao(self):
+        """
+        Returns:
+            dict: Estado da conexão deste processo (ver prontidao.EstadoProntidao)
+        """
+        return self._prontidao.resumo()
+
+    def reconectar(self, aquecer=0):
+        """
+        Cria um cliente novo para o processo atual e espera o servidor
+
+        Usado no post_fork do gunicorn: o worker não reaproveita nada do
+        cliente do processo mestre. Se o servidor não responder após
+        MONGO_RETRY_TENTATIVAS, o worker segue indisponível (sem exceção)
+        e o driver conecta na primeira operação que der certo.
+
+        Args:
+            aquecer (int): Conexões abertas no pool logo após conectar
+
+        Returns:
+            bool: True se o servidor respondeu
+        """
+        self._conectar()
+        pronto = self.verificar_conexao(tentativas_inicializacao())
+        if pronto and aquecer > 0:
+            self.aquecer_pool(aquecer)
+        return pronto
+
+    def aquecer_pool(self, conexoes):
+        """
+        Abre conexões no pool antes da primeira requisição
+
+        Executa pings simultâneos (um por thread) para que o pool crie
+        uma conexão para cada um
+
+        Args:
+            conexoes (int): Quantidade de pings simultâneos
+        """
+        barreira = threading.Barrier(conexoes)
+
+        def pingar(_):
+            barreira.wait(timeout=5)
+            self._client.admin.command('ping')
+
+        with ThreadPoolExecutor(max_workers=conexoes) as executor:
+            list(executor.map(pingar, range(conexoes)))
+
     def get_database(self):
         """
         Retorna a instância do banco de dados
@@ -69,7 +190,7 @@ class MongoDBConnection:
         Returns:
             Database: Objeto de banco de dados do MongoDB
         """
-        if self._db is None:
+        if self._db is None or self._pid != os.getpid():
             self._conectar()
         return self._db
 
@@ -83,13 +204,18 @@ class MongoDBConnection:
         Returns:
             Collection: Objeto de coleção do MongoDB
         """
-        return self._db[collection_name]
+        colecao = self._colecoes.get(collection_name)
+        if colecao is None:
+            colecao = self.get_database()[collection_name]
+            self._colecoes[collection_name] = colecao
+        return colecao
 
     def fechar_conexao(self):
-        """Fecha a conexão com o MongoDB"""
-        if self._client:
+        """Fecha a conexão com o MongoDB (a próxima utilização reconecta)"""
+        if self._client and self._pid == os.getpid():
             self._client.close()
             print("🔌 Conexão com MongoDB fechada")
+        self._descartar()
 
     def contar_documentos(self, collection_name):
         """
@@ -116,7 +242,7 @@ class MongoDBConnection:
             list: Lista com nomes das coleções
         """
         try:
-            return self._db.list_collection_names()
+            return self.get_database().list_collection_names()
         except Exception as e:
             print(f"❌ Erro ao listar coleções: {e}")
             return []
@@ -148,9 +274,55 @@ def conectar_mongo():
     return conexao.get_database()
 
 def fechar_mongo():
-    """Função de conveniência para fechar a conexão"""
-    conexao = MongoDBConnection()
-    conexao.fechar_conexao()
+    """Função de conveniência para fechar a conexão (sem abrir uma nova)"""
+    if MongoDBConnection._instance is not None:
+        MongoDBConnection._instance.fechar_conexao()
+
+def usar_perfil_mongo(perfil):
+    """
+    Define o perfil de conexão do processo (api, cli ou lote)
+
+    Deve ser chamado antes da primeira consulta; uma conexão já aberta
+    com outro perfil é fechada e refeita na próxima utilização.
+
+    Args:
+        perfil (str): Nome do perfil em src.conexion.configuracao_mongo.PERFIS
+    """
+    opcoes_cliente(perfil)  # valida o nome
+    if MongoDBConnection._perfil != perfil:
+        fechar_mongo()
+        MongoDBConnection._perfil = perfil
+
+def reconectar_mongo(aquecer=0):
+    """
+    Função de conveniência para recriar o cliente no processo atual
+
+    Args:
+        aquecer (int): Conexões abertas no pool logo após conectar
+
+    Returns:
+        bool: True se o servidor respondeu
+    """
+    conexao = MongoDBConnection.__new__(MongoDBConnection)
+    return conexao.reconectar(aquecer)
+
+def verificar_mongo(tentativas=1, respeitar_backoff=True):
+    """
+    Função de conveniência para testar a conexão (health checks)
+
+    Returns:
+        bool: True se o servidor respondeu
+    """
+    return MongoDBConnection().verificar_conexao(tentativas, respeitar_backoff)
+
+def prontidao_mongo():
+    """
+    Função de conveniência para o estado da conexão deste processo
+
+    Returns:
+        dict: estado, falhas_consecutivas, ultimo_erro, desde, proxima_tentativa_em_s
+    """
+    return MongoDBConnection().prontidao()
 
 def obter_colecao(collection_name):
     """
@@ -165,20 +337,175 @@ def obter_colecao(collection_name):
     conexao = MongoDBConnection()
     return conexao.get_collection(collection_name)
 
-# ==================== TESTE DE CONEXÃO ====================
+# ==================== BENCHMARK ====================
 
-if __name__ == "__main__":
-    """Teste de conexão ao MongoDB"""
+class MonitorPool(ConnectionPoolListener):
+    """Mede a espera por uma conexão livre do pool (checkout) em cada operação"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.esperas_ms = []
+        self.criadas = 0
+        self.timeouts = 0
+
+    def connection_check_out_started(self, event):
+        self._local.inicio = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        espera = (time.perf_counter() - self._local.inicio) * 1000
+        with self._lock:
+            self.esperas_ms.append(espera)
+
+    def connection_check_out_failed(self, event):
+        if event.reason == ConnectionCheckOutFailedReason.TIMEOUT:
+            with self._lock:
+                self.timeouts += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.criadas += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def _percentil(valores, p):
+    """Percentil p (0-100) de uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def _medir_etapa(nome, operacao, operacoes, threads):
+    """
+    Executa operacao(i) para i em range(operacoes) com N threads
+
+    Returns:
+        dict: Operações por segundo e latências em ms
+    """
+    def cronometrar(i):
+        inicio = time.perf_counter()
+        operacao(i)
+        return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencias = sorted(executor.map(cronometrar, range(operacoes)))
+    duracao = time.perf_counter() - inicio
+
+    resultado = {
+        'etapa': nome,
+        'threads': threads,
+        'operacoes': operacoes,
+        'ops_por_s': round(operacoes / duracao, 1),
+        'latencia_p50_ms': round(_percentil(latencias, 50), 3),
+        'latencia_p99_ms': round(_percentil(latencias, 99), 3)
+    }
+    print(
+        f"  {nome:<22} {resultado['ops_por_s']:>10.1f} ops/s"
+        f"   p50 {resultado['latencia_p50_ms']:>8.3f} ms   p99 {resultado['latencia_p99_ms']:>8.3f} ms"
+    )
+    return resultado
+
+
+def benchmark_conexao(threads=8, operacoes=2000):
+    """
+    Mede o perfil de conexão ativo: latência de ida e volta (ping),
+    vazão de insert_one e find_one e espera por conexão no pool
+
+    Usa um cliente próprio e a coleção temporária _benchmark_conexao,
+    removida ao final.
+
+    Args:
+        threads (int): Threads simultâneas nas etapas de insert e find
+        operacoes (int): Operações por etapa
+
+    Returns:
+        dict: Resultados por etapa e do pool
+    """
+    perfil = MongoDBConnection._perfil or perfil_ativo()
+    opcoes = opcoes_cliente(perfil)
+    monitor = MonitorPool()
+
+    print(f"\n⚙️  Perfil {perfil}: {opcoes}\n")
+
+    cliente = MongoClient(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017/"),
+        event_listeners=[monitor],
+        **opcoes
+    )
+    colecao = cliente[os.getenv("MONGO_DB_NAME", "calmou_db")]["_benchmark_conexao"]
+    texto = "x" * 200
+
+    try:
+        colecao.drop()
+        etapas = [
+            _medir_etapa("ping (1 thread)", lambda i: cliente.admin.command('ping'), min(operacoes, 500), 1),
+            _medir_etapa("insert_one", lambda i: colecao.insert_one({"_id": i, "n": i, "texto": texto}),
+                         operacoes, threads),
+            _medir_etapa("find_one por _id", lambda i: colecao.find_one({"_id": (i * 7919) % operacoes}),
+                         operacoes, threads)
+        ]
+
+        esperas = sorted(monitor.esperas_ms)
+        pool = {
+            'checkouts': len(esperas),
+            'conexoes_criadas': monitor.criadas,
+            'timeouts_espera': monitor.timeouts,
+            'espera_p50_ms': round(_percentil(esperas, 50), 3),
+            'espera_p99_ms': round(_percentil(esperas, 99), 3),
+            'espera_max_ms': round(esperas[-1], 3) if esperas else 0.0
+        }
+        print(
+            f"\n  pool: {pool['conexoes_criadas']} conexões criadas, {pool['checkouts']} checkouts,"
+            f" espera p50 {pool['espera_p50_ms']} ms / p99 {pool['espera_p99_ms']} ms"
+            f" / máx {pool['espera_max_ms']} ms, {pool['timeouts_espera']} timeouts"
+        )
+        return {'perfil': perfil, 'etapas': etapas, 'pool': pool}
+
+    finally:
+        colecao.drop()
+        cliente.close()
+
+def testar_conexao():
+    """
+    Teste de conexão ao MongoDB
+
+    Returns:
+        bool: True se o servidor respondeu ao ping
+    """
     print("\n" + "="*50)
     print("TESTE DE CONEXÃO MongoDB")
     print("="*50 + "\n")
 
     try:
-        # Testa conexão
-        db = conectar_mongo()
+        # O cliente conecta sob demanda: o ping confirma que o servidor responde
+        conectar_mongo()
+        conexao = MongoDBConnection()
+        if not conexao.verificar_conexao(respeitar_backoff=False):
+            print("\n❌ Teste falhou: MongoDB não respondeu")
+            return False
 
         # Lista coleções
-        conexao = MongoDBConnection()
         colecoes = conexao.listar_colecoes()
 
         print(f"\n📚 Coleções existentes: {colecoes if colecoes else 'Nenhuma'}")
@@ -191,8 +518,43 @@ if __name__ == "__main__":
                 print(f"  - {col}: {count} documentos")
 
         print("\n✅ Teste concluído com sucesso!")
+        return True
 
     except Exception as e:
         print(f"\n❌ Erro no teste: {e}")
+        return False
     finally:
         fechar_mongo()
+
+# ==================== TESTE DE CONEXÃO ====================
+
+if __name__ == "__main__":
+    """
+    Teste de conexão ao MongoDB
+
+    Uso:
+        python -m src.conexion.mongo_conexao
+        python -m src.conexion.mongo_conexao --benchmark --perfil api --threads 8 --operacoes 2000
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Teste e benchmark da conexão com o MongoDB")
+    parser.add_argument("--benchmark", action="store_true", help="Mede latência, vazão e espera no pool")
+    parser.add_argument("--perfil", choices=list(PERFIS), help="Perfil de conexão (padrão: MONGO_PERFIL ou api)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads simultâneas no benchmark")
+    parser.add_argument("--operacoes", type=int, default=2000, help="Operações por etapa do benchmark")
+    args = parser.parse_args()
+
+    if args.perfil:
+        usar_perfil_mongo(args.perfil)
+
+    if args.benchmark:
+        print("\n" + "="*50)
+        print("BENCHMARK DE CONEXÃO MongoDB")
+        print("="*50)
+        try:
+            benchmark_conexao(args.threads, args.operacoes)
+        except Exception as e:
+            print(f"\n❌ Erro no benchmark: {e}")
+    else:
+        raise SystemExit(0 if testar_conexao() else 1)
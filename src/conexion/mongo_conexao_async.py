@@ -0,0 +1,157 @@
+"""
+Módulo de Conexão Assíncrona com MongoDB
+Gerencia o cliente Motor (asyncio) usado pela variante ASGI da API
+"""
+
+import asyncio
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.conexion.configuracao_mongo import armazenamento_ativo, carregar_ambiente, opcoes_cliente
+from src.conexion.prontidao import (
+    ESTADO_INDISPONIVEL, ESTADO_PRONTO, EstadoProntidao, tentar_com_backoff_async,
+    tentativas_inicializacao, timeout_ping
+)
+
+
+class MongoDBConnectionAsync:
+    """
+    Classe singleton para gerenciar o cliente Motor
+
+    O cliente é criado sem teste de conexão; use `await verificar_conexao()`
+    dentro do event loop (por exemplo, no before_serving da aplicação).
+    """
+    _instance = None
+    _client = None
+    _db = None
+    _prontidao = None
+
+    def __new__(cls):
+        """Implementa o padrão Singleton"""
+        if cls._instance is None:
+            cls._instance = super(MongoDBConnectionAsync, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """Cria o cliente apenas uma vez"""
+        if self._client is None:
+            self._conectar()
+
+    def _conectar(self):
+        """Cria o cliente Motor com o perfil de conexão ativo (configuracao_mongo.py)"""
+        carregar_ambiente()
+        if armazenamento_ativo() == "memoria":
+            raise ValueError("ARMAZENAMENTO=memoria não é suportado pela variante assíncrona (use api/app.py)")
+        mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+        db_name = os.getenv("MONGO_DB_NAME", "calmou_db")
+
+        self._client = AsyncIOMotorClient(mongo_uri, **opcoes_cliente())
+        self._db = self._client[db_name]
+        self._prontidao = EstadoProntidao()
+
+    async def _ping(self):
+        """Ping limitado a MONGO_PING_TIMEOUT_MS"""
+        await asyncio.wait_for(self._client.admin.command('ping'), timeout_ping())
+
+    async def verificar_conexao(self, tentativas=1, respeitar_backoff=False):
+        """
+        Testa a conexão com novas tentativas em backoff exponencial com jitter
+
+        Args:
+            tentativas (int): Máximo de pings
+            respeitar_backoff (bool): Não tenta de novo antes de terminar o
+                backoff da última falha (health checks frequentes)
+
+        Returns:
+            bool: True se o servidor respondeu
+        """
+        if respeitar_backoff and not self._prontidao.pode_tentar():
+            return False
+
+        estado_anterior = self._prontidao.estado
+        pronto = await tentar_com_backoff_async(self._ping, self._prontidao, tentativas)
+        if pronto and estado_anterior != ESTADO_PRONTO:
+            print(f"✅ Conectado ao MongoDB (async): {self._db.name}")
+        elif not pronto and estado_anterior != ESTADO_INDISPONIVEL:
+            print(f"❌ MongoDB indisponível (async): {self._prontidao.ultimo_erro}")
+        return pronto
+
+    def prontidao(self):
+        """
+        Returns:
+            dict: Estado da conexão deste processo (ver prontidao.EstadoProntidao)
+        """
+        return self._prontidao.resumo()
+
+    def get_database(self):
+        """
+        Retorna a instância do banco de dados
+
+        Returns:
+            AsyncIOMotorDatabase: Banco de dados do MongoDB
+        """
+        return self._db
+
+    def get_collection(self, collection_name):
+        """
+        Retorna uma coleção específica
+
+        Args:
+            collection_name (str): Nome da coleção
+
+        Returns:
+            AsyncIOMotorCollection: Coleção do MongoDB
+        """
+        return self._db[collection_name]
+
+    def fechar_conexao(self):
+        """Fecha o cliente Motor"""
+        if self._client:
+            self._client.close()
+            print("🔌 Conexão assíncrona com MongoDB fechada")
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+async def conectar_mongo_async():
+    """
+    Obtém o banco de dados esperando o servidor (até MONGO_RETRY_TENTATIVAS)
+
+    Não lança exceção se o servidor estiver fora: o estado fica em
+    prontidao() e o driver conecta na primeira operação que der certo.
+
+    Returns:
+        AsyncIOMotorDatabase: Banco de dados do MongoDB
+    """
+    conexao = MongoDBConnectionAsync()
+    await conexao.verificar_conexao(tentativas_inicializacao())
+    return conexao.get_database()
+
+
+async def verificar_mongo_async(tentativas=1, respeitar_backoff=True):
+    """Função de conveniência para testar a conexão (health checks)"""
+    return await MongoDBConnectionAsync().verificar_conexao(tentativas, respeitar_backoff)
+
+
+def prontidao_mongo_async():
+    """Função de conveniência para o estado da conexão deste processo"""
+    return MongoDBConnectionAsync().prontidao()
+
+
+def fechar_mongo_async():
+    """Função de conveniência para fechar a conexão"""
+    MongoDBConnectionAsync().fechar_conexao()
+
+
+def obter_colecao_async(collection_name):
+    """
+    Função de conveniência para obter uma coleção
+
+    Args:
+        collection_name (str): Nome da coleção
+
+    Returns:
+        AsyncIOMotorCollection: Coleção do MongoDB
+    """
+    return MongoDBConnectionAsync().get_collection(collection_name)
@@ -0,0 +1,397 @@
+"""
+Operações Lentas do MongoDB - Calmou API
+CommandListener que registra os comandos acima de um limite de duração,
+com a forma normalizada da consulta, a coleção, o método que originou a
+chamada e um resumo do explain("executionStats")
+
+O listener só identifica a operação e a coloca numa fila; o explain e a
+gravação no arquivo JSONL (com rotação) são feitos por uma thread à parte,
+então a requisição não espera por eles. Cada processo grava e rotaciona o
+próprio arquivo (<nome>.<pid>.jsonl): a rotação do RotatingFileHandler não
+é segura entre os workers do gunicorn. O explain é amostrado: no máximo
+um por forma de consulta a cada LENTAS_EXPLAIN_INTERVALO_S.
+
+Ranking das formas mais custosas: python scripts/operacoes_lentas.py
+
+Variáveis de ambiente:
+    LENTAS_ATIVO                 1 registra as operações lentas (padrão)
+    LENTAS_LIMITE_MS             duração mínima registrada (padrão 100)
+    LENTAS_ARQUIVO               arquivo JSONL, recebe o pid antes da extensão
+                                 (padrão: logs/operacoes_lentas.jsonl na raiz)
+    LENTAS_ARQUIVO_MAX_BYTES     tamanho para rotação (padrão 10 MB)
+    LENTAS_ARQUIVO_BACKUPS       arquivos antigos mantidos (padrão 5)
+    LENTAS_EXPLAIN               1 executa o explain das operações lentas (padrão)
+    LENTAS_EXPLAIN_INTERVALO_S   intervalo mínimo entre explains da mesma forma (padrão 300)
+    LENTAS_EXPLAIN_TIMEOUT_MS    tempo máximo de cada explain (padrão 5000)
+    LENTAS_FILA                  operações aguardando a thread; o excedente é descartado (padrão 1000)
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import pymongo
+from bson import json_util
+from pymongo.monitoring import CommandListener
+
+from src.utils.log_estruturado import arquivo_do_processo
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DIRETORIO_CONEXAO = os.path.dirname(os.path.abspath(__file__))
+
+# Comandos de monitoramento, autenticação e o próprio explain não são registrados
+COMANDOS_IGNORADOS = {
+    "hello", "ismaster", "isMaster", "saslStart", "saslContinue", "endSessions", "explain", "ping"
+}
+
+# Comandos aceitos pelo explain
+COMANDOS_EXPLICAVEIS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Campos do comando que não fazem parte da forma da consulta (sessão, concerns, lotes)
+CAMPOS_CONTROLE = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+    "startTransaction", "maxTimeMS", "writeConcern", "readConcern", "cursor", "batchSize",
+    "singleBatch", "limit", "skip", "ordered", "comment", "$audit", "bypassDocumentValidation"
+}
+
+# Campos com valores que descrevem a forma (direção da ordenação, campos projetados)
+CAMPOS_LITERAIS = {"sort", "projection", "$sort", "$project", "hint"}
+
+ARQUIVO_PADRAO = os.path.join(RAIZ_PROJETO, "logs", "operacoes_lentas.jsonl")
+
+
+# ==================== FORMA DA CONSULTA ====================
+
+def normalizar(valor, manter_literais=False):
+    """
+    Substitui os valores literais por "?" mantendo campos e operadores
+
+        {"email": "a@b.com", "idade": {"$gt": 30}}  ->  {"email": "?", "idade": {"$gt": "?"}}
+
+    Args:
+        valor: Documento, lista ou valor
+        manter_literais (bool): Mantém os valores (ordenação, projeção)
+
+    Returns:
+        Forma do valor
+    """
+    if isinstance(valor, dict):
+        return {
+            chave: normalizar(v, manter_literais or chave in CAMPOS_LITERAIS)
+            for chave, v in valor.items()
+        }
+    if isinstance(valor, (list, tuple)):
+        if not any(isinstance(item, (dict, list, tuple)) for item in valor):
+            return ["?"] if valor and not manter_literais else list(valor)
+        itens = [normalizar(item, manter_literais) for item in valor]
+        # Vários comandos iguais num lote (updates, deletes) contam como um
+        if len(itens) > 1 and all(item == itens[0] for item in itens):
+            return [itens[0]]
+        return itens
+    if manter_literais and isinstance(valor, (int, float, str, bool)) or valor is None:
+        return valor
+    return "?"
+
+
+def forma_comando(nome, comando):
+    """
+    Forma normalizada de um comando, sem os campos de controle e sem os
+    documentos inseridos
+
+    Returns:
+        dict: Forma da consulta
+    """
+    forma = {}
+    for chave, valor in comando.items():
+        if chave == nome or chave in CAMPOS_CONTROLE:
+            continue
+        if chave == "documents":
+            forma["documents"] = "?"
+            continue
+        forma[chave] = normalizar(valor)
+    return forma
+
+
+def identificador_forma(nome, colecao, forma):
+    """Hash curto de comando + coleção + forma, usado para agrupar no ranking"""
+    texto = json.dumps([nome, colecao, forma], sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:12]
+
+
+def colecao_do_comando(nome, comando):
+    if nome == "getMore":
+        return comando.get("collection", "")
+    alvo = comando.get(nome)
+    return alvo if isinstance(alvo, str) else ""
+
+
+def origem_chamada():
+    """
+    Primeiro método do projeto na pilha, fora da camada de conexão
+    (ex.: ControllerMeditacao.remover_meditacao)
+
+    Só funciona no cliente síncrono, em que o listener é chamado na mesma
+    thread da consulta.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if (arquivo.startswith(RAIZ_PROJETO) and not arquivo.startswith(DIRETORIO_CONEXAO)
+                and "site-packages" not in arquivo):
+            instancia = frame.f_locals.get("self")
+            if instancia is not None:
+                return f"{type(instancia).__name__}.{frame.f_code.co_name}"
+            return f"{os.path.relpath(arquivo, RAIZ_PROJETO)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+# ==================== RESUMO DO EXPLAIN ====================
+
+def _percorrer(valor, estagios, totais):
+    """Coleta os estágios do plano vencedor e soma os contadores do executionStats"""
+    if isinstance(valor, dict):
+        estagio = valor.get("stage")
+        if isinstance(estagio, str) and estagio not in estagios:
+            estagios.append(estagio)
+        # Só o executionStats de cada consulta tem os totais (os estágios repetem nReturned)
+        if "totalDocsExamined" in valor:
+            for chave in totais:
+                totais[chave] += valor.get(chave, 0)
+        for chave, v in valor.items():
+            if chave == "rejectedPlans":
+                continue
+            if chave == "stages" and isinstance(v, list):
+                # Estágios da agregação, na ordem: a consulta ($cursor) e depois
+                # $unwind, $lookup, $group...
+                for item in v:
+                    _percorrer(item, estagios, totais)
+                    for nome in item:
+                        if nome.startswith("$") and nome != "$cursor" and nome not in estagios:
+                            estagios.append(nome)
+                continue
+            _percorrer(v, estagios, totais)
+    elif isinstance(valor, list):
+        for item in valor:
+            _percorrer(item, estagios, totais)
+
+
+def resumir_explain(explain):
+    """
+    Resume a saída do explain("executionStats")
+
+    Returns:
+        dict: estágios do plano, se há COLLSCAN e os totais de documentos
+        e chaves examinados e documentos retornados
+    """
+    estagios = []
+    totais = {"nReturned": 0, "totalKeysExamined": 0, "totalDocsExamined": 0, "executionTimeMillis": 0}
+    _percorrer(explain, estagios, totais)
+
+    return {
+        "estagios": estagios,
+        "collscan": "COLLSCAN" in estagios,
+        "documentos_examinados": totais["totalDocsExamined"],
+        "chaves_examinadas": totais["totalKeysExamined"],
+        "retornados": totais["nReturned"],
+        "tempo_ms": totais["executionTimeMillis"]
+    }
+
+
+# ==================== REGISTRO ====================
+
+class RegistroOperacoesLentas:
+    """Fila e thread que executam os explains e gravam o arquivo JSONL"""
+
+    def __init__(self, obter_banco):
+        """
+        Args:
+            obter_banco (callable): nome -> Database do cliente atual (para o explain)
+        """
+        self.obter_banco = obter_banco
+        self.limite = float(os.getenv("LENTAS_LIMITE_MS", "100")) / 1000
+        self.explain_ativo = os.getenv("LENTAS_EXPLAIN", "1") == "1"
+        self.intervalo_explain = float(os.getenv("LENTAS_EXPLAIN_INTERVALO_S", "300"))
+        self.timeout_explain = float(os.getenv("LENTAS_EXPLAIN_TIMEOUT_MS", "5000")) / 1000
+        self.caminho = os.getenv("LENTAS_ARQUIVO", ARQUIVO_PADRAO)
+        self.max_bytes = int(os.getenv("LENTAS_ARQUIVO_MAX_BYTES", 10 * 1024 * 1024))
+        self.backups = int(os.getenv("LENTAS_ARQUIVO_BACKUPS", "5"))
+        self.tamanho_fila = int(os.getenv("LENTAS_FILA", "1000"))
+        self._reiniciar()
+
+    def _reiniciar(self):
+        """Estado vazio (também chamado no processo filho após o fork)"""
+        self._fila = queue.Queue(maxsize=self.tamanho_fila)
+        self._ultimos_explains = {}
+        self._thread = None
+        self._lock = threading.Lock()
+        self._logger = None
+        self.descartadas = 0
+
+    def _arquivo(self):
+        """Logger com RotatingFileHandler no arquivo deste processo, criado na primeira gravação"""
+        if self._logger is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            logger = logging.getLogger(f"calmou.operacoes_lentas.{os.getpid()}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            manipulador = RotatingFileHandler(
+                arquivo_do_processo(self.caminho), maxBytes=self.max_bytes,
+                backupCount=self.backups, encoding="utf-8"
+            )
+            manipulador.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(manipulador)
+            self._logger = logger
+        return self._logger
+
+    def enfileirar(self, operacao):
+        """Entrega a operação à thread (descarta se a fila estiver cheia)"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._processar, name="operacoes_lentas", daemon=True)
+                    self._thread.start()
+        try:
+            self._fila.put_nowait(operacao)
+        except queue.Full:
+            self.descartadas += 1
+
+    def _processar(self):
+        while True:
+            operacao = self._fila.get()
+            try:
+                if operacao is None:
+                    return
+                self._gravar(operacao)
+            except Exception as e:
+                print(f"⚠️  Operação lenta não registrada: {e}")
+            finally:
+                self._fila.task_done()
+
+    def _deve_explicar(self, operacao):
+        if not self.explain_ativo or operacao["comando"] not in COMANDOS_EXPLICAVEIS:
+            return False
+        pipeline = operacao["_comando"].get("pipeline") or []
+        if any("$out" in estagio or "$merge" in estagio for estagio in pipeline):
+            return False
+        agora = time.monotonic()
+        ultimo = self._ultimos_explains.get(operacao["forma_id"])
+        if ultimo is not None and agora - ultimo < self.intervalo_explain:
+            return False
+        self._ultimos_explains[operacao["forma_id"]] = agora
+        return True
+
+    def _explicar(self, operacao):
+        comando = {
+            chave: valor for chave, valor in operacao["_comando"].items()
+            if chave not in CAMPOS_CONTROLE or chave == "cursor"
+        }
+        with pymongo.timeout(self.timeout_explain):
+            banco = self.obter_banco(operacao["banco"])
+            return banco.command({"explain": comando, "verbosity": "executionStats"})
+
+    def _gravar(self, operacao):
+        if self._deve_explicar(operacao):
+            try:
+                operacao["explain"] = resumir_explain(self._explicar(operacao))
+            except Exception as e:
+                operacao["explain"] = {"erro": str(e)}
+
+        registro = {chave: valor for chave, valor in operacao.items() if not chave.startswith("_")}
+        self._arquivo().info(json_util.dumps(registro, ensure_ascii=False))
+
+    def esvaziar(self, timeout=5.0):
+        """Espera a fila ser gravada (saída do processo)"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._fila.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class MonitorOperacoesLentas(CommandListener):
+    """Identifica os comandos acima do limite e os entrega ao registro"""
+
+    def __init__(self, registro):
+        self.registro = registro
+        # (conexão, request_id) -> comando, entre o início e o fim
+        self._em_curso = {}
+
+    def started(self, event):
+        if event.command_name not in COMANDOS_IGNORADOS:
+            self._em_curso[(event.connection_id, event.request_id)] = event.command
+
+    def _verificar(self, event, erro=None):
+        comando = self._em_curso.pop((event.connection_id, event.request_id), None)
+        if comando is None or event.duration_micros < self.registro.limite * 1e6:
+            return
+
+        nome = event.command_name
+        colecao = colecao_do_comando(nome, comando)
+        forma = forma_comando(nome, comando)
+        operacao = {
+            "data": datetime.now(timezone.utc).isoformat(),
+            "pid": os.getpid(),
+            "banco": event.database_name,
+            "colecao": colecao,
+            "comando": nome,
+            "duracao_ms": round(event.duration_micros / 1000, 3),
+            "forma_id": identificador_forma(nome, colecao, forma),
+            "forma": forma,
+            "origem": origem_chamada(),
+            "erro": erro,
+            "explain": None,
+            "_comando": comando
+        }
+        self.registro.enfileirar(operacao)
+
+    def succeeded(self, event):
+        self._verificar(event)
+
+    def failed(self, event):
+        self._verificar(event, str(event.failure.get("errmsg", event.failure)))
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+_registro = None
+
+
+def _apos_fork():
+    # A thread de gravação não existe no processo filho
+    if _registro is not None:
+        _registro._reiniciar()
+
+
+os.register_at_fork(after_in_child=_apos_fork)
+
+
+def ouvintes_operacoes_lentas(obter_banco):
+    """
+    Listener de operações lentas para o event_listeners do MongoClient
+
+    Args:
+        obter_banco (callable): nome -> Database do cliente atual (para o explain)
+
+    Returns:
+        list: Vazia se LENTAS_ATIVO=0
+    """
+    global _registro
+    if os.getenv("LENTAS_ATIVO", "1") != "1":
+        return []
+    if _registro is None:
+        _registro = RegistroOperacoesLentas(obter_banco)
+        atexit.register(lambda: _registro.esvaziar())
+    else:
+        _registro.obter_banco = obter_banco
+    return [MonitorOperacoesLentas(_registro)]
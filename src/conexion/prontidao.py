@@ -0,0 +1,153 @@
+"""
+Prontidão da Conexão com MongoDB - Calmou API
+Estado da conexão (pronta ou indisponível) e novas tentativas com backoff
+exponencial e jitter, usados pelas conexões síncrona e assíncrona
+
+Variáveis de ambiente:
+    MONGO_RETRY_BASE_MS      atraso base do backoff (padrão 100)
+    MONGO_RETRY_MAX_MS       atraso máximo entre tentativas (padrão 10000)
+    MONGO_RETRY_TENTATIVAS   tentativas na inicialização de um worker (padrão 5)
+    MONGO_PING_TIMEOUT_MS    tempo máximo de cada ping de verificação (padrão 1000)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+ESTADO_NAO_VERIFICADO = "nao_verificado"
+ESTADO_PRONTO = "pronto"
+ESTADO_INDISPONIVEL = "indisponivel"
+
+
+def _env_ms(nome, padrao):
+    return int(os.getenv(nome, padrao)) / 1000
+
+
+def tentativas_inicializacao():
+    """Tentativas de conexão feitas ao iniciar um worker"""
+    return int(os.getenv("MONGO_RETRY_TENTATIVAS", "5"))
+
+
+def timeout_ping():
+    """Tempo máximo, em segundos, de cada ping de verificação"""
+    return _env_ms("MONGO_PING_TIMEOUT_MS", "1000")
+
+
+def atraso_backoff(falhas):
+    """
+    Atraso antes da próxima tentativa ("full jitter")
+
+    Sorteado entre 0 e min(máximo, base x 2^falhas), o que espalha as
+    tentativas de vários workers que perderam a conexão ao mesmo tempo
+
+    Args:
+        falhas (int): Falhas consecutivas até agora
+
+    Returns:
+        float: Segundos
+    """
+    base = _env_ms("MONGO_RETRY_BASE_MS", "100")
+    maximo = _env_ms("MONGO_RETRY_MAX_MS", "10000")
+    return random.uniform(0, min(maximo, base * (2 ** falhas)))
+
+
+class EstadoProntidao:
+    """Estado da conexão de um processo, seguro entre threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.estado = ESTADO_NAO_VERIFICADO
+        self.falhas = 0
+        self.ultimo_erro = None
+        self.desde = time.time()
+        self._proxima_tentativa = 0.0
+
+    @property
+    def pronto(self):
+        return self.estado == ESTADO_PRONTO
+
+    def pode_tentar(self):
+        """False enquanto durar o backoff da última falha"""
+        return time.monotonic() >= self._proxima_tentativa
+
+    def registrar_sucesso(self):
+        """
+        Returns:
+            bool: True se a conexão acabou de ficar pronta
+        """
+        with self._lock:
+            mudou = self.estado != ESTADO_PRONTO
+            if mudou:
+                self.desde = time.time()
+            self.estado = ESTADO_PRONTO
+            self.falhas = 0
+            self.ultimo_erro = None
+            self._proxima_tentativa = 0.0
+            return mudou
+
+    def registrar_falha(self, erro):
+        """
+        Returns:
+            float: Segundos até a próxima tentativa
+        """
+        with self._lock:
+            if self.estado != ESTADO_INDISPONIVEL:
+                self.desde = time.time()
+            self.estado = ESTADO_INDISPONIVEL
+            self.ultimo_erro = str(erro)
+            atraso = atraso_backoff(self.falhas)
+            self.falhas += 1
+            self._proxima_tentativa = time.monotonic() + atraso
+            return atraso
+
+    def resumo(self):
+        """Estado em formato JSON (usado pelo /health)"""
+        return {
+            'estado': self.estado,
+            'falhas_consecutivas': self.falhas,
+            'ultimo_erro': self.ultimo_erro,
+            'desde': self.desde,
+            'proxima_tentativa_em_s': round(max(0.0, self._proxima_tentativa - time.monotonic()), 3)
+        }
+
+
+def tentar_com_backoff(operacao, estado, tentativas=1):
+    """
+    Executa operacao() até dar certo ou esgotar as tentativas
+
+    Args:
+        operacao (callable): Verificação (ex.: ping); qualquer exceção conta como falha
+        estado (EstadoProntidao): Estado atualizado a cada tentativa
+        tentativas (int): Máximo de tentativas
+
+    Returns:
+        bool: True se alguma tentativa deu certo
+    """
+    for tentativa in range(tentativas):
+        try:
+            operacao()
+            estado.registrar_sucesso()
+            return True
+        except Exception as e:
+            atraso = estado.registrar_falha(e)
+            if tentativa < tentativas - 1:
+                print(f"⚠️  MongoDB indisponível ({e}); nova tentativa em {atraso:.2f}s")
+                time.sleep(atraso)
+    return False
+
+
+async def tentar_com_backoff_async(operacao, estado, tentativas=1):
+    """Versão de tentar_com_backoff para corrotinas (await operacao())"""
+    for tentativa in range(tentativas):
+        try:
+            await operacao()
+            estado.registrar_sucesso()
+            return True
+        except Exception as e:
+            atraso = estado.registrar_falha(e)
+            if tentativa < tentativas - 1:
+                print(f"⚠️  MongoDB indisponível ({e}); nova tentativa em {atraso:.2f}s")
+                await asyncio.sleep(atraso)
+    return False
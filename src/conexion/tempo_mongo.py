@@ -0,0 +1,70 @@
+"""
+Tempo no MongoDB por Requisição - Calmou API
+CommandListener que soma a duração dos comandos executados dentro de uma
+medição (ex.: uma requisição HTTP), usada no log estruturado
+
+    token = iniciar_medicao()
+    ...
+    milissegundos, comandos = tempo_mongo()
+    encerrar_medicao(token)
+
+O pymongo síncrono chama o listener na thread que executou o comando, então
+a soma fica num contextvar, como o registro de timeouts de src/utils/prazos.py.
+"""
+
+import contextvars
+
+from pymongo.monitoring import CommandListener
+
+# [microssegundos, comandos] da medição em curso
+_medicao = contextvars.ContextVar("calmou_tempo_mongo", default=None)
+
+
+def iniciar_medicao():
+    """Começa a somar os comandos do contexto atual; retorna o token para encerrar"""
+    return _medicao.set([0, 0])
+
+
+def encerrar_medicao(token):
+    """Encerra a medição iniciada por iniciar_medicao()"""
+    _medicao.reset(token)
+
+
+def tempo_mongo():
+    """
+    Returns:
+        tuple: (milissegundos, comandos) da medição em curso, ou (None, 0) fora dela
+    """
+    medicao = _medicao.get()
+    if medicao is None:
+        return None, 0
+    return round(medicao[0] / 1000, 3), medicao[1]
+
+
+def somar_comando(micros):
+    """Soma um comando na medição em curso (usado também pelo motor em memória)"""
+    medicao = _medicao.get()
+    if medicao is not None:
+        medicao[0] += micros
+        medicao[1] += 1
+
+
+class MonitorTempoMongo(CommandListener):
+    """Soma a duração dos comandos na medição do contexto atual"""
+
+    def started(self, event):
+        pass
+
+    def _somar(self, event):
+        somar_comando(event.duration_micros)
+
+    def succeeded(self, event):
+        self._somar(event)
+
+    def failed(self, event):
+        self._somar(event)
+
+
+def ouvintes_tempo_mongo():
+    """Listeners para o event_listeners do MongoClient"""
+    return [MonitorTempoMongo()]
@@ -0,0 +1,363 @@
+"""
+Buffer de Escrita dos Arrays Embedded - Calmou API
+Agrupa os $push nos arrays dos usuários (histórico de meditações,
+avaliações e notificações) e os grava em lote:
+
+    uma UpdateOne por usuário, com $push: {campo: {$each: [...]}}
+    um bulk_write(ordered=False) a cada PUSH_INTERVALO_MS ou PUSH_MAX_EVENTOS
+
+Eventos gravados fora do documento do usuário (ex.: os buckets de humor de
+controller_humor.py) usam uma coleção de destino registrada com
+registrar_destino(); as operações dela são montadas por usuário e gravadas
+num bulk_write próprio, depois do lote de usuarios.
+
+Modos (PUSH_MODO):
+    sincrono   cada evento é um update_one confirmado antes da resposta (padrão)
+    buffer     o evento fica em memória e é gravado pela thread do buffer;
+               uma queda do processo perde os eventos ainda não gravados
+
+No modo buffer o controller não sabe se o usuário existe e quem lê logo
+depois de escrever pode não ver o evento até a próxima gravação. A ordem
+dos eventos de cada usuário é mantida. Uma falha de rede devolve o lote ao
+buffer (até PUSH_TENTATIVAS vezes); um erro de escrita de um usuário (ex.:
+validação do schema) descarta só os eventos dele. O buffer é esvaziado na
+saída do processo (atexit e worker_exit do gunicorn).
+
+Variáveis de ambiente:
+    PUSH_MODO             sincrono ou buffer (padrão sincrono)
+    PUSH_INTERVALO_MS     intervalo entre gravações (padrão 100)
+    PUSH_MAX_EVENTOS      eventos pendentes que antecipam a gravação (padrão 500)
+    PUSH_MAX_PENDENTES    eventos em memória; acima disso quem adiciona
+                          espera a próxima gravação (padrão 20000)
+    PUSH_TENTATIVAS       tentativas de um lote após falha de rede (padrão 3)
+    PUSH_TIMEOUT_MS       prazo de cada bulk_write (padrão 5000)
+"""
+
+import atexit
+import os
+import threading
+import time
+
+import pymongo
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.conexion.mongo_conexao import obter_colecao
+from src.controller.controller_estatisticas import ControllerEstatisticas
+from src.utils.metricas import obter_registro
+
+MODO_SINCRONO = "sincrono"
+MODO_BUFFER = "buffer"
+
+# Código de erro do MongoDB para chave duplicada
+CHAVE_DUPLICADA = 11000
+
+_estatisticas = ControllerEstatisticas()
+
+# Coleção de destino -> função (usuario_id, subdocumentos) -> operações
+_destinos = {}
+
+
+def registrar_destino(colecao, montar_operacoes):
+    """
+    Registra uma coleção que recebe eventos do buffer fora do documento do usuário
+
+    Args:
+        colecao (str): Nome da coleção
+        montar_operacoes (callable): (usuario_id, subdocumentos) -> operações de bulk_write
+    """
+    _destinos[colecao] = montar_operacoes
+
+
+def _novo_item():
+    # incrementos: destino (None para usuarios) -> operações de estatísticas
+    return {"push": {}, "set": {}, "destinos": {}, "incrementos": {}, "eventos": 0, "tentativas": 0}
+
+
+def _mesclar(item, novo):
+    """Acrescenta os eventos de novo aos de item"""
+    for campo, docs in novo["push"].items():
+        item["push"].setdefault(campo, []).extend(docs)
+    for destino, docs in novo["destinos"].items():
+        item["destinos"].setdefault(destino, []).extend(docs)
+    for destino, operacoes in novo["incrementos"].items():
+        item["incrementos"].setdefault(destino, []).extend(operacoes)
+    item["set"].update(novo["set"])
+    item["eventos"] += novo["eventos"]
+
+
+def _parte_destino(item, destino):
+    """Item só com os eventos de uma coleção de destino"""
+    parte = _novo_item()
+    parte["destinos"][destino] = item["destinos"][destino]
+    parte["incrementos"][destino] = item["incrementos"].get(destino, [])
+    parte["eventos"] = len(item["destinos"][destino])
+    parte["tentativas"] = item["tentativas"]
+    return parte
+
+
+class BufferPush:
+    """Eventos $push pendentes por usuário e a thread que os grava"""
+
+    def __init__(self):
+        """Lê a configuração das variáveis de ambiente"""
+        self.modo = os.getenv("PUSH_MODO", MODO_SINCRONO)
+        self.intervalo = int(os.getenv("PUSH_INTERVALO_MS", 100)) / 1000
+        self.max_eventos = int(os.getenv("PUSH_MAX_EVENTOS", 500))
+        self.max_pendentes = int(os.getenv("PUSH_MAX_PENDENTES", 20000))
+        self.tentativas = int(os.getenv("PUSH_TENTATIVAS", 3))
+        self.timeout = int(os.getenv("PUSH_TIMEOUT_MS", 5000)) / 1000
+        self._reiniciar()
+
+    def _reiniciar(self):
+        """Estado vazio (também chamado no processo filho após o fork)"""
+        self._pendentes = {}   # usuario_id -> item (ver _novo_item)
+        self._eventos = 0
+        self._condicao = threading.Condition()
+        self._thread = None
+        self._parar = False
+
+    @property
+    def ativo(self):
+        return self.modo == MODO_BUFFER
+
+    # ==================== ENTRADA ====================
+
+    def adicionar(self, usuario_id, campo, subdocumento, definir=None, incrementos=None, destino=None):
+        """
+        Aceita um evento para gravação em lote
+
+        Args:
+            usuario_id (ObjectId): ID do usuário
+            campo (str): Array embedded (ex.: 'historico_meditacoes'); ignorado com destino
+            subdocumento (dict): Elemento acrescentado ao array (ou à coleção de destino)
+            definir (dict): Campos de $set do usuário (o último valor vale)
+            incrementos (list): Operações de estatísticas aplicadas depois da gravação
+            destino (str, optional): Coleção registrada com registrar_destino()
+        """
+        with self._condicao:
+            # Contrapressão: com o banco lento a memória não cresce sem limite
+            while self._eventos >= self.max_pendentes and not self._parar:
+                self._condicao.notify_all()
+                self._condicao.wait(self.intervalo)
+
+            item = self._pendentes.get(usuario_id)
+            if item is None:
+                item = self._pendentes[usuario_id] = _novo_item()
+            if destino is None:
+                item["push"].setdefault(campo, []).append(subdocumento)
+            else:
+                item["destinos"].setdefault(destino, []).append(subdocumento)
+            if definir:
+                item["set"].update(definir)
+            if incrementos:
+                item["incrementos"].setdefault(destino, []).extend(incrementos)
+            item["eventos"] += 1
+            self._eventos += 1
+
+            if self._eventos >= self.max_eventos:
+                self._condicao.notify_all()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="buffer_push", daemon=True)
+                self._thread.start()
+
+    def pendentes(self):
+        """Eventos aguardando gravação"""
+        return self._eventos
+
+    # ==================== GRAVAÇÃO ====================
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                if not self._parar and self._eventos < self.max_eventos:
+                    self._condicao.wait(self.intervalo)
+                lote, self._pendentes, self._eventos = self._pendentes, {}, 0
+                parar = self._parar
+
+            if lote:
+                self._gravar(lote)
+
+            with self._condicao:
+                # Acorda quem espera espaço (contrapressão) ou o fim do esvaziamento
+                self._condicao.notify_all()
+                if parar and not self._pendentes:
+                    self._thread = None
+                    return
+
+    def _gravar(self, lote):
+        usuarios = list(lote.items())
+        registro = obter_registro()
+        inicio = time.perf_counter()
+
+        # Documento do usuário: arrays embedded e $set
+        indices, operacoes = [], []
+        for indice, (usuario_id, item) in enumerate(usuarios):
+            atualizacao = {}
+            if item["push"]:
+                atualizacao["$push"] = {campo: {"$each": docs} for campo, docs in item["push"].items()}
+            if item["set"]:
+                atualizacao["$set"] = item["set"]
+            if atualizacao:
+                indices.append(indice)
+                operacoes.append(UpdateOne({"_id": usuario_id}, atualizacao))
+
+        falhas = self._bulk("usuarios", indices, operacoes)
+        if falhas is None:
+            self._devolver(usuarios)
+            return
+
+        # Coleções de destino; os eventos de quem falhou acima são descartados junto
+        falhas_destino = {}
+        for destino, montar_operacoes in _destinos.items():
+            indices, operacoes = [], []
+            for indice, (usuario_id, item) in enumerate(usuarios):
+                docs = item["destinos"].get(destino)
+                if docs and indice not in falhas:
+                    for operacao in montar_operacoes(usuario_id, docs):
+                        indices.append(indice)
+                        operacoes.append(operacao)
+            if not operacoes:
+                continue
+
+            resultado = self._bulk(destino, indices, operacoes)
+            if resultado is None:
+                # Só os eventos desta coleção voltam ao buffer; os de usuarios já foram gravados
+                falhas_destino[destino] = set(indices)
+                self._devolver([
+                    (usuarios[indice][0], _parte_destino(usuarios[indice][1], destino))
+                    for indice in sorted(falhas_destino[destino])
+                ])
+                continue
+
+            falhas_destino[destino] = resultado
+            for indice in resultado:
+                registro.incrementar(
+                    "calmou_push_eventos_descartados_total", (("motivo", "erro_escrita"),),
+                    len(usuarios[indice][1]["destinos"][destino])
+                )
+
+        registro.observar("calmou_push_lote_duracao_segundos", (), time.perf_counter() - inicio)
+        registro.observar("calmou_push_lote_usuarios", (), len(usuarios))
+        registro.observar("calmou_push_lote_eventos", (), sum(item["eventos"] for _, item in usuarios))
+
+        incrementos = []
+        for indice, (_, item) in enumerate(usuarios):
+            if indice in falhas:
+                registro.incrementar(
+                    "calmou_push_eventos_descartados_total", (("motivo", "erro_escrita"),), item["eventos"]
+                )
+                continue
+            for destino, operacoes in item["incrementos"].items():
+                if indice not in falhas_destino.get(destino, ()):
+                    incrementos.extend(operacoes)
+        if incrementos:
+            _estatisticas.registrar(incrementos)
+
+    def _bulk(self, colecao, indices, operacoes):
+        """
+        Grava as operações de uma coleção
+
+        Args:
+            colecao (str): Nome da coleção
+            indices (list): Índice do usuário no lote de cada operação
+            operacoes (list): Operações de bulk_write
+
+        Returns:
+            set ou None: Índices dos usuários com erro de escrita, ou None se
+            o lote não foi gravado (falha de rede, prazo)
+        """
+        if not operacoes:
+            return set()
+        try:
+            with pymongo.timeout(self.timeout):
+                obter_colecao(colecao).bulk_write(operacoes, ordered=False)
+        except BulkWriteError as e:
+            # Chave duplicada: o documento já foi gravado (nova tentativa do lote, backfill)
+            falhas = {
+                indices[erro["index"]] for erro in e.details.get("writeErrors", [])
+                if erro.get("code") != CHAVE_DUPLICADA
+            }
+            if falhas:
+                print(f"⚠️  Buffer de escrita: {len(falhas)} usuário(s) com erro de escrita em '{colecao}'")
+            return falhas
+        except Exception as e:
+            print(f"⚠️  Buffer de escrita: lote de {len(set(indices))} usuário(s) não gravado em '{colecao}': {e}")
+            return None
+        return set()
+
+    def _devolver(self, usuarios):
+        """Recoloca um lote que falhou à frente dos eventos mais novos de cada usuário"""
+        registro = obter_registro()
+        with self._condicao:
+            for usuario_id, item in usuarios:
+                item["tentativas"] += 1
+                if item["tentativas"] > self.tentativas:
+                    registro.incrementar(
+                        "calmou_push_eventos_descartados_total", (("motivo", "tentativas"),), item["eventos"]
+                    )
+                    continue
+
+                novo = self._pendentes.get(usuario_id)
+                if novo is not None:
+                    _mesclar(item, novo)
+                    self._eventos -= novo["eventos"]
+                self._pendentes[usuario_id] = item
+                self._eventos += item["eventos"]
+
+    # ==================== ENCERRAMENTO ====================
+
+    def esvaziar(self, timeout=10.0):
+        """
+        Grava os eventos pendentes e encerra a thread (saída do processo)
+
+        Args:
+            timeout (float): Espera máxima em segundos
+        """
+        limite = time.monotonic() + timeout
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify_all()
+            while self._thread is not None and time.monotonic() < limite:
+                self._condicao.wait(limite - time.monotonic())
+            restantes = self._eventos
+            self._parar = False
+
+        if restantes:
+            print(f"⚠️  Buffer de escrita encerrado com {restantes} evento(s) não gravado(s)")
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def obter_buffer_push():
+    """
+    Returns:
+        BufferPush: Buffer deste processo
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferPush()
+                atexit.register(_buffer.esvaziar)
+    return _buffer
+
+
+def esvaziar_buffer_push():
+    """Grava os eventos pendentes (worker_exit do gunicorn, encerramento da API)"""
+    if _buffer is not None:
+        _buffer.esvaziar()
+
+
+def _apos_fork():
+    # O filho não herda a thread nem os eventos do pai
+    if _buffer is not None:
+        _buffer._reiniciar()
+
+
+os.register_at_fork(after_in_child=_apos_fork)
@@ -0,0 +1,126 @@
+"""
+Coleções Separadas - Calmou API
+Migração online dos arrays embedded de usuarios para as coleções próprias
+criadas por scripts/create_collections_completo.py, sem parar a API
+
+    usuarios.historico_meditacoes   -> historico_meditacoes
+    usuarios.resultados_avaliacoes  -> avaliacoes
+    usuarios.notificacoes           -> notificacoes
+
+Cada array passa pelas fases abaixo (COLECOES_MODO), independente dos outros:
+
+    embedded   grava e lê o array (padrão)
+    dupla      grava no array e na coleção, lê o array; o backfill
+               (scripts/backfill_colecoes_separadas.py) roda nesta fase
+    leitura    grava nos dois e lê a coleção; voltar para dupla desfaz o corte
+    separada   grava e lê só a coleção; depois o backfill --remover-arrays
+               apaga o array dos usuários
+
+Na escrita dupla o elemento do array recebe o mesmo _id do documento da
+coleção. O backfill usa esse _id, ou um _id derivado do conteúdo para os
+elementos antigos: copiar de novo o que já está na coleção dá chave
+duplicada, que é ignorada, então o backfill pode ser interrompido e retomado.
+
+As classificações de humor já saíram do documento do usuário para os
+buckets mensais (controller_humor.py) e não passam por esta migração.
+
+Variáveis de ambiente:
+    COLECOES_MODO   fase de cada array, ex.: "resultados_avaliacoes=leitura,notificacoes=dupla"
+"""
+
+import hashlib
+import os
+
+import bson
+from bson import ObjectId
+from pymongo import InsertOne
+
+from src.controller.buffer_push import registrar_destino
+
+MODO_EMBEDDED = "embedded"
+MODO_DUPLA = "dupla"
+MODO_LEITURA = "leitura"
+MODO_SEPARADA = "separada"
+MODOS = (MODO_EMBEDDED, MODO_DUPLA, MODO_LEITURA, MODO_SEPARADA)
+
+# Array de usuarios -> (coleção, campo de data)
+COLECOES_SEPARADAS = {
+    "historico_meditacoes": ("historico_meditacoes", "data_conclusao"),
+    "resultados_avaliacoes": ("avaliacoes", "data_avaliacao"),
+    "notificacoes": ("notificacoes", "data_envio")
+}
+
+
+def modos():
+    """
+    Lê COLECOES_MODO
+
+    Returns:
+        dict: Array -> fase (arrays ausentes estão em 'embedded')
+
+    Raises:
+        ValueError: Array ou fase desconhecidos
+    """
+    resultado = {}
+    for item in os.getenv("COLECOES_MODO", "").split(","):
+        if "=" not in item:
+            continue
+        campo, modo = (parte.strip() for parte in item.split("=", 1))
+        if campo not in COLECOES_SEPARADAS or modo not in MODOS:
+            raise ValueError(f"COLECOES_MODO inválido: '{item}'")
+        resultado[campo] = modo
+    return resultado
+
+
+def modo(campo):
+    """Fase do array"""
+    return modos().get(campo, MODO_EMBEDDED)
+
+
+def grava_array(campo):
+    return modo(campo) != MODO_SEPARADA
+
+
+def grava_colecao(campo):
+    return modo(campo) != MODO_EMBEDDED
+
+
+def le_colecao(campo):
+    return modo(campo) in (MODO_LEITURA, MODO_SEPARADA)
+
+
+def colecao_de(campo):
+    """Nome da coleção separada do array"""
+    return COLECOES_SEPARADAS[campo][0]
+
+
+def id_entrada(usuario_id, campo, elemento):
+    """
+    _id do documento separado de um elemento do array
+
+    Os elementos gravados na escrita dupla já têm _id; o dos antigos é
+    derivado do usuário, do array e do conteúdo, e não muda entre execuções.
+    """
+    if elemento.get("_id") is not None:
+        return elemento["_id"]
+    resumo = hashlib.sha1(bson.encode({"u": usuario_id, "c": campo, "e": elemento})).digest()
+    return ObjectId(resumo[:12])
+
+
+def documento_separado(usuario_id, campo, elemento):
+    """Documento da coleção separada: o elemento mais _id e usuario_id"""
+    documento = dict(elemento)
+    documento["_id"] = id_entrada(usuario_id, campo, elemento)
+    documento["usuario_id"] = usuario_id
+    return documento
+
+
+def _registrar_destinos():
+    # Com PUSH_MODO=buffer os documentos separados são inseridos em lote
+    for campo, (colecao, _) in COLECOES_SEPARADAS.items():
+        registrar_destino(colecao, lambda usuario_id, docs, campo=campo: [
+            InsertOne(documento_separado(usuario_id, campo, doc)) for doc in docs
+        ])
+
+
+_registrar_destinos()
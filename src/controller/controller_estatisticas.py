@@ -0,0 +1,334 @@
+"""
+Controller de Estatísticas - Calmou API
+Mantém a coleção 'estatisticas', incrementada pelas escritas dos outros
+controllers, para que o GET /stats não precise contar as coleções
+
+Documentos:
+    {_id: "geral"}             totais: usuários, meditações, sessões,
+                               minutos meditados e registros de humor
+    {_id: "dia:AAAA-MM-DD"}    os mesmos contadores de eventos do dia,
+                               mais os novos cadastros
+
+Os contadores de eventos (sessões, minutos e humor) acumulam o que foi
+registrado e não diminuem quando um usuário é removido. Usuários ativos
+nos últimos 7 dias vêm do campo usuarios.ultima_atividade (índice
+idx_ultima_atividade), atualizado a cada registro de humor, meditação ou
+avaliação. recalcular() refaz tudo a partir dos documentos.
+
+Variáveis de ambiente:
+    ESTATISTICAS_TTL_S   tempo de vida do resumo em cache, por processo (padrão 30)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReplaceOne, UpdateOne
+from src.conexion.mongo_conexao import obter_colecao
+from src.utils.prazos import registrar_timeout, timeout_ocorrido
+
+COLECAO_ESTATISTICAS = "estatisticas"
+ID_GERAL = "geral"
+DIAS_ATIVOS = 7
+
+# Contadores diários devolvidos pelo resumo (zero nos dias sem documento)
+CAMPOS_DIARIOS = ("novos_usuarios", "registros_humor", "sessoes_meditacao", "minutos_meditados")
+
+# Totais estimados (estimated_document_count) enquanto ausentes do documento geral
+TOTAIS_ESTIMADOS = {"total_usuarios": "usuarios", "total_meditacoes": "meditacoes"}
+
+
+def id_dia(data):
+    """_id do documento diário (ex.: 'dia:2024-05-31')"""
+    return f"dia:{data:%Y-%m-%d}"
+
+
+# ==================== INCREMENTOS ====================
+
+def operacoes_incremento(gerais=None, diarios=None, data=None):
+    """
+    Monta os upserts com $inc dos documentos geral e do dia
+
+    Args:
+        gerais (dict): Campo -> incremento no documento geral
+        diarios (dict): Campo -> incremento no documento do dia
+        data (datetime): Dia do evento (padrão: agora)
+
+    Returns:
+        list: Operações para bulk_write
+    """
+    agora = datetime.now()
+    operacoes = []
+    if gerais:
+        operacoes.append(UpdateOne(
+            {"_id": ID_GERAL},
+            {"$inc": gerais, "$set": {"atualizado_em": agora}},
+            upsert=True
+        ))
+    if diarios:
+        dia = data or agora
+        operacoes.append(UpdateOne(
+            {"_id": id_dia(dia)},
+            {"$inc": diarios, "$set": {"data": datetime(dia.year, dia.month, dia.day), "atualizado_em": agora}},
+            upsert=True
+        ))
+    return operacoes
+
+
+def incrementos_usuario(delta):
+    """Cadastro (+1) ou remoção (-1) de usuário"""
+    return operacoes_incremento(
+        gerais={"total_usuarios": delta},
+        diarios={"novos_usuarios": 1} if delta > 0 else None
+    )
+
+
+def incrementos_meditacao(delta):
+    """Inclusão (+1) ou remoção (-1) de meditação do catálogo"""
+    return operacoes_incremento(gerais={"total_meditacoes": delta})
+
+
+def incrementos_humor(data=None):
+    """Registro de humor"""
+    return operacoes_incremento(
+        gerais={"registros_humor": 1},
+        diarios={"registros_humor": 1},
+        data=data
+    )
+
+
+def incrementos_sessao(minutos, data=None):
+    """Sessão de meditação concluída (minutos ausentes contam como 0)"""
+    contadores = {"sessoes_meditacao": 1, "minutos_meditados": minutos or 0}
+    return operacoes_incremento(gerais=contadores, diarios=dict(contadores), data=data)
+
+
+# ==================== RESUMO ====================
+
+def montar_resumo(geral, diarios, ativos, hoje, dias=DIAS_ATIVOS):
+    """
+    Monta o resumo servido pelo /stats
+
+    Args:
+        geral (dict): Documento geral (sem o _id)
+        diarios (list): Documentos diários do período
+        ativos (int): Usuários com atividade nos últimos dias
+        hoje (datetime): Último dia do período
+        dias (int): Tamanho do período
+
+    Returns:
+        dict: Totais, ativos e uma entrada por dia (do mais antigo para hoje)
+    """
+    por_dia = {doc["_id"]: doc for doc in diarios}
+    periodo = []
+    for atraso in range(dias - 1, -1, -1):
+        dia = hoje - timedelta(days=atraso)
+        doc = por_dia.get(id_dia(dia), {})
+        entrada = {"data": f"{dia:%Y-%m-%d}"}
+        entrada.update({campo: doc.get(campo, 0) for campo in CAMPOS_DIARIOS})
+        periodo.append(entrada)
+
+    return {
+        "total_usuarios": geral.get("total_usuarios", 0),
+        "total_meditacoes": geral.get("total_meditacoes", 0),
+        "usuarios_ativos_7d": ativos,
+        "sessoes_meditacao": geral.get("sessoes_meditacao", 0),
+        "minutos_meditados": geral.get("minutos_meditados", 0),
+        "registros_humor": geral.get("registros_humor", 0),
+        "por_dia": periodo,
+        "atualizado_em": geral.get("atualizado_em")
+    }
+
+
+class CacheResumo:
+    """Guarda o último resumo por ttl segundos; só uma thread recalcula por vez"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._valor = None
+        self._expira_em = 0.0
+        self._lock = threading.Lock()
+
+    def obter(self, carregar):
+        if self._valor is not None and time.monotonic() < self._expira_em:
+            return self._valor
+
+        with self._lock:
+            if self._valor is not None and time.monotonic() < self._expira_em:
+                return self._valor
+            valor = carregar()
+            # Um resumo parcial (prazo estourado) não fica em cache
+            if valor is not None and not timeout_ocorrido():
+                self._valor = valor
+                self._expira_em = time.monotonic() + self.ttl
+            return valor
+
+    def limpar(self):
+        self._valor = None
+
+
+_cache_resumo = CacheResumo(float(os.getenv("ESTATISTICAS_TTL_S", 30)))
+
+
+class ControllerEstatisticas:
+    """Controlador da coleção de estatísticas mantidas"""
+
+    @property
+    def collection(self):
+        """Coleção do cliente do processo atual (conecta na primeira utilização)"""
+        return obter_colecao(COLECAO_ESTATISTICAS)
+
+    # ==================== ESCRITA ====================
+
+    def registrar(self, operacoes):
+        """
+        Aplica os incrementos de um evento
+
+        Uma falha aqui não desfaz nem falha a escrita principal: o
+        contador fica defasado até o próximo recalcular().
+
+        Args:
+            operacoes (list): Operações de operacoes_incremento()
+        """
+        try:
+            self.collection.bulk_write(operacoes, ordered=False)
+        except Exception as e:
+            print(f"⚠️  Estatísticas não atualizadas: {e}")
+
+    # ==================== LEITURA ====================
+
+    def resumo(self):
+        """
+        Resumo servido pelo /stats, em cache por ESTATISTICAS_TTL_S
+
+        Returns:
+            dict: Resumo (ver montar_resumo) ou None se falhar
+        """
+        return _cache_resumo.obter(self._carregar_resumo)
+
+    def _carregar_resumo(self):
+        try:
+            agora = datetime.now()
+            geral = self.collection.find_one({"_id": ID_GERAL}, {"_id": 0}) or {}
+            # Antes do primeiro recalcular(): contagens estimadas pelos metadados
+            for campo, colecao in TOTAIS_ESTIMADOS.items():
+                if campo not in geral:
+                    geral[campo] = obter_colecao(colecao).estimated_document_count()
+
+            inicio = agora - timedelta(days=DIAS_ATIVOS - 1)
+            diarios = list(self.collection.find({"_id": {"$gte": id_dia(inicio), "$lte": id_dia(agora)}}))
+            ativos = obter_colecao("usuarios").count_documents(
+                {"ultima_atividade": {"$gte": agora - timedelta(days=DIAS_ATIVOS)}}
+            )
+            return montar_resumo(geral, diarios, ativos, agora)
+
+        except Exception as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao carregar estatísticas: {e}")
+            return None
+
+    # ==================== RECÁLCULO ====================
+
+    def recalcular(self):
+        """
+        Refaz os documentos de estatísticas a partir de usuarios, meditacoes
+        e dos buckets de humor
+
+        Também preenche usuarios.ultima_atividade com a data do registro
+        mais recente de cada usuário. Incrementos feitos durante o
+        recálculo podem se perder; rodar fora do horário de pico.
+
+        Returns:
+            bool: True se recalculado, False caso contrário
+        """
+        try:
+            usuarios = obter_colecao("usuarios")
+            agora = datetime.now()
+
+            # Importados aqui: os dois dependem do buffer, que usa este módulo
+            from src.controller.colecoes_separadas import COLECOES_SEPARADAS, le_colecao
+            from src.controller.controller_humor import COLECAO_HUMOR
+            humor = obter_colecao(COLECAO_HUMOR)
+            historico_separado = le_colecao("historico_meditacoes")
+
+            usuarios.update_many({}, [{"$set": {"ultima_atividade": {"$max": [
+                "$data_cadastro",
+                {"$max": "$classificacoes_humor.data_classificacao"},
+                {"$max": "$historico_meditacoes.data_conclusao"},
+                {"$max": "$resultados_avaliacoes.data_avaliacao"}
+            ]}}}])
+            # Registros fora do documento do usuário: buckets de humor e coleções separadas já lidas pela API
+            fontes = [(humor, "ultima_data")] + [
+                (obter_colecao(colecao), campo_data)
+                for campo, (colecao, campo_data) in COLECOES_SEPARADAS.items() if le_colecao(campo)
+            ]
+            ultimas = [
+                UpdateOne({"_id": linha["_id"]}, {"$max": {"ultima_atividade": linha["ultima"]}})
+                for colecao, campo_data in fontes
+                for linha in colecao.aggregate(
+                    [{"$group": {"_id": "$usuario_id", "ultima": {"$max": f"${campo_data}"}}}], allowDiskUse=True
+                )
+            ]
+            if ultimas:
+                usuarios.bulk_write(ultimas, ordered=False)
+
+            diarios = {}
+
+            def acumular(pipeline, colecao=usuarios):
+                for linha in colecao.aggregate(pipeline, allowDiskUse=True):
+                    if linha["_id"] is None:
+                        continue
+                    doc = diarios.setdefault(linha.pop("_id"), {})
+                    for campo, valor in linha.items():
+                        doc[campo] = doc.get(campo, 0) + valor
+
+            def por_dia(campo_data, unwind=None, **acumuladores):
+                estagios = [{"$unwind": f"${unwind}"}] if unwind else []
+                return estagios + [{"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${campo_data}"}},
+                    **acumuladores
+                }}]
+
+            acumular(por_dia("data_cadastro", novos_usuarios={"$sum": 1}))
+            acumular(por_dia(
+                "classificacoes_humor.data_classificacao", "classificacoes_humor",
+                registros_humor={"$sum": 1}
+            ))
+            acumular(por_dia("registros.data_classificacao", "registros", registros_humor={"$sum": 1}), humor)
+            if historico_separado:
+                acumular(por_dia(
+                    "data_conclusao",
+                    sessoes_meditacao={"$sum": 1},
+                    minutos_meditados={"$sum": {"$ifNull": ["$duracao_real_minutos", 0]}}
+                ), obter_colecao(COLECOES_SEPARADAS["historico_meditacoes"][0]))
+            else:
+                acumular(por_dia(
+                    "historico_meditacoes.data_conclusao", "historico_meditacoes",
+                    sessoes_meditacao={"$sum": 1},
+                    minutos_meditados={"$sum": {"$ifNull": ["$historico_meditacoes.duracao_real_minutos", 0]}}
+                ))
+
+            geral = {"total_usuarios": usuarios.count_documents({}),
+                     "total_meditacoes": obter_colecao("meditacoes").count_documents({}),
+                     "atualizado_em": agora}
+            for campo in ("registros_humor", "sessoes_meditacao", "minutos_meditados"):
+                geral[campo] = sum(doc.get(campo, 0) for doc in diarios.values())
+
+            operacoes = [ReplaceOne({"_id": ID_GERAL}, geral, upsert=True)]
+            for dia, contadores in diarios.items():
+                doc = {campo: contadores.get(campo, 0) for campo in CAMPOS_DIARIOS}
+                doc.update({"data": datetime.strptime(dia, "%Y-%m-%d"), "atualizado_em": agora})
+                operacoes.append(ReplaceOne({"_id": f"dia:{dia}"}, doc, upsert=True))
+
+            self.collection.bulk_write(operacoes, ordered=False)
+            ids = [ID_GERAL] + [f"dia:{dia}" for dia in diarios]
+            self.collection.delete_many({"_id": {"$nin": ids}})
+            _cache_resumo.limpar()
+
+            print(f"✅ Estatísticas recalculadas ({len(diarios)} dias)")
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro ao recalcular estatísticas: {e}")
+            return False
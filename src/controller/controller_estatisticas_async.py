@@ -0,0 +1,93 @@
+"""
+Controller Assíncrono de Estatísticas - Calmou API
+Versão asyncio (Motor) do ControllerEstatisticas, usada pela API ASGI
+
+Os incrementos e o formato do resumo são os mesmos do controller síncrono;
+o recálculo fica só no síncrono.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from src.conexion.mongo_conexao_async import obter_colecao_async
+from src.controller.controller_estatisticas import (
+    COLECAO_ESTATISTICAS, DIAS_ATIVOS, ID_GERAL, TOTAIS_ESTIMADOS, id_dia, montar_resumo
+)
+
+
+class ControllerEstatisticasAsync:
+    """Controlador assíncrono da coleção de estatísticas mantidas"""
+
+    def __init__(self):
+        """Inicializa o controller"""
+        self.collection = obter_colecao_async(COLECAO_ESTATISTICAS)
+        self.ttl = float(os.getenv("ESTATISTICAS_TTL_S", 30))
+        self._resumo = None
+        self._expira_em = 0.0
+        self._lock = None
+
+    # ==================== ESCRITA ====================
+
+    async def registrar(self, operacoes):
+        """
+        Aplica os incrementos de um evento (falhas não afetam a escrita principal)
+
+        Args:
+            operacoes (list): Operações de operacoes_incremento()
+        """
+        try:
+            await self.collection.bulk_write(operacoes, ordered=False)
+        except Exception as e:
+            print(f"⚠️  Estatísticas não atualizadas: {e}")
+
+    # ==================== LEITURA ====================
+
+    async def resumo(self):
+        """
+        Resumo servido pelo /stats, em cache por ESTATISTICAS_TTL_S
+
+        Returns:
+            dict: Resumo (ver montar_resumo) ou None se falhar
+        """
+        if self._resumo is not None and time.monotonic() < self._expira_em:
+            return self._resumo
+
+        # Criado aqui para ficar no loop de eventos da aplicação
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._resumo is not None and time.monotonic() < self._expira_em:
+                return self._resumo
+
+            resumo = await self._carregar_resumo()
+            if resumo is not None:
+                self._resumo = resumo
+                self._expira_em = time.monotonic() + self.ttl
+            return resumo
+
+    async def _carregar_resumo(self):
+        try:
+            agora = datetime.now()
+            usuarios = obter_colecao_async("usuarios")
+            inicio = agora - timedelta(days=DIAS_ATIVOS - 1)
+
+            geral, diarios, ativos = await asyncio.gather(
+                self.collection.find_one({"_id": ID_GERAL}, {"_id": 0}),
+                self.collection.find({"_id": {"$gte": id_dia(inicio), "$lte": id_dia(agora)}}).to_list(length=None),
+                usuarios.count_documents({"ultima_atividade": {"$gte": agora - timedelta(days=DIAS_ATIVOS)}})
+            )
+
+            # Antes do primeiro recalcular(): contagens estimadas pelos metadados
+            geral = geral or {}
+            for campo, colecao in TOTAIS_ESTIMADOS.items():
+                if campo not in geral:
+                    geral[campo] = await obter_colecao_async(colecao).estimated_document_count()
+
+            return montar_resumo(geral, diarios, ativos, agora)
+
+        except Exception as e:
+            print(f"❌ Erro ao carregar estatísticas: {e}")
+            return None
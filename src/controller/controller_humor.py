@@ -0,0 +1,316 @@
+"""
+Controller de Humor - Calmou API
+Classificações de humor no padrão bucket: um documento por usuário e mês
+na coleção 'humor_mensal', em vez do array usuarios.classificacoes_humor
+
+    {usuario_id, mes: "AAAA-MM", inicio: <dia 1 do mês>,
+     contagem, soma, minimo, maximo, ultima_data,
+     sentimentos: {sentimento: quantidade},
+     registros: [classificação, ...]}
+
+O array registros tem no máximo HUMOR_BUCKET_MAX itens; um mês com mais
+registros continua em outro documento do mesmo mês. Os totais são
+atualizados na mesma escrita que acrescenta o registro, então o relatório
+lê contagem, soma e sentimentos dos meses inteiros dentro do período e só
+filtra os registros do mês em que o período começa.
+
+Os arrays antigos são movidos para cá por scripts/migrar_humor_buckets.py;
+os documentos migrados (legado: true) não recebem novos registros.
+
+Variáveis de ambiente:
+    HUMOR_BUCKET_MAX        registros por documento (padrão 200)
+    HUMOR_LEITURA_LEGADA    1 soma também o array usuarios.classificacoes_humor
+                            no relatório (padrão 1; 0 depois da migração)
+"""
+
+import os
+from collections import Counter
+from datetime import datetime
+
+from pymongo import ReplaceOne, UpdateOne
+from src.conexion.mongo_conexao import obter_colecao
+from src.controller.buffer_push import registrar_destino
+from src.utils.prazos import registrar_timeout
+
+COLECAO_HUMOR = "humor_mensal"
+HUMOR_BUCKET_MAX = int(os.getenv("HUMOR_BUCKET_MAX", 200))
+
+# Sentimento contado quando a classificação não informa um
+SENTIMENTO_NAO_ESPECIFICADO = "Não especificado"
+
+
+def leitura_legada():
+    """O relatório ainda soma o array embedded antigo?"""
+    return os.getenv("HUMOR_LEITURA_LEGADA", "1") == "1"
+
+
+def mes_de(data):
+    """Mês do bucket (ex.: '2024-05')"""
+    return f"{data:%Y-%m}"
+
+
+def inicio_do_mes(data):
+    return datetime(data.year, data.month, 1)
+
+
+def chave_sentimento(nome):
+    """Nome do sentimento como chave de sentimentos ('.' e '$' inicial não são aceitos)"""
+    if nome is None:
+        return SENTIMENTO_NAO_ESPECIFICADO
+    chave = str(nome).replace(".", "_").lstrip("$")
+    return chave or SENTIMENTO_NAO_ESPECIFICADO
+
+
+def _lotes_por_mes(classificacoes, maximo):
+    """(mês, índice, lote) com até maximo classificações, em ordem de data"""
+    por_mes = {}
+    for classificacao in sorted(classificacoes, key=lambda c: c["data_classificacao"]):
+        por_mes.setdefault(mes_de(classificacao["data_classificacao"]), []).append(classificacao)
+
+    for mes, itens in por_mes.items():
+        for indice, inicio in enumerate(range(0, len(itens), maximo)):
+            yield mes, indice, itens[inicio:inicio + maximo]
+
+
+def _totais(lote):
+    niveis = [c["nivel_humor"] for c in lote]
+    sentimentos = Counter(chave_sentimento(c.get("sentimento_principal")) for c in lote)
+    return niveis, sentimentos
+
+
+# ==================== ESCRITA ====================
+
+def operacoes_bucket(usuario_id, classificacoes, maximo=None):
+    """
+    Upserts que acrescentam classificações aos buckets do mês de cada uma
+
+    O filtro só aceita um bucket com espaço para o lote inteiro; sem ele o
+    upsert cria outro documento para o mesmo mês.
+
+    Args:
+        usuario_id (ObjectId): ID do usuário
+        classificacoes (list): Classificações (ClassificacaoHumor.to_dict())
+        maximo (int, optional): Registros por bucket (padrão HUMOR_BUCKET_MAX)
+
+    Returns:
+        list: Operações para bulk_write
+    """
+    maximo = maximo or HUMOR_BUCKET_MAX
+    operacoes = []
+    for mes, _, lote in _lotes_por_mes(classificacoes, maximo):
+        niveis, sentimentos = _totais(lote)
+        incrementos = {"contagem": len(lote), "soma": sum(niveis)}
+        incrementos.update({f"sentimentos.{nome}": n for nome, n in sentimentos.items()})
+
+        operacoes.append(UpdateOne(
+            {
+                "usuario_id": usuario_id,
+                "mes": mes,
+                "contagem": {"$lte": maximo - len(lote)},
+                "legado": {"$exists": False}
+            },
+            {
+                "$push": {"registros": {"$each": lote}},
+                "$inc": incrementos,
+                "$min": {"minimo": min(niveis)},
+                "$max": {"maximo": max(niveis), "ultima_data": lote[-1]["data_classificacao"]},
+                "$setOnInsert": {"inicio": inicio_do_mes(lote[0]["data_classificacao"])}
+            },
+            upsert=True
+        ))
+    return operacoes
+
+
+def operacoes_migracao(usuario_id, classificacoes, maximo=None):
+    """
+    Buckets completos (legado: true) de um array embedded antigo
+
+    O _id é derivado do usuário, do mês e do índice do lote, então rodar a
+    migração de novo regrava os mesmos documentos.
+
+    Returns:
+        list: Operações ReplaceOne para bulk_write
+    """
+    return [
+        ReplaceOne({"_id": documento["_id"]}, dict(documento, legado=True), upsert=True)
+        for documento in documentos_bucket(usuario_id, classificacoes, maximo)
+    ]
+
+
+def documentos_bucket(usuario_id, classificacoes, maximo=None):
+    """
+    Buckets completos das classificações, como o POST /humor os deixaria
+
+    O _id é derivado do usuário, do mês e do índice do lote. Usado pela
+    migração e pelas cargas de dados de teste (scripts/benchmark_endpoints.py).
+
+    Returns:
+        list: Documentos da coleção humor_mensal
+    """
+    maximo = maximo or HUMOR_BUCKET_MAX
+    documentos = []
+    for mes, indice, lote in _lotes_por_mes(classificacoes, maximo):
+        niveis, sentimentos = _totais(lote)
+        documentos.append({
+            "_id": f"{usuario_id}:{mes}:{indice}",
+            "usuario_id": usuario_id,
+            "mes": mes,
+            "inicio": inicio_do_mes(lote[0]["data_classificacao"]),
+            "contagem": len(lote),
+            "soma": sum(niveis),
+            "minimo": min(niveis),
+            "maximo": max(niveis),
+            "ultima_data": lote[-1]["data_classificacao"],
+            "sentimentos": dict(sentimentos),
+            "registros": lote
+        })
+    return documentos
+
+
+# Com PUSH_MODO=buffer as classificações são agrupadas e gravadas com estas operações
+registrar_destino(COLECAO_HUMOR, operacoes_bucket)
+
+
+# ==================== LEITURA ====================
+
+def pipeline_resumo_buckets(usuario_id, data_limite, registros=7):
+    """
+    Pipeline do resumo de cada bucket de um período
+
+    Só os buckets dos meses a partir de data_limite são lidos (índice
+    idx_usuario_mes). Um bucket que começa dentro do período usa os totais
+    pré-calculados; o do mês em que o período começa tem os registros
+    filtrados. Cada bucket devolve no máximo `registros` registros recentes.
+
+    Args:
+        usuario_id (ObjectId): ID do usuário
+        data_limite (datetime): Início do período
+        registros (int): Quantidade de registros recentes por bucket
+
+    Returns:
+        list: Estágios do aggregate
+    """
+    return [
+        {"$match": {"usuario_id": usuario_id, "mes": {"$gte": mes_de(data_limite)}}},
+        {"$project": {
+            "_id": 0,
+            "inteiro": {"$gte": ["$inicio", data_limite]},
+            "contagem": 1,
+            "soma": 1,
+            "sentimentos": 1,
+            "periodo": {"$filter": {
+                "input": "$registros",
+                "as": "c",
+                "cond": {"$gte": ["$$c.data_classificacao", data_limite]}
+            }}
+        }},
+        {"$project": {
+            "total": {"$cond": ["$inteiro", "$contagem", {"$size": "$periodo"}]},
+            "soma": {"$cond": ["$inteiro", "$soma", {"$sum": "$periodo.nivel_humor"}]},
+            "sentimentos": {"$cond": ["$inteiro", "$sentimentos", {}]},
+            "parciais": {"$cond": ["$inteiro", [], {"$map": {
+                "input": "$periodo", "as": "c", "in": "$$c.sentimento_principal"
+            }}]},
+            "recentes": {"$slice": [
+                {"$sortArray": {"input": "$periodo", "sortBy": {"data_classificacao": -1}}},
+                registros
+            ]}
+        }}
+    ]
+
+
+def parte_legada(resumo):
+    """Resumo do array embedded antigo (pipeline_relatorio_humor) no formato dos buckets"""
+    total = resumo.get("total_registros") or 0
+    return {
+        "total": total,
+        "soma": (resumo.get("media_humor") or 0) * total,
+        "sentimentos": {
+            chave_sentimento(nome): n for nome, n in (resumo.get("sentimentos_frequentes") or {}).items()
+        },
+        "recentes": resumo.get("registros") or []
+    }
+
+
+def combinar_resumos(partes, registros=7):
+    """
+    Junta os resumos dos buckets no formato do relatório de humor
+
+    Args:
+        partes (list): Documentos de pipeline_resumo_buckets (e parte_legada)
+        registros (int): Quantidade de registros recentes
+
+    Returns:
+        dict: total_registros, media_humor, sentimentos_frequentes e registros
+    """
+    total = 0
+    soma = 0
+    sentimentos = Counter()
+    recentes = []
+    for parte in partes:
+        total += parte.get("total") or 0
+        soma += parte.get("soma") or 0
+        sentimentos.update(parte.get("sentimentos") or {})
+        sentimentos.update(chave_sentimento(nome) for nome in parte.get("parciais") or [])
+        recentes.extend(parte.get("recentes") or [])
+
+    recentes.sort(key=lambda c: c["data_classificacao"], reverse=True)
+    return {
+        "total_registros": total,
+        "media_humor": soma / total if total else None,
+        "sentimentos_frequentes": dict(sentimentos),
+        "registros": recentes[:registros]
+    }
+
+
+class ControllerHumor:
+    """Controlador dos buckets mensais de classificações de humor"""
+
+    @property
+    def collection(self):
+        """Coleção do cliente do processo atual (conecta na primeira utilização)"""
+        return obter_colecao(COLECAO_HUMOR)
+
+    def adicionar(self, usuario_id, classificacoes):
+        """
+        Acrescenta classificações aos buckets do usuário
+
+        Args:
+            usuario_id (ObjectId): ID do usuário
+            classificacoes (list): Classificações (ClassificacaoHumor.to_dict())
+
+        Returns:
+            bool: True se gravado, False caso contrário
+        """
+        try:
+            self.collection.bulk_write(operacoes_bucket(usuario_id, classificacoes), ordered=False)
+            return True
+
+        except Exception as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao gravar classificações de humor: {e}")
+            return False
+
+    def resumo_periodo(self, usuario_id, data_limite, registros=7):
+        """
+        Resumos dos buckets do período (ver combinar_resumos)
+
+        Returns:
+            list: Um documento por bucket lido
+        """
+        return list(self.collection.aggregate(pipeline_resumo_buckets(usuario_id, data_limite, registros)))
+
+    def remover_usuario(self, usuario_id):
+        """
+        Remove os buckets de um usuário excluído
+
+        Returns:
+            int: Quantidade de buckets removidos
+        """
+        try:
+            return self.collection.delete_many({"usuario_id": usuario_id}).deleted_count
+
+        except Exception as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao remover classificações de humor: {e}")
+            return 0
@@ -0,0 +1,54 @@
+"""
+Controller Assíncrono de Humor - Calmou API
+Versão asyncio (Motor) do ControllerHumor, usada pela API ASGI
+"""
+
+from src.conexion.mongo_conexao_async import obter_colecao_async
+from src.controller.controller_humor import COLECAO_HUMOR, operacoes_bucket, pipeline_resumo_buckets
+
+
+class ControllerHumorAsync:
+    """Controlador assíncrono dos buckets mensais de classificações de humor"""
+
+    def __init__(self):
+        """Inicializa o controller"""
+        self.collection = obter_colecao_async(COLECAO_HUMOR)
+
+    async def adicionar(self, usuario_id, classificacoes):
+        """
+        Acrescenta classificações aos buckets do usuário
+
+        Returns:
+            bool: True se gravado, False caso contrário
+        """
+        try:
+            await self.collection.bulk_write(operacoes_bucket(usuario_id, classificacoes), ordered=False)
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao gravar classificações de humor: {e}")
+            return False
+
+    async def resumo_periodo(self, usuario_id, data_limite, registros=7):
+        """
+        Resumos dos buckets do período (ver combinar_resumos)
+
+        Returns:
+            list: Um documento por bucket lido
+        """
+        return await self.collection.aggregate(
+            pipeline_resumo_buckets(usuario_id, data_limite, registros)
+        ).to_list(length=None)
+
+    async def remover_usuario(self, usuario_id):
+        """
+        Remove os buckets de um usuário excluído
+
+        Returns:
+            int: Quantidade de buckets removidos
+        """
+        try:
+            resultado = await self.collection.delete_many({"usuario_id": usuario_id})
+            return resultado.deleted_count
+        except Exception as e:
+            print(f"❌ Erro ao remover classificações de humor: {e}")
+            return 0
@@ -5,16 +5,31 @@ Gerencia operações CRUD para meditações no MongoDB
 
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo.errors import OperationFailure, PyMongoError
 from src.conexion.mongo_conexao import obter_colecao
+from src.controller.colecoes_separadas import colecao_de, grava_colecao, le_colecao
+from src.controller.controller_estatisticas import ControllerEstatisticas, incrementos_meditacao
 from src.model.meditacao import Meditacao
+from src.utils.cache_catalogo import invalidar_catalogo
+from src.utils.paginacao import codificar_cursor, decodificar_cursor
+from src.utils.prazos import registrar_timeout
+
+# Campos devolvidos pela listagem pública do catálogo
+CAMPOS_CATALOGO = {
+    "_id": 1, "titulo": 1, "descricao": 1, "duracao_minutos": 1,
+    "url_audio": 1, "tipo": 1, "categoria": 1, "imagem_capa": 1
+}
+
+_estatisticas = ControllerEstatisticas()
 
 
 class ControllerMeditacao:
     """Controlador para operações CRUD de meditações"""
 
-    def __init__(self):
-        """Inicializa o controller"""
-        self.collection = obter_colecao("meditacoes")
+    @property
+    def collection(self):
+        """Coleção do cliente do processo atual (conecta na primeira utilização)"""
+        return obter_colecao("meditacoes")
 
     # ==================== CREATE ====================
 
@@ -38,11 +53,16 @@ class ControllerMeditacao:
                     return None
 
             # Insere a meditação
-            resultado = self.collection.insert_one(meditacao.to_dict())
+            doc = meditacao.to_dict()
+            doc.setdefault("versao", 1)
+            resultado = self.collection.insert_one(doc)
+            invalidar_catalogo()
+            _estatisticas.registrar(incrementos_meditacao(1))
             print(f"✅ Meditação '{meditacao.get_titulo()}' inserida com sucesso")
             return resultado.inserted_id
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao inserir meditação: {e}")
             return None
 
@@ -72,9 +92,51 @@ class ControllerMeditacao:
             print(f"❌ ID inválido: {meditacao_id}")
             return None
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar meditação por ID: {e}")
             return None
 
+    def obter_versao(self, meditacao_id):
+        """
+        Busca apenas a versão da meditação (usada nos ETags)
+
+        A consulta é coberta pelo índice idx_id_versao (_id, versao), então
+        não lê o documento. Documentos antigos sem o campo têm versão 0.
+
+        Args:
+            meditacao_id (str ou ObjectId): ID da meditação
+
+        Returns:
+            int ou None: Versão atual, ou None se não encontrada
+
+        Raises:
+            PyMongoError: Falha ou timeout do MongoDB (não é tratada como
+                meditação inexistente, para a rota responder 5xx em vez de 404)
+        """
+        try:
+            if isinstance(meditacao_id, str):
+                meditacao_id = ObjectId(meditacao_id)
+
+            filtro = {"_id": meditacao_id}
+            projecao = {"_id": 1, "versao": 1}
+            try:
+                doc = self.collection.find_one(filtro, projecao, hint=[("_id", 1), ("versao", 1)])
+            except OperationFailure:
+                # Índice idx_id_versao ainda não criado
+                doc = self.collection.find_one(filtro, projecao)
+
+            if doc:
+                return doc.get("versao", 0)
+            return None
+
+        except InvalidId:
+            print(f"❌ ID inválido: {meditacao_id}")
+            return None
+        except PyMongoError as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao buscar versão da meditação: {e}")
+            raise
+
     def buscar_por_titulo(self, titulo):
         """
         Busca uma meditação por título (primeira ocorrência)
@@ -93,6 +155,7 @@ class ControllerMeditacao:
             return None
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar meditação por título: {e}")
             return None
 
@@ -111,6 +174,7 @@ class ControllerMeditacao:
             return [Meditacao.from_dict(doc) for doc in docs]
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao listar meditações: {e}")
             return []
 
@@ -133,9 +197,57 @@ class ControllerMeditacao:
             return list(docs)
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao listar resumo de meditações: {e}")
             return []
 
+    def listar_pagina(self, limite=100, apos=None):
+        """
+        Lista uma página do catálogo usando paginação keyset em (titulo, _id)
+
+        O custo de cada página é constante: a consulta parte do último item
+        lido usando o índice idx_titulo_id, sem skip.
+
+        Args:
+            limite (int): Quantidade de itens na página
+            apos (str, optional): Cursor devolvido pela página anterior
+
+        Returns:
+            tuple: (lista de dicionários com CAMPOS_CATALOGO, cursor da próxima página ou None),
+                ou None em caso de erro (não é uma página vazia: não vai para o cache)
+
+        Raises:
+            CursorInvalido: Se o cursor informado for inválido
+        """
+        filtro = {}
+        if apos:
+            titulo, ultimo_id = decodificar_cursor(apos, 2)
+            filtro = {"$or": [
+                {"titulo": {"$gt": titulo}},
+                {"titulo": titulo, "_id": {"$gt": ultimo_id}}
+            ]}
+
+        try:
+            # Busca um item a mais para saber se existe próxima página
+            docs = list(
+                self.collection.find(filtro, CAMPOS_CATALOGO)
+                .sort([("titulo", 1), ("_id", 1)])
+                .limit(limite + 1)
+            )
+
+            proximo_cursor = None
+            if len(docs) > limite:
+                docs = docs[:limite]
+                ultimo = docs[-1]
+                proximo_cursor = codificar_cursor(ultimo.get("titulo"), ultimo["_id"])
+
+            return docs, proximo_cursor
+
+        except Exception as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao listar página de meditações: {e}")
+            return None
+
     def buscar_por_categoria(self, categoria, limite=100):
         """
         Busca meditações por categoria
@@ -152,6 +264,7 @@ class ControllerMeditacao:
             return [Meditacao.from_dict(doc) for doc in docs]
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar por categoria: {e}")
             return []
 
@@ -171,6 +284,7 @@ class ControllerMeditacao:
             return [Meditacao.from_dict(doc) for doc in docs]
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar por tipo: {e}")
             return []
 
@@ -194,6 +308,7 @@ class ControllerMeditacao:
             return [Meditacao.from_dict(doc) for doc in docs]
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar por duração: {e}")
             return []
 
@@ -219,16 +334,18 @@ class ControllerMeditacao:
                 print(f"❌ Meditação com ID {meditacao_id} não encontrada")
                 return False
 
-            # Remove _id dos campos (não pode ser atualizado)
+            # Remove _id e versao dos campos (não podem ser atualizados)
             campos_atualizados.pop("_id", None)
+            campos_atualizados.pop("versao", None)
 
-            # Atualiza
+            # Atualiza e incrementa a versão usada nos ETags
             resultado = self.collection.update_one(
                 {"_id": meditacao_id},
-                {"$set": campos_atualizados}
+                {"$set": campos_atualizados, "$inc": {"versao": 1}}
             )
 
             if resultado.modified_count > 0:
+                invalidar_catalogo()
                 print(f"✅ Meditação {meditacao_id} atualizada com sucesso")
                 return True
             else:
@@ -236,6 +353,7 @@ class ControllerMeditacao:
                 return True
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao atualizar meditação: {e}")
             return False
 
@@ -265,9 +383,14 @@ class ControllerMeditacao:
 
             # Verifica se há usuários com histórico desta meditação
             usuarios_collection = obter_colecao("usuarios")
-            usuarios_com_historico = usuarios_collection.count_documents({
-                "historico_meditacoes.meditacao_id": meditacao_id
-            })
+            if le_colecao("historico_meditacoes"):
+                usuarios_com_historico = len(obter_colecao(colecao_de("historico_meditacoes")).distinct(
+                    "usuario_id", {"meditacao_id": meditacao_id}
+                ))
+            else:
+                usuarios_com_historico = usuarios_collection.count_documents({
+                    "historico_meditacoes.meditacao_id": meditacao_id
+                })
 
             if usuarios_com_historico > 0:
                 print(f"\n⚠️  ATENÇÃO: {usuarios_com_historico} usuário(s) têm histórico desta meditação")
@@ -287,6 +410,8 @@ class ControllerMeditacao:
                         {},
                         {"$pull": {"historico_meditacoes": {"meditacao_id": meditacao_id}}}
                     )
+                    if grava_colecao("historico_meditacoes"):
+                        obter_colecao(colecao_de("historico_meditacoes")).delete_many({"meditacao_id": meditacao_id})
                     print(f"✅ Históricos removidos de {usuarios_com_historico} usuário(s)")
                 else:
                     print("❌ Remoção cancelada")
@@ -296,6 +421,8 @@ class ControllerMeditacao:
             resultado = self.collection.delete_one({"_id": meditacao_id})
 
             if resultado.deleted_count > 0:
+                invalidar_catalogo()
+                _estatisticas.registrar(incrementos_meditacao(-1))
                 print(f"✅ Meditação '{meditacao.get_titulo()}' removida com sucesso")
                 return True
             else:
@@ -303,6 +430,7 @@ class ControllerMeditacao:
                 return False
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao remover meditação: {e}")
             return False
 
@@ -318,6 +446,7 @@ class ControllerMeditacao:
         try:
             return self.collection.count_documents({})
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao contar meditações: {e}")
             return 0
 
@@ -338,6 +467,7 @@ class ControllerMeditacao:
             return {item["_id"]: item["count"] for item in resultado}
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao contar por categoria: {e}")
             return {}
 
@@ -358,5 +488,6 @@ class ControllerMeditacao:
             return {item["_id"]: item["count"] for item in resultado}
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao contar por tipo: {e}")
             return {}
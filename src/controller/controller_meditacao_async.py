@@ -0,0 +1,424 @@
+"""
+Controller Assíncrono de Meditações - Calmou API
+Versão asyncio (Motor) do ControllerMeditacao, usada pela API ASGI
+
+Diferente do controller síncrono, não faz perguntas no terminal: inserir
+títulos repetidos é permitido e a remoção de meditações com histórico
+depende do parâmetro remover_historicos.
+"""
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import OperationFailure, PyMongoError
+from src.conexion.mongo_conexao_async import obter_colecao_async
+from src.controller.colecoes_separadas import colecao_de, grava_colecao, le_colecao
+from src.controller.controller_estatisticas import incrementos_meditacao
+from src.controller.controller_estatisticas_async import ControllerEstatisticasAsync
+from src.controller.controller_meditacao import CAMPOS_CATALOGO
+from src.model.meditacao import Meditacao
+from src.utils.cache_catalogo import invalidar_catalogo
+from src.utils.paginacao import codificar_cursor, decodificar_cursor
+
+
+class ControllerMeditacaoAsync:
+    """Controlador assíncrono para operações CRUD de meditações"""
+
+    def __init__(self):
+        """Inicializa o controller"""
+        self.collection = obter_colecao_async("meditacoes")
+        self.estatisticas = ControllerEstatisticasAsync()
+
+    # ==================== CREATE ====================
+
+    async def inserir_meditacao(self, meditacao):
+        """
+        Insere uma nova meditação no MongoDB
+
+        Args:
+            meditacao (Meditacao): Objeto Meditacao
+
+        Returns:
+            ObjectId: ID da meditação inserida, ou None se falhar
+        """
+        try:
+            doc = meditacao.to_dict()
+            doc.setdefault("versao", 1)
+            resultado = await self.collection.insert_one(doc)
+            invalidar_catalogo()
+            await self.estatisticas.registrar(incrementos_meditacao(1))
+            print(f"✅ Meditação '{meditacao.get_titulo()}' inserida com sucesso")
+            return resultado.inserted_id
+
+        except Exception as e:
+            print(f"❌ Erro ao inserir meditação: {e}")
+            return None
+
+    # ==================== READ ====================
+
+    async def buscar_por_id(self, meditacao_id):
+        """
+        Busca uma meditação por ID
+
+        Args:
+            meditacao_id (str ou ObjectId): ID da meditação
+
+        Returns:
+            Meditacao ou None: Objeto Meditacao ou None se não encontrado
+        """
+        try:
+            if isinstance(meditacao_id, str):
+                meditacao_id = ObjectId(meditacao_id)
+
+            doc = await self.collection.find_one({"_id": meditacao_id})
+
+            if doc:
+                return Meditacao.from_dict(doc)
+            return None
+
+        except InvalidId:
+            print(f"❌ ID inválido: {meditacao_id}")
+            return None
+        except Exception as e:
+            print(f"❌ Erro ao buscar meditação por ID: {e}")
+            return None
+
+    async def obter_versao(self, meditacao_id):
+        """
+        Busca apenas a versão da meditação (usada nos ETags)
+
+        Args:
+            meditacao_id (str ou ObjectId): ID da meditação
+
+        Returns:
+            int ou None: Versão atual, ou None se não encontrada
+
+        Raises:
+            PyMongoError: Falha ou timeout do MongoDB (não é tratada como
+                meditação inexistente, para a rota responder 5xx em vez de 404)
+        """
+        try:
+            if isinstance(meditacao_id, str):
+                meditacao_id = ObjectId(meditacao_id)
+
+            filtro = {"_id": meditacao_id}
+            projecao = {"_id": 1, "versao": 1}
+            try:
+                doc = await self.collection.find_one(filtro, projecao, hint=[("_id", 1), ("versao", 1)])
+            except OperationFailure:
+                # Índice idx_id_versao ainda não criado
+                doc = await self.collection.find_one(filtro, projecao)
+
+            if doc:
+                return doc.get("versao", 0)
+            return None
+
+        except InvalidId:
+            print(f"❌ ID inválido: {meditacao_id}")
+            return None
+        except PyMongoError as e:
+            print(f"❌ Erro ao buscar versão da meditação: {e}")
+            raise
+
+    async def buscar_por_titulo(self, titulo):
+        """
+        Busca uma meditação por título (primeira ocorrência)
+
+        Args:
+            titulo (str): Título da meditação
+
+        Returns:
+            Meditacao ou None: Objeto Meditacao ou None se não encontrado
+        """
+        try:
+            doc = await self.collection.find_one({"titulo": titulo})
+
+            if doc:
+                return Meditacao.from_dict(doc)
+            return None
+
+        except Exception as e:
+            print(f"❌ Erro ao buscar meditação por título: {e}")
+            return None
+
+    async def _listar(self, filtro, ordenacao, limite):
+        """Executa uma busca e converte os documentos em objetos Meditacao"""
+        cursor = self.collection.find(filtro).sort(ordenacao, 1).limit(limite)
+        return [Meditacao.from_dict(doc) async for doc in cursor]
+
+    async def listar_todas(self, limite=100):
+        """
+        Lista todas as meditações
+
+        Args:
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de objetos Meditacao
+        """
+        try:
+            return await self._listar({}, "titulo", limite)
+        except Exception as e:
+            print(f"❌ Erro ao listar meditações: {e}")
+            return []
+
+    async def listar_resumo(self, limite=100):
+        """
+        Lista resumo das meditações (apenas campos principais)
+
+        Args:
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de dicionários com dados resumidos
+        """
+        try:
+            cursor = self.collection.find(
+                {},
+                {"_id": 1, "titulo": 1, "tipo": 1, "categoria": 1, "duracao_minutos": 1}
+            ).sort("titulo", 1).limit(limite)
+
+            return await cursor.to_list(length=limite)
+
+        except Exception as e:
+            print(f"❌ Erro ao listar resumo de meditações: {e}")
+            return []
+
+    async def listar_pagina(self, limite=100, apos=None):
+        """
+        Lista uma página do catálogo usando paginação keyset em (titulo, _id)
+
+        Args:
+            limite (int): Quantidade de itens na página
+            apos (str, optional): Cursor devolvido pela página anterior
+
+        Returns:
+            tuple: (lista de dicionários com CAMPOS_CATALOGO, cursor da próxima página ou None),
+                ou None em caso de erro (não é uma página vazia: não vai para o cache)
+
+        Raises:
+            CursorInvalido: Se o cursor informado for inválido
+        """
+        filtro = {}
+        if apos:
+            titulo, ultimo_id = decodificar_cursor(apos, 2)
+            filtro = {"$or": [
+                {"titulo": {"$gt": titulo}},
+                {"titulo": titulo, "_id": {"$gt": ultimo_id}}
+            ]}
+
+        try:
+            # Busca um item a mais para saber se existe próxima página
+            cursor = (
+                self.collection.find(filtro, CAMPOS_CATALOGO)
+                .sort([("titulo", 1), ("_id", 1)])
+                .limit(limite + 1)
+            )
+            docs = await cursor.to_list(length=limite + 1)
+
+            proximo_cursor = None
+            if len(docs) > limite:
+                docs = docs[:limite]
+                ultimo = docs[-1]
+                proximo_cursor = codificar_cursor(ultimo.get("titulo"), ultimo["_id"])
+
+            return docs, proximo_cursor
+
+        except Exception as e:
+            print(f"❌ Erro ao listar página de meditações: {e}")
+            return None
+
+    async def buscar_por_categoria(self, categoria, limite=100):
+        """
+        Busca meditações por categoria
+
+        Args:
+            categoria (str): Categoria (iniciante, intermediário, avançado)
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de objetos Meditacao
+        """
+        try:
+            return await self._listar({"categoria": categoria}, "titulo", limite)
+        except Exception as e:
+            print(f"❌ Erro ao buscar por categoria: {e}")
+            return []
+
+    async def buscar_por_tipo(self, tipo, limite=100):
+        """
+        Busca meditações por tipo
+
+        Args:
+            tipo (str): Tipo da meditação
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de objetos Meditacao
+        """
+        try:
+            return await self._listar({"tipo": tipo}, "titulo", limite)
+        except Exception as e:
+            print(f"❌ Erro ao buscar por tipo: {e}")
+            return []
+
+    async def buscar_por_duracao(self, duracao_min, duracao_max, limite=100):
+        """
+        Busca meditações por faixa de duração
+
+        Args:
+            duracao_min (int): Duração mínima em minutos
+            duracao_max (int): Duração máxima em minutos
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de objetos Meditacao
+        """
+        try:
+            filtro = {"duracao_minutos": {"$gte": duracao_min, "$lte": duracao_max}}
+            return await self._listar(filtro, "duracao_minutos", limite)
+        except Exception as e:
+            print(f"❌ Erro ao buscar por duração: {e}")
+            return []
+
+    # ==================== UPDATE ====================
+
+    async def atualizar_meditacao(self, meditacao_id, campos_atualizados):
+        """
+        Atualiza campos de uma meditação
+
+        Args:
+            meditacao_id (str ou ObjectId): ID da meditação
+            campos_atualizados (dict): Dicionário com campos a atualizar
+
+        Returns:
+            bool: True se atualizado, False caso contrário
+        """
+        try:
+            if isinstance(meditacao_id, str):
+                meditacao_id = ObjectId(meditacao_id)
+
+            # Remove _id e versao dos campos (não podem ser atualizados)
+            campos_atualizados.pop("_id", None)
+            campos_atualizados.pop("versao", None)
+
+            # Atualiza e incrementa a versão usada nos ETags
+            resultado = await self.collection.update_one(
+                {"_id": meditacao_id},
+                {"$set": campos_atualizados, "$inc": {"versao": 1}}
+            )
+
+            if resultado.matched_count == 0:
+                print(f"❌ Meditação com ID {meditacao_id} não encontrada")
+                return False
+
+            invalidar_catalogo()
+            print(f"✅ Meditação {meditacao_id} atualizada com sucesso")
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro ao atualizar meditação: {e}")
+            return False
+
+    # ==================== DELETE ====================
+
+    async def remover_meditacao(self, meditacao_id, remover_historicos=False):
+        """
+        Remove uma meditação
+
+        Args:
+            meditacao_id (str ou ObjectId): ID da meditação
+            remover_historicos (bool): Se True, apaga a meditação dos históricos
+                dos usuários; se False, não remove meditações com histórico
+
+        Returns:
+            bool: True se removido, False caso contrário
+        """
+        try:
+            if isinstance(meditacao_id, str):
+                meditacao_id = ObjectId(meditacao_id)
+
+            usuarios_collection = obter_colecao_async("usuarios")
+            historico_collection = obter_colecao_async(colecao_de("historico_meditacoes"))
+            filtro_historico = {"historico_meditacoes.meditacao_id": meditacao_id}
+
+            if le_colecao("historico_meditacoes"):
+                tem_historico = await historico_collection.find_one({"meditacao_id": meditacao_id}, {"_id": 1})
+            else:
+                tem_historico = await usuarios_collection.find_one(filtro_historico, {"_id": 1})
+
+            if tem_historico:
+                if not remover_historicos:
+                    print("❌ Remoção cancelada: há usuários com histórico desta meditação")
+                    return False
+
+                await usuarios_collection.update_many(
+                    filtro_historico,
+                    {"$pull": {"historico_meditacoes": {"meditacao_id": meditacao_id}}}
+                )
+                if grava_colecao("historico_meditacoes"):
+                    await historico_collection.delete_many({"meditacao_id": meditacao_id})
+
+            resultado = await self.collection.delete_one({"_id": meditacao_id})
+
+            if resultado.deleted_count > 0:
+                invalidar_catalogo()
+                await self.estatisticas.registrar(incrementos_meditacao(-1))
+                print(f"✅ Meditação {meditacao_id} removida com sucesso")
+                return True
+
+            print(f"❌ Meditação com ID {meditacao_id} não encontrada")
+            return False
+
+        except Exception as e:
+            print(f"❌ Erro ao remover meditação: {e}")
+            return False
+
+    # ==================== CONTADORES ====================
+
+    async def contar_todas(self):
+        """
+        Conta o total de meditações
+
+        Returns:
+            int: Número total de meditações
+        """
+        try:
+            return await self.collection.count_documents({})
+        except Exception as e:
+            print(f"❌ Erro ao contar meditações: {e}")
+            return 0
+
+    async def _contar_por(self, campo):
+        """Conta meditações agrupando pelo campo indicado"""
+        pipeline = [
+            {"$group": {"_id": f"${campo}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ]
+        resultado = await self.collection.aggregate(pipeline).to_list(length=None)
+        return {item["_id"]: item["count"] for item in resultado}
+
+    async def contar_por_categoria(self):
+        """
+        Conta meditações por categoria
+
+        Returns:
+            dict: Dicionário com contagem por categoria
+        """
+        try:
+            return await self._contar_por("categoria")
+        except Exception as e:
+            print(f"❌ Erro ao contar por categoria: {e}")
+            return {}
+
+    async def contar_por_tipo(self):
+        """
+        Conta meditações por tipo
+
+        Returns:
+            dict: Dicionário com contagem por tipo
+        """
+        try:
+            return await self._contar_por("tipo")
+        except Exception as e:
+            print(f"❌ Erro ao contar por tipo: {e}")
+            return {}
@@ -5,17 +5,237 @@ Gerencia operações CRUD para usuários no MongoDB
 
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo.errors import OperationFailure, PyMongoError
 from src.conexion.mongo_conexao import obter_colecao
+from src.controller.buffer_push import obter_buffer_push
+from src.controller.colecoes_separadas import (
+    COLECOES_SEPARADAS, colecao_de, documento_separado, grava_array, grava_colecao, le_colecao
+)
+from src.controller.controller_estatisticas import (
+    ControllerEstatisticas, incrementos_humor, incrementos_sessao, incrementos_usuario
+)
+from src.controller.controller_humor import (
+    COLECAO_HUMOR, SENTIMENTO_NAO_ESPECIFICADO, ControllerHumor, combinar_resumos, leitura_legada, parte_legada
+)
 from src.model.usuario import Usuario, ClassificacaoHumor, HistoricoMeditacao, ResultadoAvaliacao, Notificacao
-from datetime import datetime
+from src.utils.paginacao import codificar_cursor, decodificar_cursor
+from src.utils.prazos import registrar_timeout
+from datetime import datetime, timedelta
+
+_estatisticas = ControllerEstatisticas()
+_humor = ControllerHumor()
+
+
+def pipeline_relatorio_humor(usuario_id, data_limite, registros=7):
+    """
+    Pipeline do relatório de humor sobre o array embedded antigo
+
+    Usado enquanto HUMOR_LEITURA_LEGADA=1 (usuários ainda não migrados para
+    os buckets de controller_humor.py). Filtra as classificações do período no servidor e devolve só o resumo:
+    total, média, contagem por sentimento e os registros mais recentes.
+    Usa $sortArray (MongoDB 5.2+) porque os arrays migrados do PostgreSQL
+    estão em ordem decrescente e os novos são inseridos com $push.
+
+    Args:
+        usuario_id (ObjectId): ID do usuário
+        data_limite (datetime): Início do período
+        registros (int): Quantidade de registros recentes retornados
+
+    Returns:
+        list: Estágios do aggregate
+    """
+    sentimento = {"$toString": {"$ifNull": ["$$c.sentimento_principal", SENTIMENTO_NAO_ESPECIFICADO]}}
+
+    return [
+        {"$match": {"_id": usuario_id}},
+        {"$project": {
+            "_id": 0,
+            "periodo": {"$filter": {
+                "input": {"$ifNull": ["$classificacoes_humor", []]},
+                "as": "c",
+                "cond": {"$gte": ["$$c.data_classificacao", data_limite]}
+            }}
+        }},
+        {"$addFields": {
+            "sentimentos": {"$map": {"input": "$periodo", "as": "c", "in": sentimento}}
+        }},
+        {"$project": {
+            "total_registros": {"$size": "$periodo"},
+            "media_humor": {"$avg": "$periodo.nivel_humor"},
+            "sentimentos_frequentes": {"$arrayToObject": {"$map": {
+                "input": {"$setUnion": ["$sentimentos", []]},
+                "as": "s",
+                "in": {
+                    "k": "$$s",
+                    "v": {"$size": {"$filter": {
+                        "input": "$sentimentos", "as": "x", "cond": {"$eq": ["$$x", "$$s"]}
+                    }}}
+                }
+            }}},
+            "registros": {"$slice": [
+                {"$sortArray": {"input": "$periodo", "sortBy": {"data_classificacao": -1}}},
+                registros
+            ]}
+        }}
+    ]
+
+
+def pipeline_historico_avaliacoes(usuario_id, limite, antes=None, tipo=None):
+    """
+    Pipeline de uma página do histórico de avaliações (mais recentes primeiro)
+
+    O filtro por tipo, a ordenação por (data_avaliacao, posicao) e o corte da
+    página são feitos no servidor; só limite + 1 avaliações saem do MongoDB.
+    Cada avaliação sai com a posicao no array, que desempata as avaliações
+    com a mesma data (os elementos gravados antes da escrita dupla não têm
+    _id, e o array só recebe $push, então a posição não muda).
+
+    Args:
+        usuario_id (ObjectId): ID do usuário
+        limite (int): Tamanho da página
+        antes (tuple, optional): (data_avaliacao, posicao) da última avaliação da página
+            anterior (posicao None: só avaliações de data anterior)
+        tipo (str, optional): Tipo de avaliação (ansiedade, depressao, estresse, burnout)
+
+    Returns:
+        list: Estágios do aggregate
+    """
+    avaliacoes = {"$ifNull": ["$resultados_avaliacoes", []]}
+    filtro_tipo = {"$eq": ["$$a.tipo", tipo]} if tipo else True
+    filtro_cursor = True
+    if antes:
+        data, posicao = antes
+        filtro_cursor = {"$lt": ["$$a.data_avaliacao", data]}
+        if posicao is not None:
+            filtro_cursor = {"$or": [
+                filtro_cursor,
+                {"$and": [{"$eq": ["$$a.data_avaliacao", data]}, {"$lt": ["$$a.posicao", posicao]}]}
+            ]}
+
+    return [
+        {"$match": {"_id": usuario_id}},
+        {"$project": {
+            "_id": 0,
+            "filtradas": {"$filter": {
+                "input": {"$map": {
+                    "input": {"$range": [0, {"$size": avaliacoes}]},
+                    "as": "i",
+                    "in": {"$mergeObjects": [{"$arrayElemAt": [avaliacoes, "$$i"]}, {"posicao": "$$i"}]}
+                }},
+                "as": "a",
+                "cond": filtro_tipo
+            }}
+        }},
+        {"$project": {
+            "total": {"$size": "$filtradas"},
+            "pagina": {"$slice": [
+                {"$sortArray": {
+                    "input": {"$filter": {"input": "$filtradas", "as": "a", "cond": filtro_cursor}},
+                    "sortBy": {"data_avaliacao": -1, "posicao": -1}
+                }},
+                limite + 1
+            ]}
+        }}
+    ]
+
+
+def pipeline_historico_avaliacoes_colecao(usuario_id, limite, antes=None, tipo=None):
+    """
+    Mesma página de pipeline_historico_avaliacoes, lida da coleção avaliacoes
+
+    Usado depois do corte de leitura de resultados_avaliacoes
+    (colecoes_separadas.py). O desempate entre avaliações com a mesma data
+    é o _id. O $match usa o índice idx_usuario_tipo_data (ou idx_usuario_data
+    sem tipo).
+
+    Args:
+        antes (tuple, optional): (data_avaliacao, _id) da última avaliação da página anterior
+
+    Returns:
+        list: Estágios do aggregate, no formato {total, pagina}
+    """
+    filtro = {"usuario_id": usuario_id}
+    if tipo:
+        filtro["tipo"] = tipo
+
+    filtro_cursor = {}
+    if antes:
+        data, ultimo_id = antes
+        filtro_cursor = {"data_avaliacao": {"$lt": data}}
+        if ultimo_id is not None:
+            filtro_cursor = {"$or": [
+                filtro_cursor,
+                {"data_avaliacao": data, "_id": {"$lt": ultimo_id}}
+            ]}
+
+    return [
+        {"$match": filtro},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "pagina": [
+                {"$match": filtro_cursor},
+                {"$sort": {"data_avaliacao": -1, "_id": -1}},
+                {"$limit": limite + 1},
+                {"$project": {"usuario_id": 0}}
+            ]
+        }},
+        {"$project": {
+            "total": {"$ifNull": [{"$arrayElemAt": ["$total.n", 0]}, 0]},
+            "pagina": 1
+        }}
+    ]
+
+
+def pagina_avaliacoes(resultado, limite, na_colecao):
+    """
+    Corta a página lida por um dos pipelines e monta o cursor da próxima
+
+    O campo de desempate (posicao no array, _id na coleção) vai para o
+    cursor e sai das avaliações.
+
+    Returns:
+        tuple: (avaliações, cursor da próxima página ou None)
+    """
+    desempate = "_id" if na_colecao else "posicao"
+    avaliacoes = resultado["pagina"]
+    proximo_cursor = None
+    if len(avaliacoes) > limite:
+        avaliacoes = avaliacoes[:limite]
+        ultima = avaliacoes[-1]
+        proximo_cursor = codificar_cursor(ultima.get("data_avaliacao"), ultima.get(desempate))
+    for avaliacao in avaliacoes:
+        avaliacao.pop(desempate, None)
+    return avaliacoes, proximo_cursor
+
+
+def cursor_avaliacoes(apos, na_colecao):
+    """
+    Decodifica o cursor do histórico de avaliações
+
+    Um cursor emitido na outra fase da migração (posicao lida na coleção ou
+    _id lido no array) continua a partir da data anterior à dele, sem desempate.
+
+    Returns:
+        tuple ou None: (data_avaliacao, desempate) para o pipeline
+
+    Raises:
+        CursorInvalido: Se o cursor informado for inválido
+    """
+    if not apos:
+        return None
+    data, desempate = decodificar_cursor(apos, 2)
+    if na_colecao != isinstance(desempate, ObjectId):
+        desempate = None
+    return data, desempate
 
 
 class ControllerUsuario:
     """Controlador para operações CRUD de usuários"""
 
-    def __init__(self):
-        """Inicializa o controller"""
-        self.collection = obter_colecao("usuarios")
+    @property
+    def collection(self):
+        """Coleção do cliente do processo atual (conecta na primeira utilização)"""
+        return obter_colecao("usuarios")
 
     # ==================== CREATE ====================
 
@@ -41,11 +261,19 @@ class ControllerUsuario:
                 return None
 
             # Insere o usuário
-            resultado = self.collection.insert_one(usuario.to_dict())
+            doc = usuario.to_dict()
+            # Sem CPF o campo não é gravado: o índice único esparso só ignora campos ausentes
+            if doc.get("cpf") is None:
+                doc.pop("cpf", None)
+            doc.setdefault("versao", 1)
+            doc.setdefault("ultima_atividade", doc.get("data_cadastro") or datetime.now())
+            resultado = self.collection.insert_one(doc)
+            _estatisticas.registrar(incrementos_usuario(1))
             print(f"✅ Usuário '{usuario.get_nome()}' inserido com sucesso")
             return resultado.inserted_id
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao inserir usuário: {e}")
             return None
 
@@ -75,9 +303,136 @@ class ControllerUsuario:
             print(f"❌ ID inválido: {usuario_id}")
             return None
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar usuário por ID: {e}")
             return None
 
+    def obter_versao(self, usuario_id):
+        """
+        Busca apenas a versão do perfil do usuário (usada nos ETags)
+
+        A versão só muda em atualizar_usuario, já que os arrays embedded não
+        fazem parte do perfil. A consulta é coberta pelo índice idx_id_versao
+        (_id, versao), então não lê o documento. Documentos antigos sem o
+        campo têm versão 0.
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+
+        Returns:
+            int ou None: Versão atual, ou None se não encontrado
+
+        Raises:
+            PyMongoError: Falha ou timeout do MongoDB (não é tratada como
+                usuário inexistente, para a rota responder 5xx em vez de 404)
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            filtro = {"_id": usuario_id}
+            projecao = {"_id": 1, "versao": 1}
+            try:
+                doc = self.collection.find_one(filtro, projecao, hint=[("_id", 1), ("versao", 1)])
+            except OperationFailure:
+                # Índice idx_id_versao ainda não criado
+                doc = self.collection.find_one(filtro, projecao)
+
+            if doc:
+                return doc.get("versao", 0)
+            return None
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except PyMongoError as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao buscar versão do usuário: {e}")
+            raise
+
+    def buscar_campos(self, usuario_id, projecao):
+        """
+        Busca apenas os campos indicados do usuário, sem carregar os arrays embedded
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            projecao (dict): Projeção MongoDB (ex.: MapaCampos.projecao)
+
+        Returns:
+            dict ou None: Documento parcial ou None se não encontrado
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            return self.collection.find_one({"_id": usuario_id}, projecao)
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except Exception as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao buscar campos do usuário: {e}")
+            return None
+
+    def buscar_subdocumentos(self, usuario_id, campo, ultimos=None):
+        """
+        Busca um único array embedded do usuário, opcionalmente só os últimos itens
+
+        Os arrays crescem com $push, então os últimos itens são os mais
+        recentes. O corte é feito no servidor com $slice, e o restante do
+        documento não é transferido.
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            campo (str): Nome do array (ex.: "classificacoes_humor")
+            ultimos (int, optional): Quantidade máxima de itens, a partir do fim
+
+        Returns:
+            list ou None: Itens do array ou None se o usuário não for encontrado
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            if campo in COLECOES_SEPARADAS and le_colecao(campo):
+                return self._buscar_separados(usuario_id, campo, ultimos)
+
+            if ultimos is None:
+                doc = self.collection.find_one({"_id": usuario_id}, {"_id": 0, campo: 1})
+            else:
+                # $slice como expressão de $project mantém a projeção só de inclusão
+                resultado = list(self.collection.aggregate([
+                    {"$match": {"_id": usuario_id}},
+                    {"$project": {"_id": 0, campo: {"$slice": [{"$ifNull": [f"${campo}", []]}, -ultimos]}}}
+                ]))
+                doc = resultado[0] if resultado else None
+
+            if doc is None:
+                return None
+            return doc.get(campo) or []
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except Exception as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao buscar {campo} do usuário: {e}")
+            return None
+
+    def _buscar_separados(self, usuario_id, campo, ultimos=None):
+        """buscar_subdocumentos lendo a coleção separada do array (mesma ordem)"""
+        colecao, campo_data = COLECOES_SEPARADAS[campo]
+        cursor = obter_colecao(colecao).find({"usuario_id": usuario_id}, {"usuario_id": 0})
+        if ultimos is None:
+            itens = list(cursor.sort(campo_data, 1))
+        else:
+            itens = list(cursor.sort(campo_data, -1).limit(ultimos))[::-1]
+
+        if not itens and self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is None:
+            return None
+        return itens
+
     def buscar_por_email(self, email):
         """
         Busca um usuário por email
@@ -96,6 +451,7 @@ class ControllerUsuario:
             return None
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar usuário por email: {e}")
             return None
 
@@ -117,6 +473,7 @@ class ControllerUsuario:
             return None
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao buscar usuário por CPF: {e}")
             return None
 
@@ -135,6 +492,7 @@ class ControllerUsuario:
             return [Usuario.from_dict(doc) for doc in docs]
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao listar usuários: {e}")
             return []
 
@@ -157,6 +515,7 @@ class ControllerUsuario:
             return list(docs)
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao listar resumo de usuários: {e}")
             return []
 
@@ -182,23 +541,25 @@ class ControllerUsuario:
                 print(f"❌ Usuário com ID {usuario_id} não encontrado")
                 return False
 
-            # Remove _id dos campos (não pode ser atualizado)
+            # Remove _id e versao dos campos (não podem ser atualizados)
             campos_atualizados.pop("_id", None)
+            campos_atualizados.pop("versao", None)
 
-            # Atualiza
+            # Atualiza e incrementa a versão usada nos ETags
             resultado = self.collection.update_one(
                 {"_id": usuario_id},
-                {"$set": campos_atualizados}
+                {"$set": campos_atualizados, "$inc": {"versao": 1}}
             )
 
             if resultado.modified_count > 0:
                 print(f"✅ Usuário {usuario_id} atualizado com sucesso")
                 return True
             else:
-                print(f"⚠️  Nenhuma modificação realizada (valores podem ser iguais)")
+                print("⚠️  Nenhuma modificação realizada (valores podem ser iguais)")
                 return True
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao atualizar usuário: {e}")
             return False
 
@@ -228,21 +589,107 @@ class ControllerUsuario:
             resultado = self.collection.delete_one({"_id": usuario_id})
 
             if resultado.deleted_count > 0:
+                self.remover_dependentes(usuario_id)
+                _estatisticas.registrar(incrementos_usuario(-1))
                 print(f"✅ Usuário '{usuario.get_nome()}' removido com sucesso")
                 return True
             else:
-                print(f"❌ Falha ao remover usuário")
+                print("❌ Falha ao remover usuário")
                 return False
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao remover usuário: {e}")
             return False
 
+    def remover_dependentes(self, usuario_id):
+        """
+        Remove os documentos do usuário fora de usuarios: buckets de humor e,
+        nos arrays em migração, os documentos das coleções separadas
+
+        Args:
+            usuario_id (ObjectId): ID do usuário já removido
+        """
+        _humor.remover_usuario(usuario_id)
+        for campo in COLECOES_SEPARADAS:
+            if grava_colecao(campo):
+                try:
+                    obter_colecao(colecao_de(campo)).delete_many({"usuario_id": usuario_id})
+                except Exception as e:
+                    registrar_timeout(e)
+                    print(f"❌ Erro ao remover {campo} do usuário: {e}")
+
     # ==================== OPERAÇÕES COM SUBDOCUMENTOS ====================
 
+    def _push(self, usuario_id, campo, subdocumento, incrementos=None, atividade=True):
+        """
+        Adiciona um subdocumento ao array embedded indicado
+
+        Com PUSH_MODO=buffer o evento é agrupado com os demais do usuário e
+        gravado em lote pela thread do buffer (buffer_push.py); nesse caso
+        retorna True assim que o evento é aceito. Com o array em migração
+        (colecoes_separadas.py), o subdocumento também vai para a coleção
+        separada, ou só para ela na fase 'separada'.
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            campo (str): Array embedded
+            subdocumento (dict): Elemento acrescentado ao array
+            incrementos (list): Operações de estatísticas do evento
+            atividade (bool): Atualiza usuarios.ultima_atividade
+
+        Returns:
+            bool: True se adicionado (ou aceito pelo buffer), False se o usuário não existe
+        """
+        if isinstance(usuario_id, str):
+            usuario_id = ObjectId(usuario_id)
+        definir = {"ultima_atividade": datetime.now()} if atividade else None
+        no_array = grava_array(campo)
+        na_colecao = grava_colecao(campo)
+        if na_colecao:
+            # O mesmo _id no array e na coleção: o backfill não duplica o elemento
+            subdocumento = dict(subdocumento, _id=ObjectId())
+
+        buffer = obter_buffer_push()
+        if buffer.ativo:
+            if no_array:
+                buffer.adicionar(usuario_id, campo, subdocumento, definir, incrementos)
+            if na_colecao:
+                buffer.adicionar(
+                    usuario_id, None, subdocumento,
+                    None if no_array else definir, None if no_array else incrementos,
+                    destino=colecao_de(campo)
+                )
+            return True
+
+        atualizacao = {}
+        if no_array:
+            atualizacao["$push"] = {campo: subdocumento}
+        if definir:
+            atualizacao["$set"] = definir
+        if atualizacao:
+            existe = self.collection.update_one({"_id": usuario_id}, atualizacao).matched_count > 0
+        else:
+            existe = self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is not None
+        if not existe:
+            return False
+
+        if na_colecao:
+            try:
+                obter_colecao(colecao_de(campo)).insert_one(documento_separado(usuario_id, campo, subdocumento))
+            except Exception as e:
+                if not no_array:
+                    raise
+                # Já está no array com o mesmo _id: o backfill copia depois
+                print(f"⚠️  Escrita dupla em '{colecao_de(campo)}' não gravada: {e}")
+
+        if incrementos:
+            _estatisticas.registrar(incrementos)
+        return True
+
     def adicionar_classificacao_humor(self, usuario_id, classificacao):
         """
-        Adiciona uma classificação de humor ao usuário
+        Adiciona uma classificação de humor ao bucket do mês (controller_humor.py)
 
         Args:
             usuario_id (str ou ObjectId): ID do usuário
@@ -254,18 +701,26 @@ class ControllerUsuario:
         try:
             if isinstance(usuario_id, str):
                 usuario_id = ObjectId(usuario_id)
+            doc = classificacao.to_dict()
+            definir = {"ultima_atividade": datetime.now()}
+            incrementos = incrementos_humor(classificacao.data_classificacao)
+
+            buffer = obter_buffer_push()
+            if buffer.ativo:
+                buffer.adicionar(usuario_id, None, doc, definir, incrementos, destino=COLECAO_HUMOR)
+                print("✅ Classificação de humor adicionada")
+                return True
 
-            resultado = self.collection.update_one(
-                {"_id": usuario_id},
-                {"$push": {"classificacoes_humor": classificacao.to_dict()}}
-            )
+            resultado = self.collection.update_one({"_id": usuario_id}, {"$set": definir})
+            if resultado.matched_count == 0 or not _humor.adicionar(usuario_id, [doc]):
+                return False
 
-            if resultado.modified_count > 0:
-                print(f"✅ Classificação de humor adicionada")
-                return True
-            return False
+            _estatisticas.registrar(incrementos)
+            print("✅ Classificação de humor adicionada")
+            return True
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao adicionar classificação: {e}")
             return False
 
@@ -281,20 +736,14 @@ class ControllerUsuario:
             bool: True se adicionado, False caso contrário
         """
         try:
-            if isinstance(usuario_id, str):
-                usuario_id = ObjectId(usuario_id)
-
-            resultado = self.collection.update_one(
-                {"_id": usuario_id},
-                {"$push": {"historico_meditacoes": historico.to_dict()}}
-            )
-
-            if resultado.modified_count > 0:
-                print(f"✅ Histórico de meditação adicionado")
+            if self._push(usuario_id, "historico_meditacoes", historico.to_dict(),
+                          incrementos_sessao(historico.duracao_real_minutos, historico.data_conclusao)):
+                print("✅ Histórico de meditação adicionado")
                 return True
             return False
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao adicionar histórico: {e}")
             return False
 
@@ -310,20 +759,13 @@ class ControllerUsuario:
             bool: True se adicionado, False caso contrário
         """
         try:
-            if isinstance(usuario_id, str):
-                usuario_id = ObjectId(usuario_id)
-
-            resultado = self.collection.update_one(
-                {"_id": usuario_id},
-                {"$push": {"resultados_avaliacoes": resultado_aval.to_dict()}}
-            )
-
-            if resultado.modified_count > 0:
-                print(f"✅ Resultado de avaliação adicionado")
+            if self._push(usuario_id, "resultados_avaliacoes", resultado_aval.to_dict()):
+                print("✅ Resultado de avaliação adicionado")
                 return True
             return False
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao adicionar resultado: {e}")
             return False
 
@@ -339,23 +781,116 @@ class ControllerUsuario:
             bool: True se adicionado, False caso contrário
         """
         try:
-            if isinstance(usuario_id, str):
-                usuario_id = ObjectId(usuario_id)
-
-            resultado = self.collection.update_one(
-                {"_id": usuario_id},
-                {"$push": {"notificacoes": notificacao.to_dict()}}
-            )
-
-            if resultado.modified_count > 0:
-                print(f"✅ Notificação adicionada")
+            # Notificação é enviada pelo sistema, não é atividade do usuário
+            if self._push(usuario_id, "notificacoes", notificacao.to_dict(), atividade=False):
+                print("✅ Notificação adicionada")
                 return True
             return False
 
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao adicionar notificação: {e}")
             return False
 
+    # ==================== RELATÓRIOS ====================
+
+    def relatorio_humor(self, usuario_id, dias=7, registros=7):
+        """
+        Calcula o relatório de humor dos últimos dias no MongoDB
+
+        Lê só os buckets mensais do período (mais o array antigo enquanto
+        HUMOR_LEITURA_LEGADA=1) e junta os resumos de cada um.
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            dias (int): Tamanho da janela em dias
+            registros (int): Quantidade de registros recentes retornados
+
+        Returns:
+            dict ou None: total_registros, media_humor, sentimentos_frequentes
+            e registros, ou None se o usuário não for encontrado
+
+        Raises:
+            PyMongoError: Falha ou timeout do MongoDB (a rota responde 5xx,
+                não 404)
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            data_limite = datetime.now() - timedelta(days=dias)
+            partes = _humor.resumo_periodo(usuario_id, data_limite, registros)
+
+            if leitura_legada():
+                resultado = list(self.collection.aggregate(
+                    pipeline_relatorio_humor(usuario_id, data_limite, registros)
+                ))
+                if not resultado:
+                    return None
+                partes.append(parte_legada(resultado[0]))
+            elif not partes and self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is None:
+                return None
+
+            return combinar_resumos(partes, registros)
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except PyMongoError as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao gerar relatório de humor: {e}")
+            raise
+
+    def listar_avaliacoes(self, usuario_id, limite=50, apos=None, tipo=None):
+        """
+        Lista uma página do histórico de avaliações, paginada por (data_avaliacao, desempate)
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            limite (int): Quantidade de avaliações na página
+            apos (str, optional): Cursor devolvido pela página anterior
+            tipo (str, optional): Filtra por tipo de avaliação
+
+        Returns:
+            tuple ou None: (avaliações, cursor da próxima página ou None, total
+            com o filtro de tipo), ou None se o usuário não for encontrado
+
+        Raises:
+            CursorInvalido: Se o cursor informado for inválido
+            PyMongoError: Falha ou timeout do MongoDB (a rota responde 5xx,
+                não 404)
+        """
+        na_colecao = le_colecao("resultados_avaliacoes")
+        antes = cursor_avaliacoes(apos, na_colecao)
+
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            if na_colecao:
+                resultado = list(obter_colecao(colecao_de("resultados_avaliacoes")).aggregate(
+                    pipeline_historico_avaliacoes_colecao(usuario_id, limite, antes, tipo)
+                ))
+                if not resultado[0]["total"] and self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is None:
+                    return None
+            else:
+                resultado = list(self.collection.aggregate(
+                    pipeline_historico_avaliacoes(usuario_id, limite, antes, tipo)
+                ))
+                if not resultado:
+                    return None
+
+            avaliacoes, proximo_cursor = pagina_avaliacoes(resultado[0], limite, na_colecao)
+            return avaliacoes, proximo_cursor, resultado[0]["total"]
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except PyMongoError as e:
+            registrar_timeout(e)
+            print(f"❌ Erro ao listar avaliações: {e}")
+            raise
+
     # ==================== CONTADORES ====================
 
     def contar_todos(self):
@@ -368,5 +903,6 @@ class ControllerUsuario:
         try:
             return self.collection.count_documents({})
         except Exception as e:
+            registrar_timeout(e)
             print(f"❌ Erro ao contar usuários: {e}")
             return 0
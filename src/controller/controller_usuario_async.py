@@ -0,0 +1,609 @@
+"""
+Controller Assíncrono de Usuários - Calmou API
+Versão asyncio (Motor) do ControllerUsuario, usada pela API ASGI
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import OperationFailure, PyMongoError
+from src.conexion.mongo_conexao_async import obter_colecao_async
+from src.controller.colecoes_separadas import (
+    COLECOES_SEPARADAS, colecao_de, documento_separado, grava_array, grava_colecao, le_colecao
+)
+from src.controller.controller_estatisticas import incrementos_humor, incrementos_sessao, incrementos_usuario
+from src.controller.controller_estatisticas_async import ControllerEstatisticasAsync
+from src.controller.controller_humor import combinar_resumos, leitura_legada, parte_legada
+from src.controller.controller_humor_async import ControllerHumorAsync
+from src.controller.controller_usuario import (
+    cursor_avaliacoes, pagina_avaliacoes, pipeline_historico_avaliacoes,
+    pipeline_historico_avaliacoes_colecao, pipeline_relatorio_humor
+)
+from src.model.usuario import Usuario
+
+
+class ControllerUsuarioAsync:
+    """Controlador assíncrono para operações CRUD de usuários"""
+
+    def __init__(self):
+        """Inicializa o controller"""
+        self.collection = obter_colecao_async("usuarios")
+        self.estatisticas = ControllerEstatisticasAsync()
+        self.humor = ControllerHumorAsync()
+
+    # ==================== CREATE ====================
+
+    async def inserir_usuario(self, usuario):
+        """
+        Insere um novo usuário no MongoDB
+
+        Args:
+            usuario (Usuario): Objeto Usuario
+
+        Returns:
+            ObjectId: ID do usuário inserido, ou None se falhar
+        """
+        try:
+            # Verifica se email já existe
+            if await self.buscar_por_email(usuario.get_email()):
+                print(f"❌ Erro: Email '{usuario.get_email()}' já cadastrado")
+                return None
+
+            # Verifica se CPF já existe (se fornecido)
+            if usuario.get_cpf() and await self.buscar_por_cpf(usuario.get_cpf()):
+                print(f"❌ Erro: CPF '{usuario.get_cpf()}' já cadastrado")
+                return None
+
+            # Insere o usuário
+            doc = usuario.to_dict()
+            # Sem CPF o campo não é gravado: o índice único esparso só ignora campos ausentes
+            if doc.get("cpf") is None:
+                doc.pop("cpf", None)
+            doc.setdefault("versao", 1)
+            doc.setdefault("ultima_atividade", doc.get("data_cadastro") or datetime.now())
+            resultado = await self.collection.insert_one(doc)
+            await self.estatisticas.registrar(incrementos_usuario(1))
+            print(f"✅ Usuário '{usuario.get_nome()}' inserido com sucesso")
+            return resultado.inserted_id
+
+        except Exception as e:
+            print(f"❌ Erro ao inserir usuário: {e}")
+            return None
+
+    # ==================== READ ====================
+
+    async def buscar_por_id(self, usuario_id):
+        """
+        Busca um usuário por ID
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+
+        Returns:
+            Usuario ou None: Objeto Usuario ou None se não encontrado
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            doc = await self.collection.find_one({"_id": usuario_id})
+
+            if doc:
+                return Usuario.from_dict(doc)
+            return None
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except Exception as e:
+            print(f"❌ Erro ao buscar usuário por ID: {e}")
+            return None
+
+    async def obter_versao(self, usuario_id):
+        """
+        Busca apenas a versão do perfil do usuário (usada nos ETags)
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+
+        Returns:
+            int ou None: Versão atual, ou None se não encontrado
+
+        Raises:
+            PyMongoError: Falha ou timeout do MongoDB (não é tratada como
+                usuário inexistente, para a rota responder 5xx em vez de 404)
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            filtro = {"_id": usuario_id}
+            projecao = {"_id": 1, "versao": 1}
+            try:
+                doc = await self.collection.find_one(filtro, projecao, hint=[("_id", 1), ("versao", 1)])
+            except OperationFailure:
+                # Índice idx_id_versao ainda não criado
+                doc = await self.collection.find_one(filtro, projecao)
+
+            if doc:
+                return doc.get("versao", 0)
+            return None
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except PyMongoError as e:
+            print(f"❌ Erro ao buscar versão do usuário: {e}")
+            raise
+
+    async def buscar_campos(self, usuario_id, projecao):
+        """
+        Busca apenas os campos indicados do usuário, sem carregar os arrays embedded
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            projecao (dict): Projeção MongoDB (ex.: MapaCampos.projecao)
+
+        Returns:
+            dict ou None: Documento parcial ou None se não encontrado
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            return await self.collection.find_one({"_id": usuario_id}, projecao)
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except Exception as e:
+            print(f"❌ Erro ao buscar campos do usuário: {e}")
+            return None
+
+    async def buscar_subdocumentos(self, usuario_id, campo, ultimos=None):
+        """
+        Busca um único array embedded do usuário, opcionalmente só os últimos itens
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            campo (str): Nome do array (ex.: "classificacoes_humor")
+            ultimos (int, optional): Quantidade máxima de itens, a partir do fim
+
+        Returns:
+            list ou None: Itens do array ou None se o usuário não for encontrado
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            if campo in COLECOES_SEPARADAS and le_colecao(campo):
+                return await self._buscar_separados(usuario_id, campo, ultimos)
+
+            if ultimos is None:
+                doc = await self.collection.find_one({"_id": usuario_id}, {"_id": 0, campo: 1})
+            else:
+                resultado = await self.collection.aggregate([
+                    {"$match": {"_id": usuario_id}},
+                    {"$project": {"_id": 0, campo: {"$slice": [{"$ifNull": [f"${campo}", []]}, -ultimos]}}}
+                ]).to_list(length=1)
+                doc = resultado[0] if resultado else None
+
+            if doc is None:
+                return None
+            return doc.get(campo) or []
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except Exception as e:
+            print(f"❌ Erro ao buscar {campo} do usuário: {e}")
+            return None
+
+    async def _buscar_separados(self, usuario_id, campo, ultimos=None):
+        """buscar_subdocumentos lendo a coleção separada do array (mesma ordem)"""
+        colecao, campo_data = COLECOES_SEPARADAS[campo]
+        cursor = obter_colecao_async(colecao).find({"usuario_id": usuario_id}, {"usuario_id": 0})
+        if ultimos is None:
+            itens = await cursor.sort(campo_data, 1).to_list(length=None)
+        else:
+            itens = (await cursor.sort(campo_data, -1).limit(ultimos).to_list(length=None))[::-1]
+
+        if not itens and await self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is None:
+            return None
+        return itens
+
+    async def buscar_por_email(self, email):
+        """
+        Busca um usuário por email
+
+        Args:
+            email (str): Email do usuário
+
+        Returns:
+            Usuario ou None: Objeto Usuario ou None se não encontrado
+        """
+        try:
+            doc = await self.collection.find_one({"email": email})
+
+            if doc:
+                return Usuario.from_dict(doc)
+            return None
+
+        except Exception as e:
+            print(f"❌ Erro ao buscar usuário por email: {e}")
+            return None
+
+    async def buscar_por_cpf(self, cpf):
+        """
+        Busca um usuário por CPF
+
+        Args:
+            cpf (str): CPF do usuário
+
+        Returns:
+            Usuario ou None: Objeto Usuario ou None se não encontrado
+        """
+        try:
+            doc = await self.collection.find_one({"cpf": cpf})
+
+            if doc:
+                return Usuario.from_dict(doc)
+            return None
+
+        except Exception as e:
+            print(f"❌ Erro ao buscar usuário por CPF: {e}")
+            return None
+
+    async def listar_todos(self, limite=100):
+        """
+        Lista todos os usuários
+
+        Args:
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de objetos Usuario
+        """
+        try:
+            cursor = self.collection.find().sort("data_cadastro", -1).limit(limite)
+            return [Usuario.from_dict(doc) async for doc in cursor]
+
+        except Exception as e:
+            print(f"❌ Erro ao listar usuários: {e}")
+            return []
+
+    async def listar_resumo(self, limite=100):
+        """
+        Lista resumo dos usuários (apenas campos principais)
+
+        Args:
+            limite (int): Limite de resultados
+
+        Returns:
+            list: Lista de dicionários com dados resumidos
+        """
+        try:
+            cursor = self.collection.find(
+                {},
+                {"_id": 1, "nome": 1, "email": 1, "cpf": 1, "data_cadastro": 1}
+            ).sort("data_cadastro", -1).limit(limite)
+
+            return await cursor.to_list(length=limite)
+
+        except Exception as e:
+            print(f"❌ Erro ao listar resumo de usuários: {e}")
+            return []
+
+    # ==================== UPDATE ====================
+
+    async def atualizar_usuario(self, usuario_id, campos_atualizados):
+        """
+        Atualiza campos de um usuário
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            campos_atualizados (dict): Dicionário com campos a atualizar
+
+        Returns:
+            bool: True se atualizado, False caso contrário
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            # Verifica se usuário existe
+            if await self.obter_versao(usuario_id) is None:
+                print(f"❌ Usuário com ID {usuario_id} não encontrado")
+                return False
+
+            # Remove _id e versao dos campos (não podem ser atualizados)
+            campos_atualizados.pop("_id", None)
+            campos_atualizados.pop("versao", None)
+
+            # Atualiza e incrementa a versão usada nos ETags
+            resultado = await self.collection.update_one(
+                {"_id": usuario_id},
+                {"$set": campos_atualizados, "$inc": {"versao": 1}}
+            )
+
+            if resultado.modified_count > 0:
+                print(f"✅ Usuário {usuario_id} atualizado com sucesso")
+            else:
+                print("⚠️  Nenhuma modificação realizada (valores podem ser iguais)")
+            return True
+
+        except Exception as e:
+            print(f"❌ Erro ao atualizar usuário: {e}")
+            return False
+
+    # ==================== DELETE ====================
+
+    async def remover_usuario(self, usuario_id):
+        """
+        Remove um usuário
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+
+        Returns:
+            bool: True se removido, False caso contrário
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            resultado = await self.collection.delete_one({"_id": usuario_id})
+
+            if resultado.deleted_count > 0:
+                await self.remover_dependentes(usuario_id)
+                await self.estatisticas.registrar(incrementos_usuario(-1))
+                print(f"✅ Usuário {usuario_id} removido com sucesso")
+                return True
+
+            print(f"❌ Usuário com ID {usuario_id} não encontrado")
+            return False
+
+        except Exception as e:
+            print(f"❌ Erro ao remover usuário: {e}")
+            return False
+
+    async def remover_dependentes(self, usuario_id):
+        """Remove os buckets de humor e os documentos das coleções separadas do usuário"""
+        await self.humor.remover_usuario(usuario_id)
+        for campo in COLECOES_SEPARADAS:
+            if grava_colecao(campo):
+                try:
+                    await obter_colecao_async(colecao_de(campo)).delete_many({"usuario_id": usuario_id})
+                except Exception as e:
+                    print(f"❌ Erro ao remover {campo} do usuário: {e}")
+
+    # ==================== OPERAÇÕES COM SUBDOCUMENTOS ====================
+
+    async def _push(self, usuario_id, campo, subdocumento, incrementos=None, atividade=True):
+        """
+        Adiciona um subdocumento ao array embedded indicado (e à coleção
+        separada, conforme a fase de colecoes_separadas.py)
+        """
+        if isinstance(usuario_id, str):
+            usuario_id = ObjectId(usuario_id)
+        no_array = grava_array(campo)
+        na_colecao = grava_colecao(campo)
+        if na_colecao:
+            subdocumento = dict(subdocumento, _id=ObjectId())
+
+        atualizacao = {"$set": {"ultima_atividade": datetime.now()}} if atividade else {}
+        if no_array:
+            atualizacao["$push"] = {campo: subdocumento}
+        if atualizacao:
+            existe = (await self.collection.update_one({"_id": usuario_id}, atualizacao)).matched_count > 0
+        else:
+            existe = await self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is not None
+        if not existe:
+            return False
+
+        if na_colecao:
+            try:
+                await obter_colecao_async(colecao_de(campo)).insert_one(
+                    documento_separado(usuario_id, campo, subdocumento)
+                )
+            except Exception as e:
+                if not no_array:
+                    raise
+                print(f"⚠️  Escrita dupla em '{colecao_de(campo)}' não gravada: {e}")
+
+        if incrementos:
+            await self.estatisticas.registrar(incrementos)
+        return True
+
+    async def adicionar_classificacao_humor(self, usuario_id, classificacao):
+        """
+        Adiciona uma classificação de humor ao bucket do mês (controller_humor.py)
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            classificacao (ClassificacaoHumor): Objeto de classificação
+
+        Returns:
+            bool: True se adicionado, False caso contrário
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            resultado = await self.collection.update_one(
+                {"_id": usuario_id}, {"$set": {"ultima_atividade": datetime.now()}}
+            )
+            if resultado.matched_count == 0 or not await self.humor.adicionar(usuario_id, [classificacao.to_dict()]):
+                return False
+
+            await self.estatisticas.registrar(incrementos_humor(classificacao.data_classificacao))
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao adicionar classificação: {e}")
+            return False
+
+    async def adicionar_historico_meditacao(self, usuario_id, historico):
+        """
+        Adiciona um histórico de meditação ao usuário
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            historico (HistoricoMeditacao): Objeto de histórico
+
+        Returns:
+            bool: True se adicionado, False caso contrário
+        """
+        try:
+            return await self._push(
+                usuario_id, "historico_meditacoes", historico.to_dict(),
+                incrementos_sessao(historico.duracao_real_minutos, historico.data_conclusao)
+            )
+        except Exception as e:
+            print(f"❌ Erro ao adicionar histórico: {e}")
+            return False
+
+    async def adicionar_resultado_avaliacao(self, usuario_id, resultado_aval):
+        """
+        Adiciona um resultado de avaliação ao usuário
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            resultado_aval (ResultadoAvaliacao): Objeto de resultado
+
+        Returns:
+            bool: True se adicionado, False caso contrário
+        """
+        try:
+            return await self._push(usuario_id, "resultados_avaliacoes", resultado_aval.to_dict())
+        except Exception as e:
+            print(f"❌ Erro ao adicionar resultado: {e}")
+            return False
+
+    async def adicionar_notificacao(self, usuario_id, notificacao):
+        """
+        Adiciona uma notificação ao usuário
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            notificacao (Notificacao): Objeto de notificação
+
+        Returns:
+            bool: True se adicionado, False caso contrário
+        """
+        try:
+            # Notificação é enviada pelo sistema, não é atividade do usuário
+            return await self._push(usuario_id, "notificacoes", notificacao.to_dict(), atividade=False)
+        except Exception as e:
+            print(f"❌ Erro ao adicionar notificação: {e}")
+            return False
+
+    # ==================== RELATÓRIOS ====================
+
+    async def relatorio_humor(self, usuario_id, dias=7, registros=7):
+        """
+        Calcula o relatório de humor dos últimos dias no MongoDB
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            dias (int): Tamanho da janela em dias
+            registros (int): Quantidade de registros recentes retornados
+
+        Returns:
+            dict ou None: total_registros, media_humor, sentimentos_frequentes
+            e registros, ou None se o usuário não for encontrado
+
+        Raises:
+            PyMongoError: Falha ou timeout do MongoDB (a rota responde 5xx,
+                não 404)
+        """
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            data_limite = datetime.now() - timedelta(days=dias)
+            partes = await self.humor.resumo_periodo(usuario_id, data_limite, registros)
+
+            if leitura_legada():
+                resultado = await self.collection.aggregate(
+                    pipeline_relatorio_humor(usuario_id, data_limite, registros)
+                ).to_list(length=1)
+                if not resultado:
+                    return None
+                partes.append(parte_legada(resultado[0]))
+            elif not partes and await self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is None:
+                return None
+
+            return combinar_resumos(partes, registros)
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except PyMongoError as e:
+            print(f"❌ Erro ao gerar relatório de humor: {e}")
+            raise
+
+    async def listar_avaliacoes(self, usuario_id, limite=50, apos=None, tipo=None):
+        """
+        Lista uma página do histórico de avaliações, paginada por (data_avaliacao, desempate)
+
+        Args:
+            usuario_id (str ou ObjectId): ID do usuário
+            limite (int): Quantidade de avaliações na página
+            apos (str, optional): Cursor devolvido pela página anterior
+            tipo (str, optional): Filtra por tipo de avaliação
+
+        Returns:
+            tuple ou None: (avaliações, cursor da próxima página ou None, total
+            com o filtro de tipo), ou None se o usuário não for encontrado
+
+        Raises:
+            CursorInvalido: Se o cursor informado for inválido
+            PyMongoError: Falha ou timeout do MongoDB (a rota responde 5xx,
+                não 404)
+        """
+        na_colecao = le_colecao("resultados_avaliacoes")
+        antes = cursor_avaliacoes(apos, na_colecao)
+
+        try:
+            if isinstance(usuario_id, str):
+                usuario_id = ObjectId(usuario_id)
+
+            if na_colecao:
+                resultado = await obter_colecao_async(colecao_de("resultados_avaliacoes")).aggregate(
+                    pipeline_historico_avaliacoes_colecao(usuario_id, limite, antes, tipo)
+                ).to_list(length=1)
+                if not resultado[0]["total"] and await self.collection.find_one({"_id": usuario_id}, {"_id": 1}) is None:
+                    return None
+            else:
+                resultado = await self.collection.aggregate(
+                    pipeline_historico_avaliacoes(usuario_id, limite, antes, tipo)
+                ).to_list(length=1)
+                if not resultado:
+                    return None
+
+            avaliacoes, proximo_cursor = pagina_avaliacoes(resultado[0], limite, na_colecao)
+
+            return avaliacoes, proximo_cursor, resultado[0]["total"]
+
+        except InvalidId:
+            print(f"❌ ID inválido: {usuario_id}")
+            return None
+        except PyMongoError as e:
+            print(f"❌ Erro ao listar avaliações: {e}")
+            raise
+
+    # ==================== CONTADORES ====================
+
+    async def contar_todos(self):
+        """
+        Conta o total de usuários
+
+        Returns:
+            int: Número total de usuários
+        """
+        try:
+            return await self.collection.count_documents({})
+        except Exception as e:
+            print(f"❌ Erro ao contar usuários: {e}")
+            return 0
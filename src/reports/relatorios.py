@@ -4,9 +4,17 @@ Implementa relatórios com agregação e lookup (join)
 """
 
 from src.conexion.mongo_conexao import obter_colecao
+from src.controller.colecoes_separadas import colecao_de, le_colecao
+from src.controller.controller_humor import COLECAO_HUMOR
+from src.utils.prazos import eh_timeout
 from datetime import datetime
 import os
 
+import pymongo
+
+# Tempo máximo de cada agregação (enviado ao servidor como maxTimeMS)
+PRAZO_RELATORIOS = int(os.getenv("RELATORIOS_PRAZO_MS", "30000")) / 1000
+
 
 class Relatorios:
     """Classe para geração de relatórios"""
@@ -15,11 +23,24 @@ class Relatorios:
         """Inicializa os relatórios"""
         self.usuarios_collection = obter_colecao("usuarios")
         self.meditacoes_collection = obter_colecao("meditacoes")
+        self.humor_collection = obter_colecao(COLECAO_HUMOR)
 
     def limpar_tela(self):
         """Limpa a tela do terminal"""
         os.system('clear' if os.name != 'nt' else 'cls')
 
+    def agregar(self, collection, pipeline):
+        """Executa a agregação dentro do prazo dos relatórios"""
+        with pymongo.timeout(PRAZO_RELATORIOS):
+            return list(collection.aggregate(pipeline))
+
+    def exibir_erro(self, erro):
+        """Exibe o erro da geração de um relatório"""
+        if eh_timeout(erro):
+            print(f"⏱️  Relatório interrompido: passou de {PRAZO_RELATORIOS:.0f}s (RELATORIOS_PRAZO_MS)\n")
+        else:
+            print(f"❌ Erro ao gerar relatório: {erro}\n")
+
     def exibir_cabecalho(self, titulo):
         """Exibe cabeçalho do relatório"""
         print("\n" + "=" * 80)
@@ -54,7 +75,7 @@ class Relatorios:
                 }
             ]
 
-            resultados = list(self.meditacoes_collection.aggregate(pipeline))
+            resultados = self.agregar(self.meditacoes_collection, pipeline)
 
             if not resultados:
                 print("⚠️  Nenhuma meditação encontrada\n")
@@ -78,7 +99,7 @@ class Relatorios:
             print(f"{'TOTAL GERAL:':<20} {'':<25} {total_geral:<15}\n")
 
         except Exception as e:
-            print(f"❌ Erro ao gerar relatório: {e}\n")
+            self.exibir_erro(e)
 
     def relatorio_usuarios_por_humor(self):
         """
@@ -89,14 +110,21 @@ class Relatorios:
         self.exibir_cabecalho("RELATÓRIO: DISTRIBUIÇÃO DE CLASSIFICAÇÕES DE HUMOR")
 
         try:
-            # Agregação: Desdobra array de humor e agrupa por sentimento
+            # Agregação: Desdobra os buckets mensais e agrupa por sentimento;
+            # $unionWith soma os arrays embedded ainda não migrados
             pipeline = [
-                {"$unwind": "$classificacoes_humor"},
+                {"$unwind": "$registros"},
+                {"$project": {"_id": 0, "classificacao": "$registros"}},
+                {"$unionWith": {"coll": "usuarios", "pipeline": [
+                    {"$match": {"classificacoes_humor.0": {"$exists": True}}},
+                    {"$unwind": "$classificacoes_humor"},
+                    {"$project": {"_id": 0, "classificacao": "$classificacoes_humor"}}
+                ]}},
                 {
                     "$group": {
                         "_id": {
-                            "sentimento": "$classificacoes_humor.sentimento_principal",
-                            "nivel": "$classificacoes_humor.nivel_humor"
+                            "sentimento": "$classificacao.sentimento_principal",
+                            "nivel": "$classificacao.nivel_humor"
                         },
                         "total": {"$sum": 1}
                     }
@@ -104,7 +132,7 @@ class Relatorios:
                 {"$sort": {"_id.nivel": -1, "total": -1}}
             ]
 
-            resultados = list(self.usuarios_collection.aggregate(pipeline))
+            resultados = self.agregar(self.humor_collection, pipeline)
 
             if not resultados:
                 print("⚠️  Nenhuma classificação de humor encontrada\n")
@@ -130,7 +158,7 @@ class Relatorios:
             print(f"{'TOTAL:':<10} {'':<25} {total_geral:<15}\n")
 
         except Exception as e:
-            print(f"❌ Erro ao gerar relatório: {e}\n")
+            self.exibir_erro(e)
 
     # ==================== RELATÓRIO 2: LOOKUP (JOIN) ====================
 
@@ -182,7 +210,33 @@ class Relatorios:
                 {"$limit": limite}
             ]
 
-            resultados = list(self.usuarios_collection.aggregate(pipeline))
+            if le_colecao("historico_meditacoes"):
+                # Coleção separada: ordena e corta pelo índice idx_data antes dos joins
+                pipeline = [
+                    {"$sort": {"data_conclusao": -1}},
+                    {"$limit": limite},
+                    {"$lookup": {"from": "meditacoes", "localField": "meditacao_id",
+                                 "foreignField": "_id", "as": "meditacao_detalhes"}},
+                    {"$unwind": {"path": "$meditacao_detalhes", "preserveNullAndEmptyArrays": True}},
+                    {"$lookup": {"from": "usuarios", "localField": "usuario_id", "foreignField": "_id",
+                                 "pipeline": [{"$project": {"nome": 1, "email": 1}}], "as": "usuario"}},
+                    {"$unwind": {"path": "$usuario", "preserveNullAndEmptyArrays": True}},
+                    {
+                        "$project": {
+                            "usuario_nome": "$usuario.nome",
+                            "usuario_email": "$usuario.email",
+                            "meditacao_titulo": "$meditacao_detalhes.titulo",
+                            "meditacao_tipo": "$meditacao_detalhes.tipo",
+                            "meditacao_categoria": "$meditacao_detalhes.categoria",
+                            "duracao_esperada": "$meditacao_detalhes.duracao_minutos",
+                            "duracao_real": "$duracao_real_minutos",
+                            "data_conclusao": 1
+                        }
+                    }
+                ]
+                resultados = self.agregar(obter_colecao(colecao_de("historico_meditacoes")), pipeline)
+            else:
+                resultados = self.agregar(self.usuarios_collection, pipeline)
 
             if not resultados:
                 print("⚠️  Nenhum histórico de meditação encontrado\n")
@@ -209,7 +263,7 @@ class Relatorios:
             print(f"Total de registros: {len(resultados)}\n")
 
         except Exception as e:
-            print(f"❌ Erro ao gerar relatório: {e}\n")
+            self.exibir_erro(e)
             import traceback
             traceback.print_exc()
 
@@ -222,26 +276,58 @@ class Relatorios:
         self.exibir_cabecalho(f"RELATÓRIO: TOP {limite} USUÁRIOS MAIS ATIVOS")
 
         try:
-            pipeline = [
-                # Projeta apenas nome, email e tamanho do array de histórico
+            # Soma a contagem dos buckets de humor só dos N usuários
+            contagem_humor = [
                 {
-                    "$project": {
-                        "nome": 1,
-                        "email": 1,
-                        "total_meditacoes": {"$size": {"$ifNull": ["$historico_meditacoes", []]}},
-                        "total_humores": {"$size": {"$ifNull": ["$classificacoes_humor", []]}},
-                        "data_cadastro": 1
+                    "$lookup": {
+                        "from": COLECAO_HUMOR,
+                        "localField": "_id",
+                        "foreignField": "usuario_id",
+                        "pipeline": [{"$project": {"_id": 0, "contagem": 1}}],
+                        "as": "buckets_humor"
                     }
                 },
-
-                # Ordena por total de meditações
-                {"$sort": {"total_meditacoes": -1}},
-
-                # Limita ao top N
-                {"$limit": limite}
+                {"$addFields": {"total_humores": {"$add": ["$total_humores", {"$sum": "$buckets_humor.contagem"}]}}}
             ]
 
-            resultados = list(self.usuarios_collection.aggregate(pipeline))
+            if le_colecao("historico_meditacoes"):
+                # Coleção separada: conta as sessões por usuário e busca só os N primeiros
+                collection = obter_colecao(colecao_de("historico_meditacoes"))
+                pipeline = [
+                    {"$group": {"_id": "$usuario_id", "total_meditacoes": {"$sum": 1}}},
+                    {"$sort": {"total_meditacoes": -1}},
+                    {"$limit": limite},
+                    {"$lookup": {"from": "usuarios", "localField": "_id", "foreignField": "_id", "pipeline": [
+                        {"$project": {
+                            "nome": 1, "email": 1, "data_cadastro": 1,
+                            "total_humores": {"$size": {"$ifNull": ["$classificacoes_humor", []]}}
+                        }}
+                    ], "as": "usuario"}},
+                    {"$unwind": "$usuario"},
+                    {"$replaceWith": {"$mergeObjects": ["$usuario", {"total_meditacoes": "$total_meditacoes"}]}}
+                ] + contagem_humor
+            else:
+                collection = self.usuarios_collection
+                pipeline = [
+                    # Projeta apenas nome, email e tamanho do array de histórico
+                    {
+                        "$project": {
+                            "nome": 1,
+                            "email": 1,
+                            "total_meditacoes": {"$size": {"$ifNull": ["$historico_meditacoes", []]}},
+                            "total_humores": {"$size": {"$ifNull": ["$classificacoes_humor", []]}},
+                            "data_cadastro": 1
+                        }
+                    },
+
+                    # Ordena por total de meditações
+                    {"$sort": {"total_meditacoes": -1}},
+
+                    # Limita ao top N
+                    {"$limit": limite}
+                ] + contagem_humor
+
+            resultados = self.agregar(collection, pipeline)
 
             if not resultados:
                 print("⚠️  Nenhum usuário encontrado\n")
@@ -264,7 +350,7 @@ class Relatorios:
             print("-" * 70 + "\n")
 
         except Exception as e:
-            print(f"❌ Erro ao gerar relatório: {e}\n")
+            self.exibir_erro(e)
 
     # ==================== MENU DE RELATÓRIOS ====================
 
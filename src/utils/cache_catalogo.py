@@ -0,0 +1,425 @@
+"""
+Cache do Catálogo de Meditações - Calmou API
+Cache em dois níveis para leituras do catálogo:
+
+    L1: em memória, por processo (TTL + LRU, limitado por itens e bytes)
+    L2: SQLite local compartilhado entre os workers do gunicorn
+
+Toda escrita no catálogo (ControllerMeditacao) incrementa uma versão
+guardada no SQLite. Cada processo consulta essa versão no máximo a cada
+CACHE_CATALOGO_INTERVALO_VERSAO segundos e descarta o L1 quando ela muda,
+então todos os workers ficam consistentes dentro desse intervalo.
+
+Os valores vão para o L2 em JSON (são as respostas já formatadas), e o
+arquivo fica num diretório só do usuário (src/utils/diretorios.py): qualquer
+processo que escreva nele define o que a API devolve.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.diretorios import diretorio_privado
+from src.utils.prazos import timeout_ocorrido
+
+
+def _env_float(nome, padrao):
+    return float(os.getenv(nome, padrao))
+
+
+def _env_int(nome, padrao):
+    return int(os.getenv(nome, padrao))
+
+
+def serializar(valor):
+    """Valor do cache (listas, dicionários e escalares) em bytes JSON"""
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def desserializar(dados):
+    """Inverso de serializar(); tuplas voltam como listas"""
+    return json.loads(bytes(dados).decode("utf-8"))
+
+
+# ==================== L1: MEMÓRIA DO PROCESSO ====================
+
+class CacheL1:
+    """Cache LRU em memória com TTL, limitado por número de itens e bytes"""
+
+    def __init__(self, max_itens, max_bytes, ttl):
+        """
+        Args:
+            max_itens (int): Número máximo de entradas
+            max_bytes (int): Soma máxima do tamanho serializado das entradas
+            ttl (float): Tempo de vida de cada entrada em segundos
+        """
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._itens = OrderedDict()  # chave -> (expira_em, tamanho, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.remocoes = 0
+        self.expiracoes = 0
+
+    def obter(self, chave):
+        """
+        Busca uma entrada válida
+
+        Returns:
+            tuple: (encontrado, valor)
+        """
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return False, None
+
+            expira_em, tamanho, valor = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                self._bytes -= tamanho
+                self.expiracoes += 1
+                return False, None
+
+            self._itens.move_to_end(chave)
+            return True, valor
+
+    def gravar(self, chave, valor, tamanho):
+        """Grava uma entrada, removendo as menos usadas se passar dos limites"""
+        if tamanho > self.max_bytes:
+            return
+
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= antigo[1]
+
+            self._itens[chave] = (time.monotonic() + self.ttl, tamanho, valor)
+            self._bytes += tamanho
+
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, (_, tamanho_removido, _) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_removido
+                self.remocoes += 1
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def tamanho(self):
+        """Retorna (itens, bytes) ocupados"""
+        with self._lock:
+            return len(self._itens), self._bytes
+
+
+# ==================== L2: SQLITE COMPARTILHADO ====================
+
+class CacheL2:
+    """Cache em SQLite (modo WAL) compartilhado pelos processos do host"""
+
+    def __init__(self, caminho, ttl, max_itens):
+        """
+        Args:
+            caminho (str): Arquivo SQLite
+            ttl (float): Tempo de vida das entradas em segundos
+            max_itens (int): Número máximo de entradas mantidas no arquivo
+        """
+        self.caminho = caminho
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._local = threading.local()
+        self._gravacoes = 0
+
+    def _conexao(self):
+        """Retorna a conexão da thread atual (recriada após fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " chave TEXT PRIMARY KEY, expira_em REAL NOT NULL, valor BLOB NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS versao ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1), valor INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO versao (id, valor) VALUES (1, 0)")
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def obter(self, chave):
+        """Retorna os bytes gravados para a chave ou None"""
+        linha = self._conexao().execute(
+            "SELECT valor FROM cache WHERE chave = ? AND expira_em > ?",
+            (chave, time.time())
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def gravar(self, chave, dados):
+        """Grava os bytes da chave e, de tempos em tempos, poda o arquivo"""
+        conn = self._conexao()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (chave, expira_em, valor) VALUES (?, ?, ?)",
+            (chave, time.time() + self.ttl, sqlite3.Binary(dados))
+        )
+
+        self._gravacoes += 1
+        if self._gravacoes % 100 == 0:
+            self.podar()
+
+    def podar(self):
+        """Remove entradas expiradas e as mais antigas acima de max_itens"""
+        conn = self._conexao()
+        conn.execute("DELETE FROM cache WHERE expira_em <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE chave NOT IN ("
+            " SELECT chave FROM cache ORDER BY expira_em DESC LIMIT ?)",
+            (self.max_itens,)
+        )
+
+    def versao(self):
+        """Versão atual do catálogo"""
+        return self._conexao().execute("SELECT valor FROM versao WHERE id = 1").fetchone()[0]
+
+    def incrementar_versao(self):
+        """Incrementa a versão do catálogo e descarta as entradas antigas"""
+        conn = self._conexao()
+        conn.execute("UPDATE versao SET valor = valor + 1 WHERE id = 1")
+        conn.execute("DELETE FROM cache")
+        return self.versao()
+
+
+# ==================== CACHE DE DOIS NÍVEIS ====================
+
+class CacheCatalogo:
+    """Combina L1 e L2 e controla a invalidação por versão do catálogo"""
+
+    def __init__(self):
+        """Lê a configuração das variáveis de ambiente"""
+        self.ativo = os.getenv("CACHE_CATALOGO_ATIVO", "1") == "1"
+        self.intervalo_versao = _env_float("CACHE_CATALOGO_INTERVALO_VERSAO", 1.0)
+
+        ttl = _env_float("CACHE_CATALOGO_TTL", 300)
+        self.l1 = CacheL1(
+            max_itens=_env_int("CACHE_CATALOGO_MAX_ITENS", 1024),
+            max_bytes=_env_int("CACHE_CATALOGO_MAX_BYTES", 16 * 1024 * 1024),
+            ttl=ttl
+        )
+        self.l2 = CacheL2(
+            caminho=(
+                os.getenv("CACHE_CATALOGO_CAMINHO")
+                or os.path.join(diretorio_privado(), "cache_catalogo.sqlite3")
+            ),
+            ttl=ttl,
+            max_itens=_env_int("CACHE_CATALOGO_MAX_ITENS_L2", 10000)
+        )
+
+        self._versao = None
+        self._ultima_verificacao = 0.0
+        self._lock = threading.Lock()
+
+        self.acertos_l1 = 0
+        self.acertos_l2 = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.erros_l2 = 0
+
+    def _sincronizar_versao(self):
+        """Consulta a versão compartilhada no máximo uma vez por intervalo"""
+        agora = time.monotonic()
+        if self._versao is not None and agora - self._ultima_verificacao < self.intervalo_versao:
+            return self._versao
+
+        with self._lock:
+            if self._versao is not None and agora - self._ultima_verificacao < self.intervalo_versao:
+                return self._versao
+            try:
+                versao = self.l2.versao()
+            except sqlite3.Error as e:
+                self.erros_l2 += 1
+                print(f"⚠️  Cache L2 indisponível: {e}")
+                versao = self._versao if self._versao is not None else 0
+
+            if versao != self._versao:
+                self.l1.limpar()
+                self._versao = versao
+            self._ultima_verificacao = agora
+            return versao
+
+    def obter(self, chave, carregar):
+        """
+        Retorna o valor em cache ou executa carregar() e guarda o resultado
+
+        Resultados None não são guardados, já que os controllers também
+        retornam None em caso de erro, nem os carregados numa requisição
+        que estourou o prazo (a página vazia devolvida não é o catálogo).
+
+        Args:
+            chave (str): Chave da entrada
+            carregar (callable): Função sem argumentos que busca o valor no MongoDB
+
+        Returns:
+            Valor em cache ou retornado por carregar()
+        """
+        if not self.ativo:
+            return carregar()
+
+        encontrado, valor, chave_versionada = self._ler(chave)
+        if encontrado:
+            return valor
+
+        valor = carregar()
+        self._guardar(chave_versionada, valor)
+        return valor
+
+    async def obter_async(self, chave, carregar):
+        """
+        Versão de obter() para a API assíncrona
+
+        Args:
+            chave (str): Chave da entrada
+            carregar (callable): Função assíncrona sem argumentos que busca o valor
+
+        Returns:
+            Valor em cache ou retornado por carregar()
+        """
+        if not self.ativo:
+            return await carregar()
+
+        encontrado, valor, chave_versionada = self._ler(chave)
+        if encontrado:
+            return valor
+
+        valor = await carregar()
+        self._guardar(chave_versionada, valor)
+        return valor
+
+    def _ler(self, chave):
+        """
+        Procura a chave no L1 e depois no L2; retorna (encontrado, valor, chave_versionada)
+
+        Os dois níveis usam a chave prefixada pela versão lida aqui: um valor
+        carregado antes de uma invalidação é gravado sob a versão antiga e
+        nunca é lido depois dela.
+        """
+        versao = self._sincronizar_versao()
+        chave_versionada = f"{versao}:{chave}"
+
+        encontrado, valor = self.l1.obter(chave_versionada)
+        if encontrado:
+            self.acertos_l1 += 1
+            return True, valor, None
+
+        try:
+            dados = self.l2.obter(chave_versionada)
+        except sqlite3.Error:
+            self.erros_l2 += 1
+            dados = None
+
+        if dados is not None:
+            try:
+                valor = desserializar(dados)
+            except ValueError:
+                # Entrada ilegível (ex.: gravada por uma versão antiga): falha
+                self.erros_l2 += 1
+                dados = None
+
+        if dados is not None:
+            self.acertos_l2 += 1
+            self.l1.gravar(chave_versionada, valor, len(dados))
+            return True, valor, chave_versionada
+
+        self.falhas += 1
+        return False, None, chave_versionada
+
+    def _guardar(self, chave_versionada, valor):
+        """Grava o valor carregado nos dois níveis"""
+        if valor is None or timeout_ocorrido():
+            return
+
+        dados = serializar(valor)
+        self.l1.gravar(chave_versionada, valor, len(dados))
+        try:
+            self.l2.gravar(chave_versionada, dados)
+        except sqlite3.Error:
+            self.erros_l2 += 1
+
+    def versao(self):
+        """Versão do catálogo vista por este processo"""
+        return self._sincronizar_versao()
+
+    def invalidar(self):
+        """Incrementa a versão do catálogo e limpa o L1 deste processo"""
+        self.invalidacoes += 1
+        self.l1.limpar()
+        try:
+            versao = self.l2.incrementar_versao()
+        except sqlite3.Error as e:
+            self.erros_l2 += 1
+            print(f"⚠️  Não foi possível invalidar o cache L2: {e}")
+            return
+
+        with self._lock:
+            self._versao = versao
+            self._ultima_verificacao = time.monotonic()
+
+    def estatisticas(self):
+        """
+        Contadores para dimensionamento do cache
+
+        Returns:
+            dict: Acertos, falhas, remoções e ocupação de cada nível
+        """
+        itens, bytes_ocupados = self.l1.tamanho()
+        return {
+            'ativo': self.ativo,
+            'versao': self._versao,
+            'acertos_l1': self.acertos_l1,
+            'acertos_l2': self.acertos_l2,
+            'falhas': self.falhas,
+            'remocoes_l1': self.l1.remocoes,
+            'expiracoes_l1': self.l1.expiracoes,
+            'invalidacoes': self.invalidacoes,
+            'erros_l2': self.erros_l2,
+            'itens_l1': itens,
+            'bytes_l1': bytes_ocupados,
+            'max_itens_l1': self.l1.max_itens,
+            'max_bytes_l1': self.l1.max_bytes
+        }
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_catalogo():
+    """
+    Retorna a instância do cache do catálogo deste processo
+
+    Returns:
+        CacheCatalogo: Cache compartilhado pelos controllers e pela API
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheCatalogo()
+    return _cache
+
+
+def invalidar_catalogo():
+    """Invalida o catálogo em todos os workers (chamado após escritas)"""
+    obter_cache_catalogo().invalidar()
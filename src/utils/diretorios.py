@@ -0,0 +1,42 @@
+"""
+Diretórios Privados - Calmou API
+Diretório do usuário do serviço para os arquivos locais da API (L2 do cache
+do catálogo, retratos das métricas, limites de requisição)
+
+Qualquer processo que escreva nesses arquivos define o que a API devolve,
+então cada nível é criado com permissão 0700, e um diretório existente de
+outro usuário ou aberto a outros usuários é recusado.
+
+Variáveis de ambiente:
+    XDG_CACHE_HOME   base dos diretórios (padrão: ~/.cache)
+"""
+
+import os
+
+
+def _verificar(diretorio):
+    estado = os.stat(diretorio)
+    if hasattr(os, "getuid") and (estado.st_uid != os.getuid() or estado.st_mode & 0o077):
+        raise PermissionError(f"diretório não é privado: {diretorio}")
+
+
+def diretorio_privado(*partes):
+    """
+    Diretório privado $XDG_CACHE_HOME/calmou[/partes...] (ou ~/.cache/calmou)
+
+    Args:
+        *partes (str): Subdiretórios dentro de calmou/
+
+    Returns:
+        str: Caminho do diretório
+
+    Raises:
+        PermissionError: Se algum nível a partir de calmou/ não for privado
+    """
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    diretorio = base
+    for parte in ("calmou",) + partes:
+        diretorio = os.path.join(diretorio, parte)
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        _verificar(diretorio)
+    return diretorio
@@ -0,0 +1,218 @@
+"""
+Log Estruturado - Calmou API
+Log em JSON gravado por uma thread à parte:
+
+    logger -> HandlerFila (fila limitada) -> QueueListener -> arquivo e console
+
+Quem loga só coloca o registro na fila; a formatação da mensagem e a
+escrita em disco ficam com a thread do QueueListener. Com a fila cheia
+(disco lento ou travado), o registro é descartado e contado em
+calmou_log_descartados_total (/metrics), em vez de bloquear a requisição.
+
+Cada linha do arquivo é um objeto JSON com data, nível, logger, mensagem,
+pid e os campos extras presentes no registro (CAMPOS_EXTRAS).
+
+Cada processo grava e rotaciona o próprio arquivo (logs/api.log ->
+logs/api.<pid>.log): com o preload do gunicorn o pipeline é criado no
+mestre, e a rotação do RotatingFileHandler não é segura entre processos.
+Os handlers são recriados no filho após o fork.
+
+Variáveis de ambiente:
+    LOG_FILA                registros aguardando a escrita (padrão 10000)
+    LOG_ARQUIVO_MAX_BYTES   tamanho de cada arquivo antes da rotação (padrão 10 MB)
+    LOG_ARQUIVO_BACKUPS     arquivos rotacionados mantidos (padrão 10)
+    LOG_CONSOLE_JSON        1 também escreve JSON no console (padrão: texto)
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import re
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from src.utils.metricas import obter_registro
+
+# Atributos do registro copiados para o JSON quando presentes (logger.info(..., extra={...}))
+CAMPOS_EXTRAS = (
+    "rota", "metodo", "status", "usuario", "duracao_ms", "mongo_ms", "mongo_comandos", "amostragem"
+)
+
+FORMATO_TEXTO = '[%(asctime)s] %(levelname)s: %(message)s'
+
+
+def arquivo_do_processo(caminho, pid=None):
+    """Arquivo do processo: logs/api.log -> logs/api.<pid>.log"""
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.{pid or os.getpid()}{extensao}"
+
+
+def arquivos_dos_processos(caminho):
+    """
+    Arquivos atuais (sem os rotacionados) de todos os processos que gravaram em caminho
+
+    Returns:
+        list: Caminhos <nome>.<pid><extensão>, mais caminho se existir (versões sem pid)
+    """
+    raiz, extensao = os.path.splitext(caminho)
+    padrao = re.compile(re.escape(raiz) + r"\.\d+" + re.escape(extensao) + "$")
+    arquivos = sorted(
+        arquivo for arquivo in glob.glob(f"{glob.escape(raiz)}.*{glob.escape(extensao)}")
+        if padrao.match(arquivo)
+    )
+    if os.path.exists(caminho):
+        arquivos.insert(0, caminho)
+    return arquivos
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record):
+        dados = {
+            "data": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+            "pid": record.process
+        }
+        for campo in CAMPOS_EXTRAS:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                dados[campo] = valor
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class HandlerFila(QueueHandler):
+    """QueueHandler que descarta (e conta) em vez de esperar com a fila cheia"""
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # A fila é do próprio processo: o registro não precisa ser serializável,
+        # e a mensagem só é formatada na thread de escrita
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+            obter_registro().incrementar("calmou_log_descartados_total", (("motivo", "fila"),))
+
+
+class PipelineLog:
+    """Fila, handler e thread de escrita de um logger"""
+
+    def __init__(self, criar_handlers, tamanho_fila):
+        """
+        Args:
+            criar_handlers (callable): Cria os handlers de destino (executados
+                na thread de escrita); chamado de novo em cada processo filho
+            tamanho_fila (int): Registros aguardando a escrita
+        """
+        self.criar_handlers = criar_handlers
+        self.handlers = []
+        self.tamanho_fila = tamanho_fila
+        self.handler = HandlerFila(queue.Queue(tamanho_fila))
+        self.listener = None
+
+    def iniciar(self):
+        """Cria os handlers deste processo e inicia a thread de escrita"""
+        self.handlers = self.criar_handlers()
+        self.listener = QueueListener(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def parar(self):
+        """Grava o que está na fila e encerra a thread"""
+        if self.listener is None:
+            return
+        try:
+            self.listener.stop()
+        except queue.Full:
+            # Sem espaço nem para o sinal de parada: a thread (daemon) fica para trás
+            pass
+        self.listener = None
+
+    def apos_fork(self):
+        """
+        No filho a thread de escrita não existe e a fila herdada pode estar
+        travada; os handlers herdados apontam para o arquivo do pai
+        """
+        self.handler.queue = queue.Queue(self.tamanho_fila)
+        self.handler.descartados = 0
+        self.iniciar()
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+_pipelines = []
+
+
+def configurar_log_estruturado(logger, arquivo, nivel=logging.INFO, filtros=()):
+    """
+    Liga o logger ao pipeline: arquivo JSON rotacionado do processo e console
+
+    Args:
+        logger (logging.Logger): Logger configurado (ex.: app.logger)
+        arquivo (str): Arquivo de log, que recebe o pid antes da extensão
+        nivel (int): Nível mínimo
+        filtros (iterable): Filtros executados antes de enfileirar, na thread
+            de quem loga (ex.: contexto da requisição, amostragem)
+
+    Returns:
+        HandlerFila: Handler adicionado ao logger
+    """
+    os.makedirs(os.path.dirname(arquivo) or '.', exist_ok=True)
+
+    def criar_handlers():
+        # delay: o arquivo só é aberto na primeira escrita do processo
+        arquivo_handler = RotatingFileHandler(
+            arquivo_do_processo(arquivo),
+            maxBytes=int(os.getenv("LOG_ARQUIVO_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_ARQUIVO_BACKUPS", 10)),
+            encoding="utf-8",
+            delay=True
+        )
+        arquivo_handler.setFormatter(FormatadorJSON())
+
+        console_handler = logging.StreamHandler()
+        if os.getenv("LOG_CONSOLE_JSON", "0") == "1":
+            console_handler.setFormatter(FormatadorJSON())
+        else:
+            console_handler.setFormatter(logging.Formatter(FORMATO_TEXTO))
+        return [arquivo_handler, console_handler]
+
+    pipeline = PipelineLog(criar_handlers, int(os.getenv("LOG_FILA", 10000)))
+    pipeline.handler.setLevel(nivel)
+    for filtro in filtros:
+        pipeline.handler.addFilter(filtro)
+
+    logger.addHandler(pipeline.handler)
+    logger.setLevel(nivel)
+    pipeline.iniciar()
+    _pipelines.append(pipeline)
+    return pipeline.handler
+
+
+def encerrar_logs():
+    """Grava os registros pendentes de todos os pipelines do processo"""
+    for pipeline in _pipelines:
+        pipeline.parar()
+
+
+def _apos_fork():
+    # Com o preload do gunicorn o pipeline é criado no mestre
+    for pipeline in _pipelines:
+        pipeline.apos_fork()
+
+
+os.register_at_fork(after_in_child=_apos_fork)
+atexit.register(encerrar_logs)
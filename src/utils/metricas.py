@@ -0,0 +1,328 @@
+"""
+Métricas - Calmou API
+Contadores, gauges e histogramas no formato de texto do Prometheus,
+somados entre os workers do gunicorn
+
+Cada thread grava no próprio dicionário (sem lock no caminho da
+requisição); a coleta soma os dicionários das threads. Cada worker grava
+de tempos em tempos um retrato das suas métricas em METRICAS_DIR/<pid>.json,
+e o /metrics de qualquer worker soma os arquivos de todos. Gauges de
+processos que já terminaram são ignorados; contadores e histogramas continuam
+somados, como no modo multiprocesso do prometheus_client.
+
+O diretório deve ser limpo quando o servidor inicia (limpar_metricas(),
+chamado no when_ready do gunicorn).
+
+Variáveis de ambiente:
+    METRICAS_ATIVAS        1 registra as métricas (padrão)
+    METRICAS_DIR           diretório dos retratos por processo (padrão:
+                           ~/.cache/calmou/metricas, só do usuário; ver
+                           src/utils/diretorios.py)
+    METRICAS_INTERVALO_S   intervalo de gravação dos retratos (padrão 5)
+"""
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+from src.utils.diretorios import diretorio_privado
+
+# Limites dos histogramas
+LIMITES_LATENCIA_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_LATENCIA_MONGO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+LIMITES_LOTE = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Nome -> (tipo, ajuda, limites)
+DEFINICOES = {
+    "calmou_http_requisicoes_total": (
+        "counter", "Requisições HTTP atendidas, por rota, método e status", None),
+    "calmou_http_duracao_segundos": (
+        "histogram", "Duração das requisições HTTP por rota e método", LIMITES_LATENCIA_HTTP),
+    "calmou_http_em_andamento": (
+        "gauge", "Requisições HTTP em andamento por rota", None),
+    "calmou_mongo_comando_duracao_segundos": (
+        "histogram", "Duração dos comandos do MongoDB por comando e coleção", LIMITES_LATENCIA_MONGO),
+    "calmou_mongo_resposta_bytes": (
+        "histogram", "Tamanho das respostas do MongoDB por comando e coleção", LIMITES_BYTES),
+    "calmou_mongo_comandos_falhas_total": (
+        "counter", "Comandos do MongoDB que falharam por comando e coleção", None),
+    "calmou_log_descartados_total": (
+        "counter", "Registros de log descartados, por motivo (fila cheia ou amostragem)", None),
+    "calmou_push_lote_eventos": (
+        "histogram", "Eventos $push por lote gravado pelo buffer de escrita", LIMITES_LOTE),
+    "calmou_push_lote_usuarios": (
+        "histogram", "Usuários (UpdateOne) por lote gravado pelo buffer de escrita", LIMITES_LOTE),
+    "calmou_push_lote_duracao_segundos": (
+        "histogram", "Duração do bulk_write de cada lote do buffer de escrita", LIMITES_LATENCIA_MONGO),
+    "calmou_push_eventos_descartados_total": (
+        "counter", "Eventos $push do buffer não gravados, por motivo", None)
+}
+
+
+def _diretorio():
+    # Quem escreve no diretório define o /metrics: o padrão não é compartilhado
+    return os.getenv("METRICAS_DIR") or diretorio_privado("metricas")
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ==================== REGISTRO DO PROCESSO ====================
+
+class RegistroMetricas:
+    """Métricas do processo atual, com um dicionário por thread"""
+
+    def __init__(self):
+        self.ativo = os.getenv("METRICAS_ATIVAS", "1") == "1"
+        self.intervalo = float(os.getenv("METRICAS_INTERVALO_S", "5"))
+        self._reiniciar()
+
+    def _reiniciar(self):
+        """Estado vazio (também chamado no processo filho após o fork)"""
+        self._local = threading.local()
+        self._fragmentos = []
+        self._lock = threading.Lock()   # só na criação do fragmento de uma thread
+        self._gravador = None
+
+    def _fragmento(self):
+        fragmento = getattr(self._local, 'fragmento', None)
+        if fragmento is None:
+            fragmento = {}
+            with self._lock:
+                self._fragmentos.append(fragmento)
+                if self._gravador is None:
+                    self._iniciar_gravador()
+            self._local.fragmento = fragmento
+        return fragmento
+
+    # ---------- Registro ----------
+
+    def incrementar(self, nome, rotulos, valor=1):
+        """
+        Soma valor a um contador ou gauge
+
+        Args:
+            nome (str): Nome em DEFINICOES
+            rotulos (tuple): Pares (rótulo, valor), sempre na mesma ordem
+            valor (float): Incremento (negativo para gauges)
+        """
+        if not self.ativo:
+            return
+        fragmento = self._fragmento()
+        chave = (nome, rotulos)
+        fragmento[chave] = fragmento.get(chave, 0) + valor
+
+    def observar(self, nome, rotulos, valor):
+        """Registra uma observação num histograma"""
+        if not self.ativo:
+            return
+        limites = DEFINICOES[nome][2]
+        fragmento = self._fragmento()
+        chave = (nome, rotulos)
+        # [contagem por faixa..., acima do último limite, soma, total]
+        faixas = fragmento.get(chave)
+        if faixas is None:
+            faixas = fragmento[chave] = [0] * (len(limites) + 1) + [0.0, 0]
+        faixas[bisect.bisect_left(limites, valor)] += 1
+        faixas[-2] += valor
+        faixas[-1] += 1
+
+    # ---------- Coleta ----------
+
+    def retrato(self):
+        """
+        Soma os fragmentos das threads
+
+        A cópia de cada fragmento é feita sem lock: uma observação gravada
+        durante a coleta pode aparecer no total e ainda não na faixa, o que
+        se corrige na coleta seguinte.
+
+        Returns:
+            dict: (nome, rotulos) -> valor ou lista de faixas
+        """
+        with self._lock:
+            fragmentos = list(self._fragmentos)
+
+        total = {}
+        for fragmento in fragmentos:
+            for chave, valor in dict(fragmento).items():
+                _somar(total, chave, list(valor) if isinstance(valor, list) else valor)
+        return total
+
+    def gravar(self):
+        """Grava o retrato deste processo em METRICAS_DIR/<pid>.json"""
+        diretorio = _diretorio()
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        caminho = os.path.join(diretorio, f"{os.getpid()}.json")
+        temporario = f"{caminho}.tmp"
+
+        linhas = [[nome, list(rotulos), valor] for (nome, rotulos), valor in self.retrato().items()]
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(linhas, arquivo, separators=(",", ":"))
+        os.replace(temporario, caminho)
+
+    def _iniciar_gravador(self):
+        """Thread que grava o retrato a cada METRICAS_INTERVALO_S (chamar com o lock)"""
+        def gravar_periodicamente():
+            while True:
+                time.sleep(self.intervalo)
+                try:
+                    self.gravar()
+                except OSError as e:
+                    print(f"⚠️  Métricas não gravadas: {e}")
+
+        self._gravador = threading.Thread(target=gravar_periodicamente, name="metricas", daemon=True)
+        self._gravador.start()
+
+
+def _somar(total, chave, valor):
+    anterior = total.get(chave)
+    if anterior is None:
+        total[chave] = valor
+    elif isinstance(valor, list):
+        for i, parte in enumerate(valor):
+            anterior[i] += parte
+    else:
+        total[chave] = anterior + valor
+
+
+# ==================== AGREGAÇÃO ENTRE PROCESSOS ====================
+
+def coletar_processos():
+    """
+    Soma os retratos gravados por todos os processos (incluindo o atual,
+    que é gravado antes da leitura)
+
+    Returns:
+        dict: (nome, rotulos) -> valor ou lista de faixas
+    """
+    registro = obter_registro()
+    try:
+        registro.gravar()
+    except OSError as e:
+        print(f"⚠️  Métricas não gravadas: {e}")
+        return registro.retrato()
+
+    total = {}
+    for caminho in glob.glob(os.path.join(_diretorio(), "*.json")):
+        try:
+            pid = int(os.path.basename(caminho)[:-len(".json")])
+            with open(caminho, encoding="utf-8") as arquivo:
+                linhas = json.load(arquivo)
+        except (ValueError, OSError):
+            continue
+
+        vivo = pid == os.getpid() or _processo_vivo(pid)
+        for nome, rotulos, valor in linhas:
+            if nome not in DEFINICOES or (DEFINICOES[nome][0] == "gauge" and not vivo):
+                continue
+            _somar(total, (nome, tuple(tuple(par) for par in rotulos)), valor)
+    return total
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _rotulos_texto(rotulos, extra=()):
+    pares = tuple(rotulos) + tuple(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def _numero(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def formatar_prometheus(metricas):
+    """
+    Formato de texto do Prometheus (versão 0.0.4)
+
+    Args:
+        metricas (dict): Resultado de coletar_processos() ou RegistroMetricas.retrato()
+
+    Returns:
+        str: Texto para o /metrics
+    """
+    por_nome = {}
+    for (nome, rotulos), valor in metricas.items():
+        por_nome.setdefault(nome, []).append((rotulos, valor))
+
+    linhas = []
+    for nome, (tipo, ajuda, limites) in DEFINICOES.items():
+        series = sorted(por_nome.get(nome, []))
+        if not series:
+            continue
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+
+        for rotulos, valor in series:
+            if tipo != "histogram":
+                linhas.append(f"{nome}{_rotulos_texto(rotulos)} {_numero(valor)}")
+                continue
+
+            acumulado = 0
+            for limite, contagem in zip(limites + ("+Inf",), valor[:-2]):
+                acumulado += contagem
+                le = limite if limite == "+Inf" else _numero(float(limite))
+                linhas.append(f"{nome}_bucket{_rotulos_texto(rotulos, (('le', le),))} {acumulado}")
+            linhas.append(f"{nome}_sum{_rotulos_texto(rotulos)} {_numero(valor[-2])}")
+            linhas.append(f"{nome}_count{_rotulos_texto(rotulos)} {valor[-1]}")
+
+    return "\n".join(linhas) + "\n"
+
+
+# ==================== FUNÇÕES DE CONVENIÊNCIA ====================
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def obter_registro():
+    """
+    Returns:
+        RegistroMetricas: Registro deste processo
+    """
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                _registro = RegistroMetricas()
+    return _registro
+
+
+def _apos_fork():
+    # O filho não herda as métricas (nem a thread de gravação) do mestre
+    if _registro is not None:
+        _registro._reiniciar()
+
+
+os.register_at_fork(after_in_child=_apos_fork)
+
+
+def texto_metricas():
+    """Métricas de todos os processos no formato de texto do Prometheus"""
+    return formatar_prometheus(coletar_processos())
+
+
+def limpar_metricas():
+    """Remove os retratos de execuções anteriores (início do servidor)"""
+    for caminho in glob.glob(os.path.join(_diretorio(), "*.json*")):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
@@ -0,0 +1,79 @@
+"""
+Paginação por Cursor - Calmou API
+Codifica e decodifica cursores opacos usados na paginação keyset
+"""
+
+import base64
+import binascii
+
+from bson import json_util
+
+
+class CursorInvalido(ValueError):
+    """Cursor de paginação malformado ou de outro formato"""
+
+
+def codificar_cursor(*valores):
+    """
+    Codifica os valores da última posição lida em um cursor opaco
+
+    Args:
+        *valores: Valores da chave de ordenação (str, int, ObjectId, datetime)
+
+    Returns:
+        str: Cursor em base64 seguro para URL
+    """
+    bruto = json_util.dumps(list(valores)).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, quantidade):
+    """
+    Decodifica um cursor gerado por codificar_cursor
+
+    Args:
+        cursor (str): Cursor recebido do cliente
+        quantidade (int): Número de valores esperados na chave
+
+    Returns:
+        list: Valores da chave de ordenação
+
+    Raises:
+        CursorInvalido: Se o cursor não puder ser decodificado
+    """
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        bruto = base64.urlsafe_b64decode(cursor + preenchimento)
+        valores = json_util.loads(bruto.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise CursorInvalido(f"Cursor inválido: {cursor}") from e
+
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise CursorInvalido(f"Cursor inválido: {cursor}")
+
+    return valores
+
+
+def ler_limite(valor, padrao, maximo):
+    """
+    Converte o parâmetro 'limit' da query string
+
+    Args:
+        valor (str ou None): Valor recebido
+        padrao (int): Limite usado quando o parâmetro não é informado
+        maximo (int): Maior limite aceito
+
+    Returns:
+        int: Limite entre 1 e maximo
+
+    Raises:
+        ValueError: Se o valor não for um inteiro positivo
+    """
+    if valor is None or valor == '':
+        return padrao
+
+    limite = int(valor)
+    if limite < 1:
+        raise ValueError("O limite deve ser maior que zero")
+
+    return min(limite, maximo)
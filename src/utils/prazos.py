@@ -0,0 +1,67 @@
+"""
+Prazos de Operações no MongoDB - Calmou API
+Identifica os timeouts do pymongo (pymongo.timeout / maxTimeMS) e os anota
+no contexto atual, já que os controllers tratam os erros e retornam None
+
+Uso na camada HTTP (ver api/prazos.py):
+
+    token = iniciar_monitoramento()
+    try:
+        with pymongo.timeout(2.0):
+            ...                           # controllers chamam registrar_timeout(e)
+        if timeout_ocorrido():
+            ...                           # responde 503/504
+    finally:
+        encerrar_monitoramento(token)
+"""
+
+import contextvars
+
+from pymongo.errors import PyMongoError, ServerSelectionTimeoutError, WaitQueueTimeoutError
+
+# Tipos de timeout
+TIMEOUT_INDISPONIVEL = "indisponivel"   # sem servidor ou sem conexão livre no pool
+TIMEOUT_PRAZO = "prazo"                 # a operação passou do tempo
+
+_timeout = contextvars.ContextVar("timeout_mongo", default=None)
+
+
+def eh_timeout(erro):
+    """True se o erro é um timeout do MongoDB (do cliente ou maxTimeMS no servidor)"""
+    return isinstance(erro, PyMongoError) and erro.timeout
+
+
+def classificar_timeout(erro):
+    """
+    Returns:
+        str: TIMEOUT_INDISPONIVEL, TIMEOUT_PRAZO ou None se não for timeout
+    """
+    if not eh_timeout(erro):
+        return None
+    if isinstance(erro, (ServerSelectionTimeoutError, WaitQueueTimeoutError)):
+        return TIMEOUT_INDISPONIVEL
+    return TIMEOUT_PRAZO
+
+
+def registrar_timeout(erro):
+    """Anota no contexto atual se o erro tratado por um controller foi um timeout"""
+    tipo = classificar_timeout(erro)
+    if tipo is not None and _timeout.get() is None:
+        _timeout.set(tipo)
+
+
+def timeout_ocorrido():
+    """
+    Returns:
+        str: Tipo do primeiro timeout do contexto atual, ou None
+    """
+    return _timeout.get()
+
+
+def iniciar_monitoramento():
+    """Zera a anotação (threads do servidor são reaproveitadas entre requisições)"""
+    return _timeout.set(None)
+
+
+def encerrar_monitoramento(token):
+    _timeout.reset(token)
@@ -0,0 +1,115 @@
+"""
+Serialização JSON - Calmou API
+Codificação JSON com suporte nativo aos tipos BSON e mapas de campos
+pré-compilados para converter documentos do MongoDB em respostas
+
+Usa o orjson quando instalado e cai para o json da biblioteca padrão caso
+contrário; as duas saídas são equivalentes (chaves ordenadas, datas em ISO 8601).
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+BACKEND_JSON = "orjson" if orjson else "json"
+
+if orjson:
+    _OPCOES_ORJSON = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+def padrao_json(obj):
+    """
+    Converte tipos que o encoder não conhece (usado como `default`)
+
+    ObjectId vira string, datas viram ISO 8601 e decimais viram string para
+    não perder precisão (mesmo comportamento do Flask para Decimal).
+
+    Raises:
+        TypeError: Se o tipo não for suportado
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def json_dumps_bytes(obj):
+    """
+    Serializa em JSON compacto com chaves ordenadas
+
+    Returns:
+        bytes: JSON em UTF-8
+    """
+    if orjson:
+        return orjson.dumps(obj, default=padrao_json, option=_OPCOES_ORJSON)
+    return json.dumps(
+        obj, default=padrao_json, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_loads(dados):
+    """Desserializa JSON de str ou bytes"""
+    if orjson:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+# ==================== MAPAS DE CAMPOS ====================
+
+class MapaCampos:
+    """
+    Mapa pré-compilado de um documento MongoDB para o dicionário da resposta
+
+    Cada campo é o nome da chave ou uma tupla (origem, destino[, conversor[, padrao]]).
+    Os campos são normalizados uma única vez na criação do mapa, então
+    aplicar() só faz um laço sobre tuplas, sem inspecionar o documento.
+    Os valores ficam nos tipos nativos (datetime, ObjectId); quem converte
+    é o encoder JSON.
+    """
+
+    def __init__(self, *campos):
+        compilados = []
+        for campo in campos:
+            if isinstance(campo, str):
+                campo = (campo,)
+            origem = campo[0]
+            destino = campo[1] if len(campo) > 1 else origem
+            conversor = campo[2] if len(campo) > 2 else None
+            padrao = campo[3] if len(campo) > 3 else None
+            compilados.append((origem, destino, conversor, padrao))
+
+        self.campos = tuple(compilados)
+
+        # Projeção MongoDB com apenas os campos usados pelo mapa
+        self.projecao = {origem: 1 for origem, _, _, _ in self.campos}
+        self.projecao.setdefault("_id", 0)
+
+    def aplicar(self, doc):
+        """Converte um documento; o valor padrão não deve ser alterado por quem recebe"""
+        saida = {}
+        for origem, destino, conversor, padrao in self.campos:
+            valor = doc.get(origem, padrao)
+            if conversor is not None and valor is not None:
+                valor = conversor(valor)
+            saida[destino] = valor
+        return saida
+
+    def aplicar_lista(self, docs):
+        """Converte uma lista de documentos"""
+        aplicar = self.aplicar
+        return [aplicar(doc) for doc in docs]
@@ -0,0 +1,35 @@
+"""
+Configuração dos testes - Calmou API
+
+Os testes rodam sobre o armazenamento em memória (src/conexion/memoria),
+sem MongoDB. A raiz do projeto e o diretório api/ entram no path, como no
+gunicorn.conf.py e no app.py.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, RAIZ_PROJETO)
+sys.path.insert(0, os.path.join(RAIZ_PROJETO, "api"))
+
+os.environ.setdefault("ARMAZENAMENTO", "memoria")
+os.environ.setdefault("RATELIMIT_ENABLED", "0")
+
+# Cache do catálogo (L2) fora do ~/.cache do usuário
+os.environ.setdefault("XDG_CACHE_HOME", tempfile.mkdtemp(prefix="calmou-testes-"))
+
+
+@pytest.fixture
+def banco():
+    """Banco do motor em memória, vazio no início de cada teste"""
+    from src.conexion.mongo_conexao import conectar_mongo
+
+    db = conectar_mongo()
+    for nome in db.list_collection_names():
+        db.drop_collection(nome)
+    return db
@@ -0,0 +1,77 @@
+"""Testes do cache do catálogo (src/utils/cache_catalogo.py)"""
+
+import os
+import pickle
+import sqlite3
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from src.controller import controller_meditacao as modulo_controller
+from src.utils import cache_catalogo as modulo_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_CATALOGO_CAMINHO", str(tmp_path / "cache.sqlite3"))
+    return modulo_cache.CacheCatalogo()
+
+
+class _ColecaoComErro:
+    def find(self, *args, **kwargs):
+        raise AutoReconnect("conexão perdida")
+
+
+def test_pagina_com_erro_do_mongo_nao_vai_para_o_cache(cache, monkeypatch):
+    monkeypatch.setattr(modulo_controller, "obter_colecao", lambda nome: _ColecaoComErro())
+    controller = modulo_controller.ControllerMeditacao()
+    chamadas = []
+
+    def carregar():
+        chamadas.append(1)
+        return controller.listar_pagina(10, None)
+
+    assert cache.obter("pagina:10:", carregar) is None
+    assert cache.obter("pagina:10:", carregar) is None
+
+    assert len(chamadas) == 2
+    assert cache.l1.tamanho() == (0, 0)
+
+
+def test_l2_guarda_json_e_compartilha_entre_instancias(cache):
+    pagina = ([{"id": "1", "titulo": "Respiração"}], "cursor")
+
+    assert cache.obter("pagina:10:", lambda: pagina) == pagina
+
+    outro = modulo_cache.CacheCatalogo()
+    valor = outro.obter("pagina:10:", lambda: pytest.fail("deveria vir do L2"))
+    assert valor == [[{"id": "1", "titulo": "Respiração"}], "cursor"]
+    assert outro.acertos_l2 == 1
+
+    dados = sqlite3.connect(cache.l2.caminho).execute("SELECT valor FROM cache").fetchone()[0]
+    assert dados.startswith(b"[[{")
+
+
+class _Explosivo:
+    def __reduce__(self):
+        return (os.system, ("false",))
+
+
+def test_l2_nao_desserializa_pickle(cache, monkeypatch):
+    chave_l2 = f"{cache.versao()}:pagina:10:"
+    cache.l2.gravar(chave_l2, pickle.dumps(_Explosivo()))
+    monkeypatch.setattr(os, "system", lambda *args: pytest.fail("pickle executado"))
+
+    assert cache.obter("pagina:10:", lambda: ["do mongo"]) == ["do mongo"]
+    assert cache.erros_l2 == 1
+
+
+def test_valor_carregado_antes_de_invalidar_nao_fica_no_cache(cache):
+    def carregar_antigo():
+        # Uma escrita no catálogo invalida o cache durante a leitura
+        cache.invalidar()
+        return ["antigo"]
+
+    assert cache.obter("pagina:10:", carregar_antigo) == ["antigo"]
+    assert cache.obter("pagina:10:", lambda: ["novo"]) == ["novo"]
+    assert cache.obter("pagina:10:", lambda: ["outro"]) == ["novo"]
@@ -0,0 +1,46 @@
+"""Testes dos diretórios privados (src/utils/diretorios.py) e de quem os usa"""
+
+import os
+
+import pytest
+
+from armazenamento_limites import ArmazenamentoSQLite, uri_padrao
+from src.utils import metricas as modulo_metricas
+from src.utils.diretorios import diretorio_privado
+
+
+def test_diretorio_privado_criado_com_0700(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    diretorio = diretorio_privado("metricas")
+
+    assert diretorio == str(tmp_path / "calmou" / "metricas")
+    assert os.stat(tmp_path / "calmou").st_mode & 0o777 == 0o700
+    assert os.stat(diretorio).st_mode & 0o777 == 0o700
+
+
+@pytest.mark.parametrize("aberto", ["calmou", "calmou/metricas"])
+def test_diretorio_aberto_e_recusado(tmp_path, monkeypatch, aberto):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    (tmp_path / "calmou" / "metricas").mkdir(parents=True, mode=0o700)
+    os.chmod(tmp_path / "calmou", 0o700)
+    os.chmod(tmp_path / aberto, 0o777)
+
+    with pytest.raises(PermissionError):
+        diretorio_privado("metricas")
+
+
+def test_metricas_usam_diretorio_privado_por_padrao(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delenv("METRICAS_DIR", raising=False)
+
+    assert modulo_metricas._diretorio() == str(tmp_path / "calmou" / "metricas")
+
+
+def test_limites_usam_diretorio_privado_por_padrao(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    armazenamento = ArmazenamentoSQLite()
+
+    assert armazenamento.caminho == str(tmp_path / "calmou" / "limites.sqlite3")
+    assert uri_padrao() == f"sqlite:///{armazenamento.caminho}"
@@ -0,0 +1,72 @@
+"""Testes dos ETags do catálogo e do perfil (api/app.py)"""
+
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+from pymongo.errors import AutoReconnect, ServerSelectionTimeoutError
+
+import app as modulo_app
+from src.controller import controller_meditacao as modulo_meditacao
+from src.controller import controller_usuario as modulo_usuario
+
+
+class _ColecaoComErro:
+    def __init__(self, erro):
+        self.erro = erro
+
+    def find_one(self, *args, **kwargs):
+        raise self.erro
+
+
+@pytest.fixture
+def cliente(banco):
+    modulo_app.cache_catalogo.invalidar()
+    return modulo_app.create_app().test_client()
+
+
+def _inserir_meditacao(banco, titulo):
+    return banco["meditacoes"].insert_one({
+        "titulo": titulo, "descricao": "Sessão de teste", "duracao_minutos": 10,
+        "url_audio": "https://cdn.calmou.com/a.mp3", "tipo": "guiada", "categoria": "sono", "versao": 1
+    }).inserted_id
+
+
+def test_meditacao_inexistente_responde_404(cliente):
+    assert cliente.get(f"/meditacoes/{ObjectId()}").status_code == 404
+
+
+@pytest.mark.parametrize("erro, status", [
+    (AutoReconnect("conexão perdida"), 500),
+    (ServerSelectionTimeoutError("sem servidor"), 503)
+])
+def test_erro_do_mongo_na_versao_da_meditacao_nao_vira_404(cliente, monkeypatch, erro, status):
+    monkeypatch.setattr(modulo_meditacao, "obter_colecao", lambda nome: _ColecaoComErro(erro))
+    assert cliente.get(f"/meditacoes/{ObjectId()}").status_code == status
+
+
+def test_erro_do_mongo_na_versao_do_perfil_nao_vira_404(cliente, monkeypatch):
+    with cliente.application.app_context():
+        token = create_access_token(identity=str(ObjectId()))
+    cabecalhos = {"Authorization": f"Bearer {token}"}
+    assert cliente.get("/perfil", headers=cabecalhos).status_code == 404
+
+    monkeypatch.setattr(modulo_usuario, "obter_colecao", lambda nome: _ColecaoComErro(AutoReconnect("conexão perdida")))
+    assert cliente.get("/perfil", headers=cabecalhos).status_code == 500
+
+
+def test_etag_do_catalogo_vem_do_conteudo(cliente, banco):
+    _inserir_meditacao(banco, "Sono")
+    primeira = cliente.get("/meditacoes")
+    etag = primeira.headers["ETag"]
+
+    # Nova versão do cache (ou outro host) com o mesmo conteúdo: mesmo ETag
+    modulo_app.cache_catalogo.invalidar()
+    assert cliente.get("/meditacoes").headers["ETag"] == etag
+    assert cliente.get("/meditacoes", headers={"If-None-Match": etag}).status_code == 304
+
+    _inserir_meditacao(banco, "Foco")
+    modulo_app.cache_catalogo.invalidar()
+    segunda = cliente.get("/meditacoes", headers={"If-None-Match": etag})
+    assert segunda.status_code == 200
+    assert segunda.headers["ETag"] != etag
+    assert len(segunda.get_json()) == 2
@@ -0,0 +1,103 @@
+"""Testes da paginação do histórico de avaliações (ControllerUsuario.listar_avaliacoes)"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import ExecutionTimeout, PyMongoError
+
+from src.controller import controller_usuario as modulo_controller
+from src.controller.controller_usuario import ControllerUsuario
+from src.utils.prazos import TIMEOUT_PRAZO, encerrar_monitoramento, iniciar_monitoramento, timeout_ocorrido
+
+MESMA_DATA = datetime(2026, 5, 10, 9, 30)
+
+DATAS = [
+    datetime(2026, 5, 1, 8, 0),
+    MESMA_DATA,
+    MESMA_DATA,
+    MESMA_DATA,
+    datetime(2026, 5, 12, 20, 0)
+]
+
+
+def _avaliacao(numero, data):
+    return {
+        "tipo": "ansiedade",
+        "respostas": {"q1": numero},
+        "resultado_score": numero,
+        "resultado_texto": f"Avaliação {numero}",
+        "data_avaliacao": data
+    }
+
+
+def _ler_todas(controller, usuario_id, limite):
+    lidas, cursor = [], None
+    while True:
+        avaliacoes, cursor, total = controller.listar_avaliacoes(usuario_id, limite, cursor)
+        lidas.extend(avaliacoes)
+        if cursor is None:
+            return lidas, total
+
+
+@pytest.fixture
+def usuario_id(banco):
+    usuario_id = ObjectId()
+    banco["usuarios"].insert_one({
+        "_id": usuario_id,
+        "nome": "Teste",
+        "email": "teste@calmou.com",
+        "resultados_avaliacoes": [_avaliacao(numero, data) for numero, data in enumerate(DATAS)]
+    })
+    return usuario_id
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3])
+def test_datas_repetidas_na_virada_da_pagina_embedded(usuario_id, limite, monkeypatch):
+    monkeypatch.delenv("COLECOES_MODO", raising=False)
+
+    lidas, total = _ler_todas(ControllerUsuario(), usuario_id, limite)
+
+    assert total == len(DATAS)
+    assert sorted(a["resultado_score"] for a in lidas) == list(range(len(DATAS)))
+    assert [a["data_avaliacao"] for a in lidas] == sorted(DATAS, reverse=True)
+    assert all("posicao" not in a for a in lidas)
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3])
+def test_datas_repetidas_na_virada_da_pagina_colecao(banco, usuario_id, limite, monkeypatch):
+    monkeypatch.setenv("COLECOES_MODO", "resultados_avaliacoes=leitura")
+    banco["avaliacoes"].insert_many([
+        dict(_avaliacao(numero, data), usuario_id=usuario_id) for numero, data in enumerate(DATAS)
+    ])
+
+    lidas, total = _ler_todas(ControllerUsuario(), usuario_id, limite)
+
+    assert total == len(DATAS)
+    assert sorted(a["resultado_score"] for a in lidas) == list(range(len(DATAS)))
+    assert [a["data_avaliacao"] for a in lidas] == sorted(DATAS, reverse=True)
+    assert all("_id" not in a for a in lidas)
+
+
+class _ColecaoComErro:
+    def aggregate(self, *args, **kwargs):
+        raise ExecutionTimeout("operation exceeded time limit", 50)
+
+
+def test_usuario_inexistente(usuario_id, monkeypatch):
+    monkeypatch.delenv("COLECOES_MODO", raising=False)
+
+    assert ControllerUsuario().listar_avaliacoes(ObjectId()) is None
+
+
+def test_erro_do_mongo_nao_vira_usuario_inexistente(usuario_id, monkeypatch):
+    monkeypatch.delenv("COLECOES_MODO", raising=False)
+    monkeypatch.setattr(modulo_controller, "obter_colecao", lambda nome: _ColecaoComErro())
+
+    token = iniciar_monitoramento()
+    try:
+        with pytest.raises(PyMongoError):
+            ControllerUsuario().listar_avaliacoes(usuario_id)
+        assert timeout_ocorrido() == TIMEOUT_PRAZO
+    finally:
+        encerrar_monitoramento(token)
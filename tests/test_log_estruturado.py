@@ -0,0 +1,75 @@
+"""Testes do log estruturado da API (api/app.py e src/utils/log_estruturado.py)"""
+
+import json
+import logging
+import multiprocessing
+import os
+
+from flask.logging import default_handler
+
+import app as modulo_app
+from src.utils import log_estruturado as modulo_log
+from src.utils.log_estruturado import (
+    HandlerFila, arquivo_do_processo, arquivos_dos_processos, configurar_log_estruturado, encerrar_logs
+)
+
+
+def _criar_app_sem_handlers(monkeypatch):
+    """
+    Cria a aplicação sem handlers no logger dela nem na raiz, como num
+    processo do gunicorn (o Flask só adiciona o handler padrão assim)
+
+    Chamado no corpo do teste: o pytest põe o handler de captura na raiz
+    no início de cada fase
+    """
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    monkeypatch.setattr(logging.getLogger(modulo_app.__name__), "handlers", [])
+    return modulo_app.create_app()
+
+
+def test_app_logger_so_tem_o_handler_da_fila(monkeypatch):
+    app = _criar_app_sem_handlers(monkeypatch)
+
+    assert default_handler not in app.logger.handlers
+    assert len(app.logger.handlers) == 1
+    assert isinstance(app.logger.handlers[0], HandlerFila)
+
+
+def test_configurar_logging_nao_duplica_handlers(monkeypatch):
+    app = _criar_app_sem_handlers(monkeypatch)
+    modulo_app.configurar_logging(app)
+
+    assert len(app.logger.handlers) == 1
+
+
+def _logar_no_filho(logger):
+    logger.info("filho")
+    encerrar_logs()
+
+
+def test_cada_processo_grava_o_proprio_arquivo(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_CONSOLE_JSON", "0")
+    arquivo = str(tmp_path / "api.log")
+    logger = logging.getLogger("teste.log_por_processo")
+    logger.propagate = False
+    handler = configurar_log_estruturado(logger, arquivo)
+    pipeline = modulo_log._pipelines[-1]
+    try:
+        # Como no preload do gunicorn: o pipeline é criado antes do fork
+        processo = multiprocessing.get_context("fork").Process(target=_logar_no_filho, args=(logger,))
+        processo.start()
+        processo.join()
+        logger.info("pai")
+    finally:
+        # Só o pipeline deste teste: os da aplicação continuam ativos
+        logger.removeHandler(handler)
+        pipeline.parar()
+        modulo_log._pipelines.remove(pipeline)
+
+    arquivos = arquivos_dos_processos(arquivo)
+    assert arquivos == sorted([arquivo_do_processo(arquivo), arquivo_do_processo(arquivo, processo.pid)])
+    esperado = {arquivo_do_processo(arquivo): "pai", arquivo_do_processo(arquivo, processo.pid): "filho"}
+    for caminho, mensagem in esperado.items():
+        with open(caminho, encoding="utf-8") as entrada:
+            assert [json.loads(linha)["mensagem"] for linha in entrada] == [mensagem]
+    assert not os.path.exists(arquivo)
@@ -0,0 +1,234 @@
+"""Testes de aggregate no motor em memória (src/conexion/memoria): estágios e expressões usados pelos controllers e relatórios"""
+
+from datetime import datetime
+
+import pytest
+
+from src.conexion.memoria import ClienteMemoria
+
+
+@pytest.fixture
+def banco():
+    banco = ClienteMemoria()["teste"]
+    banco["usuarios"].insert_many([
+        {"_id": 1, "nome": "ana", "humor": [
+            {"nivel": 4, "sentimento": "Calmo", "data": datetime(2026, 5, 3)},
+            {"nivel": 2, "sentimento": "Triste", "data": datetime(2026, 5, 1)},
+            {"nivel": 5, "sentimento": "Calmo", "data": datetime(2026, 5, 2)}
+        ], "historico": [{"meditacao_id": 10}, {"meditacao_id": 99}]},
+        {"_id": 2, "nome": "bia", "humor": [], "historico": [{"meditacao_id": 10}]},
+        {"_id": 3, "nome": "caio"}
+    ])
+    banco["meditacoes"].insert_many([
+        {"_id": 10, "titulo": "Sono", "tipo": "guiada"},
+        {"_id": 11, "titulo": "Foco", "tipo": "musica"}
+    ])
+    return banco
+
+
+def _agregar(colecao, pipeline):
+    return list(colecao.aggregate(pipeline))
+
+
+def test_match_sort_limit_e_project_com_campos_calculados(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$match": {"nome": {"$ne": "caio"}}},
+        {"$sort": {"nome": -1}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "nome": 1, "total": {"$size": {"$ifNull": ["$humor", []]}}}}
+    ])
+    assert resultado == [{"nome": "bia", "total": 0}]
+
+
+def test_add_fields_e_count(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$addFields": {"total": {"$size": {"$ifNull": ["$humor", []]}}}},
+        {"$match": {"total": {"$gt": 0}}},
+        {"$count": "quantidade"}
+    ])
+    assert resultado == [{"quantidade": 1}]
+
+
+def test_unwind_simples_e_preservando_vazios(banco):
+    simples = _agregar(banco["usuarios"], [{"$unwind": "$humor"}, {"$project": {"humor.nivel": 1}}])
+    assert [(d["_id"], d["humor"]["nivel"]) for d in simples] == [(1, 4), (1, 2), (1, 5)]
+
+    preservado = _agregar(banco["usuarios"], [
+        {"$unwind": {"path": "$humor", "preserveNullAndEmptyArrays": True}},
+        {"$project": {"_id": 1}}
+    ])
+    assert [d["_id"] for d in preservado] == [1, 1, 1, 2, 3]
+
+
+def test_group_com_acumuladores(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$unwind": "$humor"},
+        {"$group": {
+            "_id": "$humor.sentimento",
+            "quantidade": {"$sum": 1},
+            "soma": {"$sum": "$humor.nivel"},
+            "media": {"$avg": "$humor.nivel"},
+            "maximo": {"$max": "$humor.nivel"},
+            "ultima": {"$max": "$humor.data"}
+        }},
+        {"$sort": {"_id": 1}}
+    ])
+    assert resultado == [
+        {"_id": "Calmo", "quantidade": 2, "soma": 9, "media": 4.5, "maximo": 5, "ultima": datetime(2026, 5, 3)},
+        {"_id": "Triste", "quantidade": 1, "soma": 2, "media": 2.0, "maximo": 2, "ultima": datetime(2026, 5, 1)}
+    ]
+
+
+def test_group_por_id_composto_e_por_dia(banco):
+    por_usuario = _agregar(banco["usuarios"], [
+        {"$unwind": "$humor"},
+        {"$group": {"_id": {"usuario": "$_id", "sentimento": "$humor.sentimento"}, "n": {"$sum": 1}}},
+        {"$sort": {"n": -1}}
+    ])
+    assert por_usuario[0] == {"_id": {"usuario": 1, "sentimento": "Calmo"}, "n": 2}
+
+    por_dia = _agregar(banco["usuarios"], [
+        {"$unwind": "$humor"},
+        {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$humor.data"}}, "n": {"$sum": 1}}},
+        {"$sort": {"_id": 1}}
+    ])
+    assert [d["_id"] for d in por_dia] == ["2026-05-01", "2026-05-02", "2026-05-03"]
+
+
+def test_group_de_tudo_com_id_nulo(banco):
+    resultado = _agregar(banco["usuarios"], [{"$group": {"_id": None, "usuarios": {"$sum": 1}}}])
+    assert resultado == [{"_id": None, "usuarios": 3}]
+
+
+def test_lookup_por_campo_local_em_array(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$match": {"_id": 1}},
+        {"$unwind": "$historico"},
+        {"$lookup": {"from": "meditacoes", "localField": "historico.meditacao_id", "foreignField": "_id", "as": "meditacao"}},
+        {"$unwind": {"path": "$meditacao", "preserveNullAndEmptyArrays": True}},
+        {"$project": {"_id": 0, "titulo": "$meditacao.titulo"}}
+    ])
+    # A meditação 99 não existe: o documento segue sem o campo
+    assert resultado == [{"titulo": "Sono"}, {}]
+
+
+def test_lookup_com_pipeline_e_replace_with(banco):
+    resultado = _agregar(banco["meditacoes"], [
+        {"$lookup": {"from": "usuarios", "localField": "_id", "foreignField": "historico.meditacao_id", "pipeline": [
+            {"$project": {"_id": 0, "nome": 1}}
+        ], "as": "usuarios"}},
+        {"$replaceWith": {"$mergeObjects": [{"titulo": "$titulo"}, {"usuarios": "$usuarios.nome"}]}}
+    ])
+    assert resultado == [{"titulo": "Sono", "usuarios": ["ana", "bia"]}, {"titulo": "Foco", "usuarios": []}]
+
+
+def test_facet(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "nomes": [{"$sort": {"nome": 1}}, {"$limit": 2}, {"$project": {"_id": 0, "nome": 1}}]
+        }}
+    ])
+    assert resultado == [{"total": [{"n": 3}], "nomes": [{"nome": "ana"}, {"nome": "bia"}]}]
+
+
+def test_union_with_com_pipeline(banco):
+    resultado = _agregar(banco["meditacoes"], [
+        {"$project": {"_id": 0, "nome": "$titulo"}},
+        {"$unionWith": {"coll": "usuarios", "pipeline": [{"$match": {"_id": 3}}, {"$project": {"_id": 0, "nome": 1}}]}}
+    ])
+    assert resultado == [{"nome": "Sono"}, {"nome": "Foco"}, {"nome": "caio"}]
+
+
+def test_expressoes_de_array_do_resumo_de_humor(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$match": {"_id": 1}},
+        {"$project": {
+            "periodo": {"$filter": {
+                "input": "$humor", "as": "c", "cond": {"$gte": ["$$c.data", datetime(2026, 5, 2)]}
+            }}
+        }},
+        {"$addFields": {"sentimentos": {"$map": {"input": "$periodo", "as": "c", "in": "$$c.sentimento"}}}},
+        {"$project": {
+            "_id": 0,
+            "total": {"$size": "$periodo"},
+            "media": {"$avg": "$periodo.nivel"},
+            "soma": {"$sum": "$periodo.nivel"},
+            "frequentes": {"$arrayToObject": {"$map": {
+                "input": {"$setUnion": ["$sentimentos", []]},
+                "as": "s",
+                "in": {"k": "$$s", "v": {"$size": {"$filter": {
+                    "input": "$sentimentos", "as": "x", "cond": {"$eq": ["$$x", "$$s"]}
+                }}}}
+            }}},
+            "recente": {"$arrayElemAt": [{"$sortArray": {"input": "$periodo", "sortBy": {"data": -1}}}, 0]},
+            "ultimos": {"$slice": [{"$sortArray": {"input": "$periodo", "sortBy": {"data": 1}}}, -1]}
+        }}
+    ])
+    assert resultado == [{
+        "total": 2,
+        "media": 4.5,
+        "soma": 9,
+        "frequentes": {"Calmo": 2},
+        "recente": {"nivel": 4, "sentimento": "Calmo", "data": datetime(2026, 5, 3)},
+        "ultimos": [{"nivel": 4, "sentimento": "Calmo", "data": datetime(2026, 5, 3)}]
+    }]
+
+
+def test_sort_array_por_varias_chaves_e_slice_com_posicao():
+    colecao = ClienteMemoria()["teste"]["listas"]
+    colecao.insert_one({"_id": 1, "itens": [
+        {"d": 1, "p": 0}, {"d": 2, "p": 1}, {"d": 2, "p": 2}, {"d": 3, "p": 3}
+    ]})
+    resultado = _agregar(colecao, [{"$project": {
+        "_id": 0,
+        "ordem": {"$map": {
+            "input": {"$sortArray": {"input": "$itens", "sortBy": {"d": -1, "p": -1}}}, "as": "i", "in": "$$i.p"
+        }},
+        "pagina": {"$slice": ["$itens", 1, 2]},
+        "inicio": {"$slice": ["$itens", 2]}
+    }}])
+    assert resultado == [{
+        "ordem": [3, 2, 1, 0],
+        "pagina": [{"d": 2, "p": 1}, {"d": 2, "p": 2}],
+        "inicio": [{"d": 1, "p": 0}, {"d": 2, "p": 1}]
+    }]
+
+
+def test_range_merge_objects_e_posicao_no_array():
+    colecao = ClienteMemoria()["teste"]["listas"]
+    colecao.insert_one({"_id": 1, "itens": [{"v": "a"}, {"v": "b"}]})
+    resultado = _agregar(colecao, [{"$project": {"_id": 0, "itens": {"$map": {
+        "input": {"$range": [0, {"$size": "$itens"}]},
+        "as": "i",
+        "in": {"$mergeObjects": [{"$arrayElemAt": ["$itens", "$$i"]}, {"posicao": "$$i"}]}
+    }}}}])
+    assert resultado == [{"itens": [{"v": "a", "posicao": 0}, {"v": "b", "posicao": 1}]}]
+
+
+def test_expressoes_escalares(banco):
+    resultado = _agregar(banco["usuarios"], [
+        {"$match": {"_id": 3}},
+        {"$project": {
+            "_id": 0,
+            "id_texto": {"$toString": "$_id"},
+            "soma": {"$add": [1, 2, 3]},
+            "nulo": {"$ifNull": ["$ausente", "padrao"]},
+            "condicao": {"$cond": [{"$and": [{"$eq": ["$nome", "caio"]}, {"$lt": [1, 2]}]}, "sim", "nao"]},
+            "ou": {"$or": [False, {"$gte": [2, 3]}]},
+            "maior": {"$max": [3, 7, None]},
+            "vazio": {"$max": "$ausente"},
+            "data": {"$dateToString": {"format": "%Y-%m-%d", "date": datetime(2026, 1, 2, 23, 59)}}
+        }}
+    ])
+    assert resultado == [{
+        "id_texto": "3", "soma": 6, "nulo": "padrao", "condicao": "sim",
+        "ou": False, "maior": 7, "vazio": None, "data": "2026-01-02"
+    }]
+
+
+def test_avg_de_array_vazio_e_nulo():
+    colecao = ClienteMemoria()["teste"]["listas"]
+    colecao.insert_one({"_id": 1, "itens": []})
+    resultado = _agregar(colecao, [{"$project": {"_id": 0, "media": {"$avg": "$itens.n"}, "soma": {"$sum": "$itens.n"}}}])
+    assert resultado == [{"media": None, "soma": 0}]
@@ -0,0 +1,165 @@
+"""Testes de escrita do motor em memória (src/conexion/memoria): operadores de update, upsert, bulk_write e índices únicos"""
+
+from datetime import datetime
+
+import pytest
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.operations import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+from src.conexion.memoria import ClienteMemoria
+
+
+@pytest.fixture
+def colecao():
+    return ClienteMemoria()["teste"]["documentos"]
+
+
+def test_set_unset_e_inc_com_caminho_com_ponto(colecao):
+    colecao.insert_one({"_id": 1, "nome": "ana", "sentimentos": {"Calmo": 1}, "apagar": True})
+    resultado = colecao.update_one({"_id": 1}, {
+        "$set": {"perfil.cidade": "Recife", "nome": "Ana"},
+        "$unset": {"apagar": ""},
+        "$inc": {"sentimentos.Calmo": 2, "sentimentos.Feliz": 1}
+    })
+    assert (resultado.matched_count, resultado.modified_count) == (1, 1)
+    assert colecao.find_one({"_id": 1}) == {
+        "_id": 1, "nome": "Ana", "sentimentos": {"Calmo": 3, "Feliz": 1}, "perfil": {"cidade": "Recife"}
+    }
+
+
+def test_update_sem_mudanca_nao_conta_como_modificado(colecao):
+    colecao.insert_one({"_id": 1, "nome": "ana"})
+    resultado = colecao.update_one({"_id": 1}, {"$set": {"nome": "ana"}})
+    assert (resultado.matched_count, resultado.modified_count) == (1, 0)
+
+
+def test_min_e_max(colecao):
+    colecao.insert_one({"_id": 1, "minimo": 3, "maximo": 3, "ultima": datetime(2026, 5, 1)})
+    colecao.update_one({"_id": 1}, {"$min": {"minimo": 1}, "$max": {"maximo": 2, "ultima": datetime(2026, 5, 2)}})
+    colecao.update_one({"_id": 1}, {"$min": {"minimo": 2, "novo": 7}})
+    assert colecao.find_one({"_id": 1}) == {
+        "_id": 1, "minimo": 1, "maximo": 3, "ultima": datetime(2026, 5, 2), "novo": 7
+    }
+
+
+def test_push_each_e_pull_por_subdocumento(colecao):
+    colecao.insert_one({"_id": 1, "historico": [{"meditacao_id": "a", "n": 1}]})
+    colecao.update_one({"_id": 1}, {"$push": {"historico": {"$each": [{"meditacao_id": "b"}, {"meditacao_id": "a", "n": 2}]}}})
+    colecao.update_one({"_id": 1}, {"$push": {"outro": 5}})
+    assert len(colecao.find_one({"_id": 1})["historico"]) == 3
+
+    colecao.update_many({}, {"$pull": {"historico": {"meditacao_id": "a"}}})
+    assert colecao.find_one({"_id": 1}) == {"_id": 1, "historico": [{"meditacao_id": "b"}], "outro": [5]}
+
+
+def test_pull_por_valor_e_condicao(colecao):
+    colecao.insert_one({"_id": 1, "numeros": [1, 5, 2, 8], "tags": ["a", "b", "a"]})
+    colecao.update_one({"_id": 1}, {"$pull": {"numeros": {"$gte": 5}, "tags": "a"}})
+    assert colecao.find_one({"_id": 1}) == {"_id": 1, "numeros": [1, 2], "tags": ["b"]}
+
+
+def test_upsert_copia_so_as_igualdades_do_filtro(colecao):
+    filtro = {"usuario_id": "u1", "mes": "2026-05", "contagem": {"$lte": 8}, "legado": {"$exists": False}}
+    atualizacao = {
+        "$push": {"registros": {"$each": [{"nivel": 4}, {"nivel": 2}]}},
+        "$inc": {"contagem": 2, "soma": 6},
+        "$min": {"minimo": 2},
+        "$max": {"maximo": 4},
+        "$setOnInsert": {"inicio": datetime(2026, 5, 1)}
+    }
+    resultado = colecao.update_one(filtro, atualizacao, upsert=True)
+    assert resultado.upserted_id is not None
+    documento = colecao.find_one({"_id": resultado.upserted_id}, {"_id": 0})
+    assert documento == {
+        "usuario_id": "u1", "mes": "2026-05", "registros": [{"nivel": 4}, {"nivel": 2}],
+        "contagem": 2, "soma": 6, "minimo": 2, "maximo": 4, "inicio": datetime(2026, 5, 1)
+    }
+
+    # O segundo upsert encontra o bucket e não reaplica $setOnInsert
+    atualizacao["$setOnInsert"] = {"inicio": datetime(2030, 1, 1)}
+    resultado = colecao.update_one(filtro, atualizacao, upsert=True)
+    assert (resultado.matched_count, resultado.upserted_id) == (1, None)
+    documento = colecao.find_one({"usuario_id": "u1"})
+    assert documento["contagem"] == 4 and documento["inicio"] == datetime(2026, 5, 1)
+
+
+def test_upsert_com_id_no_filtro(colecao):
+    colecao.update_one({"_id": "geral"}, {"$inc": {"total": 1}, "$set": {"atualizado": True}}, upsert=True)
+    colecao.update_one({"_id": "geral"}, {"$inc": {"total": 1}}, upsert=True)
+    assert colecao.find_one({"_id": "geral"}) == {"_id": "geral", "total": 2, "atualizado": True}
+
+
+def test_update_por_pipeline_com_max_de_caminhos_em_arrays(colecao):
+    colecao.insert_many([
+        {"_id": 1, "cadastro": datetime(2026, 1, 1), "humor": [{"data": datetime(2026, 3, 1)}, {"data": datetime(2026, 2, 1)}]},
+        {"_id": 2, "cadastro": datetime(2026, 4, 1), "humor": []},
+        {"_id": 3, "cadastro": datetime(2026, 1, 5)}
+    ])
+    colecao.update_many({}, [{"$set": {"ultima": {"$max": ["$cadastro", {"$max": "$humor.data"}]}}}])
+    assert [d["ultima"] for d in colecao.find({}, sort=[("_id", 1)])] == [
+        datetime(2026, 3, 1), datetime(2026, 4, 1), datetime(2026, 1, 5)
+    ]
+
+
+def test_replace_one_com_upsert(colecao):
+    colecao.replace_one({"_id": 1}, {"nome": "ana"}, upsert=True)
+    colecao.replace_one({"_id": 1}, {"nome": "bia"}, upsert=True)
+    assert list(colecao.find()) == [{"_id": 1, "nome": "bia"}]
+
+
+def test_find_one_and_update_devolve_antes_ou_depois(colecao):
+    colecao.insert_one({"_id": 1, "versao": 1})
+    antes = colecao.find_one_and_update({"_id": 1}, {"$inc": {"versao": 1}})
+    depois = colecao.find_one_and_update({"_id": 1}, {"$inc": {"versao": 1}}, return_document=ReturnDocument.AFTER)
+    assert (antes["versao"], depois["versao"]) == (1, 3)
+    assert colecao.find_one_and_update({"_id": 2}, {"$set": {"x": 1}}) is None
+
+
+def test_indice_unico_rejeita_duplicata(colecao):
+    colecao.create_index("email", unique=True)
+    colecao.insert_one({"email": "a@x.com"})
+    with pytest.raises(DuplicateKeyError):
+        colecao.insert_one({"email": "a@x.com"})
+    outro = colecao.insert_one({"email": "b@x.com"}).inserted_id
+    with pytest.raises(DuplicateKeyError):
+        colecao.update_one({"_id": outro}, {"$set": {"email": "a@x.com"}})
+    assert colecao.count_documents({"email": "a@x.com"}) == 1
+
+
+def test_insert_many_desordenado_continua_apos_duplicata(colecao):
+    colecao.create_index("email", unique=True)
+    with pytest.raises(BulkWriteError) as erro:
+        colecao.insert_many([{"email": "a"}, {"email": "a"}, {"email": "b"}], ordered=False)
+    detalhes = erro.value.details
+    assert detalhes["nInserted"] == 2
+    assert [(e["index"], e["code"]) for e in detalhes["writeErrors"]] == [(1, 11000)]
+    assert colecao.count_documents({}) == 2
+
+
+def test_insert_many_ordenado_para_na_duplicata(colecao):
+    colecao.create_index("email", unique=True)
+    with pytest.raises(BulkWriteError) as erro:
+        colecao.insert_many([{"email": "a"}, {"email": "a"}, {"email": "b"}])
+    assert erro.value.details["nInserted"] == 1
+    assert colecao.count_documents({}) == 1
+
+
+def test_bulk_write_misto(colecao):
+    colecao.insert_many([{"_id": 1, "n": 1}, {"_id": 2, "n": 2}])
+    resultado = colecao.bulk_write([
+        InsertOne({"_id": 3, "n": 3}),
+        UpdateOne({"_id": 1}, {"$inc": {"n": 10}}),
+        UpdateOne({"_id": 9}, {"$set": {"n": 9}}, upsert=True),
+        ReplaceOne({"_id": 2}, {"n": 20}),
+        DeleteOne({"_id": 3})
+    ], ordered=False)
+    assert (resultado.inserted_count, resultado.matched_count, resultado.modified_count) == (1, 2, 2)
+    assert (resultado.upserted_count, resultado.deleted_count) == (1, 1)
+    assert [d["n"] for d in colecao.find({}, sort=[("_id", 1)])] == [11, 20, 9]
+
+
+def test_delete_many_com_nin(colecao):
+    colecao.insert_many([{"_id": i} for i in range(5)])
+    assert colecao.delete_many({"_id": {"$nin": [1, 3]}}).deleted_count == 3
+    assert [d["_id"] for d in colecao.find()] == [1, 3]
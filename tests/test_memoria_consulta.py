@@ -0,0 +1,130 @@
+"""Testes de consulta do motor em memória (src/conexion/memoria): filtros, projeção, ordenação e contagens"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from src.conexion.memoria import ClienteMemoria
+
+
+@pytest.fixture
+def colecao():
+    colecao = ClienteMemoria()["teste"]["documentos"]
+    colecao.insert_many([
+        {"_id": 1, "nome": "ana", "idade": 30, "tags": ["a", "b"], "perfil": {"cidade": "Recife"},
+         "itens": [{"tipo": "x", "valor": 1}, {"tipo": "y", "valor": 2}], "classificacoes_humor": [{"nivel": 3}]},
+        {"_id": 2, "nome": "bia", "idade": 25, "tags": ["b"], "perfil": {"cidade": "Natal"},
+         "itens": [{"tipo": "y", "valor": 5}], "classificacoes_humor": []},
+        {"_id": 3, "nome": "caio", "idade": None, "tags": [], "perfil": {}},
+        {"_id": 4, "nome": "duda", "idade": "40"}
+    ])
+    return colecao
+
+
+def _ids(cursor):
+    return [documento["_id"] for documento in cursor]
+
+
+def test_igualdade_com_null_casa_campo_ausente_e_nulo(colecao):
+    assert _ids(colecao.find({"idade": None})) == [3]
+    assert _ids(colecao.find({"perfil.cidade": None})) == [3, 4]
+
+
+def test_igualdade_com_escalar_casa_elemento_de_array(colecao):
+    assert _ids(colecao.find({"tags": "b"})) == [1, 2]
+    assert _ids(colecao.find({"tags": ["b"]})) == [2]
+    assert _ids(colecao.find({"tags": []})) == [3]
+
+
+def test_caminho_com_ponto_percorre_arrays_de_subdocumentos(colecao):
+    assert _ids(colecao.find({"itens.tipo": "y"})) == [1, 2]
+    assert _ids(colecao.find({"itens.valor": {"$gt": 4}})) == [2]
+    assert _ids(colecao.find({"perfil.cidade": "Recife"})) == [1]
+
+
+def test_comparacoes_nao_misturam_tipos(colecao):
+    assert _ids(colecao.find({"idade": {"$gt": 20}})) == [1, 2]
+    assert _ids(colecao.find({"idade": {"$gte": 25, "$lt": 30}})) == [2]
+    assert _ids(colecao.find({"idade": {"$lte": 30}})) == [1, 2]
+    assert _ids(colecao.find({"idade": {"$gt": "3"}})) == [4]
+    assert _ids(colecao.find({"idade": {"$eq": 30}})) == [1]
+
+
+def test_in_e_nin(colecao):
+    assert _ids(colecao.find({"nome": {"$in": ["ana", "caio"]}})) == [1, 3]
+    assert _ids(colecao.find({"idade": {"$in": [None, 25]}})) == [2, 3]
+    assert _ids(colecao.find({"tags": {"$in": ["a"]}})) == [1]
+    # $nin também casa documentos sem o campo
+    assert _ids(colecao.find({"tags": {"$nin": ["b"]}})) == [3, 4]
+
+
+def test_exists_inclusive_indice_de_array(colecao):
+    assert _ids(colecao.find({"tags": {"$exists": True}})) == [1, 2, 3]
+    assert _ids(colecao.find({"tags": {"$exists": False}})) == [4]
+    assert _ids(colecao.find({"classificacoes_humor.0": {"$exists": True}})) == [1]
+    assert _ids(colecao.find({"idade": {"$exists": True}})) == [1, 2, 3, 4]
+
+
+def test_or_e_and(colecao):
+    assert _ids(colecao.find({"$or": [{"nome": "ana"}, {"idade": 25}]})) == [1, 2]
+    assert _ids(colecao.find({"$and": [{"tags": "b"}, {"idade": {"$lt": 30}}]})) == [2]
+    assert _ids(colecao.find({"$or": [{"idade": {"$lt": 30}}, {"idade": 30, "_id": {"$lt": 2}}]})) == [1, 2]
+
+
+def test_cursor_composto_por_data_e_object_id():
+    colecao = ClienteMemoria()["teste"]["avaliacoes"]
+    data = datetime(2026, 5, 10)
+    ids = [ObjectId() for _ in range(3)]
+    colecao.insert_many([{"_id": id_, "data": data} for id_ in ids] + [{"_id": ObjectId(), "data": datetime(2026, 5, 9)}])
+    filtro = {"$or": [{"data": {"$lt": data}}, {"data": data, "_id": {"$lt": ids[2]}}]}
+    resultado = list(colecao.find(filtro).sort([("data", -1), ("_id", -1)]))
+    assert [documento["_id"] for documento in resultado[:2]] == [ids[1], ids[0]]
+    assert len(resultado) == 3
+
+
+def test_projecao_de_inclusao_e_exclusao(colecao):
+    assert colecao.find_one({"_id": 1}, {"nome": 1}) == {"_id": 1, "nome": "ana"}
+    assert colecao.find_one({"_id": 1}, {"_id": 0, "perfil.cidade": 1}) == {"perfil": {"cidade": "Recife"}}
+    excluido = colecao.find_one({"_id": 2}, {"itens": 0, "classificacoes_humor": 0, "perfil": 0})
+    assert excluido == {"_id": 2, "nome": "bia", "idade": 25, "tags": ["b"]}
+
+
+def test_projecao_devolve_copia(colecao):
+    documento = colecao.find_one({"_id": 1})
+    documento["tags"].append("z")
+    assert colecao.find_one({"_id": 1})["tags"] == ["a", "b"]
+
+
+def test_ordenacao_coloca_ausentes_e_nulos_primeiro(colecao):
+    assert _ids(colecao.find({}, {"_id": 1}).sort("perfil.cidade", 1)) == [3, 4, 2, 1]
+    assert _ids(colecao.find({"_id": {"$lte": 3}}).sort("idade", -1)) == [1, 2, 3]
+
+
+def test_ordenacao_por_varias_chaves_skip_e_limit(colecao):
+    colecao.insert_many([{"_id": 5, "nome": "bia", "idade": 20}, {"_id": 6, "nome": "ana", "idade": 18}])
+    cursor = colecao.find({"nome": {"$in": ["ana", "bia"]}}).sort([("nome", 1), ("idade", -1)])
+    assert _ids(cursor) == [1, 6, 2, 5]
+    assert _ids(colecao.find({}).sort("_id", -1).skip(1).limit(2)) == [5, 4]
+    assert _ids(colecao.find({}, sort=[("_id", 1)], skip=4)) == [5, 6]
+
+
+def test_hint_com_indice_existente(colecao):
+    colecao.create_index([("nome", 1)], name="nome_1")
+    assert _ids(colecao.find({"nome": "bia"}).hint("nome_1")) == [2]
+    assert _ids(colecao.find({"nome": "bia"}).hint([("nome", 1)])) == [2]
+
+
+def test_contagem_e_distinct(colecao):
+    assert colecao.count_documents({}) == 4
+    assert colecao.count_documents({"tags": "b"}) == 2
+    assert colecao.count_documents({}, skip=1, limit=2) == 2
+    assert sorted(colecao.distinct("tags")) == ["a", "b"]
+    assert sorted(colecao.distinct("itens.tipo")) == ["x", "y"]
+    assert colecao.distinct("nome", {"idade": {"$gt": 26}}) == ["ana"]
+
+
+def test_find_one_and_delete_respeita_ordenacao(colecao):
+    removido = colecao.find_one_and_delete({"tags": "b"}, sort=[("idade", 1)])
+    assert removido["_id"] == 2
+    assert colecao.count_documents({}) == 3
@@ -0,0 +1,58 @@
+"""Testes do log de operações lentas (src/conexion/operacoes_lentas.py e scripts/operacoes_lentas.py)"""
+
+import importlib.util
+import json
+import multiprocessing
+import os
+
+from src.conexion.operacoes_lentas import RAIZ_PROJETO, RegistroOperacoesLentas
+from src.utils.log_estruturado import arquivo_do_processo, arquivos_dos_processos
+
+OPERACOES_POR_PROCESSO = 200
+
+
+def _script():
+    caminho = os.path.join(RAIZ_PROJETO, "scripts", "operacoes_lentas.py")
+    especificacao = importlib.util.spec_from_file_location("script_operacoes_lentas", caminho)
+    modulo = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(modulo)
+    return modulo
+
+
+def _gravar_no_filho(registro, processo):
+    registro._reiniciar()
+    for numero in range(OPERACOES_POR_PROCESSO):
+        registro._gravar({
+            "comando": "find", "forma_id": "forma", "processo": processo, "numero": numero,
+            "carga": "x" * 200, "_comando": {}
+        })
+
+
+def test_arquivo_do_processo():
+    assert arquivo_do_processo("logs/operacoes_lentas.jsonl", 123) == "logs/operacoes_lentas.123.jsonl"
+
+
+def test_workers_rotacionam_arquivos_separados_sem_perder_linhas(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "operacoes_lentas.jsonl")
+    monkeypatch.setenv("LENTAS_ARQUIVO", caminho)
+    monkeypatch.setenv("LENTAS_ARQUIVO_MAX_BYTES", "4096")
+    monkeypatch.setenv("LENTAS_ARQUIVO_BACKUPS", "100")
+    monkeypatch.setenv("LENTAS_EXPLAIN", "0")
+    registro = RegistroOperacoesLentas(lambda nome: None)
+
+    contexto = multiprocessing.get_context("fork")
+    processos = [contexto.Process(target=_gravar_no_filho, args=(registro, numero)) for numero in range(2)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
+
+    assert len(arquivos_dos_processos(caminho)) == 2
+    linhas = []
+    for arquivo in _script().arquivos_log(caminho):
+        with open(arquivo, encoding="utf-8") as entrada:
+            linhas.extend(json.loads(linha) for linha in entrada)
+
+    assert sorted((linha["processo"], linha["numero"]) for linha in linhas) == [
+        (processo, numero) for processo in range(2) for numero in range(OPERACOES_POR_PROCESSO)
+    ]
@@ -0,0 +1,70 @@
+"""Testes do pool de hash de senhas (api/pool_senhas.py)"""
+
+import os
+import time
+
+import pytest
+
+from pool_senhas import PoolSenhas, PoolSenhasSobrecarregado
+
+
+# Executadas nos processos do pool (precisam ser importáveis)
+
+def _dormir(segundos):
+    inicio = time.time()
+    time.sleep(segundos)
+    return True, inicio, time.time() - inicio
+
+
+def _encerrar_processo():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = PoolSenhas(processos=1, max_fila=0, timeout=30, retry_after=1, rounds=4)
+    # Aquece o processo do pool: o spawn não entra no tempo dos testes
+    assert pool._executar(_dormir, 0) is True
+    yield pool
+    pool.fechar()
+
+
+def _esperar_pendentes(pool, esperado, limite=10):
+    fim = time.monotonic() + limite
+    while pool.estatisticas()['pendentes'] != esperado and time.monotonic() < fim:
+        time.sleep(0.05)
+    return pool.estatisticas()['pendentes']
+
+
+def test_timeout_mantem_a_operacao_pendente_ate_terminar(pool):
+    pool.timeout = 0.2
+
+    with pytest.raises(PoolSenhasSobrecarregado):
+        pool._executar(_dormir, 1.5)
+
+    # O bcrypt continua no processo: a vaga só é liberada quando ele termina
+    assert pool.estatisticas()['pendentes'] == 1
+    with pytest.raises(PoolSenhasSobrecarregado, match="cheia"):
+        pool._executar(_dormir, 0)
+
+    assert _esperar_pendentes(pool, 0) == 0
+    estatisticas = pool.estatisticas()
+    assert estatisticas['timeouts'] == 1
+    assert estatisticas['rejeitadas'] == 1
+
+
+def test_pool_quebrado_e_recriado(pool):
+    with pytest.raises(PoolSenhasSobrecarregado, match="reiniciado"):
+        pool._executar(_encerrar_processo)
+
+    assert pool._executar(_dormir, 0) is True
+    estatisticas = pool.estatisticas()
+    assert estatisticas['reinicios'] == 1
+    assert estatisticas['pendentes'] == 0
+
+
+def test_gerar_e_verificar_hash(pool):
+    password_hash = pool.gerar_hash("senha-forte")
+
+    assert pool.verificar("senha-forte", password_hash) is True
+    assert pool.verificar("outra", password_hash) is False
@@ -0,0 +1,51 @@
+"""Testes dos prazos por requisição (api/prazos.py e src/utils/prazos.py)"""
+
+from flask import Flask
+from pymongo.errors import ExecutionTimeout
+
+from prazos import aplicar_prazos, prazo
+from src.utils.prazos import registrar_timeout, timeout_ocorrido
+
+
+def _criar_app():
+    app = Flask(__name__)
+    vistos = []
+
+    @app.route('/sem-prazo')
+    @prazo(None)
+    def sem_prazo():
+        vistos.append(timeout_ocorrido())
+        registrar_timeout(ExecutionTimeout("operation exceeded time limit", 50))
+        return {'ok': True}
+
+    @app.route('/com-prazo')
+    @prazo(2.0)
+    def com_prazo():
+        vistos.append(timeout_ocorrido())
+        registrar_timeout(ExecutionTimeout("operation exceeded time limit", 50))
+        return {'ok': True}
+
+    aplicar_prazos(app)
+    return app, vistos
+
+
+def test_timeout_sem_prazo_nao_vaza_para_a_proxima_requisicao():
+    app, vistos = _criar_app()
+    cliente = app.test_client()
+
+    assert cliente.get('/sem-prazo').status_code == 200
+    assert timeout_ocorrido() is None
+    assert cliente.get('/sem-prazo').status_code == 200
+
+    assert vistos == [None, None]
+
+
+def test_timeout_com_prazo_responde_504_e_e_limpo():
+    app, vistos = _criar_app()
+    cliente = app.test_client()
+
+    resposta = cliente.get('/com-prazo')
+
+    assert resposta.status_code == 504
+    assert resposta.get_json()['error'] == 'deadline_exceeded'
+    assert timeout_ocorrido() is None
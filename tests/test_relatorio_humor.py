@@ -0,0 +1,50 @@
+"""Testes do relatório de humor (ControllerUsuario.relatorio_humor e rota /humor/relatorio-semanal)"""
+
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+from pymongo.errors import OperationFailure, PyMongoError
+
+import app as modulo_app
+from src.controller import controller_humor as modulo_humor
+from src.controller.controller_usuario import ControllerUsuario
+
+
+class _ColecaoComErro:
+    def aggregate(self, *args, **kwargs):
+        raise OperationFailure("falha no $group")
+
+    def find_one(self, *args, **kwargs):
+        raise OperationFailure("falha no find")
+
+
+@pytest.fixture
+def usuario_id(banco):
+    return banco["usuarios"].insert_one({"nome": "Teste", "email": "teste@calmou.com"}).inserted_id
+
+
+def test_usuario_sem_registros_e_usuario_inexistente(usuario_id):
+    controller = ControllerUsuario()
+
+    assert controller.relatorio_humor(usuario_id)["total_registros"] == 0
+    assert controller.relatorio_humor(ObjectId()) is None
+
+
+def test_erro_do_mongo_nao_vira_usuario_inexistente(usuario_id, monkeypatch):
+    monkeypatch.setattr(modulo_humor, "obter_colecao", lambda nome: _ColecaoComErro())
+
+    with pytest.raises(PyMongoError):
+        ControllerUsuario().relatorio_humor(usuario_id)
+
+
+def test_rota_responde_500_em_erro_do_mongo(usuario_id, monkeypatch):
+    app = modulo_app.create_app()
+    with app.app_context():
+        token = create_access_token(identity=str(usuario_id))
+    cliente = app.test_client()
+    cabecalhos = {"Authorization": f"Bearer {token}"}
+
+    assert cliente.get("/humor/relatorio-semanal", headers=cabecalhos).status_code == 200
+
+    monkeypatch.setattr(modulo_humor, "obter_colecao", lambda nome: _ColecaoComErro())
+    assert cliente.get("/humor/relatorio-semanal", headers=cabecalhos).status_code == 500